@@ -1,21 +1,39 @@
 
-# Build a toy feature matrix by merging features_raw with lines; creates feat_rating_diff.
+# Build the per-game feature matrix (db/features.csv) from the point-in-time team feature store
+# plus pre-game Elo ratings / spread / total.
+# Falls back to the old toy merge of features_raw with lines when no games file exists yet.
 import pandas as pd
 from ..utils.paths import DB_DIR, ensure_dirs
+from .feature_store import FeatureStore, _default_games
+from .ratings import rate
 
-def run():
-    ensure_dirs()
+def _toy():
     raw = pd.read_csv(DB_DIR / "features_raw.csv")
     lines = pd.read_csv(DB_DIR / "lines.csv")
     df = raw.merge(lines, on=["season","week","game_id"], how="left")
     df["feat_rating_diff"] = (df["team_rating"] - df["opp_rating"]).fillna(0.0)
+    return df
+
+def run(games_path=None, rebuild=False):
+    ensure_dirs()
+    src = games_path or _default_games()
+    if src is None:
+        df = _toy()
+    else:
+        store = FeatureStore()
+        if rebuild:
+            store.reset()
+        res = store.update(pd.read_csv(src, low_memory=False))
+        store.save()
+        print(f"[build_features] feature store: +{res['games']} games, rewound_from={res['rewound_from']}")
+        df = store.matchup_features(store.games)
+        elo, _ = rate(store.games)
+        elo = elo.rename(columns={"p_home": "elo_p_home", "spread_pred": "elo_spread", "total_pred": "elo_total"})
+        df = df.merge(elo[["game_id", "elo_home_pre", "elo_away_pre", "elo_p_home", "elo_spread", "elo_total"]],
+                      on="game_id", how="left")
+        df["feat_rating_diff"] = df["rating_diff"].fillna(0.0)
     df.to_csv(DB_DIR / "features.csv", index=False)
     print(f"[build_features] Wrote {len(df)} rows -> {DB_DIR/'features.csv'}")
 
 if __name__ == "__main__":
     run()
-
-
-
-
-
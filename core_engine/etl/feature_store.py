@@ -0,0 +1,410 @@
+# core_engine/etl/feature_store.py
+# Incremental, point-in-time team feature store.
+#
+# The store is one table of *post-game* team states: after every game a team plays, one row with its
+# running season counters (points, ATS / OU records, home / away splits), its last ten margins and
+# an opponent-adjusted rating. Pre-game features for any (team, date) are read from the latest state
+# strictly before that date, so nothing from the game itself or later can leak in — training rows
+# and upcoming games go through the same as-of lookup.
+#
+# Folding a new week only touches the teams that played: their previous state plus the game gives
+# the new state, processed date by date (a team plays at most once per date). A game that arrives
+# out of order rewinds the store to that date and refolds from there.
+#
+# Files (db/feature_store/):
+#   team_states.parquet   post-game states, sorted by (team, date)
+#   games.parquet         the folded game inputs (so rewinds can replay them)
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+try:
+    from core_engine.utils.paths import DB_DIR, EXPORTS_DIR, ensure_dirs  # type: ignore
+except Exception:
+    ROOT = Path(__file__).resolve().parents[2]
+    DB_DIR = ROOT / "db"
+    EXPORTS_DIR = ROOT / "serving_ui" / "exports"
+
+    def ensure_dirs() -> None:
+        DB_DIR.mkdir(parents=True, exist_ok=True)
+
+STORE_DIR = Path(DB_DIR) / "feature_store"
+STATES = "team_states.parquet"
+GAMES = "games.parquet"
+
+N_LAST = 10            # margins kept per team for rolling windows
+WINDOWS = (3, 5, 10)
+RATING_ALPHA = 0.15    # EWMA weight of the newest opponent-adjusted margin
+HFA = 2.0              # points credited to the home side before adjusting
+SEASON_CARRY = 0.67    # share of the rating carried into a new season
+
+GAME_COLS = ["season", "week", "date", "game_id", "home_team", "away_team", "home_score", "away_score",
+             "home_spread", "total_line", "neutral"]
+SEASON_COUNTERS = ["s_games", "s_pf", "s_pa", "s_ats_w", "s_ats_l", "s_ats_p", "s_ou_o", "s_ou_u", "s_ou_p",
+                   "s_home_g", "s_home_margin", "s_away_g", "s_away_margin"]
+LAST_COLS = [f"m_{i}" for i in range(1, N_LAST + 1)]
+STATE_COLS = ["team", "date", "season", "week", "game_id", "opp", "is_home", "pf", "pa", "rating"] + SEASON_COUNTERS + LAST_COLS
+
+ALIASES = {
+    "season": ("season", "Season", "schedule_season"),
+    "week": ("week", "Week", "wk", "schedule_week"),
+    "date": ("date", "Date", "_date_iso", "gameday", "game_date", "ts", "commence_time"),
+    "game_id": ("game_id", "gameid", "gid", "_gid"),
+    "home_team": ("home_team", "HomeTeam", "_home_nick", "home", "team_home"),
+    "away_team": ("away_team", "AwayTeam", "_away_nick", "away", "team_away"),
+    "home_score": ("home_score", "HomeScore", "score_home", "home_pts"),
+    "away_score": ("away_score", "AwayScore", "score_away", "away_pts"),
+    "home_spread": ("home_spread", "spread_close", "close_spread", "spread_favorite_home", "spread"),
+    "total_line": ("total_line", "total_close", "close_total", "over_under_line", "over_under", "total"),
+}
+
+# --------------------------------------------------------------------------------------
+# Input normalization
+# --------------------------------------------------------------------------------------
+def nfl_season(date: pd.Series) -> pd.Series:
+    """Season a date belongs to: January-February games count toward the previous year."""
+    d = pd.to_datetime(date, errors="coerce")
+    return (d.dt.year - (d.dt.month <= 2).astype("int64")).astype("Int64")
+
+def normalize_games(raw: pd.DataFrame, played_only: bool = True) -> pd.DataFrame:
+    """
+    Any schedule/scores export -> GAME_COLS. home_spread is the home line (negative = home
+    favoured); nflverse `spread_line` (positive = home favoured) is flipped on the way in.
+    Unplayed games (no score) are dropped unless played_only=False.
+    """
+    lc = {str(c).lower(): c for c in raw.columns}
+    g = pd.DataFrame(index=raw.index)
+    for want, names in ALIASES.items():
+        src = next((lc[n.lower()] for n in names if n.lower() in lc), None)
+        g[want] = raw[src] if src is not None else np.nan
+    if "spread_line" in lc and g["home_spread"].isna().all():
+        g["home_spread"] = -pd.to_numeric(raw[lc["spread_line"]], errors="coerce")
+    g["neutral"] = raw[lc["neutral"]].astype(bool) if "neutral" in lc else False
+
+    g["date"] = pd.to_datetime(g["date"], errors="coerce", utc=True).dt.tz_localize(None).dt.normalize()
+    g["season"] = pd.to_numeric(g["season"], errors="coerce").astype("Int64").fillna(nfl_season(g["date"]))
+    g["week"] = pd.to_numeric(g["week"], errors="coerce").astype("Int64")
+    for c in ("home_team", "away_team"):
+        g[c] = g[c].astype("string").str.strip().str.upper()
+    for c in ("home_score", "away_score", "home_spread", "total_line"):
+        g[c] = pd.to_numeric(g[c], errors="coerce")
+    g = g.dropna(subset=["date", "home_team", "away_team"] + (["home_score", "away_score"] if played_only else []))
+    gid = g["game_id"].astype("string")
+    g["game_id"] = gid.where(gid.notna() & (gid != ""),
+                             g["date"].dt.strftime("%Y-%m-%d") + "::" + g["away_team"] + "@" + g["home_team"])
+    g = g.drop_duplicates("game_id", keep="last")
+    return g[GAME_COLS].sort_values(["date", "game_id"]).reset_index(drop=True)
+
+# --------------------------------------------------------------------------------------
+# Fold
+# --------------------------------------------------------------------------------------
+def _team_rows(games: pd.DataFrame) -> pd.DataFrame:
+    """One row per team per game, from that team's point of view."""
+    def side(home: bool) -> pd.DataFrame:
+        t, o = ("home", "away") if home else ("away", "home")
+        spread = games["home_spread"] if home else -games["home_spread"]
+        return pd.DataFrame({
+            "team": games[f"{t}_team"].to_numpy(), "opp": games[f"{o}_team"].to_numpy(),
+            "date": games["date"].to_numpy(), "season": games["season"].to_numpy(), "week": games["week"].to_numpy(),
+            "game_id": games["game_id"].to_numpy(),
+            "is_home": np.where(games["neutral"].to_numpy(dtype=bool), 0, 1 if home else -1),
+            "pf": games[f"{t}_score"].to_numpy(dtype="float64"), "pa": games[f"{o}_score"].to_numpy(dtype="float64"),
+            "spread": spread.to_numpy(dtype="float64"), "total_line": games["total_line"].to_numpy(dtype="float64"),
+        })
+    return pd.concat([side(True), side(False)], ignore_index=True)
+
+def _carry_into(prev: pd.DataFrame, season: np.ndarray) -> pd.DataFrame:
+    """Previous post-game state as it stands entering `season`: counters reset, rating regressed."""
+    prev = prev.copy()
+    new = prev["season"].isna().to_numpy() | (prev["season"].to_numpy(dtype="float64", na_value=np.nan) != season)
+    if new.any():
+        prev.loc[new, SEASON_COUNTERS] = 0.0
+        prev.loc[new, "rating"] = prev.loc[new, "rating"] * SEASON_CARRY
+    return prev
+
+# the fold keeps one float row per team: season, rating, season counters, last-N margins
+_NUM = ["season", "rating"] + SEASON_COUNTERS + LAST_COLS
+_K = {c: i for i, c in enumerate(_NUM)}
+_CNT = slice(_K[SEASON_COUNTERS[0]], _K[SEASON_COUNTERS[-1]] + 1)
+_LAST = slice(_K[LAST_COLS[0]], None)
+
+def _step(pre: np.ndarray, day: dict) -> np.ndarray:
+    """
+    One date: previous state rows (aligned to that date's team rows) + the games -> post-game rows.
+    Ratings use both sides' pre-game values, so the order of games within a date does not matter.
+    """
+    season, pf, pa, is_home = day["season"], day["pf"], day["pa"], day["is_home"]
+    pre = pre.copy()
+    new = np.isnan(pre[:, 0]) | (pre[:, 0] != season)
+    pre[new, _CNT] = 0.0
+    pre[new, 1] *= SEASON_CARRY
+    margin = pf - pa
+
+    post = np.empty_like(pre)
+    post[:, 0] = season
+    # opponent-adjusted rating: EWMA of (venue-neutral margin + opponent's pre-game rating)
+    opp = day["opp_pos"]
+    opp_pre = np.where(opp >= 0, pre[np.maximum(opp, 0), 1], 0.0)
+    post[:, 1] = (1 - RATING_ALPHA) * pre[:, 1] + RATING_ALPHA * (margin - HFA * is_home + opp_pre)
+
+    post[:, _CNT] = pre[:, _CNT]
+    ats = np.sign(margin + day["spread"])
+    ou = np.sign(pf + pa - day["total_line"])
+    add = {
+        "s_games": 1.0, "s_pf": pf, "s_pa": pa,
+        "s_ats_w": ats == 1, "s_ats_l": ats == -1, "s_ats_p": ats == 0,
+        "s_ou_o": ou == 1, "s_ou_u": ou == -1, "s_ou_p": ou == 0,
+        "s_home_g": is_home == 1, "s_home_margin": np.where(is_home == 1, margin, 0.0),
+        "s_away_g": is_home == -1, "s_away_margin": np.where(is_home == -1, margin, 0.0),
+    }
+    for c, v in add.items():
+        post[:, _K[c]] += v
+
+    # last-N margins, newest first
+    post[:, _LAST] = np.c_[margin, pre[:, _LAST][:, :-1]]
+    return post
+
+def fold(states: pd.DataFrame, games: pd.DataFrame) -> pd.DataFrame:
+    """Append post-game states for `games` (all later than every state) to `states`."""
+    if games.empty:
+        return states
+    rows = _team_rows(games).sort_values("date", kind="stable").drop_duplicates(["date", "team"], keep="last")
+    rows = rows.reset_index(drop=True)
+    teams = pd.Index(pd.concat([states["team"], rows["team"]]).unique()) if not states.empty else pd.Index(rows["team"].unique())
+
+    latest = np.full((len(teams), len(_NUM)), np.nan)
+    latest[:, 1] = 0.0
+    latest[:, _CNT] = 0.0
+    if not states.empty:
+        last = states.sort_values("date", kind="stable").drop_duplicates("team", keep="last")
+        latest[teams.get_indexer(last["team"])] = last[_NUM].to_numpy(dtype="float64", na_value=np.nan)
+
+    code = teams.get_indexer(rows["team"])
+    opp_code = teams.get_indexer(rows["opp"])
+    cols = {c: rows[c].to_numpy(dtype="float64", na_value=np.nan) for c in ("season", "pf", "pa", "spread", "total_line")}
+    cols["is_home"] = rows["is_home"].to_numpy(dtype="float64")
+    day_ns = rows["date"].to_numpy(dtype="datetime64[ns]")
+    bounds = np.r_[0, np.flatnonzero(day_ns[1:] != day_ns[:-1]) + 1, len(rows)]
+
+    out = np.empty((len(rows), len(_NUM)))
+    pos_of = np.full(len(teams), -1)
+    for lo, hi in zip(bounds[:-1], bounds[1:]):
+        c = code[lo:hi]
+        pos_of[c] = np.arange(hi - lo)
+        day = {k: v[lo:hi] for k, v in cols.items()}
+        day["opp_pos"] = pos_of[opp_code[lo:hi]]
+        post = _step(latest[c], day)
+        pos_of[c] = -1
+        latest[c] = post
+        out[lo:hi] = post
+
+    new = rows[["team", "date", "season", "week", "game_id", "opp", "is_home", "pf", "pa"]].copy()
+    for c in _NUM[1:]:
+        new[c] = out[:, _K[c]]
+    new = new[STATE_COLS]
+    return (pd.concat([states, new], ignore_index=True) if not states.empty else new) \
+        .sort_values(["team", "date"], kind="stable").reset_index(drop=True)
+
+# --------------------------------------------------------------------------------------
+# As-of index
+# --------------------------------------------------------------------------------------
+class AsOfIndex:
+    """
+    (team, date) -> latest post-game state strictly before `date`. States are sorted once by
+    (team code, day); a query is one searchsorted over the composite key.
+    """
+    def __init__(self, states: pd.DataFrame):
+        s = states.sort_values(["team", "date"], kind="stable").reset_index(drop=True)
+        self.states = s
+        self.teams = pd.Index(s["team"].unique())
+        self._code = self.teams.get_indexer(s["team"]).astype("int64")
+        self._day = s["date"].to_numpy(dtype="datetime64[D]").astype("int64")
+        self._span = int(self._day.max() - self._day.min() + 2) if len(s) else 1
+        self._base = int(self._day.min()) if len(s) else 0
+        self._key = self._code * self._span + (self._day - self._base)
+
+    def positions(self, teams, dates) -> np.ndarray:
+        """Row positions into .states (-1 when the team has no earlier game)."""
+        code = self.teams.get_indexer(pd.Index(pd.Series(teams, dtype="string").str.upper()))
+        day = pd.to_datetime(pd.Series(dates)).to_numpy(dtype="datetime64[D]").astype("int64") - self._base
+        day = np.clip(day, 0, self._span - 1)
+        pos = np.searchsorted(self._key, code * self._span + day, side="left") - 1
+        ok = (code >= 0) & (pos >= 0)
+        ok[ok] &= self._code[pos[ok]] == code[ok]
+        return np.where(ok, pos, -1)
+
+    def lookup(self, teams, dates, seasons=None) -> pd.DataFrame:
+        """Pre-game features for each (team, date[, season])."""
+        teams = pd.Series(teams, dtype="string").str.upper().reset_index(drop=True)
+        dates = pd.to_datetime(pd.Series(dates)).reset_index(drop=True)
+        seasons = nfl_season(dates) if seasons is None else pd.Series(seasons).reset_index(drop=True)
+        pos = self.positions(teams, dates)
+        have = pos >= 0
+        st = self.states.iloc[np.where(have, pos, 0)].reset_index(drop=True)
+        st = st.where(np.repeat(have[:, None], st.shape[1], axis=1))
+        st["season"] = pd.to_numeric(st["season"], errors="coerce").astype("Int64")
+        st = _carry_into(st, pd.to_numeric(seasons, errors="coerce").to_numpy(dtype="float64", na_value=np.nan))
+        st.loc[~have, "rating"] = 0.0   # first game: no history, league-average prior
+        return _pregame(st, teams, dates, have)
+
+def _div(a, b):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(b > 0, a / b, np.nan)
+
+def _pregame(st: pd.DataFrame, teams: pd.Series, dates: pd.Series, have: np.ndarray) -> pd.DataFrame:
+    g = st["s_games"].to_numpy(dtype="float64")
+    f = pd.DataFrame({"team": teams.to_numpy(), "date": dates.to_numpy()})
+    last_date = pd.to_datetime(st["date"])
+    f["rest_days"] = np.where(have, (dates - last_date).dt.days, np.nan)
+    f["games_played"] = g
+    f["ppg"] = _div(st["s_pf"].to_numpy(dtype="float64"), g)
+    f["papg"] = _div(st["s_pa"].to_numpy(dtype="float64"), g)
+    f["margin_avg"] = f["ppg"] - f["papg"]
+    last = st[LAST_COLS].to_numpy(dtype="float64")
+    for w in WINDOWS:
+        cnt = np.sum(~np.isnan(last[:, :w]), axis=1)
+        f[f"margin_l{w}"] = _div(np.nansum(last[:, :w], axis=1), cnt)
+    aw, al, ap = (st[c].to_numpy(dtype="float64") for c in ("s_ats_w", "s_ats_l", "s_ats_p"))
+    f["ats_w"], f["ats_l"], f["ats_p"] = aw, al, ap
+    f["ats_pct"] = _div(aw, aw + al)
+    oo, ou = st["s_ou_o"].to_numpy(dtype="float64"), st["s_ou_u"].to_numpy(dtype="float64")
+    f["ou_o"], f["ou_u"] = oo, ou
+    f["ou_over_pct"] = _div(oo, oo + ou)
+    f["home_margin_avg"] = _div(st["s_home_margin"].to_numpy(dtype="float64"), st["s_home_g"].to_numpy(dtype="float64"))
+    f["away_margin_avg"] = _div(st["s_away_margin"].to_numpy(dtype="float64"), st["s_away_g"].to_numpy(dtype="float64"))
+    f["rating"] = st["rating"].to_numpy(dtype="float64")
+    return f
+
+# --------------------------------------------------------------------------------------
+# Store
+# --------------------------------------------------------------------------------------
+class FeatureStore:
+    def __init__(self, root: Path | None = None):
+        self.root = Path(root) if root else STORE_DIR
+        self.states = self._read(STATES, STATE_COLS)
+        self.games = self._read(GAMES, GAME_COLS)
+        self._index: AsOfIndex | None = None
+
+    @classmethod
+    def from_games(cls, games: pd.DataFrame) -> "FeatureStore":
+        """In-memory store folded from `games` (nothing read from or written to disk)."""
+        store = cls.__new__(cls)
+        store.root = STORE_DIR
+        store.reset()
+        store.update(games)
+        return store
+
+    def _read(self, name: str, cols: list[str]) -> pd.DataFrame:
+        p = self.root / name
+        return pd.read_parquet(p) if p.exists() else pd.DataFrame(columns=cols)
+
+    def save(self) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        for df, name in ((self.states, STATES), (self.games, GAMES)):
+            tmp = self.root / (name + ".tmp")
+            df.to_parquet(tmp, index=False)
+            tmp.replace(self.root / name)
+
+    def reset(self) -> None:
+        self.states = pd.DataFrame(columns=STATE_COLS)
+        self.games = pd.DataFrame(columns=GAME_COLS)
+        self._index = None
+
+    @property
+    def index(self) -> AsOfIndex:
+        if self._index is None:
+            self._index = AsOfIndex(self.states)
+        return self._index
+
+    def update(self, games: pd.DataFrame) -> dict:
+        """
+        Fold new or corrected games. Games after everything stored are appended for the teams that
+        played; anything at or before the latest stored date rewinds all states to that date first.
+        """
+        g = normalize_games(games) if not set(GAME_COLS) <= set(games.columns) \
+            else games.loc[games["home_score"].notna() & games["away_score"].notna(), GAME_COLS]
+        if not self.games.empty:
+            known = self.games.set_index("game_id")
+            same = g["game_id"].isin(known.index)
+            if same.any():
+                cmp = ["home_score", "away_score", "home_spread", "total_line", "date"]
+                old = known.loc[g.loc[same, "game_id"], cmp].reset_index(drop=True)
+                new = g.loc[same, cmp].reset_index(drop=True)
+                changed = ~((old == new) | (old.isna() & new.isna())).all(axis=1).to_numpy()
+                keep = ~same.to_numpy(); keep[np.flatnonzero(same.to_numpy())[changed]] = True
+                g = g[keep]
+        if g.empty:
+            return {"games": 0, "teams": 0, "rewound_from": None}
+
+        rewind = None
+        if not self.states.empty and g["date"].min() <= self.states["date"].max():
+            rewind = g["date"].min()
+        all_games = pd.concat([self.games[~self.games["game_id"].isin(g["game_id"])], g], ignore_index=True) \
+            if not self.games.empty else g.copy()
+        all_games = all_games.sort_values(["date", "game_id"]).reset_index(drop=True)
+        if rewind is not None:
+            base = self.states[self.states["date"] < rewind]
+            todo = all_games[all_games["date"] >= rewind]
+        else:
+            base, todo = self.states, g
+        self.states = fold(base, todo)
+        self.games = all_games
+        self._index = None
+        return {"games": int(len(g)), "teams": int(pd.concat([todo["home_team"], todo["away_team"]]).nunique()),
+                "rewound_from": None if rewind is None else str(rewind.date())}
+
+    def features_for(self, teams, dates, seasons=None) -> pd.DataFrame:
+        return self.index.lookup(teams, dates, seasons)
+
+    def matchup_features(self, games: pd.DataFrame) -> pd.DataFrame:
+        """One row per game: home_* / away_* pre-game features plus a few diffs."""
+        g = games.reset_index(drop=True)
+        season = g["season"] if "season" in g.columns else None
+        h = self.features_for(g["home_team"], g["date"], season).drop(columns=["team", "date"])
+        a = self.features_for(g["away_team"], g["date"], season).drop(columns=["team", "date"])
+        out = pd.concat([g[[c for c in ("season", "week", "date", "game_id", "home_team", "away_team") if c in g.columns]],
+                         h.add_prefix("home_"), a.add_prefix("away_")], axis=1)
+        out["rating_diff"] = out["home_rating"] - out["away_rating"]
+        out["margin_l5_diff"] = out["home_margin_l5"] - out["away_margin_l5"]
+        out["rest_diff"] = out["home_rest_days"] - out["away_rest_days"]
+        return out
+
+# --------------------------------------------------------------------------------------
+# CLI
+# --------------------------------------------------------------------------------------
+def _default_games() -> Path | None:
+    for p in (Path(DB_DIR) / "games.csv", Path(EXPORTS_DIR) / "scores_1966-2025.csv",
+              Path(EXPORTS_DIR) / "scores_normalized_std_maxaligned.csv"):
+        if p.exists() and p.stat().st_size > 0:
+            return p
+    return None
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Fold games into the point-in-time team feature store.")
+    ap.add_argument("--games", type=Path, default=None, help="scores/schedule CSV (default: db/games.csv or exports scores)")
+    ap.add_argument("--rebuild", action="store_true", help="start from an empty store")
+    ap.add_argument("--features-out", type=Path, default=None, help="also write per-game matchup features here")
+    args = ap.parse_args()
+    ensure_dirs()
+    src = args.games or _default_games()
+    if src is None:
+        print("[feature_store] no games file found"); return 1
+    store = FeatureStore()
+    if args.rebuild:
+        store.reset()
+    res = store.update(pd.read_csv(src, low_memory=False))
+    store.save()
+    print(f"[feature_store] folded games={res['games']:,} teams={res['teams']} rewound_from={res['rewound_from']} "
+          f"-> {len(store.states):,} team states")
+    if args.features_out:
+        feats = store.matchup_features(store.games)
+        feats.to_csv(args.features_out, index=False)
+        print(f"[feature_store] wrote {len(feats):,} rows -> {args.features_out}")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,320 @@
+# core_engine/etl/ratings.py
+# Elo / power-rating engine over the full scores history (scores_1966-2025.csv).
+#
+# One pass over int-coded games in date order (a numba loop) produces, for every game, the
+# pre-game ratings of both sides, a home win probability, a spread and a total:
+#   - Elo with a margin-of-victory multiplier (log margin, damped for favourites), home field
+#     and regression toward the mean between seasons;
+#   - optional Glicko-style variance: each team carries a rating deviation that shrinks with
+#     games, grows with idle weeks and at each new season, and scales its own updates;
+#   - points model for totals: league scoring level + per-team offense / defense offsets,
+#     updated by the same pass (scoring levels drift a lot across 1966-2025).
+# Unplayed games (no score) get predictions from the latest state but do not update it, so the
+# same call rates history and prices the upcoming slate.
+#
+# A hyperparameter sweep runs the same kernel for every grid point in parallel (numba prange).
+from __future__ import annotations
+
+import argparse
+import itertools
+import time
+from dataclasses import asdict, dataclass, fields
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+try:
+    from numba import njit, prange  # type: ignore
+except Exception:  # numba missing: same code, interpreted (slow but correct)
+    prange = range
+
+    def njit(*args, **kwargs):
+        if args and callable(args[0]):
+            return args[0]
+        return lambda f: f
+
+from .feature_store import DB_DIR, GAME_COLS, _default_games, ensure_dirs, normalize_games
+
+BASE = 1500.0
+Q = np.log(10.0) / 400.0
+
+@dataclass
+class EloParams:
+    k: float = 20.0               # Elo K (ignored when glicko=True; the deviation sets the step)
+    hfa: float = 55.0             # home field, Elo points
+    mov: bool = True              # margin-of-victory multiplier
+    regress: float = 0.33         # share pulled back to 1500 between seasons
+    elo_per_point: float = 25.0   # Elo points per point of spread
+    glicko: bool = False
+    rd0: float = 100.0            # deviation of a new team
+    rd_min: float = 30.0
+    rd_max: float = 150.0
+    rd_week: float = 2.0          # deviation growth per idle week
+    rd_season: float = 25.0       # deviation added at a new season
+    k_pts: float = 0.08           # offense / defense learning rate (points)
+    k_league: float = 0.01        # league scoring level learning rate
+    pts_regress: float = 0.5      # share of offense / defense offsets dropped between seasons
+    league0: float = 20.0         # starting points per team per game
+
+    def vector(self) -> np.ndarray:
+        return np.array([float(getattr(self, f.name)) for f in fields(self)], dtype="float64")
+
+PARAMS = [f.name for f in fields(EloParams)]
+_P = {n: i for i, n in enumerate(PARAMS)}
+P_K, P_HFA, P_MOV, P_REG, P_EPP = _P["k"], _P["hfa"], _P["mov"], _P["regress"], _P["elo_per_point"]
+P_GL, P_RD0, P_RDMIN, P_RDMAX, P_RDW, P_RDS = (_P[n] for n in ("glicko", "rd0", "rd_min", "rd_max", "rd_week", "rd_season"))
+P_KP, P_KL, P_PREG, P_L0 = _P["k_pts"], _P["k_league"], _P["pts_regress"], _P["league0"]
+
+OUT_COLS = ["elo_home_pre", "elo_away_pre", "rd_home_pre", "rd_away_pre", "p_home", "spread_pred", "total_pred"]
+
+# --------------------------------------------------------------------------------------
+# Kernel
+# --------------------------------------------------------------------------------------
+@njit(cache=True)
+def _glicko_g(rd):
+    return 1.0 / np.sqrt(1.0 + 3.0 * Q * Q * rd * rd / (np.pi * np.pi))
+
+@njit(cache=True)
+def _enter(t, season, day, p, elo, rd, off, dfn, last_day, last_season):
+    """Season turnover for team t (mutates once per season); returns its effective deviation today."""
+    if last_season[t] != season:
+        if last_season[t] >= 0:
+            elo[t] = BASE + (1.0 - p[P_REG]) * (elo[t] - BASE)
+            off[t] *= 1.0 - p[P_PREG]
+            dfn[t] *= 1.0 - p[P_PREG]
+            rd[t] = min(np.sqrt(rd[t] * rd[t] + p[P_RDS] * p[P_RDS]), p[P_RDMAX])
+        last_season[t] = season
+    r = rd[t]
+    if last_day[t] >= 0:
+        weeks = (day - last_day[t]) / 7.0
+        r = min(np.sqrt(r * r + p[P_RDW] * p[P_RDW] * weeks), p[P_RDMAX])
+    return r
+
+@njit(cache=True)
+def _run(home, away, hs, as_, day, season, neutral, n_teams, p):
+    n = home.shape[0]
+    elo = np.full(n_teams, BASE)
+    rd = np.full(n_teams, p[P_RD0])
+    off = np.zeros(n_teams)
+    dfn = np.zeros(n_teams)
+    last_day = np.full(n_teams, -1, dtype=np.int64)
+    last_season = np.full(n_teams, -1, dtype=np.int64)
+    league = p[P_L0]
+    glicko = p[P_GL] > 0.5
+    out = np.empty((n, 7))
+    for i in range(n):
+        h = home[i]
+        a = away[i]
+        rh = _enter(h, season[i], day[i], p, elo, rd, off, dfn, last_day, last_season)
+        ra = _enter(a, season[i], day[i], p, elo, rd, off, dfn, last_day, last_season)
+        hfa = 0.0 if neutral[i] else p[P_HFA]
+        diff = elo[h] - elo[a] + hfa
+        g = _glicko_g(np.sqrt(rh * rh + ra * ra)) if glicko else 1.0
+        p_home = 1.0 / (1.0 + 10.0 ** (-g * diff / 400.0))
+        out[i, 0] = elo[h]
+        out[i, 1] = elo[a]
+        out[i, 2] = rh
+        out[i, 3] = ra
+        out[i, 4] = p_home
+        out[i, 5] = -diff / p[P_EPP]
+        out[i, 6] = 2.0 * league + off[h] + dfn[a] + off[a] + dfn[h]
+        if np.isnan(hs[i]) or np.isnan(as_[i]):
+            continue
+
+        margin = hs[i] - as_[i]
+        s = 1.0 if margin > 0 else (0.5 if margin == 0 else 0.0)
+        mult = 1.0
+        if p[P_MOV] > 0.5:
+            wdiff = diff if margin > 0 else -diff
+            mult = np.log(abs(margin) + 1.0) * 2.2 / (wdiff * 0.001 + 2.2)
+        if glicko:
+            gh = _glicko_g(ra)
+            eh = 1.0 / (1.0 + 10.0 ** (-gh * diff / 400.0))
+            den_h = 1.0 / (rh * rh) + Q * Q * gh * gh * eh * (1.0 - eh)
+            ga = _glicko_g(rh)
+            ea = 1.0 / (1.0 + 10.0 ** (ga * diff / 400.0))
+            den_a = 1.0 / (ra * ra) + Q * Q * ga * ga * ea * (1.0 - ea)
+            elo[h] += Q / den_h * gh * (s - eh) * mult
+            elo[a] += Q / den_a * ga * ((1.0 - s) - ea) * mult
+            rd[h] = max(np.sqrt(1.0 / den_h), p[P_RDMIN])
+            rd[a] = max(np.sqrt(1.0 / den_a), p[P_RDMIN])
+        else:
+            delta = p[P_K] * mult * (s - p_home)
+            elo[h] += delta
+            elo[a] -= delta
+            rd[h] = rh
+            rd[a] = ra
+
+        err_h = hs[i] - (league + off[h] + dfn[a])
+        err_a = as_[i] - (league + off[a] + dfn[h])
+        off[h] += p[P_KP] * err_h
+        dfn[a] += p[P_KP] * err_h
+        off[a] += p[P_KP] * err_a
+        dfn[h] += p[P_KP] * err_a
+        league += p[P_KL] * 0.5 * (err_h + err_a)
+        last_day[h] = day[i]
+        last_day[a] = day[i]
+    state = np.empty((n_teams, 4))
+    state[:, 0] = elo
+    state[:, 1] = rd
+    state[:, 2] = off
+    state[:, 3] = dfn
+    return out, state, league
+
+@njit(cache=True)
+def _score(out, hs, as_, season, eval_from):
+    """(log loss, spread MAE, total MAE, games) over played games from `eval_from` on."""
+    ll = 0.0
+    se = 0.0
+    te = 0.0
+    m = 0
+    for i in range(out.shape[0]):
+        if season[i] < eval_from or np.isnan(hs[i]) or np.isnan(as_[i]):
+            continue
+        margin = hs[i] - as_[i]
+        y = 1.0 if margin > 0 else (0.5 if margin == 0 else 0.0)
+        ph = min(max(out[i, 4], 1e-9), 1.0 - 1e-9)
+        ll -= y * np.log(ph) + (1.0 - y) * np.log(1.0 - ph)
+        se += abs(-out[i, 5] - margin)
+        te += abs(out[i, 6] - (hs[i] + as_[i]))
+        m += 1
+    if m == 0:
+        return np.nan, np.nan, np.nan, 0.0
+    return ll / m, se / m, te / m, float(m)
+
+@njit(cache=True, parallel=True)
+def _sweep(home, away, hs, as_, day, season, neutral, n_teams, grid, eval_from):
+    res = np.empty((grid.shape[0], 4))
+    for j in prange(grid.shape[0]):
+        out, _, _ = _run(home, away, hs, as_, day, season, neutral, n_teams, grid[j])
+        ll, se, te, m = _score(out, hs, as_, season, eval_from)
+        res[j, 0] = ll
+        res[j, 1] = se
+        res[j, 2] = te
+        res[j, 3] = m
+    return res
+
+# --------------------------------------------------------------------------------------
+# Python API
+# --------------------------------------------------------------------------------------
+def encode(games: pd.DataFrame) -> tuple[pd.DataFrame, dict, pd.Index]:
+    """Normalized games (date order, unplayed kept) + the int-coded arrays the kernel takes."""
+    g = games.sort_values(["date", "game_id"], kind="stable").reset_index(drop=True) if set(GAME_COLS) <= set(games.columns) \
+        else normalize_games(games, played_only=False)
+    teams = pd.Index(pd.unique(pd.concat([g["home_team"], g["away_team"]], ignore_index=True)))
+    arr = {
+        "home": teams.get_indexer(g["home_team"]).astype(np.int64),
+        "away": teams.get_indexer(g["away_team"]).astype(np.int64),
+        "hs": g["home_score"].to_numpy(dtype="float64", na_value=np.nan),
+        "as_": g["away_score"].to_numpy(dtype="float64", na_value=np.nan),
+        "day": g["date"].to_numpy(dtype="datetime64[D]").astype(np.int64),
+        "season": g["season"].to_numpy(dtype="int64"),
+        "neutral": g["neutral"].to_numpy(dtype=bool),
+    }
+    return g, arr, teams
+
+def rate(games: pd.DataFrame, params: EloParams | None = None) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    (per-game predictions, current team table). Predictions are pre-game: each row only uses games
+    on earlier rows, so they are safe as model features.
+    """
+    params = params or EloParams()
+    g, arr, teams = encode(games)
+    out, state, league = _run(arr["home"], arr["away"], arr["hs"], arr["as_"], arr["day"], arr["season"],
+                              arr["neutral"], len(teams), params.vector())
+    res = g[["season", "week", "date", "game_id", "home_team", "away_team", "home_score", "away_score"]].copy()
+    for j, c in enumerate(OUT_COLS):
+        res[c] = out[:, j]
+    if not params.glicko:
+        res = res.drop(columns=["rd_home_pre", "rd_away_pre"])
+    tbl = pd.DataFrame({"team": teams, "elo": state[:, 0], "rd": state[:, 1],
+                        "off_pts": state[:, 2], "def_pts": state[:, 3]})
+    tbl["pts_for"] = league + tbl["off_pts"]
+    tbl["pts_against"] = league + tbl["def_pts"]
+    tbl = tbl.sort_values("elo", ascending=False).reset_index(drop=True)
+    return res, tbl
+
+def evaluate(games: pd.DataFrame, params: EloParams | None = None, eval_from: int = 1978) -> dict:
+    g, arr, teams = encode(games)
+    out, _, _ = _run(arr["home"], arr["away"], arr["hs"], arr["as_"], arr["day"], arr["season"],
+                     arr["neutral"], len(teams), (params or EloParams()).vector())
+    ll, se, te, m = _score(out, arr["hs"], arr["as_"], arr["season"], eval_from)
+    return {"logloss": ll, "spread_mae": se, "total_mae": te, "games": int(m)}
+
+def sweep(games: pd.DataFrame, grid: dict[str, list], base: EloParams | None = None, eval_from: int = 1978) -> pd.DataFrame:
+    """Every combination in `grid` (param name -> values) scored in parallel; best log loss first."""
+    base = base or EloParams()
+    unknown = set(grid) - set(PARAMS)
+    if unknown:
+        raise ValueError(f"unknown params: {sorted(unknown)}")
+    g, arr, teams = encode(games)
+    names = list(grid)
+    combos = list(itertools.product(*(grid[n] for n in names)))
+    mat = np.tile(base.vector(), (len(combos), 1))
+    for j, combo in enumerate(combos):
+        for n, v in zip(names, combo):
+            mat[j, _P[n]] = float(v)
+    res = _sweep(arr["home"], arr["away"], arr["hs"], arr["as_"], arr["day"], arr["season"], arr["neutral"],
+                 len(teams), mat, eval_from)
+    df = pd.DataFrame(combos, columns=names)
+    df["logloss"], df["spread_mae"], df["total_mae"], df["games"] = res[:, 0], res[:, 1], res[:, 2], res[:, 3].astype(int)
+    return df.sort_values("logloss").reset_index(drop=True)
+
+# --------------------------------------------------------------------------------------
+# CLI
+# --------------------------------------------------------------------------------------
+def _load(path: Path | None) -> pd.DataFrame:
+    src = path or _default_games()
+    if src is None:
+        raise SystemExit("[ratings] no games file found (pass --games)")
+    return pd.read_csv(src, low_memory=False)
+
+def _grid_arg(s: str) -> tuple[str, list[float]]:
+    name, _, vals = s.partition("=")
+    return name.strip(), [float(v) for v in vals.split(",") if v.strip()]
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Elo / power ratings over the scores history.")
+    ap.add_argument("cmd", choices=["rate", "sweep"], nargs="?", default="rate")
+    ap.add_argument("--games", type=Path, default=None)
+    ap.add_argument("--out", type=Path, default=None, help="rate: per-game CSV (default db/ratings.csv); sweep: results CSV")
+    ap.add_argument("--glicko", action="store_true")
+    ap.add_argument("--set", action="append", default=[], metavar="NAME=VALUE", help="override a parameter")
+    ap.add_argument("--grid", action="append", default=[], metavar="NAME=V1,V2,...", help="sweep values for a parameter")
+    ap.add_argument("--eval-from", type=int, default=1978, help="first season scored by evaluate/sweep")
+    args = ap.parse_args()
+    ensure_dirs()
+
+    params = EloParams(glicko=args.glicko)
+    for s in args.set:
+        n, v = _grid_arg(s)
+        setattr(params, n, type(getattr(params, n))(v[0]))
+    games = _load(args.games)
+
+    if args.cmd == "rate":
+        t = time.perf_counter()
+        res, tbl = rate(games, params)
+        dt = time.perf_counter() - t
+        out = args.out or (Path(DB_DIR) / "ratings.csv")
+        res.to_csv(out, index=False)
+        tbl.to_csv(out.with_name(out.stem + "_teams.csv"), index=False)
+        m = evaluate(games, params, args.eval_from)
+        print(f"[ratings] {len(res):,} games in {dt:.2f}s -> {out}")
+        print(f"[ratings] from {args.eval_from}: logloss={m['logloss']:.4f} spread_mae={m['spread_mae']:.2f} "
+              f"total_mae={m['total_mae']:.2f} (n={m['games']:,})")
+        print(tbl.head(10).to_string(index=False))
+    else:
+        grid = dict(_grid_arg(s) for s in args.grid) or {"k": [15, 20, 25, 30], "hfa": [35, 50, 65], "regress": [0.25, 0.33, 0.5]}
+        t = time.perf_counter()
+        res = sweep(games, grid, params, args.eval_from)
+        print(f"[ratings] swept {len(res)} combos in {time.perf_counter() - t:.2f}s")
+        if args.out:
+            res.to_csv(args.out, index=False)
+        print(res.head(15).to_string(index=False))
+        best = {**asdict(params), **res.iloc[0][list(grid)].to_dict()}
+        print("[ratings] best:", " ".join(f"--set {k}={v:g}" for k, v in best.items() if k in grid))
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
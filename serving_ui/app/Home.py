@@ -1,12 +1,23 @@
+# === Bootstrap (once per process: paths, optional-module shims, timings) ===
+try:
+    from app.bootstrap import boot, lazy
+except ModuleNotFoundError:  # page opened directly: only serving_ui/app is on sys.path yet
+    from bootstrap import boot, lazy
+page = boot(__file__)
+# === /Bootstrap ===
 # --- Core imports & paths (must come first) ---
 from pathlib import Path
+import csv
+import itertools
 import os
 import time
 from typing import Iterable, Set
 
-import pandas as pd
 import streamlit as st
 
+# the landing page is every session's cold start: pandas (+ numpy) loads only if the cart preview needs it
+pd = lazy("pandas")
+
 st.set_page_config(page_title='Calculate Risk: Edge Finder — Home', page_icon='📈', layout='wide')
 
 APP_DIR = Path(__file__).resolve().parent
@@ -160,56 +171,6 @@ def require_eligibility(
     # Optional small banner on page body
     st.info(BADGE_TEXT, icon="🛡️")
 
-# === AppImportGuard (nuclear) ===
-try:
-    from app.lib.auth import login, show_logout
-except ModuleNotFoundError:
-    import sys
-    from pathlib import Path
-    here = Path(__file__).resolve()
-
-    # Find .../<base>/app/lib/auth.py OR .../<base>/serving_ui/app/lib/auth.py
-    base = None
-    auth_path = None
-    for p in [here] + list(here.parents):
-        cand1 = p / "app" / "lib" / "auth.py"
-        cand2 = p / "serving_ui" / "app" / "lib" / "auth.py"
-        if cand1.exists():
-            base, auth_path = p, cand1
-            break
-        if cand2.exists():
-            base, auth_path = (p / "serving_ui"), cand2
-            break
-
-    if base and auth_path:
-        s = str(base)
-        if s not in sys.path:
-            sys.path.insert(0, s)
-        try:
-            # Try the normal import again after fixing sys.path
-            from app.lib.auth import login, show_logout  # type: ignore
-        except ModuleNotFoundError:
-            # Fallback: load the module directly and register it under app.lib.auth
-            import types, importlib.util
-            # Ensure package containers exist in sys.modules
-            if "app" not in sys.modules:
-                pkg_app = types.ModuleType("app")
-                pkg_app.__path__ = [str(Path(base) / "app")]
-                sys.modules["app"] = pkg_app
-            if "app.lib" not in sys.modules:
-                pkg_lib = types.ModuleType("app.lib")
-                pkg_lib.__path__ = [str(Path(base) / "app" / "lib")]
-                sys.modules["app.lib"] = pkg_lib
-            spec = importlib.util.spec_from_file_location("app.lib.auth", str(auth_path))
-            mod = importlib.util.module_from_spec(spec)  # type: ignore[arg-type]
-            assert spec and spec.loader
-            spec.loader.exec_module(mod)  # type: ignore[attr-defined]
-            sys.modules["app.lib.auth"] = mod
-            login = mod.login
-            show_logout = mod.show_logout
-    else:
-        raise  # no auth.py found at expected locations
-
 def _find_disclaimer() -> Path | None:
     """Find a DISCLAIMER.md via env or common locations."""
     env_path = os.environ.get('EDGE_DISCLAIMER_PATH', '').strip()
@@ -237,12 +198,6 @@ with col_logo:
         st.caption('No logo found. Place your logo image at:')
         st.code(str(ASSETS_DIR / 'logo.png'))
         st.warning('Missing logo: put your file at assets/logo.png', icon='⚠️')
-# === /AppImportGuard ===
-from pathlib import Path
-import os
-import time
-import pandas as pd
-import streamlit as st
 st.set_page_config(page_title='Edge Finder — Home', page_icon='📈', layout='wide')
 
 ROOT = APP_DIR.parent.parent
@@ -287,7 +242,18 @@ def _mtime(path: Path) -> str:
         return '—'
 
 @st.cache_data(show_spinner=False)
-def _read_csv_safe(p: Path, nrows: int | None=5) -> pd.DataFrame:
+def _sample_rows(p: Path, limit: int=3) -> int:
+    """Data rows under the header, counted up to `limit` (csv module: no pandas on first paint)."""
+    try:
+        with open(p, newline='', encoding='utf-8-sig') as fh:
+            rows = csv.reader(fh)
+            next(rows, None)
+            return sum(1 for _ in itertools.islice((r for r in rows if r), limit))
+    except Exception:
+        return 0
+
+@st.cache_data(show_spinner=False)
+def _read_csv_safe(p: Path, nrows: int | None=5) -> 'pd.DataFrame':
     try:
         return pd.read_csv(p, nrows=nrows)
     except Exception:
@@ -323,20 +289,20 @@ with c1:
     st.caption('Edges')
     st.code(str(edges_p))
     st.metric('Last modified', _mtime(edges_p))
-    df = _read_csv_safe(edges_p, nrows=3)
-    st.caption(f'Sample rows: {len(df)}' if not df.empty else 'No preview available.')
+    n = _sample_rows(edges_p)
+    st.caption(f'Sample rows: {n}' if n else 'No preview available.')
 with c2:
     st.caption('Odds / Lines')
     st.code(str(odds_p))
     st.metric('Last modified', _mtime(odds_p))
-    df = _read_csv_safe(odds_p, nrows=3)
-    st.caption(f'Sample rows: {len(df)}' if not df.empty else 'No preview available.')
+    n = _sample_rows(odds_p)
+    st.caption(f'Sample rows: {n}' if n else 'No preview available.')
 with c3:
     st.caption('Scores')
     st.code(str(scores_p))
     st.metric('Last modified', _mtime(scores_p))
-    df = _read_csv_safe(scores_p, nrows=3)
-    st.caption(f'Sample rows: {len(df)}' if not df.empty else 'No preview available.')
+    n = _sample_rows(scores_p)
+    st.caption(f'Sample rows: {n}' if n else 'No preview available.')
 st.divider()
 st.subheader('Parlay Cart (quick peek)')
 cart_p = EXPORTS / 'parlay_cart.csv'
@@ -366,3 +332,4 @@ with st.expander('Quick Tips', expanded=False):
     st.markdown('\n- Update data from the **00 — Data Diagnostics** page if something looks stale.\n- Place your logo at `serving_ui/app/assets/logo.png` (preferred). Other fallbacks: repo `logo.png` or `calculated_risk_logo.png`.\n- Set `EDGE_EXPORTS_DIR` if your exports live outside the repo.\n- Put your **DISCLAIMER.md** in `serving_ui/app/assets/` or set `EDGE_DISCLAIMER_PATH` to your file.\n- To control the Terms link, set **EDGE_TOS_URL** to your hosted page. If not set, the app will try local files and make a `file://` link.\n        '.strip())
 st.caption('© Calculated Risk — Edge Finder')
 
+page.rendered()
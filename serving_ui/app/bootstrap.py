@@ -1,12 +1,175 @@
-from pathlib import Path
+"""
+bootstrap.py — Edge Finder
+Page bootstrap, run once per process (module state survives Streamlit reruns):
+
+  paths    serving_ui/ and the repo root go on sys.path the first time any page boots, so
+           `app.*` and `tools.*` import normally; nothing walks parent directories on rerun
+  shims    the optional app modules pages used to guard one by one (auth, access, parlay cart /
+           odds table, diagnostics) resolve on first attribute access and are cached here, with
+           the same fallbacks the old per-page guards had:
+               from app.bootstrap import login, show_logout, require_allowed_page, beta_banner
+  lazy     lazy("plotly.express") returns a module proxy that imports on first use, so heavy
+           libraries stay off the first-paint path of pages that only need them behind a widget
+  timings  boot(__file__) starts a page timer; page.rendered() at the end of the script records
+           the page's first render in this process (boot, shim / lazy import time, total).
+           EDGE_PAGE_TIMINGS=<file.jsonl> also appends each record (tools/bench_startup.py)
+
+Pages start with:
+
+    try:
+        from app.bootstrap import boot
+    except ModuleNotFoundError:  # page opened directly: only serving_ui/app is on sys.path yet
+        from bootstrap import boot
+    page = boot(__file__)
+"""
+from __future__ import annotations
+
+import importlib
+import importlib.util
+import json
+import os
 import sys
+import time
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parent          # .../serving_ui/app
+UI_DIR = APP_DIR.parent                             # .../serving_ui
+REPO_DIR = UI_DIR.parent                            # repo root (tools/, exports/)
+
+_T_PROCESS = time.perf_counter()
+_BOOTED = False
+_IMPORT_S = 0.0
+TIMINGS: dict[str, dict] = {}
 
 def bootstrap_paths():
-    app_dir = Path(__file__).resolve().parent
-    root = app_dir.parents[2]
-    su = str(app_dir.parent)
-    rt = str(root)
-    for p in (su, rt):
+    # Put serving_ui and repo root at the front of sys.path so "import app" and "import tools" work
+    for p in (str(UI_DIR), str(REPO_DIR)):
         if p not in sys.path:
             sys.path.insert(0, p)
-    return root
\ No newline at end of file
+    # imported as top-level "bootstrap" (page opened directly): share this module's state with app.bootstrap
+    if __name__ != "app.bootstrap":
+        sys.modules.setdefault("app.bootstrap", sys.modules[__name__])
+    return REPO_DIR
+
+# -------------------- lazy imports --------------------
+
+def _timed_import(name: str):
+    global _IMPORT_S
+    if name in sys.modules:
+        return sys.modules[name]
+    t = time.perf_counter()
+    try:
+        return importlib.import_module(name)
+    finally:
+        _IMPORT_S += time.perf_counter() - t
+
+class _LazyModule:
+    """Stand-in for a module that is imported the first time an attribute is read."""
+
+    def __init__(self, name: str):
+        self.__dict__["_name"] = name
+        self.__dict__["_mod"] = None
+
+    def _load(self):
+        if self._mod is None:
+            self.__dict__["_mod"] = _timed_import(self._name)
+        return self._mod
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __repr__(self) -> str:
+        return f"<lazy module {self._name!r}{' (loaded)' if self._mod is not None else ''}>"
+
+def lazy(name: str):
+    """The module itself when it is already imported, else a proxy that imports on first use."""
+    return sys.modules.get(name) or _LazyModule(name)
+
+def available(name: str) -> bool:
+    """Whether an optional dependency is installed, without importing it."""
+    return name in sys.modules or importlib.util.find_spec(name) is not None
+
+# -------------------- optional app modules --------------------
+
+def _no_access_banner() -> None:
+    try:
+        import streamlit as st
+        st.caption("🧪 Beta mode — access module missing; using shim.")
+    except Exception:
+        pass
+
+# name -> (module, attribute, fallback or None to let the import error surface)
+_SHIMS = {
+    "login":                 ("app.lib.auth", "login", None),
+    "show_logout":           ("app.lib.auth", "show_logout", None),
+    "require_allowed_page":  ("app.lib.access", "require_allowed_page", lambda _page_path: None),
+    "beta_banner":           ("app.lib.access", "beta_banner", _no_access_banner),
+    "live_enabled":          ("app.lib.access", "live_enabled", lambda: False),
+    "do_expensive_refresh":  ("app.lib.access", "do_expensive_refresh", lambda: None),
+    "selectable_odds_table": ("app.utils.parlay_ui", "selectable_odds_table", None),
+    "read_cart":             ("app.utils.parlay_cart", "read_cart", None),
+    "add_to_cart":           ("app.utils.parlay_cart", "add_to_cart", None),
+    "clear_cart":            ("app.utils.parlay_cart", "clear_cart", None),
+    "mount_in_sidebar":      ("app.utils.diagnostics", "mount_in_sidebar", lambda *_a, **_k: None),
+}
+
+def __getattr__(name: str):
+    spec = _SHIMS.get(name)
+    if spec is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    bootstrap_paths()
+    mod, attr, fallback = spec
+    try:
+        value = getattr(_timed_import(mod), attr)
+    except (ImportError, AttributeError):
+        if fallback is None:
+            raise
+        value = fallback
+    globals()[name] = value           # resolved once per process
+    return value
+
+# -------------------- page timings --------------------
+
+class PageTimer:
+    """Per-run timer returned by boot(); rendered() records the first render of the page in this process."""
+
+    def __init__(self, page: str, boot_s: float):
+        self.page = page
+        self.boot_s = boot_s
+        self.t0 = time.perf_counter()
+        self.import0 = _IMPORT_S
+
+    def rendered(self) -> dict | None:
+        if self.page in TIMINGS:
+            TIMINGS[self.page]["runs"] += 1
+            return None
+        rec = {
+            "page": self.page,
+            "boot_s": round(self.boot_s, 4),
+            "import_s": round(_IMPORT_S - self.import0, 4),
+            "render_s": round(time.perf_counter() - self.t0, 4),
+            "process_s": round(time.perf_counter() - _T_PROCESS, 4),
+            "runs": 1,
+        }
+        TIMINGS[self.page] = rec
+        out = os.environ.get("EDGE_PAGE_TIMINGS", "").strip()
+        if out:
+            try:
+                with open(out, "a", encoding="utf-8") as fh:
+                    fh.write(json.dumps(rec) + "\n")
+            except OSError:
+                pass
+        return rec
+
+def boot(page_file: str) -> PageTimer:
+    """Call first thing in a page; cheap on every rerun after the first."""
+    global _BOOTED
+    t = time.perf_counter()
+    if not _BOOTED:
+        bootstrap_paths()
+        _BOOTED = True
+    return PageTimer(Path(page_file).stem, time.perf_counter() - t)
+
+def timings() -> list[dict]:
+    """First-render records for the pages seen by this process, slowest first."""
+    return sorted(TIMINGS.values(), key=lambda r: -r["render_s"])
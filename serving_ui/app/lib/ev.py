@@ -16,7 +16,7 @@ def add_ev_columns(df: pd.DataFrame) -> pd.DataFrame:
     Adds EV-friendly columns:
       - implied_prob : if missing, computed as 1/decimal
       - imp_prob     : alias of implied_prob (legacy convenience)
-      - fair_dec     : 1 / imp_prob
+      - fair_dec     : 1 / fair_prob when present (de-vigged), else 1 / imp_prob
       - fair_american: decimal -> American conversion of fair price
     """
     if df is None or df.empty:
@@ -33,8 +33,10 @@ def add_ev_columns(df: pd.DataFrame) -> pd.DataFrame:
             d.loc[needs, 'implied_prob'] = 1.0 / d.loc[needs, 'decimal']
     if 'implied_prob' in d.columns:
         d['imp_prob'] = d['implied_prob']
+        # prefer a de-vigged market probability (tools/fair_price.py) when one is attached
+        fair_p = pd.to_numeric(d['fair_prob'], errors='coerce') if 'fair_prob' in d.columns else d['imp_prob']
         with np.errstate(divide='ignore', invalid='ignore'):
-            d['fair_dec'] = 1.0 / d['imp_prob']
+            d['fair_dec'] = 1.0 / fair_p.where(fair_p.notna(), d['imp_prob'])
         d['fair_american'] = d['fair_dec'].map(_dec_to_american)
     else:
         d['imp_prob'] = np.nan
@@ -0,0 +1,39 @@
+import pandas as pd
+from tools.model_registry import active_id, list_models, load, model_dir, registry_dir, set_active
+
+def find_models(name: str | None=None) -> list[dict]:
+    """Registered models from the registry index (no filesystem scan); newest first."""
+    df = list_models(name)
+    out = []
+    for r in df.to_dict(orient='records'):
+        rec = {'id': r['id'], 'name': r['name'], 'version': r['id'], 'updated': r.get('created', ''), 'notes': r.get('notes', '') or '', 'path': str(registry_dir() / r['path']), 'active': bool(r.get('active')), 'train_rows': r.get('train_rows')}
+        rec.update({k[2:]: v for k, v in r.items() if k.startswith('m_')})
+        out.append(rec)
+    return out
+
+def set_active_model(version: str):
+    set_active(version)
+
+def load_model(model_id: str | None=None, name: str='parlay'):
+    """(estimator, meta) by id; defaults to the active model for `name`. O(1) index lookup, cached per process."""
+    mid = model_id or active_id(name) or active_id()
+    if not mid:
+        raise KeyError(f'no registered model for {name!r}')
+    return load(mid)
+
+def score(rows, model_id: str | None=None, name: str='parlay'):
+    """P(win) per row through the shared in-process model server (warm cache, micro-batched across sessions)."""
+    from tools.model_server import get_server
+    mid = model_id or active_id(name) or active_id()
+    if not mid:
+        raise KeyError(f'no registered model for {name!r}')
+    return get_server().score(mid, rows)
+
+def server_stats() -> dict:
+    from tools.model_server import get_server
+    return get_server().stats()
+
+def model_files(model_id: str) -> pd.DataFrame:
+    d = model_dir(model_id)
+    files = [f for f in d.iterdir() if f.is_file()] if d.exists() else []
+    return pd.DataFrame({'relpath': [f.name for f in files], 'size_kb': [round(f.stat().st_size / 1024, 2) for f in files]}).sort_values('relpath') if files else pd.DataFrame(columns=['relpath', 'size_kb'])
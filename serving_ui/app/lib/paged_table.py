@@ -0,0 +1,267 @@
+"""
+paged_table.py — Edge Finder
+Server-side filtering / sorting / paging for the explorer tables. The full frame stays in the
+server process; the browser only ever receives the visible page.
+
+  FilterIndex   built once per data version (cache_resource via filter_index()):
+                  categorical columns -> factorized codes + a boolean mask per value, made on
+                  first use and kept; a multiselect is the OR of its value masks
+                  numeric columns     -> float arrays for range filters (NaN never matches)
+                  text columns        -> upper-cased strings for "contains" search (masks per query kept)
+                  sort orders         -> stable argsort per (column, direction), reused by every
+                                         filter combination (NaN last)
+                one instance is shared by every session, so the mask / order caches sit behind a lock
+  page()        mask -> positions in sort order -> one slice of rows, projected to the chosen
+                columns; cost is O(rows) in numpy plus O(page) in pandas
+  download_csv()
+                "Prepare CSV" button; the filtered rows are encoded only on that click and handed
+                straight to st.download_button (nothing kept in session_state)
+  paged_dataframe()
+                the Streamlit side: sort / direction / columns / page size / page controls, a
+                "rows a–b of N" caption and st.dataframe of the slice only
+
+    idx = filter_index(df, token=(str(path), path.stat().st_mtime_ns), key="lines",
+                       categorical=["book", "side"], numeric=["price"], text=["_home_nick", "_away_nick"])
+    mask = idx.mask(equals={"book": books}, ranges={"price": (lo, hi)}, contains={("_home_nick", "_away_nick"): q})
+    rows = paged_dataframe(idx, mask, key="lines", columns=cols, sort=["_date_iso"])
+"""
+from __future__ import annotations
+
+import threading
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+
+PAGE_SIZES = (50, 100, 250, 500, 1000)
+
+class FilterIndex:
+    """Cached per-value masks, numeric arrays and sort orders over one frame (see the module header)."""
+
+    def __init__(self, df: pd.DataFrame, categorical: Iterable[str] = (), numeric: Iterable[str] = (),
+                 text: Iterable[str] = ()):
+        self.df = df.reset_index(drop=True)
+        self.n = len(self.df)
+        self._codes: dict[str, tuple[np.ndarray, pd.Index]] = {}
+        self._masks: dict[tuple[str, object], np.ndarray] = {}
+        self._num: dict[str, np.ndarray] = {}
+        self._text: dict[str, pd.Series] = {}
+        self._orders: dict[tuple[str, bool], np.ndarray] = {}
+        self._lock = threading.Lock()          # caches below are filled from every session's thread
+        for c in categorical:
+            if c in self.df.columns:
+                try:
+                    codes, uniq = pd.factorize(self.df[c], sort=True)
+                except TypeError:       # mixed types: keep first-seen order
+                    codes, uniq = pd.factorize(self.df[c])
+                self._codes[c] = (codes, pd.Index(uniq))
+        for c in numeric:
+            if c in self.df.columns:
+                self._num[c] = pd.to_numeric(self.df[c], errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+        for c in text:
+            if c in self.df.columns:
+                self._text[c] = self.df[c].astype("string").fillna("").str.upper()
+
+    # ---- filters ----
+
+    def options(self, col: str, within: np.ndarray | None = None) -> list:
+        """Sorted distinct non-missing values of a categorical column (only those present under `within`)."""
+        if col not in self._codes:
+            return []
+        codes, uniq = self._codes[col]
+        if within is None:
+            return uniq.tolist()
+        present = np.unique(codes[within & (codes >= 0)])
+        return uniq[present].tolist()
+
+    def bounds(self, col: str, within: np.ndarray | None = None) -> tuple[float, float] | None:
+        """(min, max) of a numeric column under `within`, None when it has no finite values there."""
+        v = self._num.get(col)
+        if v is None:
+            return None
+        v = v if within is None else v[within]
+        v = v[np.isfinite(v)]
+        return (float(v.min()), float(v.max())) if v.size else None
+
+    def numeric(self, col: str) -> np.ndarray:
+        """The float array behind a numeric column (read it under a mask for stats; do not modify)."""
+        return self._num[col]
+
+    def value_mask(self, col: str, value) -> np.ndarray:
+        key = (col, value)
+        with self._lock:
+            m = self._masks.get(key)
+        if m is None:
+            codes, uniq = self._codes[col]
+            i = uniq.get_indexer([value])[0]
+            m = codes == i if i >= 0 else np.zeros(self.n, dtype=bool)
+            m.flags.writeable = False
+            with self._lock:
+                m = self._masks.setdefault(key, m)
+        return m
+
+    def text_mask(self, col: str, q: str) -> np.ndarray:
+        key = (col, "~", q)
+        with self._lock:
+            m = self._masks.get(key)
+        if m is None:
+            m = self._text[col].str.contains(q, regex=False).to_numpy(dtype=bool)
+            m.flags.writeable = False
+            with self._lock:
+                if len(self._masks) > 512:      # search strings are unbounded; value masks are not
+                    for k in [k for k in self._masks if len(k) != 2]:
+                        del self._masks[k]
+                m = self._masks.setdefault(key, m)
+        return m
+
+    def mask(self, equals: dict | None = None, ranges: dict | None = None, contains: dict | None = None,
+             base: np.ndarray | None = None) -> np.ndarray:
+        """
+        AND of: equals {col: value or list} (OR within a list; an empty list / None means no filter),
+        ranges {col: (lo, hi)} inclusive, contains {col or (cols...): text} matching any of the columns.
+        Columns the index does not know are ignored, like the pages' .get(col) filters.
+        """
+        m = np.ones(self.n, dtype=bool) if base is None else base.copy()
+        for col, vals in (equals or {}).items():
+            if col not in self._codes or vals is None:
+                continue
+            vals = list(vals) if isinstance(vals, (list, tuple, set)) else [vals]
+            if not vals:
+                continue
+            sel = np.zeros(self.n, dtype=bool)
+            for v in vals:
+                sel |= self.value_mask(col, v)
+            m &= sel
+        for col, (lo, hi) in (ranges or {}).items():
+            v = self._num.get(col)
+            if v is not None:
+                with np.errstate(invalid="ignore"):
+                    m &= (v >= lo) & (v <= hi)
+        for cols, q in (contains or {}).items():
+            q = str(q or "").strip().upper()
+            cols = [c for c in ((cols,) if isinstance(cols, str) else cols) if c in self._text]
+            if not q or not cols:
+                continue
+            hit = np.zeros(self.n, dtype=bool)
+            for c in cols:
+                hit |= self.text_mask(c, q)
+            m &= hit
+        return m
+
+    # ---- sort / page ----
+
+    def order(self, col: str, ascending: bool = True) -> np.ndarray:
+        key = (col, ascending)
+        with self._lock:
+            o = self._orders.get(key)
+        if o is None:
+            s = self.df[col]
+            try:
+                o = s.sort_values(ascending=ascending, kind="stable", na_position="last").index.to_numpy()
+            except TypeError:           # mixed types sort as text
+                o = s.astype("string").sort_values(ascending=ascending, kind="stable", na_position="last").index.to_numpy()
+            o.flags.writeable = False
+            with self._lock:
+                o = self._orders.setdefault(key, o)
+        return o
+
+    def page(self, mask: np.ndarray, sort: str | list[str] | None = None, ascending: bool = True,
+             columns: list[str] | None = None, page: int = 1, page_size: int = 100) -> tuple[pd.DataFrame, int]:
+        """(rows of the requested page, total rows under the mask)."""
+        total = int(mask.sum())
+        sort = [c for c in ([sort] if isinstance(sort, str) else (sort or [])) if c in self.df.columns]
+        if not sort:
+            pos = np.flatnonzero(mask)
+        elif len(sort) == 1:
+            o = self.order(sort[0], ascending)
+            pos = o[mask[o]]
+        else:
+            # multi-key: sort only the filtered rows (rare; the single-key path is the cached one)
+            sub = self.df.loc[mask, sort]
+            pos = sub.sort_values(sort, ascending=ascending, kind="stable", na_position="last").index.to_numpy()
+        start = max(0, (int(page) - 1) * int(page_size))
+        rows = self.df.iloc[pos[start:start + int(page_size)]]
+        if columns:
+            rows = rows[[c for c in columns if c in rows.columns]]
+        return rows, total
+
+# -------------------- Streamlit --------------------
+
+def filter_index(df: pd.DataFrame, token, key: str, categorical: Iterable[str] = (), numeric: Iterable[str] = (),
+                 text: Iterable[str] = ()) -> FilterIndex:
+    """FilterIndex cached across reruns and sessions until `token` (e.g. source path + mtime) changes."""
+    import streamlit as st
+
+    @st.cache_resource(show_spinner=False, max_entries=16)
+    def _build(key: str, token, categorical: tuple, numeric: tuple, text: tuple, _df: pd.DataFrame) -> FilterIndex:
+        return FilterIndex(_df, categorical, numeric, text)
+
+    return _build(key, token, tuple(categorical), tuple(numeric), tuple(text), df)
+
+def paged_dataframe(idx: FilterIndex, mask: np.ndarray, key: str, columns: list[str] | None = None,
+                    sort: str | list[str] | None = None, ascending: bool = True, page_size: int = 100,
+                    enrich=None, **dataframe_kwargs) -> pd.DataFrame:
+    """
+    Render one page of idx.df[mask] and return those rows (all columns, so callers can hand them
+    to selectable_odds_table). `enrich(rows) -> rows` runs on the slice only (e.g. a merge); columns
+    it adds are shown when listed in `columns`.
+    """
+    import streamlit as st
+
+    all_cols = list(idx.df.columns)
+    columns = list(columns or all_cols)
+    added = [c for c in columns if c not in all_cols]
+    sort_opts = ["(default)"] + all_cols
+    default_sort = sort if isinstance(sort, str) else None
+
+    c1, c2, c3, c4, c5 = st.columns([4, 2, 1, 1, 1])
+    with c1:
+        shown = st.multiselect("Columns", all_cols, default=[c for c in columns if c in all_cols], key=f"{key}_cols")
+    with c2:
+        sort_by = st.selectbox("Sort by", sort_opts, key=f"{key}_sort",
+                               index=sort_opts.index(default_sort) if default_sort in sort_opts else 0)
+    with c3:
+        desc = st.toggle("Descending", value=not ascending, key=f"{key}_desc")
+    with c4:
+        size = int(st.selectbox("Rows / page", PAGE_SIZES, key=f"{key}_size",
+                                index=PAGE_SIZES.index(page_size) if page_size in PAGE_SIZES else 1))
+
+    # back to page 1 whenever the filter result or the ordering changes; clamp when the page size grows
+    total = int(mask.sum())
+    n_pages = max(1, -(-total // size))
+    sig = hash((np.packbits(mask).tobytes(), sort_by, desc))
+    if st.session_state.get(f"{key}_sig") != sig:
+        st.session_state[f"{key}_sig"] = sig
+        st.session_state[f"{key}_page"] = 1
+    st.session_state[f"{key}_page"] = min(max(1, int(st.session_state.get(f"{key}_page", 1))), n_pages)
+    with c5:
+        pg = int(st.number_input("Page", min_value=1, step=1, key=f"{key}_page"))
+    pg = min(pg, n_pages)
+
+    rows, total = idx.page(mask, sort if sort_by == "(default)" else sort_by, ascending=not desc,
+                           page=pg, page_size=size)
+    if enrich is not None:
+        rows = enrich(rows)
+    start = (pg - 1) * size
+    st.caption(f"Rows {start + 1 if total else 0:,}–{start + len(rows):,} of {total:,} · page {pg:,} of {n_pages:,}"
+               f" · {idx.n:,} loaded")
+    show = [c for c in (shown or columns) if c in rows.columns] + [c for c in added if c in rows.columns]
+    st.dataframe(rows[show], hide_index=True, **dataframe_kwargs)
+    return rows
+
+def download_csv(idx: FilterIndex, mask: np.ndarray, key: str, columns: list[str] | None = None,
+                 label: str = "Download filtered CSV", file_name: str = "filtered.csv") -> None:
+    """
+    Download of every filtered row. The CSV is encoded only when "Prepare CSV" is clicked, for the
+    filter in effect on that run; the bytes live for that run only (not in session_state).
+    """
+    import streamlit as st
+
+    total = int(mask.sum())
+    if not st.button(f"Prepare CSV ({total:,} rows)", key=f"{key}_prep", disabled=not total):
+        return
+    out = idx.df.loc[mask]
+    if columns:
+        out = out[[c for c in columns if c in out.columns]]
+    st.download_button(label, out.to_csv(index=False).encode("utf-8"), file_name=file_name,
+                       mime="text/csv", key=f"{key}_dl")
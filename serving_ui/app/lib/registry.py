@@ -1,4 +1,11 @@
 def current_model_version() -> str:
+    try:
+        from tools.model_registry import active_id
+        mid = active_id()
+        if mid:
+            return mid
+    except Exception:
+        pass
     try:
         from app.lib.config import MODEL_VERSION
         return str(MODEL_VERSION)
@@ -1,9 +1,16 @@
 from __future__ import annotations
+# === Bootstrap (once per process: paths, optional-module shims, timings) ===
+try:
+    from app.bootstrap import boot
+except ModuleNotFoundError:  # page opened directly: only serving_ui/app is on sys.path yet
+    from bootstrap import boot
+page = boot(__file__)
+# === /Bootstrap ===
 # -*- coding: utf-8 -*-
 # 01 Line Shop — clean, with robust parlay_ui import
 
 
-import os, sys, time
+import os, time
 from pathlib import Path
 import numpy as np
 import pandas as pd
@@ -54,24 +61,19 @@ bump_usage("page_visit")
 show_nudge(feature="analytics", metric="page_visit", threshold=10, period="1D", demo_unlock=True, location="inline")
 # === /Nudge (auto-injected) ===
 
-# ------- Make sure "app" is importable (only if needed) -------
+# ------- Optional parlay_ui -------
 try:
     from app.utils.parlay_ui import selectable_odds_table  # type: ignore
-except ModuleNotFoundError:
-    here = Path(__file__).resolve()
-    for up in (here,) + tuple(here.parents):
-        probe = up / "serving_ui" / "app" / "__init__.py"
-        if probe.exists():
-            base = str((up / "serving_ui").resolve())
-            if base not in sys.path:
-                sys.path.insert(0, base)
-            break
-    try:
-        from app.utils.parlay_ui import selectable_odds_table  # type: ignore
-    except Exception:
-        # last-resort no-op to keep the page running
-        def selectable_odds_table(*a, **k):  # type: ignore
-            st.warning("parlay_ui not available — selection table disabled.", icon="⚠️")
+except Exception:
+    # last-resort no-op to keep the page running
+    def selectable_odds_table(*a, **k):  # type: ignore
+        st.warning("parlay_ui not available — selection table disabled.", icon="⚠️")
+
+try:
+    from tools.best_price import JOURNAL_CSV, load_index
+    from tools.fair_price import canon_quotes
+except ImportError:
+    JOURNAL_CSV, load_index = "best_price_quotes.csv", None
 
 # ------- Paths -------
 def _repo_root() -> Path:
@@ -124,11 +126,28 @@ def kelly_fraction(p, dec):
     f = (p * b - (1.0 - p)) / b
     return max(0.0, float(f))
 
-def best_rows(df):
+def best_rows(df, index=None):
+    """Best price per (game_id, market, selection, line): read from the best-price index when it holds
+    the quote shown here, ranked locally for the rest (index stale, or books filtered)."""
     d = df.copy()
     d["Decimal"] = d["American"].apply(american_to_decimal)
-    d["_rank"] = d.groupby(["game_id","market","selection"])["Decimal"].rank(ascending=False, method="first")
-    return d[d["_rank"] == 1.0].drop(columns=["_rank"])
+    d["_line"] = pd.to_numeric(d["Line/Point"], errors="coerce").fillna(0.0)
+    key = ["game_id","market","selection","_line"]
+    served = d.iloc[:0]
+    if index is not None and len(index):
+        q = canon_quotes(d)
+        top = [index.top.get((g, m, s, ln), [None])[0]
+               for g, m, s, ln in zip(q["_game"], q["_market_norm"], q["side"], q["line"].fillna(0.0))]
+        hit = (d["book"].to_numpy() == np.array([t[1] if t else None for t in top], dtype=object)) & \
+              (d["American"].to_numpy() == np.array([t[2] if t else np.nan for t in top], dtype=float))
+        served = d[hit].drop_duplicates(key)
+    rest = d[~d.set_index(key).index.isin(served.set_index(key).index)]
+    rest = rest[rest.groupby(key)["Decimal"].rank(ascending=False, method="first") == 1.0]
+    return pd.concat([served, rest]).sort_index().drop(columns=["_line"])
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def load_best_index(stamp: int):
+    return load_index(EXPORTS) if load_index is not None else None
 
 # ------- IO -------
 def load_model_probs():
@@ -199,6 +218,14 @@ if mp is not None:
 
 df["Decimal"] = df["American"].apply(american_to_decimal)
 df["Impl. Prob (Odds)"] = df["American"].apply(implied_prob)
+
+# Market-fair reference: de-vigged cross-book consensus (tools/fair_price.py)
+try:
+    from tools.fair_price import consensus_fair, attach_fair
+    df = attach_fair(df, consensus_fair(df), price_col="American").rename(columns={"fair_prob": "Fair Prob", "ev_vs_fair": "EV vs Fair %"})
+    df["EV vs Fair %"] = 100.0 * df["EV vs Fair %"]
+except ImportError:
+    df["Fair Prob"] = df["EV vs Fair %"] = np.nan
 if "Model Prob" in df.columns:
     df["EV %"] = df.apply(lambda r: ev_percent(r["Model Prob"], r["Decimal"]), axis=1)
     df[f"EV @ ${stake_display}"] = df.apply(lambda r: ev_dollars(r.get("Model Prob"), r["Decimal"], stake_display), axis=1)
@@ -210,14 +237,17 @@ else:
 if "EV %" in df.columns and show_pos_ev:
     df = df[df["EV %"].fillna(-999) >= float(min_ev_pct)]
 
-base_cols = ["commence_time","home","away","market","selection","book","American","Line/Point","Decimal","Impl. Prob (Odds)","#Books"]
+base_cols = ["commence_time","home","away","market","selection","book","American","Line/Point","Decimal","Impl. Prob (Odds)","Fair Prob","EV vs Fair %","#Books"]
 ev_cols = ["Model Prob","EV %",f"EV @ ${stake_display}","Kelly f","Kelly stake ($)"] if "Model Prob" in df.columns else []
 show_cols = [c for c in base_cols + ev_cols if c in df.columns]
 
 tab_best, tab_all = st.tabs(["Quick Odds Shop (Best Price)","All Quotes"])
 with tab_best:
-    best = best_rows(df)
-    st.caption("Best price per (game_id, market, selection).")
+    _journal = EXPORTS / JOURNAL_CSV
+    best_idx = load_best_index(_journal.stat().st_mtime_ns if _journal.exists() else 0)
+    # the index ranks every book; with books filtered out its winner may be one the user excluded
+    best = best_rows(df, best_idx if not chosen_books or set(chosen_books) >= set(books) else None)
+    st.caption("Best price per (game_id, market, selection, line).")
     st.dataframe(best[show_cols], hide_index=True, use_container_width=True)
 with tab_all:
     st.dataframe(df[show_cols], hide_index=True, use_container_width=True)
@@ -226,5 +256,4 @@ st.markdown("---")
 st.subheader("Add selections to Parlay Cart")
 selectable_odds_table(df, page_key="line_shop", page_name="01_Line_Shop")
 
-
-
+page.rendered()
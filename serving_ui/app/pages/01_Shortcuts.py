@@ -1,53 +1,16 @@
 from __future__ import annotations
-# === AppImportGuard (nuclear) ===
+# === Bootstrap (once per process: paths, optional-module shims, timings) ===
 try:
-    from app.lib.auth import login, show_logout
-except ModuleNotFoundError:
-    import sys
-    from pathlib import Path
-    here = Path(__file__).resolve()
-    base = None
-    auth_path = None
-    for p in [here] + list(here.parents):
-        cand1 = p / "app" / "lib" / "auth.py"
-        cand2 = p / "serving_ui" / "app" / "lib" / "auth.py"
-        if cand1.exists():
-            base, auth_path = p, cand1; break
-        if cand2.exists():
-            base, auth_path = (p / "serving_ui"), cand2; break
-    if base and auth_path:
-        s = str(base)
-        if s not in sys.path: sys.path.insert(0, s)
-        try:
-            from app.lib.auth import login, show_logout  # type: ignore
-        except ModuleNotFoundError:
-            import types, importlib.util
-            if "app" not in sys.modules:
-                pkg_app = types.ModuleType("app"); pkg_app.__path__ = [str(Path(base) / "app")]; sys.modules["app"] = pkg_app
-            if "app.lib" not in sys.modules:
-                pkg_lib = types.ModuleType("app.lib"); pkg_lib.__path__ = [str(Path(base) / "app" / "lib")]; sys.modules["app.lib"] = pkg_lib
-            spec = importlib.util.spec_from_file_location("app.lib.auth", str(auth_path))
-            mod = importlib.util.module_from_spec(spec); assert spec and spec.loader
-            spec.loader.exec_module(mod)  # type: ignore[attr-defined]
-            sys.modules["app.lib.auth"] = mod
-            login = mod.login; show_logout = mod.show_logout
-    else:
-        raise
-# === /AppImportGuard ===
-
-
-
-import sys
-from pathlib import Path
+    from app.bootstrap import boot
+except ModuleNotFoundError:  # page opened directly: only serving_ui/app is on sys.path yet
+    from bootstrap import boot
+page = boot(__file__)
+from app.bootstrap import login, show_logout
+# === /Bootstrap ===
+
+
+
 import streamlit as st
-_here = Path(__file__).resolve()
-for up in [_here] + list(_here.parents):
-    cand = up / 'serving_ui' / 'app' / '__init__.py'
-    if cand.exists():
-        base = str((up / 'serving_ui').resolve())
-        if base not in sys.path:
-            sys.path.insert(0, base)
-        break
 PAGE_PROTECTED = False
 auth = login(required=PAGE_PROTECTED)
 if not auth.ok:
@@ -57,12 +20,6 @@ auth = login(required=False)
 if not auth.authenticated:
     st.info('You are in read-only mode.')
 show_logout()
-import sys
-from pathlib import Path
-_HERE = Path(__file__).resolve()
-_SERVING_UI = _HERE.parents[2]
-if str(_SERVING_UI) not in sys.path:
-    sys.path.insert(0, str(_SERVING_UI))
 st.set_page_config(page_title='00 Shortcuts', page_icon='📈', layout='wide')
 from app.lib.compliance_gate import require_eligibility  # compliance gate
 require_eligibility(min_age=18, restricted_states={"WA","ID","NV"})
@@ -107,21 +64,6 @@ bump_usage("page_visit")
 show_nudge(feature="analytics", metric="page_visit", threshold=10, period="1D", demo_unlock=True, location="inline")
 # === /Nudge (auto-injected) ===
 
-try:
-    from app.utils.diagnostics import mount_in_sidebar
-except ModuleNotFoundError:
-    try:
-        import sys
-        from pathlib import Path as _efP
-        sys.path.append(str(_efP(__file__).resolve().parents[3]))
-        from app.utils.diagnostics import mount_in_sidebar
-    except Exception:
-        try:
-            from utils.diagnostics import mount_in_sidebar
-        except Exception:
-
-            def mount_in_sidebar(page_name: str):
-                return None
 import json
 from pathlib import Path
 from urllib.parse import urlparse
@@ -224,11 +166,4 @@ with st.expander('Security notes', expanded=False):
     st.markdown('\n- This page stores **only the shortcut name and HTTPS URL** locally for your account.\n- **No usernames or passwords** are collected or stored here.\n- Clicking a shortcut opens the sportsbook site/app where you log in **directly with them**.\n- For deeper integrations (e.g., auto-login), an **official OAuth/API** from the sportsbook would be required.\n        '.strip())
 show_logout()
 
-
-
-
-
-
-
-
-
+page.rendered()
@@ -2,6 +2,13 @@
 # Backtest — Scores Browser (Archive + Live 2020+)
 
 from __future__ import annotations
+# === Bootstrap (once per process: paths, optional-module shims, timings) ===
+try:
+    from app.bootstrap import boot
+except ModuleNotFoundError:  # page opened directly: only serving_ui/app is on sys.path yet
+    from bootstrap import boot
+page = boot(__file__)
+# === /Bootstrap ===
 
 def _fix_side_labels(df):
     """
@@ -910,4 +917,4 @@ with st.expander("🔎 Unmatched / No scores (debug)"):
 with st.expander("📜 Full Archive (joined rows preview)"):
     st.dataframe(archive.head(100), use_container_width=True)
 
-
+page.rendered()
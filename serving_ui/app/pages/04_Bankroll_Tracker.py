@@ -1,63 +1,15 @@
 from __future__ import annotations
-# === AppImportGuard (nuclear) ===
+# === Bootstrap (once per process: paths, optional-module shims, timings) ===
 try:
-    from app.lib.auth import login, show_logout
-except ModuleNotFoundError:
-    import sys
-    from pathlib import Path
-    here = Path(__file__).resolve()
+    from app.bootstrap import boot
+except ModuleNotFoundError:  # page opened directly: only serving_ui/app is on sys.path yet
+    from bootstrap import boot
+page = boot(__file__)
+from app.bootstrap import login, show_logout
+# === /Bootstrap ===
 
-    base = None
-    auth_path = None
-    for p in [here] + list(here.parents):
-        cand1 = p / "app" / "lib" / "auth.py"
-        cand2 = p / "serving_ui" / "app" / "lib" / "auth.py"
-        if cand1.exists():
-            base, auth_path = p, cand1
-            break
-        if cand2.exists():
-            base, auth_path = (p / "serving_ui"), cand2
-            break
 
-    if base and auth_path:
-        s = str(base)
-        if s not in sys.path:
-            sys.path.insert(0, s)
-        try:
-            from app.lib.auth import login, show_logout  # type: ignore
-        except ModuleNotFoundError:
-            import types, importlib.util
-            if "app" not in sys.modules:
-                pkg_app = types.ModuleType("app")
-                pkg_app.__path__ = [str(Path(base) / "app")]
-                sys.modules["app"] = pkg_app
-            if "app.lib" not in sys.modules:
-                pkg_lib = types.ModuleType("app.lib")
-                pkg_lib.__path__ = [str(Path(base) / "app" / "lib")]
-                sys.modules["app.lib"] = pkg_lib
-            spec = importlib.util.spec_from_file_location("app.lib.auth", str(auth_path))
-            mod = importlib.util.module_from_spec(spec)  # type: ignore[arg-type]
-            assert spec and spec.loader
-            spec.loader.exec_module(mod)  # type: ignore[attr-defined]
-            sys.modules["app.lib.auth"] = mod
-            login = mod.login
-            show_logout = mod.show_logout
-    else:
-        raise
-# === /AppImportGuard ===
-
-
-import sys
-from pathlib import Path
 import streamlit as st
-_here = Path(__file__).resolve()
-for up in [_here] + list(_here.parents):
-    cand = up / 'serving_ui' / 'app' / '__init__.py'
-    if cand.exists():
-        base = str((up / 'serving_ui').resolve())
-        if base not in sys.path:
-            sys.path.insert(0, base)
-        break
 PAGE_PROTECTED = False
 auth = login(required=PAGE_PROTECTED)
 if not auth.ok:
@@ -67,12 +19,6 @@ auth = login(required=False)
 if not auth.authenticated:
     st.info('You are in read-only mode.')
 show_logout()
-import sys
-from pathlib import Path
-_HERE = Path(__file__).resolve()
-_SERVING_UI = _HERE.parents[2]
-if str(_SERVING_UI) not in sys.path:
-    sys.path.insert(0, str(_SERVING_UI))
 st.set_page_config(page_title='04 Bankroll Tracker', page_icon='📈', layout='wide')
 from app.lib.compliance_gate import require_eligibility  # compliance gate
 require_eligibility(min_age=18, restricted_states={"WA","ID","NV"})
@@ -117,21 +63,6 @@ bump_usage("page_visit")
 show_nudge(feature="analytics", metric="page_visit", threshold=10, period="1D", demo_unlock=True, location="inline")
 # === /Nudge (auto-injected) ===
 
-try:
-    from app.utils.diagnostics import mount_in_sidebar
-except ModuleNotFoundError:
-    try:
-        import sys
-        from pathlib import Path as _efP
-        sys.path.append(str(_efP(__file__).resolve().parents[3]))
-        from app.utils.diagnostics import mount_in_sidebar
-    except Exception:
-        try:
-            from utils.diagnostics import mount_in_sidebar
-        except Exception:
-
-            def mount_in_sidebar(page_name: str):
-                return None
 try:
     pass
 except Exception:
@@ -147,37 +78,11 @@ except Exception:
         def __nfp_apply(_):
             return
 __nfp_apply(st)
-import sys, pathlib
-_APP_DIR = pathlib.Path(__file__).resolve().parents[1]
-_PARENT = _APP_DIR.parent
-if str(_PARENT) not in sys.path:
-    sys.path.insert(0, str(_PARENT))
-try:
-    from app.bootstrap import bootstrap_paths
-except ModuleNotFoundError:
-    try:
-        from bootstrap import bootstrap_paths
-    except Exception:
-
-        def bootstrap_paths():
-            return None
-            bootstrap_paths()
-import sys as _sys
-from pathlib import Path as _Path
-try:
-    _ROOT = _Path(__file__).resolve().parents[2]
-    _REPO = _ROOT.parents[1]
-    if str(_REPO) not in _sys.path:
-        _sys.path.insert(0, str(_REPO))
-except Exception:
-    pass
-import sys, math, datetime as dt
+import math, datetime as dt
 from pathlib import Path
 import numpy as np
 import pandas as pd
 ROOT = Path(__file__).resolve().parents[2]
-if str(ROOT) not in sys.path:
-    sys.path.insert(0, str(ROOT))
 EXPORTS = ROOT / 'exports'
 EXPORTS.mkdir(parents=True, exist_ok=True)
 BANKROLL_CSV = EXPORTS / 'bankroll.csv'
@@ -318,10 +223,4 @@ if BETS_LOG.exists():
     show_cols = ['date', 'bankroll', 'daily_change', 'note', 'tag']
     st.dataframe(df[show_cols], hide_index=True, width='stretch')
 
-
-
-
-
-
-
-
+page.rendered()
@@ -1,168 +1,25 @@
 from __future__ import annotations
-# === UltraImportGuard (parlay_ui & parlay_cart) ===
+# === Bootstrap (once per process: paths, optional-module shims, timings) ===
 try:
-    from app.utils.parlay_ui import selectable_odds_table
-    from app.utils.parlay_cart import read_cart, add_to_cart, clear_cart
-except Exception:
-    import sys, types, importlib.util
-    from pathlib import Path
-    here = Path(__file__).resolve()
+    from app.bootstrap import boot
+except ModuleNotFoundError:  # page opened directly: only serving_ui/app is on sys.path yet
+    from bootstrap import boot
+page = boot(__file__)
+from app.bootstrap import (
+    login, show_logout, require_allowed_page, beta_banner, live_enabled, do_expensive_refresh, selectable_odds_table,
+)
+# === /Bootstrap ===
+
 
-    def _find(path_tail: str):
-        for up in (here,) + tuple(here.parents):
-            cand = up / "serving_ui" / "app" / "utils" / path_tail
-            if cand.exists():
-                return up / "serving_ui", cand
-        return None, None
-
-    base_ui, ui_path   = _find("parlay_ui.py")
-    base_ca, cart_path = _find("parlay_cart.py")
-    base = base_ui or base_ca
-    if not base:
-        raise
-
-    if str(base) not in sys.path:
-        sys.path.insert(0, str(base))
-
-    # ensure packages
-    if "app" not in sys.modules:
-        pkg_app = types.ModuleType("app"); pkg_app.__path__ = [str(base / "app")]; sys.modules["app"] = pkg_app
-    if "app.utils" not in sys.modules:
-        pkg_utils = types.ModuleType("app.utils"); pkg_utils.__path__ = [str(base / "app" / "utils")]; sys.modules["app.utils"] = pkg_utils
-
-    # load modules by file and register under canonical names
-    if ui_path:
-        spec = importlib.util.spec_from_file_location("app.utils.parlay_ui", str(ui_path))
-        mod = importlib.util.module_from_spec(spec); assert spec and spec.loader; spec.loader.exec_module(mod)  # type: ignore[attr-defined]
-        sys.modules["app.utils.parlay_ui"] = mod
-        selectable_odds_table = mod.selectable_odds_table
-    if cart_path:
-        spec2 = importlib.util.spec_from_file_location("app.utils.parlay_cart", str(cart_path))
-        mod2 = importlib.util.module_from_spec(spec2); assert spec2 and spec2.loader; spec2.loader.exec_module(mod2)  # type: ignore[attr-defined]
-        sys.modules["app.utils.parlay_cart"] = mod2
-        read_cart      = getattr(mod2, "read_cart")
-        add_to_cart    = getattr(mod2, "add_to_cart")
-        clear_cart     = getattr(mod2, "clear_cart")
-# === /UltraImportGuard ===
-
-# === AccessImportGuard ===
-try:
-    from app.lib.access import require_allowed_page, beta_banner, live_enabled  # type: ignore
-except ModuleNotFoundError:
-    import sys
-    from pathlib import Path
-    _here = Path(__file__).resolve()
-    for up in (_here,) + tuple(_here.parents):
-        cand = up / "serving_ui" / "app" / "lib" / "access.py"
-        if cand.exists():
-            base = str((up / "serving_ui").resolve())
-            if base not in sys.path:
-                sys.path.insert(0, base)
-            break
-    try:
-        from app.lib.access import require_allowed_page, beta_banner, live_enabled  # type: ignore
-    except Exception:
-        def live_enabled() -> bool: return False
-        def require_allowed_page(_page_path: str) -> None: return None
-        def beta_banner() -> None:
-            try:
-                import streamlit as st
-                st.caption("🧪 Beta mode — access module missing; using shim.")
-            except Exception:
-                pass
-# === /AccessImportGuard ===
 
-# === UltraImportGuard (parlay_ui) — registers app.utils.parlay_ui even if packages not set ===
-try:
-    from app.utils.parlay_ui import selectable_odds_table  # normal path
-except Exception:
-    import sys, types, importlib.util
-    from pathlib import Path
-    here = Path(__file__).resolve()
-    base = path = None
-    for up in (here,) + tuple(here.parents):
-        cand = up / "serving_ui" / "app" / "utils" / "parlay_ui.py"
-        if cand.exists():
-            base, path = up / "serving_ui", cand
-            break
-    if not base or not path:
-        raise
-    if str(base) not in sys.path:
-        sys.path.insert(0, str(base))
-    if "app" not in sys.modules:
-        pkg_app = types.ModuleType("app")
-        pkg_app.__path__ = [str(base / "app")]
-        sys.modules["app"] = pkg_app
-    if "app.utils" not in sys.modules:
-        pkg_utils = types.ModuleType("app.utils")
-        pkg_utils.__path__ = [str(base / "app" / "utils")]
-        sys.modules["app.utils"] = pkg_utils
-    spec = importlib.util.spec_from_file_location("app.utils.parlay_ui", str(path))
-    mod = importlib.util.module_from_spec(spec)  # type: ignore[arg-type]
-    assert spec and spec.loader
-    spec.loader.exec_module(mod)  # type: ignore[attr-defined]
-    sys.modules["app.utils.parlay_ui"] = mod
-    selectable_odds_table = mod.selectable_odds_table
-# === /UltraImportGuard ===
-
-# === AppImportGuard (auth) ===
-try:
-    from app.lib.auth import login, show_logout
-except ModuleNotFoundError:
-    import sys, types, importlib.util
-    from pathlib import Path
-    here = Path(__file__).resolve()
-    base = auth_path = None
-    for p in (here,) + tuple(here.parents):
-        c1 = p / "serving_ui" / "app" / "lib" / "auth.py"
-        if c1.exists():
-            base, auth_path = p / "serving_ui", c1
-            break
-        c2 = p / "app" / "lib" / "auth.py"
-        if c2.exists():
-            base, auth_path = p, c2
-            break
-    if not base or not auth_path:
-        raise
-    if str(base) not in sys.path:
-        sys.path.insert(0, str(base))
-    try:
-        from app.lib.auth import login, show_logout  # type: ignore
-    except ModuleNotFoundError:
-        if "app" not in sys.modules:
-            pkg_app = types.ModuleType("app")
-            pkg_app.__path__ = [str(base / "app")]
-            sys.modules["app"] = pkg_app
-        if "app.lib" not in sys.modules:
-            pkg_lib = types.ModuleType("app.lib")
-            pkg_lib.__path__ = [str(base / "app" / "lib")]
-            sys.modules["app.lib"] = pkg_lib
-        spec = importlib.util.spec_from_file_location("app.lib.auth", str(auth_path))
-        mod = importlib.util.module_from_spec(spec)  # type: ignore[arg-type]
-        assert spec and spec.loader
-        spec.loader.exec_module(mod)  # type: ignore[attr-defined]
-        sys.modules["app.lib.auth"] = mod
-        login, show_logout = mod.login, mod.show_logout
-# === /AppImportGuard ===
-
-# === Path bootstrap & refresh shim ===
-import sys
-from pathlib import Path
-_HERE = Path(__file__).resolve()
-_SERVING_UI = _HERE.parents[2]
-if str(_SERVING_UI) not in sys.path:
-    sys.path.insert(0, str(_SERVING_UI))
 
+# === Live refresh ===
 try:
     if live_enabled():
-        try:
-            from app.lib.access import do_expensive_refresh  # optional
-        except Exception:
-            def do_expensive_refresh(): return None
         do_expensive_refresh()
 except Exception:
     pass
-# === /Path bootstrap & refresh shim ===
+# === /Live refresh ===
 
 import streamlit as st
 st.set_page_config(page_title='Parlay Builder', page_icon='🧱', layout='wide')
@@ -214,9 +71,9 @@ show_nudge(feature="analytics", metric="page_visit", threshold=10, period="1D",
 require_allowed_page('pages/05_Parlay_Builder.py')
 beta_banner()
 
-import os, time, math
+import os, time
 from pathlib import Path
-from typing import List, Optional, Dict
+from typing import List, Optional
 import numpy as np
 import pandas as pd
 
@@ -484,7 +341,6 @@ except Exception:
     pass
 
 import pandas as pd
-from app.utils.parlay_cart import read_cart, clear_cart
 with st.expander('🧺 Your Cart (staged picks)', expanded=True):
     _cart = read_cart()
     st.caption(f'{len(_cart):,} item(s) in cart')
@@ -509,5 +365,4 @@ try:
 except Exception:
     pass
 
-
-
+page.rendered()
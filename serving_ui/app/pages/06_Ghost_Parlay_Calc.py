@@ -1,89 +1,15 @@
 from __future__ import annotations
-# === AccessImportGuard ===
+# === Bootstrap (once per process: paths, optional-module shims, timings) ===
 try:
-    from app.lib.access import require_allowed_page, beta_banner, live_enabled  # type: ignore
-except ModuleNotFoundError:
-    import sys
-    from pathlib import Path
-    _here = Path(__file__).resolve()
-    for up in (_here,) + tuple(_here.parents):
-        cand = up / "serving_ui" / "app" / "lib" / "access.py"
-        if cand.exists():
-            base = str((up / "serving_ui").resolve())
-            if base not in sys.path:
-                sys.path.insert(0, base)
-            break
-    try:
-        from app.lib.access import require_allowed_page, beta_banner, live_enabled  # type: ignore
-    except Exception:
-        def live_enabled() -> bool: return False
-        def require_allowed_page(_page_path: str) -> None: return None
-        def beta_banner() -> None:
-            try:
-                import streamlit as st
-                st.caption("🧪 Beta mode — access module missing; using shim.")
-            except Exception:
-                pass
-# === /AccessImportGuard ===
-# === AppImportGuard (nuclear) ===
-try:
-    from app.lib.auth import login, show_logout
-except ModuleNotFoundError:
-    import sys
-    from pathlib import Path
-    here = Path(__file__).resolve()
+    from app.bootstrap import boot
+except ModuleNotFoundError:  # page opened directly: only serving_ui/app is on sys.path yet
+    from bootstrap import boot
+page = boot(__file__)
+from app.bootstrap import login, show_logout, live_enabled, do_expensive_refresh
+# === /Bootstrap ===
 
-    base = None
-    auth_path = None
-    for p in [here] + list(here.parents):
-        cand1 = p / "app" / "lib" / "auth.py"
-        cand2 = p / "serving_ui" / "app" / "lib" / "auth.py"
-        if cand1.exists():
-            base, auth_path = p, cand1
-            break
-        if cand2.exists():
-            base, auth_path = (p / "serving_ui"), cand2
-            break
 
-    if base and auth_path:
-        s = str(base)
-        if s not in sys.path:
-            sys.path.insert(0, s)
-        try:
-            from app.lib.auth import login, show_logout  # type: ignore
-        except ModuleNotFoundError:
-            import types, importlib.util
-            if "app" not in sys.modules:
-                pkg_app = types.ModuleType("app")
-                pkg_app.__path__ = [str(Path(base) / "app")]
-                sys.modules["app"] = pkg_app
-            if "app.lib" not in sys.modules:
-                pkg_lib = types.ModuleType("app.lib")
-                pkg_lib.__path__ = [str(Path(base) / "app" / "lib")]
-                sys.modules["app.lib"] = pkg_lib
-            spec = importlib.util.spec_from_file_location("app.lib.auth", str(auth_path))
-            mod = importlib.util.module_from_spec(spec)  # type: ignore[arg-type]
-            assert spec and spec.loader
-            spec.loader.exec_module(mod)  # type: ignore[attr-defined]
-            sys.modules["app.lib.auth"] = mod
-            login = mod.login
-            show_logout = mod.show_logout
-    else:
-        raise
-# === /AppImportGuard ===
-
-
-import sys
-from pathlib import Path
 import streamlit as st
-_here = Path(__file__).resolve()
-for up in [_here] + list(_here.parents):
-    cand = up / 'serving_ui' / 'app' / '__init__.py'
-    if cand.exists():
-        base = str((up / 'serving_ui').resolve())
-        if base not in sys.path:
-            sys.path.insert(0, base)
-        break
 PAGE_PROTECTED = False
 auth = login(required=PAGE_PROTECTED)
 if not auth.ok:
@@ -93,12 +19,7 @@ auth = login(required=False)
 if not auth.authenticated:
     st.info('You are in read-only mode.')
 show_logout()
-import sys
 from pathlib import Path
-_HERE = Path(__file__).resolve()
-_SERVING_UI = _HERE.parents[2]
-if str(_SERVING_UI) not in sys.path:
-    sys.path.insert(0, str(_SERVING_UI))
 if live_enabled():
     do_expensive_refresh()
 else:
@@ -374,11 +295,4 @@ if st.button('Generate Ghost Parlays', type='secondary'):
 else:
     st.info('Set filters and click **Generate Ghost Parlays**.')
 
-
-
-
-
-
-
-
-
+page.rendered()
@@ -1,169 +1,28 @@
 from __future__ import annotations
-# === UltraImportGuard (parlay_ui & parlay_cart) ===
+# === Bootstrap (once per process: paths, optional-module shims, timings) ===
 try:
-    from app.utils.parlay_ui import selectable_odds_table
-    from app.utils.parlay_cart import read_cart, add_to_cart, clear_cart
-except Exception:
-    import sys, types, importlib.util
-    from pathlib import Path
-    here = Path(__file__).resolve()
-
-    def _find(path_tail: str):
-        for up in (here,) + tuple(here.parents):
-            cand = up / "serving_ui" / "app" / "utils" / path_tail
-            if cand.exists():
-                return up / "serving_ui", cand
-        return None, None
-
-    base_ui, ui_path   = _find("parlay_ui.py")
-    base_ca, cart_path = _find("parlay_cart.py")
-    base = base_ui or base_ca
-    if not base:
-        raise
-
-    if str(base) not in sys.path:
-        sys.path.insert(0, str(base))
-
-    # ensure packages
-    if "app" not in sys.modules:
-        pkg_app = types.ModuleType("app"); pkg_app.__path__ = [str(base / "app")]; sys.modules["app"] = pkg_app
-    if "app.utils" not in sys.modules:
-        pkg_utils = types.ModuleType("app.utils"); pkg_utils.__path__ = [str(base / "app" / "utils")]; sys.modules["app.utils"] = pkg_utils
-
-    # load modules by file and register under canonical names
-    if ui_path:
-        spec = importlib.util.spec_from_file_location("app.utils.parlay_ui", str(ui_path))
-        mod = importlib.util.module_from_spec(spec); assert spec and spec.loader; spec.loader.exec_module(mod)  # type: ignore[attr-defined]
-        sys.modules["app.utils.parlay_ui"] = mod
-        selectable_odds_table = mod.selectable_odds_table
-    if cart_path:
-        spec2 = importlib.util.spec_from_file_location("app.utils.parlay_cart", str(cart_path))
-        mod2 = importlib.util.module_from_spec(spec2); assert spec2 and spec2.loader; spec2.loader.exec_module(mod2)  # type: ignore[attr-defined]
-        sys.modules["app.utils.parlay_cart"] = mod2
-        read_cart      = getattr(mod2, "read_cart")
-        add_to_cart    = getattr(mod2, "add_to_cart")
-        clear_cart     = getattr(mod2, "clear_cart")
-# === /UltraImportGuard ===
-
-# === AccessImportGuard ===
-try:
-    from app.lib.access import require_allowed_page, beta_banner, live_enabled  # type: ignore
-except ModuleNotFoundError:
-    import sys
-    from pathlib import Path
-    _here = Path(__file__).resolve()
-    for up in (_here,) + tuple(_here.parents):
-        cand = up / "serving_ui" / "app" / "lib" / "access.py"
-        if cand.exists():
-            base = str((up / "serving_ui").resolve())
-            if base not in sys.path:
-                sys.path.insert(0, base)
-            break
-    try:
-        from app.lib.access import require_allowed_page, beta_banner, live_enabled  # type: ignore
-    except Exception:
-        def live_enabled() -> bool: return False
-        def require_allowed_page(_page_path: str) -> None: return None
-        def beta_banner() -> None:
-            try:
-                import streamlit as st
-                st.caption("🧪 Beta mode — access module missing; using shim.")
-            except Exception:
-                pass
-# === /AccessImportGuard ===
-
-# === UltraImportGuard (parlay_ui) ===
-try:
-    from app.utils.parlay_ui import selectable_odds_table
-except Exception:
-    import sys, types, importlib.util
-    from pathlib import Path
-    here = Path(__file__).resolve()
-    base = path = None
-    for up in (here,) + tuple(here.parents):
-        cand = up / "serving_ui" / "app" / "utils" / "parlay_ui.py"
-        if cand.exists():
-            base, path = up / "serving_ui", cand
-            break
-    if not base or not path:
-        raise
-    if str(base) not in sys.path:
-        sys.path.insert(0, str(base))
-    if "app" not in sys.modules:
-        pkg_app = types.ModuleType("app")
-        pkg_app.__path__ = [str(base / "app")]
-        sys.modules["app"] = pkg_app
-    if "app.utils" not in sys.modules:
-        pkg_utils = types.ModuleType("app.utils")
-        pkg_utils.__path__ = [str(base / "app" / "utils")]
-        sys.modules["app.utils"] = pkg_utils
-    spec = importlib.util.spec_from_file_location("app.utils.parlay_ui", str(path))
-    mod = importlib.util.module_from_spec(spec)  # type: ignore[arg-type]
-    assert spec and spec.loader
-    spec.loader.exec_module(mod)  # type: ignore[attr-defined]
-    sys.modules["app.utils.parlay_ui"] = mod
-    selectable_odds_table = mod.selectable_odds_table
-# === /UltraImportGuard ===
-
-# === AppImportGuard (auth) ===
-try:
-    from app.lib.auth import login, show_logout
-except ModuleNotFoundError:
-    import sys, types, importlib.util
-    from pathlib import Path
-    here = Path(__file__).resolve()
-    base = auth_path = None
-    for p in (here,) + tuple(here.parents):
-        c1 = p / "serving_ui" / "app" / "lib" / "auth.py"
-        if c1.exists():
-            base, auth_path = p / "serving_ui", c1
-            break
-        c2 = p / "app" / "lib" / "auth.py"
-        if c2.exists():
-            base, auth_path = p, c2
-            break
-    if not base or not auth_path:
-        raise
-    if str(base) not in sys.path:
-        sys.path.insert(0, str(base))
-    try:
-        from app.lib.auth import login, show_logout  # type: ignore
-    except ModuleNotFoundError:
-        if "app" not in sys.modules:
-            pkg_app = types.ModuleType("app")
-            pkg_app.__path__ = [str(base / "app")]
-            sys.modules["app"] = pkg_app
-        if "app.lib" not in sys.modules:
-            pkg_lib = types.ModuleType("app.lib")
-            pkg_lib.__path__ = [str(base / "app" / "lib")]
-            sys.modules["app.lib"] = pkg_lib
-        spec = importlib.util.spec_from_file_location("app.lib.auth", str(auth_path))
-        mod = importlib.util.module_from_spec(spec)  # type: ignore[arg-type]
-        assert spec and spec.loader
-        spec.loader.exec_module(mod)  # type: ignore[attr-defined]
-        sys.modules["app.lib.auth"] = mod
-        login, show_logout = mod.login, mod.show_logout
-# === /AppImportGuard ===
-
-# === Path bootstrap & refresh shim ===
-import sys
-from pathlib import Path
-_HERE = Path(__file__).resolve()
-_SERVING_UI = _HERE.parents[2]
-if str(_SERVING_UI) not in sys.path:
-    sys.path.insert(0, str(_SERVING_UI))
+    from app.bootstrap import boot
+except ModuleNotFoundError:  # page opened directly: only serving_ui/app is on sys.path yet
+    from bootstrap import boot
+page = boot(__file__)
+from app.bootstrap import (
+    login, show_logout, require_allowed_page, beta_banner, live_enabled, do_expensive_refresh, selectable_odds_table,
+)
+# === /Bootstrap ===
+
+
+
+
+# === Live refresh ===
 try:
     if live_enabled():
-        try:
-            from app.lib.access import do_expensive_refresh
-        except Exception:
-            def do_expensive_refresh(): return None
         do_expensive_refresh()
 except Exception:
     pass
-# === /Path bootstrap & refresh shim ===
+# === /Live refresh ===
 
 import streamlit as st
+from app.lib.paged_table import download_csv, filter_index, paged_dataframe
 st.set_page_config(page_title='Parlay Scored Explorer', page_icon='📊', layout='wide')
 from app.lib.compliance_gate import require_eligibility  # compliance gate
 require_eligibility(min_age=18, restricted_states={"WA","ID","NV"})
@@ -236,29 +95,41 @@ st.title('Parlay Scored Explorer')
 def _repo_root() -> Path:
     return Path(__file__).resolve().parents[3]
 
+@st.cache_data(ttl=60)
 def load_edges_or_scores():
+    """(frame, source path, stamp of the source taken before the read: the filter_index token)."""
     repo = _repo_root()
     scores = repo / 'exports' / 'parlay_scores.csv'
     edges  = repo / 'exports' / 'edges.csv'
     if scores.exists() and scores.stat().st_size > 0:
-        return (pd.read_csv(scores), str(scores))
-    if edges.exists() and edges.stat().st_size > 0:
-        return (pd.read_csv(edges), str(edges))
-    return (pd.DataFrame(), str(edges))
-
-df, src_path = load_edges_or_scores()
+        stamp = _stamp(scores)
+        df, src = pd.read_csv(scores), str(scores)
+    elif edges.exists() and edges.stat().st_size > 0:
+        stamp = _stamp(edges)
+        df, src = pd.read_csv(edges), str(edges)
+    else:
+        return (pd.DataFrame(), str(edges), 0)
+    for c in ('season', 'week'):
+        if c in df.columns:
+            df[c] = pd.to_numeric(df[c], errors='coerce').astype('Int64')
+    return (df, src, stamp)
+
+def _stamp(p) -> int:
+    try: return Path(p).stat().st_mtime_ns
+    except Exception: return 0
+
+df, src_path, src_stamp = load_edges_or_scores()
 st.write(f'**Source:** `{src_path}` • **Rows:** {len(df):,}')
 has_score = 'parlay_proba' in df.columns
 if not has_score:
     st.warning('No `parlay_proba` found. Did you run `predict_parlay_score.py`? Showing base edges instead.', icon='⚠️')
 
-def _num_unique(df, col):
-    if col not in df.columns: return []
-    s = pd.to_numeric(df[col], errors='coerce').dropna().astype(int)
-    return sorted(s.unique().tolist())
+# filters run server-side on a cached index; only the visible page goes to the browser
+idx = filter_index(df, token=(src_path, src_stamp), key='07_parlay_scored',
+                   categorical=['season', 'week'], numeric=['parlay_proba'])
 
-seasons_all = _num_unique(df, 'season')
-weeks_all   = _num_unique(df, 'week')
+seasons_all = [int(v) for v in idx.options('season')]
+weeks_all   = [int(v) for v in idx.options('week')]
 
 left, right = st.columns(2)
 with left:
@@ -268,37 +139,37 @@ with right:
     week_options = ['All'] + [str(w) for w in weeks_all or list(range(1, 23))]
     week_sel = st.multiselect('Week', week_options, default=['All'])
 
-work = df.copy()
+equals = {}
 if 'All' not in season_sel and seasons_all:
-    keep = {int(x) for x in season_sel if str(x).isdigit()}
-    work = work[work['season'].astype('Int64').isin(keep)]
+    equals['season'] = [int(x) for x in season_sel if str(x).isdigit()] or [None]   # nothing picked -> no rows
 if 'All' not in week_sel:
-    keep = {int(x) for x in week_sel if str(x).isdigit()}
-    if 'week' in work.columns:
-        work = work[work['week'].astype('Int64').isin(keep)]
+    equals['week'] = [int(x) for x in week_sel if str(x).isdigit()] or [None]
 
+ranges = {}
 if has_score:
     thr = st.slider('Min parlay probability', 0.0, 1.0, 0.7, 0.01)
-    work = work[work['parlay_proba'].fillna(0) >= thr]
-    st.caption(f'{len(work):,} rows ≥ {thr:.2f}')
+    if thr > 0:   # a missing probability counts as 0
+        ranges['parlay_proba'] = (thr, np.inf)
+mask = idx.mask(equals=equals, ranges=ranges)
+if has_score:
+    st.caption(f'{int(mask.sum()):,} rows ≥ {thr:.2f}')
 
-pref_cols = [c for c in ['ts', 'season', 'week', 'sport', 'league', 'market', 'side', 'line', 'odds', 'p_win', 'ev', 'parlay_proba', 'dec_comb', 'legs', 'parlay_stake', 'team_name', 'home', 'away', 'game_id'] if c in work.columns]
-with st.expander('Preview (top 2,500 rows)', expanded=True):
-    st.dataframe((work[pref_cols] if pref_cols else work).head(2500), width='stretch')
+pref_cols = [c for c in ['ts', 'season', 'week', 'sport', 'league', 'market', 'side', 'line', 'odds', 'p_win', 'ev', 'parlay_proba', 'dec_comb', 'legs', 'parlay_stake', 'team_name', 'home', 'away', 'game_id'] if c in df.columns]
+with st.expander('Preview', expanded=True):
+    work = paged_dataframe(idx, mask, key='07_parlay_scored', columns=pref_cols or None, width='stretch')
 
-st.download_button('Download filtered as CSV', data=work.to_csv(index=False).encode('utf-8'), file_name='parlay_scored_filtered.csv', mime='text/csv')
+download_csv(idx, mask, key='07_parlay_scored', file_name='parlay_scored_filtered.csv')
 
 if has_score:
-    arr = pd.to_numeric(work.get('parlay_proba'), errors='coerce').dropna().to_numpy()
+    arr = idx.numeric('parlay_proba')[mask]
+    arr = arr[np.isfinite(arr)]
     if arr.size:
         qs = np.quantile(arr, [0, 0.25, 0.5, 0.75, 0.9, 0.95, 0.99, 1.0])
         st.write('**Parlay probability quantiles:**', {k: round(float(v), 3) for k, v in zip(['min','25%','50%','75%','90%','95%','99%','max'], qs)})
 
 try:
-    if 'work' in globals() and isinstance(work, pd.DataFrame):
-        selectable_odds_table(work, page_key='parlay_scored', page_name='07_Parlay_Scored_Explorer')
+    selectable_odds_table(work, page_key='parlay_scored', page_name='07_Parlay_Scored_Explorer')
 except Exception:
     pass
 
-
-
+page.rendered()
@@ -1,169 +1,28 @@
 from __future__ import annotations
-# === UltraImportGuard (parlay_ui & parlay_cart) ===
+# === Bootstrap (once per process: paths, optional-module shims, timings) ===
 try:
-    from app.utils.parlay_ui import selectable_odds_table
-    from app.utils.parlay_cart import read_cart, add_to_cart, clear_cart
-except Exception:
-    import sys, types, importlib.util
-    from pathlib import Path
-    here = Path(__file__).resolve()
+    from app.bootstrap import boot
+except ModuleNotFoundError:  # page opened directly: only serving_ui/app is on sys.path yet
+    from bootstrap import boot
+page = boot(__file__)
+from app.bootstrap import (
+    require_allowed_page, beta_banner, live_enabled, do_expensive_refresh, selectable_odds_table,
+)
+# === /Bootstrap ===
 
-    def _find(path_tail: str):
-        for up in (here,) + tuple(here.parents):
-            cand = up / "serving_ui" / "app" / "utils" / path_tail
-            if cand.exists():
-                return up / "serving_ui", cand
-        return None, None
-
-    base_ui, ui_path   = _find("parlay_ui.py")
-    base_ca, cart_path = _find("parlay_cart.py")
-    base = base_ui or base_ca
-    if not base:
-        raise
-
-    if str(base) not in sys.path:
-        sys.path.insert(0, str(base))
-
-    # ensure packages
-    if "app" not in sys.modules:
-        pkg_app = types.ModuleType("app"); pkg_app.__path__ = [str(base / "app")]; sys.modules["app"] = pkg_app
-    if "app.utils" not in sys.modules:
-        pkg_utils = types.ModuleType("app.utils"); pkg_utils.__path__ = [str(base / "app" / "utils")]; sys.modules["app.utils"] = pkg_utils
-
-    # load modules by file and register under canonical names
-    if ui_path:
-        spec = importlib.util.spec_from_file_location("app.utils.parlay_ui", str(ui_path))
-        mod = importlib.util.module_from_spec(spec); assert spec and spec.loader; spec.loader.exec_module(mod)  # type: ignore[attr-defined]
-        sys.modules["app.utils.parlay_ui"] = mod
-        selectable_odds_table = mod.selectable_odds_table
-    if cart_path:
-        spec2 = importlib.util.spec_from_file_location("app.utils.parlay_cart", str(cart_path))
-        mod2 = importlib.util.module_from_spec(spec2); assert spec2 and spec2.loader; spec2.loader.exec_module(mod2)  # type: ignore[attr-defined]
-        sys.modules["app.utils.parlay_cart"] = mod2
-        read_cart      = getattr(mod2, "read_cart")
-        add_to_cart    = getattr(mod2, "add_to_cart")
-        clear_cart     = getattr(mod2, "clear_cart")
-# === /UltraImportGuard ===
-
-# === AccessImportGuard ===
-try:
-    from app.lib.access import require_allowed_page, beta_banner, live_enabled  # type: ignore
-except ModuleNotFoundError:
-    import sys
-    from pathlib import Path
-    _here = Path(__file__).resolve()
-    for up in (_here,) + tuple(_here.parents):
-        cand = up / "serving_ui" / "app" / "lib" / "access.py"
-        if cand.exists():
-            base = str((up / "serving_ui").resolve())
-            if base not in sys.path:
-                sys.path.insert(0, base)
-            break
-    try:
-        from app.lib.access import require_allowed_page, beta_banner, live_enabled  # type: ignore
-    except Exception:
-        def live_enabled() -> bool: return False
-        def require_allowed_page(_page_path: str) -> None: return None
-        def beta_banner() -> None:
-            try:
-                import streamlit as st
-                st.caption("🧪 Beta mode — access module missing; using shim.")
-            except Exception:
-                pass
-# === /AccessImportGuard ===
-
-# === UltraImportGuard (parlay_ui) ===
-try:
-    from app.utils.parlay_ui import selectable_odds_table
-except Exception:
-    import sys, types, importlib.util
-    from pathlib import Path
-    here = Path(__file__).resolve()
-    base = path = None
-    for up in (here,) + tuple(here.parents):
-        cand = up / "serving_ui" / "app" / "utils" / "parlay_ui.py"
-        if cand.exists():
-            base, path = up / "serving_ui", cand
-            break
-    if not base or not path:
-        raise
-    if str(base) not in sys.path:
-        sys.path.insert(0, str(base))
-    if "app" not in sys.modules:
-        pkg_app = types.ModuleType("app")
-        pkg_app.__path__ = [str(base / "app")]
-        sys.modules["app"] = pkg_app
-    if "app.utils" not in sys.modules:
-        pkg_utils = types.ModuleType("app.utils")
-        pkg_utils.__path__ = [str(base / "app" / "utils")]
-        sys.modules["app.utils"] = pkg_utils
-    spec = importlib.util.spec_from_file_location("app.utils.parlay_ui", str(path))
-    mod = importlib.util.module_from_spec(spec)  # type: ignore[arg-type]
-    assert spec and spec.loader
-    spec.loader.exec_module(mod)  # type: ignore[attr-defined]
-    sys.modules["app.utils.parlay_ui"] = mod
-    selectable_odds_table = mod.selectable_odds_table
-# === /UltraImportGuard ===
-
-# === AppImportGuard (auth) ===
-try:
-    from app.lib.auth import login, show_logout
-except ModuleNotFoundError:
-    import sys, types, importlib.util
-    from pathlib import Path
-    here = Path(__file__).resolve()
-    base = auth_path = None
-    for p in (here,) + tuple(here.parents):
-        c1 = p / "serving_ui" / "app" / "lib" / "auth.py"
-        if c1.exists():
-            base, auth_path = p / "serving_ui", c1
-            break
-        c2 = p / "app" / "lib" / "auth.py"
-        if c2.exists():
-            base, auth_path = p, c2
-            break
-    if not base or not auth_path:
-        raise
-    if str(base) not in sys.path:
-        sys.path.insert(0, str(base))
-    try:
-        from app.lib.auth import login, show_logout  # type: ignore
-    except ModuleNotFoundError:
-        if "app" not in sys.modules:
-            pkg_app = types.ModuleType("app")
-            pkg_app.__path__ = [str(base / "app")]
-            sys.modules["app"] = pkg_app
-        if "app.lib" not in sys.modules:
-            pkg_lib = types.ModuleType("app.lib")
-            pkg_lib.__path__ = [str(base / "app" / "lib")]
-            sys.modules["app.lib"] = pkg_lib
-        spec = importlib.util.spec_from_file_location("app.lib.auth", str(auth_path))
-        mod = importlib.util.module_from_spec(spec)  # type: ignore[arg-type]
-        assert spec and spec.loader
-        spec.loader.exec_module(mod)  # type: ignore[attr-defined]
-        sys.modules["app.lib.auth"] = mod
-        login, show_logout = mod.login, mod.show_logout
-# === /AppImportGuard ===
-
-# === Path bootstrap & refresh shim ===
-import sys
-from pathlib import Path
-_HERE = Path(__file__).resolve()
-_SERVING_UI = _HERE.parents[2]
-if str(_SERVING_UI) not in sys.path:
-    sys.path.insert(0, str(_SERVING_UI))
+
+
+
+# === Live refresh ===
 try:
     if live_enabled():
-        try:
-            from app.lib.access import do_expensive_refresh
-        except Exception:
-            def do_expensive_refresh(): return None
         do_expensive_refresh()
 except Exception:
     pass
-# === /Path bootstrap & refresh shim ===
+# === /Live refresh ===
 
 import streamlit as st
+from app.lib.paged_table import filter_index, paged_dataframe
 st.set_page_config(page_title='09 All Picks Explorer', page_icon='📈', layout='wide')
 from app.lib.compliance_gate import require_eligibility  # compliance gate
 require_eligibility(min_age=18, restricted_states={"WA","ID","NV"})
@@ -322,64 +181,86 @@ def _latest_csv(paths: list[Path]) -> Optional[Path]:
     return max(paths, key=lambda p: p.stat().st_mtime)
 
 @st.cache_data(ttl=60)
-def load_live() -> tuple[pd.DataFrame, Path]:
+def load_live() -> tuple[pd.DataFrame, Path, int]:
     exp = _exports_dir()
     cand = [exp / 'lines_live.csv', exp / 'lines_live_latest.csv']
     p = _latest_csv(cand) or cand[0]
+    stamp = _stamp(p)   # before the read, so a filter_index token built from it names this frame
     df = pd.read_csv(p, low_memory=False, encoding='utf-8-sig') if p.exists() else pd.DataFrame()
-    return (df, p)
+    return (df, p, stamp)
 
 @st.cache_data(ttl=60)
-def load_edges() -> tuple[pd.DataFrame, Path]:
+def load_edges() -> tuple[pd.DataFrame, Path, int]:
     exp = _exports_dir()
     names = ['edges_standardized.csv', 'edges_graded_full_normalized_std.csv', 'edges_graded_full.csv', 'edges_normalized.csv', 'edges_master.csv']
     paths = [exp / n for n in names]
     p = _latest_csv(paths) or paths[0]
+    stamp = _stamp(p)   # before the read, so a filter_index token built from it names this frame
     df = pd.read_csv(p, low_memory=False, encoding='utf-8-sig') if p.exists() else pd.DataFrame()
-    return (df, p)
+    return (df, p, stamp)
+
+def _stamp(p: Path) -> int:
+    try:
+        return Path(p).stat().st_mtime_ns
+    except Exception:
+        return 0
+
+@st.cache_data(ttl=60)
+def prepare() -> tuple[pd.DataFrame, pd.DataFrame, tuple[int, int]]:
+    """
+    (edges, this week's latest live snapshot, stamps of the live / edges files they were read from)
+    with dates, nicks and markets normalized.
+    """
+    live, _, lstamp = load_live()
+    edges, _, estamp = load_edges()
+    edges = _ensure_date_iso(edges, ['_date_iso', 'date', 'game_date', '_key_date', 'Date'])
+    live  = _ensure_date_iso(live,  ['_date_iso', 'event_date', 'commence_time', 'date', 'game_date', 'Date'])
+    edges = _ensure_nicks(edges)
+    live  = _ensure_nicks(live)
+    edges['_market_norm'] = edges.get('_market_norm', edges.get('market', pd.Series(index=edges.index))).map(_norm_market)
+    live ['_market_norm'] = live .get('_market_norm', live .get('market',  pd.Series(index=live .index))).map(_norm_market)
+    return edges, within_next_week(latest_batch(live)), (lstamp, estamp)
 
 diag = mount_in_sidebar('09_All_Picks_Explorer')
 st.title('All Picks — Explorer')
 refresh_button(key='refresh_09_all_picks')
 
-live,  live_path  = load_live()
-edges, edges_path = load_edges()
+live,  live_path,  _ = load_live()
+edges, edges_path, _ = load_edges()
 st.caption(f'Live lines: `{live_path}` · rows={len(live):,} · age={_age_str(live_path)}')
 st.caption(f'Edges: `{edges_path}` · rows={len(edges):,}')
 
-edges = _ensure_date_iso(edges, ['_date_iso', 'date', 'game_date', '_key_date', 'Date'])
-live  = _ensure_date_iso(live,  ['_date_iso', 'event_date', 'commence_time', 'date', 'game_date', 'Date'])
-edges = _ensure_nicks(edges)
-live  = _ensure_nicks(live)
-edges['_market_norm'] = edges.get('_market_norm', edges.get('market', pd.Series(index=edges.index))).map(_norm_market)
-live ['_market_norm'] = live .get('_market_norm', live .get('market',  pd.Series(index=live .index))).map(_norm_market)
-
-snap_live = within_next_week(latest_batch(live))
+# filters run server-side on cached indexes; only the visible page goes to the browser
+# tokens are the stamps the cached frames were read under, not the files' current ones
+edges, snap_live, (lstamp, estamp) = prepare()
+today_iso = pd.Timestamp.now(tz=TZ).strftime('%Y-%m-%d')   # the week window moves with the day
+filter_cols = dict(categorical=['book', '_market_norm'], text=['_home_nick', '_away_nick'])
+idx_live  = filter_index(snap_live, token=(str(live_path), lstamp, today_iso), key='09_all_picks_live', **filter_cols)
+idx_edges = filter_index(edges, token=(str(edges_path), estamp), key='09_all_picks_edges', **filter_cols)
 
 st.sidebar.header('Filters')
-books = st.sidebar.multiselect('Books', sorted(snap_live.get('book', pd.Series(dtype='string')).dropna().unique()))
-mkts  = st.sidebar.multiselect('Markets', sorted(snap_live.get('_market_norm', pd.Series(dtype='string')).dropna().unique()), default=['H2H', 'SPREADS', 'TOTALS'])
+books = st.sidebar.multiselect('Books', idx_live.options('book'))
+mkts  = st.sidebar.multiselect('Markets', idx_live.options('_market_norm'), default=['H2H', 'SPREADS', 'TOTALS'])
 teams = st.sidebar.text_input('Team contains (nick)', '').strip().upper()
 
-q = snap_live.copy()
-if books: q = q[q.get('book', pd.Series(index=q.index)).isin(books)]
-if mkts:  q = q[q.get('_market_norm', pd.Series(index=q.index)).isin(mkts)]
-if teams: q = q[q['_home_nick'].str.contains(teams, na=False) | q['_away_nick'].str.contains(teams, na=False)]
+filters = dict(equals={'book': books, '_market_norm': mkts}, contains={('_home_nick', '_away_nick'): teams})
+q_mask  = idx_live.mask(**filters)
+e_mask  = idx_edges.mask(**filters)
 
-cols    = [c for c in ['_date_iso','_home_nick','_away_nick','_market_norm','side','line','price','decimal','book'] if c in q.columns]
-sort_by = [c for c in ['_date_iso','_home_nick','book','_market_norm','side'] if c in q.columns]
+cols    = [c for c in ['_date_iso','_home_nick','_away_nick','_market_norm','side','line','price','decimal','book'] if c in snap_live.columns]
+sort_by = [c for c in ['_date_iso','_home_nick','book','_market_norm','side'] if c in snap_live.columns]
 
-st.write(f'Showing {len(q):,} rows')
-st.dataframe(q[cols].sort_values(sort_by), hide_index=True, width='stretch')
+st.write(f'Showing {int(q_mask.sum()):,} rows')
+q = paged_dataframe(idx_live, q_mask, key='09_all_picks_live', columns=cols, sort=sort_by, width='stretch')
 
-# Allow adding rows to cart from either edges or live
+# Allow adding rows to cart from either edges or live (the visible page of each)
+st.subheader('Edges')
+e_sort = [c for c in ['_date_iso','_home_nick','book','_market_norm','side'] if c in edges.columns]
+e_page = paged_dataframe(idx_edges, e_mask, key='09_all_picks_edges', sort=e_sort, width='stretch')
 try:
-    if 'edges' in globals() and isinstance(edges, pd.DataFrame):
-        selectable_odds_table(edges, page_key='all_picks_edges', page_name='09_All_Picks_Explorer')
-    if 'live' in globals() and isinstance(live, pd.DataFrame):
-        selectable_odds_table(live,  page_key='all_picks_live',  page_name='09_All_Picks_Explorer')
+    selectable_odds_table(e_page, page_key='all_picks_edges', page_name='09_All_Picks_Explorer')
+    selectable_odds_table(q, page_key='all_picks_live', page_name='09_All_Picks_Explorer')
 except Exception:
     pass
 
-
-
+page.rendered()
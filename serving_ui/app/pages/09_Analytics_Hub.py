@@ -2,6 +2,13 @@
 # 09_Analytics_Hub.py — Team & Market analytics with tier gating
 
 from __future__ import annotations
+# === Bootstrap (once per process: paths, optional-module shims, timings) ===
+try:
+    from app.bootstrap import boot
+except ModuleNotFoundError:  # page opened directly: only serving_ui/app is on sys.path yet
+    from bootstrap import boot
+page = boot(__file__)
+# === /Bootstrap ===
 
 from pathlib import Path
 from functools import lru_cache
@@ -391,4 +398,4 @@ else:
     if has_feature(tier, "market", "alerts"):
         st.info("Premium: line-move / arb / middle alert configuration would render here.")
 
-
+page.rendered()
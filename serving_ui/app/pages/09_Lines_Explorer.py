@@ -1,152 +1,18 @@
 from __future__ import annotations
-# === UltraImportGuard (parlay_ui & parlay_cart) ===
+# === Bootstrap (once per process: paths, optional-module shims, timings) ===
 try:
-    from app.utils.parlay_ui import selectable_odds_table
-    from app.utils.parlay_cart import read_cart, add_to_cart, clear_cart
-except Exception:
-    import sys, types, importlib.util
-    from pathlib import Path
-    here = Path(__file__).resolve()
-
-    def _find(path_tail: str):
-        for up in (here,) + tuple(here.parents):
-            cand = up / "serving_ui" / "app" / "utils" / path_tail
-            if cand.exists():
-                return up / "serving_ui", cand
-        return None, None
-
-    base_ui, ui_path   = _find("parlay_ui.py")
-    base_ca, cart_path = _find("parlay_cart.py")
-    base = base_ui or base_ca
-    if not base:
-        raise
-
-    if str(base) not in sys.path:
-        sys.path.insert(0, str(base))
-
-    # ensure packages
-    if "app" not in sys.modules:
-        pkg_app = types.ModuleType("app"); pkg_app.__path__ = [str(base / "app")]; sys.modules["app"] = pkg_app
-    if "app.utils" not in sys.modules:
-        pkg_utils = types.ModuleType("app.utils"); pkg_utils.__path__ = [str(base / "app" / "utils")]; sys.modules["app.utils"] = pkg_utils
-
-    # load modules by file and register under canonical names
-    if ui_path:
-        spec = importlib.util.spec_from_file_location("app.utils.parlay_ui", str(ui_path))
-        mod = importlib.util.module_from_spec(spec); assert spec and spec.loader; spec.loader.exec_module(mod)  # type: ignore[attr-defined]
-        sys.modules["app.utils.parlay_ui"] = mod
-        selectable_odds_table = mod.selectable_odds_table
-    if cart_path:
-        spec2 = importlib.util.spec_from_file_location("app.utils.parlay_cart", str(cart_path))
-        mod2 = importlib.util.module_from_spec(spec2); assert spec2 and spec2.loader; spec2.loader.exec_module(mod2)  # type: ignore[attr-defined]
-        sys.modules["app.utils.parlay_cart"] = mod2
-        read_cart      = getattr(mod2, "read_cart")
-        add_to_cart    = getattr(mod2, "add_to_cart")
-        clear_cart     = getattr(mod2, "clear_cart")
-# === /UltraImportGuard ===
-
-# === AccessImportGuard ===
-try:
-    from app.lib.access import require_allowed_page, beta_banner, live_enabled  # type: ignore
-except ModuleNotFoundError:
-    import sys
-    from pathlib import Path
-    _here = Path(__file__).resolve()
-    for up in (_here,) + tuple(_here.parents):
-        cand = up / "serving_ui" / "app" / "lib" / "access.py"
-        if cand.exists():
-            base = str((up / "serving_ui").resolve())
-            if base not in sys.path:
-                sys.path.insert(0, base)
-            break
-    try:
-        from app.lib.access import require_allowed_page, beta_banner, live_enabled  # type: ignore
-    except Exception:
-        def live_enabled() -> bool: return False
-        def require_allowed_page(_page_path: str) -> None: return None
-        def beta_banner() -> None:
-            try:
-                import streamlit as st
-                st.caption("🧪 Beta mode — access module missing; using shim.")
-            except Exception:
-                pass
-# === /AccessImportGuard ===
-# === UtilsImportGuard (parlay_ui) ===
-try:
-    from app.utils.parlay_ui import selectable_odds_table
-except ModuleNotFoundError:
-    import sys
-    from pathlib import Path
-    _here = Path(__file__).resolve()
-    for up in (_here,) + tuple(_here.parents):
-        cand = up / "serving_ui" / "app" / "utils" / "parlay_ui.py"
-        if cand.exists():
-            base = str((up / "serving_ui").resolve())
-            if base not in sys.path:
-                sys.path.insert(0, base)
-            break
-    from app.utils.parlay_ui import selectable_odds_table
-# === /UtilsImportGuard ===
-
-# === AppImportGuard (nuclear) ===
-try:
-    from app.lib.auth import login, show_logout
-except ModuleNotFoundError:
-    import sys
-    from pathlib import Path
-    here = Path(__file__).resolve()
+    from app.bootstrap import boot
+except ModuleNotFoundError:  # page opened directly: only serving_ui/app is on sys.path yet
+    from bootstrap import boot
+page = boot(__file__)
+from app.bootstrap import login, show_logout, live_enabled, do_expensive_refresh, mount_in_sidebar
+# === /Bootstrap ===
 
-    base = None
-    auth_path = None
-    for p in [here] + list(here.parents):
-        cand1 = p / "app" / "lib" / "auth.py"
-        cand2 = p / "serving_ui" / "app" / "lib" / "auth.py"
-        if cand1.exists():
-            base, auth_path = p, cand1
-            break
-        if cand2.exists():
-            base, auth_path = (p / "serving_ui"), cand2
-            break
 
-    if base and auth_path:
-        s = str(base)
-        if s not in sys.path:
-            sys.path.insert(0, s)
-        try:
-            from app.lib.auth import login, show_logout  # type: ignore
-        except ModuleNotFoundError:
-            import types, importlib.util
-            if "app" not in sys.modules:
-                pkg_app = types.ModuleType("app")
-                pkg_app.__path__ = [str(Path(base) / "app")]
-                sys.modules["app"] = pkg_app
-            if "app.lib" not in sys.modules:
-                pkg_lib = types.ModuleType("app.lib")
-                pkg_lib.__path__ = [str(Path(base) / "app" / "lib")]
-                sys.modules["app.lib"] = pkg_lib
-            spec = importlib.util.spec_from_file_location("app.lib.auth", str(auth_path))
-            mod = importlib.util.module_from_spec(spec)  # type: ignore[arg-type]
-            assert spec and spec.loader
-            spec.loader.exec_module(mod)  # type: ignore[attr-defined]
-            sys.modules["app.lib.auth"] = mod
-            login = mod.login
-            show_logout = mod.show_logout
-    else:
-        raise
-# === /AppImportGuard ===
 
 
-import sys
-from pathlib import Path
 import streamlit as st
-_here = Path(__file__).resolve()
-for up in [_here] + list(_here.parents):
-    cand = up / 'serving_ui' / 'app' / '__init__.py'
-    if cand.exists():
-        base = str((up / 'serving_ui').resolve())
-        if base not in sys.path:
-            sys.path.insert(0, base)
-        break
+from app.lib.paged_table import filter_index, paged_dataframe
 PAGE_PROTECTED = False
 auth = login(required=PAGE_PROTECTED)
 if not auth.ok:
@@ -156,12 +22,6 @@ auth = login(required=False)
 if not auth.authenticated:
     st.info('You are in read-only mode.')
 show_logout()
-import sys
-from pathlib import Path
-_HERE = Path(__file__).resolve()
-_SERVING_UI = _HERE.parents[2]
-if str(_SERVING_UI) not in sys.path:
-    sys.path.insert(0, str(_SERVING_UI))
 if live_enabled():
     do_expensive_refresh()
 else:
@@ -215,21 +75,6 @@ from pathlib import Path
 from typing import List, Optional, Dict
 import numpy as np
 import pandas as pd
-try:
-    from app.utils.diagnostics import mount_in_sidebar
-except ModuleNotFoundError:
-    try:
-        import sys
-        from pathlib import Path as _efP
-        sys.path.append(str(_efP(__file__).resolve().parents[3]))
-        from app.utils.diagnostics import mount_in_sidebar
-    except Exception:
-        try:
-            from utils.diagnostics import mount_in_sidebar
-        except Exception:
-
-            def mount_in_sidebar(page_name: str):
-                return None
 TZ = 'America/New_York'
 
 def _exports_dir() -> Path:
@@ -343,54 +188,90 @@ def _latest_csv(paths: list[Path]) -> Optional[Path]:
     return max(paths, key=lambda p: p.stat().st_mtime)
 
 @st.cache_data(ttl=60)
-def load_live() -> tuple[pd.DataFrame, Path]:
+def load_live() -> tuple[pd.DataFrame, Path, int]:
     exp = _exports_dir()
     cand = [exp / 'lines_live.csv', exp / 'lines_live_latest.csv']
     p = _latest_csv(cand) or cand[0]
+    stamp = _stamp(p)   # before the read, so a filter_index token built from it names this frame
     df = pd.read_csv(p, low_memory=False, encoding='utf-8-sig') if p.exists() else pd.DataFrame()
-    return (df, p)
+    return (df, p, stamp)
 
 @st.cache_data(ttl=60)
-def load_open_close() -> tuple[pd.DataFrame, Path]:
+def load_open_close() -> tuple[pd.DataFrame, Path, int]:
     exp = _exports_dir()
     cand = [exp / 'lines_open_close.csv', exp / 'lines_open_close_latest.csv']
     p = _latest_csv(cand) or cand[0]
+    stamp = _stamp(p)   # before the read, so a filter_index token built from it names this frame
     df = pd.read_csv(p, low_memory=False, encoding='utf-8-sig') if p.exists() else pd.DataFrame()
-    return (df, p)
+    return (df, p, stamp)
 
 @st.cache_data(ttl=60)
-def load_edges() -> tuple[pd.DataFrame, Path]:
+def load_edges() -> tuple[pd.DataFrame, Path, int]:
     exp = _exports_dir()
     names = ['edges_standardized.csv', 'edges_graded_full_normalized_std.csv', 'edges_graded_full.csv', 'edges_normalized.csv', 'edges_master.csv']
     paths = [exp / n for n in names]
     p = _latest_csv(paths) or paths[0]
+    stamp = _stamp(p)   # before the read, so a filter_index token built from it names this frame
     df = pd.read_csv(p, low_memory=False, encoding='utf-8-sig') if p.exists() else pd.DataFrame()
-    return (df, p)
+    return (df, p, stamp)
+
+def _stamp(p: Path) -> int:
+    try:
+        return Path(p).stat().st_mtime_ns
+    except Exception:
+        return 0
+
+@st.cache_data(ttl=60)
+def prepare_live() -> tuple[pd.DataFrame, int]:
+    """(live lines with dates, nicks, markets and join keys normalized, stamp of the file they were read from)."""
+    live, _, stamp = load_live()
+    if live.empty:
+        return live, stamp
+    live = _ensure_date_iso(live, ['_date_iso', 'event_date', 'commence_time', 'date', 'game_date', 'Date']).copy()
+    live = _ensure_nicks(live)
+    live['_market_norm'] = live.get('_market_norm', live.get('market', pd.Series(index=live.index))).map(_norm_market)
+    live['decimal'] = _odds_to_decimal(live.get('price', pd.Series(index=live.index)))
+    live['imp_prob'] = 1.0 / live['decimal']
+    live['_key'] = live['_date_iso'].astype('string') + '|' + live['_home_nick'].astype('string') + '|' + live['_away_nick'].astype('string') + '|' + live['_market_norm'].astype('string') + '|' + live.get('side', pd.Series(index=live.index)).astype('string') + '|' + live.get('book', pd.Series(index=live.index)).astype('string')
+    return live, stamp
+
+@st.cache_data(ttl=60)
+def prepare_open_close() -> pd.DataFrame:
+    oc, _, _ = load_open_close()
+    if oc.empty:
+        return oc
+    need = ['_date_iso', '_home_nick', '_away_nick', '_market_norm', 'side', 'book']
+    for c in need:
+        if c not in oc.columns:
+            oc[c] = pd.NA
+    oc['_key'] = oc['_date_iso'].astype('string') + '|' + oc['_home_nick'].astype('string') + '|' + oc['_away_nick'].astype('string') + '|' + oc['_market_norm'].astype('string') + '|' + oc['side'].astype('string') + '|' + oc['book'].astype('string')
+    cols = ['_key', 'open_line', 'open_price', 'close_line', 'close_price', 'open_ts_utc', 'close_ts_utc']
+    return oc[[c for c in cols if c in oc.columns]]
 diag = mount_in_sidebar('09_Lines_Explorer')
 st.title('Lines — Explorer')
 refresh_button(key='refresh_09_lines')
-live, live_path = load_live()
-oc, oc_path = load_open_close()
+live, live_path, _ = load_live()
+oc, oc_path, _ = load_open_close()
 st.caption(f'Live lines: `{live_path}` · rows={len(live):,} · age={_age_str(live_path)}')
 st.caption(f'Open/Close: `{oc_path}` · rows={len(oc):,}' + ('' if len(oc) else ' (optional)'))
 if live.empty:
     st.warning('No live lines found. Point EDGE_EXPORTS_DIR to your exports folder.')
     st.stop()
-live = _ensure_date_iso(live, ['_date_iso', 'event_date', 'commence_time', 'date', 'game_date', 'Date']).copy()
-live = _ensure_nicks(live)
-live['_market_norm'] = live.get('_market_norm', live.get('market', pd.Series(index=live.index))).map(_norm_market)
-live['decimal'] = _odds_to_decimal(live.get('price', pd.Series(index=live.index)))
-live['imp_prob'] = 1.0 / live['decimal']
-live['_key'] = live['_date_iso'].astype('string') + '|' + live['_home_nick'].astype('string') + '|' + live['_away_nick'].astype('string') + '|' + live['_market_norm'].astype('string') + '|' + live.get('side', pd.Series(index=live.index)).astype('string') + '|' + live.get('book', pd.Series(index=live.index)).astype('string')
+# filters run server-side on a cached index; only the visible page goes to the browser
+# the token is the stamp the cached frame was read under, not the file's current one
+live, lstamp = prepare_live()
+idx = filter_index(live, token=(str(live_path), lstamp), key='09_lines',
+                   categorical=['_date_iso', '_market_norm', 'side', 'book'], numeric=['price', 'line'],
+                   text=['_home_nick', '_away_nick'])
 today_iso = pd.Timestamp.now(tz=TZ).strftime('%Y-%m-%d')
-dates_avail = sorted([d for d in live['_date_iso'].dropna().unique().tolist()])
+dates_avail = idx.options('_date_iso')
 default_date = today_iso if today_iso in dates_avail else dates_avail[-1] if dates_avail else None
 st.sidebar.header('Slate & Filters')
 date_pick = st.sidebar.selectbox('Date', options=dates_avail, index=dates_avail.index(default_date) if default_date in dates_avail else 0)
-view = live[live['_date_iso'] == date_pick].copy()
-mk_opts = ['(all)'] + sorted(view['_market_norm'].dropna().unique().tolist())
-book_opts = sorted([b for b in view.get('book', pd.Series(dtype='string')).dropna().unique().tolist()])
-side_opts = sorted([s for s in view.get('side', pd.Series(dtype='string')).dropna().unique().tolist()])
+on_date = idx.mask(equals={'_date_iso': date_pick})
+mk_opts = ['(all)'] + idx.options('_market_norm', within=on_date)
+book_opts = idx.options('book', within=on_date)
+side_opts = idx.options('side', within=on_date)
 colA, colB = st.sidebar.columns(2)
 with colA:
     market_pick = st.selectbox('Market', options=mk_opts)
@@ -398,35 +279,21 @@ with colB:
     sides_pick = st.multiselect('Sides', options=side_opts, default=side_opts)
 books_pick = st.sidebar.multiselect('Books', options=book_opts, default=book_opts)
 team_query = st.sidebar.text_input('Team contains (RAIDERS, 49ERS, etc.)', '')
-pr = pd.to_numeric(view.get('price', pd.Series(index=view.index)), errors='coerce')
-ln = pd.to_numeric(view.get('line', pd.Series(index=view.index)), errors='coerce')
-p_min, p_max = (int(np.nanmin(pr)) if pr.notna().any() else -500, int(np.nanmax(pr)) if pr.notna().any() else 500)
-l_min, l_max = (float(np.nanmin(ln)) if ln.notna().any() else -30.0, float(np.nanmax(ln)) if ln.notna().any() else 30.0)
+pb, lb = idx.bounds('price', on_date), idx.bounds('line', on_date)
+p_min, p_max = (int(pb[0]), int(pb[1])) if pb else (-500, 500)
+l_min, l_max = lb if lb else (-30.0, 30.0)
 price_rng = st.sidebar.slider('American odds (price) range', p_min, p_max, (p_min, p_max), step=5)
 line_rng = st.sidebar.slider('Line range', float(l_min), float(l_max), (float(l_min), float(l_max)))
-if market_pick != '(all)':
-    view = view[view['_market_norm'] == market_pick]
-if len(sides_pick):
-    view = view[view.get('side', pd.Series(index=view.index)).isin(sides_pick)]
-if len(books_pick):
-    view = view[view.get('book', pd.Series(index=view.index)).isin(books_pick)]
-if team_query.strip():
-    q = team_query.strip().upper()
-    view = view[view['_home_nick'].str.contains(q, na=False) | view['_away_nick'].str.contains(q, na=False)]
-view = view[pr.between(price_rng[0], price_rng[1], inclusive='both')]
-view = view[ln.between(line_rng[0], line_rng[1], inclusive='both')]
-if not oc.empty:
-    need = ['_date_iso', '_home_nick', '_away_nick', '_market_norm', 'side', 'book']
-    for c in need:
-        if c not in oc.columns:
-            oc[c] = pd.NA
-    oc['_key'] = oc['_date_iso'].astype('string') + '|' + oc['_home_nick'].astype('string') + '|' + oc['_away_nick'].astype('string') + '|' + oc['_market_norm'].astype('string') + '|' + oc['side'].astype('string') + '|' + oc['book'].astype('string')
-    cols = ['_key', 'open_line', 'open_price', 'close_line', 'close_price', 'open_ts_utc', 'close_ts_utc']
-    oc_cols = [c for c in cols if c in oc.columns]
-    view = view.merge(oc[oc_cols], on='_key', how='left')
-cols = [c for c in ['_date_iso', '_away_nick', '_home_nick', 'book', '_market_norm', 'side', 'line', 'price', 'decimal', 'imp_prob', 'open_line', 'open_price', 'close_line', 'close_price'] if c in view.columns]
-st.write(f'Showing {len(view):,} rows for {date_pick}')
-st.dataframe(view[cols], hide_index=True, width='stretch')
+mask = idx.mask(equals={'_market_norm': None if market_pick == '(all)' else market_pick, 'side': sides_pick, 'book': books_pick},
+                ranges={'price': price_rng, 'line': line_rng}, contains={('_home_nick', '_away_nick'): team_query}, base=on_date)
+oc_small = prepare_open_close()
+
+def _with_open_close(rows: pd.DataFrame) -> pd.DataFrame:
+    return rows.merge(oc_small, on='_key', how='left') if not oc_small.empty else rows
+cols = ['_date_iso', '_away_nick', '_home_nick', 'book', '_market_norm', 'side', 'line', 'price', 'decimal', 'imp_prob', 'open_line', 'open_price', 'close_line', 'close_price']
+st.write(f'Showing {int(mask.sum()):,} rows for {date_pick}')
+view = paged_dataframe(idx, mask, key='09_lines', columns=[c for c in cols if c in live.columns or c in oc_small.columns],
+                       enrich=_with_open_close, width='stretch')
 try:
     import pandas as _ef_pd
     from pathlib import Path as _ef_Path
@@ -449,11 +316,4 @@ try:
 except Exception:
     pass
 
-
-
-
-
-
-
-
-
+page.rendered()
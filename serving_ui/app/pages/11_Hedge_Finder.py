@@ -1,167 +1,25 @@
 from __future__ import annotations
-# === UltraImportGuard (parlay_ui & parlay_cart) ===
+# === Bootstrap (once per process: paths, optional-module shims, timings) ===
 try:
-    from app.utils.parlay_ui import selectable_odds_table
-    from app.utils.parlay_cart import read_cart, add_to_cart, clear_cart
-except Exception:
-    import sys, types, importlib.util
-    from pathlib import Path
-    here = Path(__file__).resolve()
+    from app.bootstrap import boot
+except ModuleNotFoundError:  # page opened directly: only serving_ui/app is on sys.path yet
+    from bootstrap import boot
+page = boot(__file__)
+from app.bootstrap import (
+    login, show_logout, require_allowed_page, beta_banner, live_enabled, do_expensive_refresh, selectable_odds_table,
+)
+# === /Bootstrap ===
 
-    def _find(path_tail: str):
-        for up in (here,) + tuple(here.parents):
-            cand = up / "serving_ui" / "app" / "utils" / path_tail
-            if cand.exists():
-                return up / "serving_ui", cand
-        return None, None
-
-    base_ui, ui_path   = _find("parlay_ui.py")
-    base_ca, cart_path = _find("parlay_cart.py")
-    base = base_ui or base_ca
-    if not base:
-        raise
-
-    if str(base) not in sys.path:
-        sys.path.insert(0, str(base))
-
-    # ensure packages
-    if "app" not in sys.modules:
-        pkg_app = types.ModuleType("app"); pkg_app.__path__ = [str(base / "app")]; sys.modules["app"] = pkg_app
-    if "app.utils" not in sys.modules:
-        pkg_utils = types.ModuleType("app.utils"); pkg_utils.__path__ = [str(base / "app" / "utils")]; sys.modules["app.utils"] = pkg_utils
-
-    # load modules by file and register under canonical names
-    if ui_path:
-        spec = importlib.util.spec_from_file_location("app.utils.parlay_ui", str(ui_path))
-        mod = importlib.util.module_from_spec(spec); assert spec and spec.loader; spec.loader.exec_module(mod)  # type: ignore[attr-defined]
-        sys.modules["app.utils.parlay_ui"] = mod
-        selectable_odds_table = mod.selectable_odds_table
-    if cart_path:
-        spec2 = importlib.util.spec_from_file_location("app.utils.parlay_cart", str(cart_path))
-        mod2 = importlib.util.module_from_spec(spec2); assert spec2 and spec2.loader; spec2.loader.exec_module(mod2)  # type: ignore[attr-defined]
-        sys.modules["app.utils.parlay_cart"] = mod2
-        read_cart      = getattr(mod2, "read_cart")
-        add_to_cart    = getattr(mod2, "add_to_cart")
-        clear_cart     = getattr(mod2, "clear_cart")
-# === /UltraImportGuard ===
-
-# === AccessImportGuard ===
-try:
-    from app.lib.access import require_allowed_page, beta_banner, live_enabled  # type: ignore
-except ModuleNotFoundError:
-    import sys
-    from pathlib import Path
-    _here = Path(__file__).resolve()
-    for up in (_here,) + tuple(_here.parents):
-        cand = up / "serving_ui" / "app" / "lib" / "access.py"
-        if cand.exists():
-            base = str((up / "serving_ui").resolve())
-            if base not in sys.path:
-                sys.path.insert(0, base)
-            break
-    try:
-        from app.lib.access import require_allowed_page, beta_banner, live_enabled  # type: ignore
-    except Exception:
-        def live_enabled() -> bool: return False
-        def require_allowed_page(_page_path: str) -> None: return None
-        def beta_banner() -> None:
-            try:
-                import streamlit as st
-                st.caption("🧪 Beta mode — access module missing; using shim.")
-            except Exception:
-                pass
-# === /AccessImportGuard ===
-
-# === UltraImportGuard (parlay_ui) ===
-try:
-    from app.utils.parlay_ui import selectable_odds_table
-except Exception:
-    import sys, types, importlib.util
-    from pathlib import Path
-    here = Path(__file__).resolve()
-    base = path = None
-    for up in (here,) + tuple(here.parents):
-        cand = up / "serving_ui" / "app" / "utils" / "parlay_ui.py"
-        if cand.exists():
-            base, path = up / "serving_ui", cand
-            break
-    if not base or not path:
-        raise
-    if str(base) not in sys.path:
-        sys.path.insert(0, str(base))
-    if "app" not in sys.modules:
-        pkg_app = types.ModuleType("app")
-        pkg_app.__path__ = [str(base / "app")]
-        sys.modules["app"] = pkg_app
-    if "app.utils" not in sys.modules:
-        pkg_utils = types.ModuleType("app.utils")
-        pkg_utils.__path__ = [str(base / "app" / "utils")]
-        sys.modules["app.utils"] = pkg_utils
-    spec = importlib.util.spec_from_file_location("app.utils.parlay_ui", str(path))
-    mod = importlib.util.module_from_spec(spec)  # type: ignore[arg-type]
-    assert spec and spec.loader
-    spec.loader.exec_module(mod)  # type: ignore[attr-defined]
-    sys.modules["app.utils.parlay_ui"] = mod
-    selectable_odds_table = mod.selectable_odds_table
-# === /UltraImportGuard ===
-
-# === AppImportGuard (auth) ===
-try:
-    from app.lib.auth import login, show_logout
-except ModuleNotFoundError:
-    import sys, types, importlib.util
-    from pathlib import Path
-    here = Path(__file__).resolve()
-    base = auth_path = None
-    for p in (here,) + tuple(here.parents):
-        c1 = p / "serving_ui" / "app" / "lib" / "auth.py"
-        if c1.exists():
-            base, auth_path = p / "serving_ui", c1
-            break
-        c2 = p / "app" / "lib" / "auth.py"
-        if c2.exists():
-            base, auth_path = p, c2
-            break
-    if not base or not auth_path:
-        raise
-    if str(base) not in sys.path:
-        sys.path.insert(0, str(base))
-    try:
-        from app.lib.auth import login, show_logout  # type: ignore
-    except ModuleNotFoundError:
-        if "app" not in sys.modules:
-            pkg_app = types.ModuleType("app")
-            pkg_app.__path__ = [str(base / "app")]
-            sys.modules["app"] = pkg_app
-        if "app.lib" not in sys.modules:
-            pkg_lib = types.ModuleType("app.lib")
-            pkg_lib.__path__ = [str(base / "app" / "lib")]
-            sys.modules["app.lib"] = pkg_lib
-        spec = importlib.util.spec_from_file_location("app.lib.auth", str(auth_path))
-        mod = importlib.util.module_from_spec(spec)  # type: ignore[arg-type]
-        assert spec and spec.loader
-        spec.loader.exec_module(mod)  # type: ignore[attr-defined]
-        sys.modules["app.lib.auth"] = mod
-        login, show_logout = mod.login, mod.show_logout
-# === /AppImportGuard ===
-
-# === Path bootstrap & refresh shim ===
-import sys
-from pathlib import Path
-_HERE = Path(__file__).resolve()
-_SERVING_UI = _HERE.parents[2]
-if str(_SERVING_UI) not in sys.path:
-    sys.path.insert(0, str(_SERVING_UI))
+
+
+
+# === Live refresh ===
 try:
     if live_enabled():
-        try:
-            from app.lib.access import do_expensive_refresh
-        except Exception:
-            def do_expensive_refresh(): return None
         do_expensive_refresh()
 except Exception:
     pass
-# === /Path bootstrap & refresh shim ===
+# === /Live refresh ===
 
 import streamlit as st
 st.set_page_config(page_title='11 Hedge Finder', page_icon='📈', layout='wide')
@@ -214,7 +72,6 @@ require_allowed_page('pages/11_Hedge_Finder.py')
 beta_banner()
 
 import os, time
-from itertools import combinations
 from pathlib import Path
 from typing import List, Optional
 import numpy as np
@@ -276,7 +133,7 @@ top = st.columns([1, 1.2, 2, 1])
 with top[0]:
     newest_first = st.toggle('Newest first', value=True)
 with top[1]:
-    mode = st.selectbox('Side match', ['Strict (OU/Home-Away)', 'Loose (any different)'], index=1)
+    bankroll = st.number_input('Bankroll per hedge ($)', 10.0, 100000.0, 100.0, 10.0)
 with top[2]:
     odds_min, odds_max = st.slider('Odds window (American, abs)', 100, 300, (100, 200))
 with top[3]:
@@ -290,33 +147,29 @@ game = st.selectbox('Game', ['All'] + games)
 subset = edges if game == 'All' else edges[edges['game_id'].astype(str) == game]
 subset = subset[subset['odds'].abs().between(odds_min, odds_max, inclusive='both')]
 
-def is_opposite(a: str, b: str, mode: str) -> bool:
-    if not a or not b: return False
-    A, B = (str(a).strip().lower(), str(b).strip().lower())
-    if mode == 'Strict (OU/Home-Away)':
-        return (A, B) in {('over','under'), ('home','away'), ('away','home')} or (B, A) in {('over','under'), ('home','away'), ('away','home')}
-    return A != B
-
 if not run:
     st.info('Adjust filters and click **Find hedges**.')
     st.stop()
 
-rows = []
-for (gid, mkt), g in subset.groupby(['game_id', 'market'], dropna=False):
-    g = g.reset_index(drop=True)
-    for i, j in combinations(range(len(g)), 2):
-        a, b = (g.loc[i], g.loc[j])
-        if is_opposite(a.get('side', ''), b.get('side', ''), mode):
-            rows.append({'game_id': str(gid), 'market': str(mkt),
-                         'a_side': str(a.get('side', '')), 'a_odds': a.get('odds'), 'a_book': str(a.get('book', '')),
-                         'b_side': str(b.get('side', '')), 'b_odds': b.get('odds'), 'b_book': str(b.get('book', ''))})
-
-if not rows:
-    st.info('No hedges found at current filters.')
-else:
-    out = pd.DataFrame(rows)
-    st.dataframe(out, width='stretch')
-    st.download_button('Download hedges.csv', data=out.to_csv(index=False).encode('utf-8'), file_name='hedges.csv', mime='text/csv')
+# best price per side/line, then vectorized arb + middle sweep (tools/arb_scanner.py)
+from tools.arb_scanner import scan
+t0 = time.perf_counter()
+arbs, middles = scan(subset, bankroll=float(bankroll))
+st.caption(f'Scanned {len(subset):,} quotes in {1000 * (time.perf_counter() - t0):.0f} ms')
+
+tab_arb, tab_mid = st.tabs([f'Arbitrage ({len(arbs)})', f'Middles ({len(middles)})'])
+with tab_arb:
+    if arbs.empty:
+        st.info('No arbitrage at current filters.')
+    else:
+        st.dataframe(arbs.dropna(axis=1, how='all'), width='stretch')
+        st.download_button('Download arbs.csv', data=arbs.to_csv(index=False).encode('utf-8'), file_name='arbs.csv', mime='text/csv')
+with tab_mid:
+    if middles.empty:
+        st.info('No middles at current filters.')
+    else:
+        st.dataframe(middles, width='stretch')
+        st.download_button('Download middles.csv', data=middles.to_csv(index=False).encode('utf-8'), file_name='middles.csv', mime='text/csv')
 
 try:
     if 'edges' in globals() and isinstance(edges, pd.DataFrame):
@@ -324,5 +177,4 @@ try:
 except Exception:
     pass
 
-
-
+page.rendered()
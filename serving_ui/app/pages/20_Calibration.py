@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""
+20_Calibration.py — Edge Finder
+Calibration workbench: fit Platt / beta / isotonic calibrators per market on out-of-time season
+folds (tools/calibrators.py), compare reliability, scores and expected vs realized ROI before and
+after, and save the winning set for scoring.
+"""
+from __future__ import annotations
+# === Bootstrap (once per process: paths, optional-module shims, timings) ===
+try:
+    from app.bootstrap import boot
+except ModuleNotFoundError:  # page opened directly: only serving_ui/app is on sys.path yet
+    from bootstrap import boot
+page = boot(__file__)
+# === /Bootstrap ===
+
+import time
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+st.set_page_config(page_title="20 • Calibration", page_icon="🎯", layout="wide")
+from app.lib.compliance_gate import require_eligibility  # compliance gate
+require_eligibility(min_age=18, restricted_states={"WA","ID","NV"})
+
+from app.bootstrap import require_allowed_page, beta_banner
+
+require_allowed_page(__file__)
+
+from tools.calibrators import METHODS, CalibratorSet, fit_out_of_time, store_dir, summarize
+
+APP_DIR = Path(__file__).resolve().parent
+ROOT = APP_DIR.parent.parent
+DEFAULT_MASTER = ROOT / "data" / "master_likes.parquet"
+
+# ---------------- Helpers ----------------
+
+@st.cache_data(show_spinner=False)
+def _load(path: str, stamp: int) -> pd.DataFrame:
+    p = Path(path)
+    return pd.read_csv(p, low_memory=False) if p.suffix == ".csv" else pd.read_parquet(p)
+
+
+@st.cache_data(show_spinner=False)
+def _fit(path: str, stamp: int, window: int, methods: tuple, min_rows: int, prob_col: str, y_col: str):
+    t0 = time.perf_counter()
+    cal, oof = fit_out_of_time(_load(path, stamp), window, methods, min_rows, prob_col, y_col)
+    return cal, oof, time.perf_counter() - t0
+
+
+def _reliability(oof: pd.DataFrame, cols: list[str], n_bins: int = 10) -> pd.DataFrame:
+    """Long frame (method, pred, actual, count) per fixed-width bin, one bincount per method."""
+    y = oof["y"].to_numpy(dtype="float64")
+    out = []
+    for c in cols:
+        p = oof[c].to_numpy(dtype="float64")
+        b = np.clip((p * n_bins).astype(np.int64), 0, n_bins - 1)
+        n = np.bincount(b, minlength=n_bins)
+        ok = n > 0
+        out.append(pd.DataFrame({
+            "method": c.removeprefix("p_"),
+            "pred": np.bincount(b, p, n_bins)[ok] / n[ok],
+            "actual": np.bincount(b, y, n_bins)[ok] / n[ok],
+            "count": n[ok],
+        }))
+    return pd.concat(out, ignore_index=True) if out else pd.DataFrame()
+
+# ---------------- UI ----------------
+
+st.title("🎯 Calibration")
+beta_banner()
+st.caption("Calibrators are fitted only on seasons before the one they are scored on, so the comparison below is out-of-time.")
+
+with st.sidebar:
+    st.header("Data")
+    master_path = st.text_input("Settled picks (Parquet/CSV)", value=str(DEFAULT_MASTER))
+    prob_col = st.text_input("Probability column", value="model_prob")
+    y_col = st.text_input("Outcome column (0/1)", value="hit_bool")
+    st.header("Fit")
+    window = st.slider("Training window (seasons)", 1, 8, 3)
+    min_rows = st.number_input("Min rows per fold", min_value=50, value=200, step=50)
+    methods = tuple(st.multiselect("Methods", list(METHODS), default=list(METHODS)))
+
+p = Path(master_path)
+if not p.exists():
+    st.info("No settled picks file found. Export likes and backfill outcomes first.")
+    st.stop()
+if not methods:
+    st.warning("Pick at least one method.")
+    st.stop()
+
+stamp = p.stat().st_mtime_ns
+with st.spinner("Fitting calibrators…"):
+    cal, oof, secs = _fit(str(p), stamp, window, methods, int(min_rows), prob_col, y_col)
+if oof.empty:
+    st.info("Not enough settled history across seasons to fit out-of-time calibrators.")
+    st.stop()
+st.caption(f"{len(cal)} calibrators • {len(oof):,} out-of-fold rows • fitted in {secs:.2f}s")
+
+summ = summarize(oof, methods)
+markets = summ["cal_market"].unique().tolist()
+market = st.selectbox("Market", markets, index=0, format_func=lambda m: "All markets (pooled)" if m == "*" else m)
+sub = oof[oof["cal_market"] == market]
+ms = summ[summ["cal_market"] == market].drop(columns="cal_market")
+
+c1, c2, c3 = st.columns(3)
+raw = ms[ms["method"] == "raw"].iloc[0]
+best = ms[ms["method"] != "raw"].sort_values("log_loss").iloc[0]
+c1.metric("Best method", best["method"])
+c2.metric("Log loss", f"{best['log_loss']:.4f}", f"{best['log_loss'] - raw['log_loss']:+.4f}", delta_color="inverse")
+c3.metric("ECE", f"{best['ece']:.4f}", f"{best['ece'] - raw['ece']:+.4f}", delta_color="inverse")
+
+left, right = st.columns([3, 2])
+with left:
+    st.subheader("Reliability (before / after)")
+    rel = _reliability(sub, ["p_raw"] + [f"p_{m}" for m in methods])
+    try:
+        import altair as alt
+        chart = alt.Chart(rel).mark_line(point=True).encode(
+            x=alt.X("pred:Q", title="Predicted", scale=alt.Scale(domain=[0, 1])),
+            y=alt.Y("actual:Q", title="Actual", scale=alt.Scale(domain=[0, 1])),
+            color="method:N", tooltip=["method", "pred", "actual", "count"],
+        ).properties(height=340)
+        diag = alt.Chart(pd.DataFrame({"x": [0, 1], "y": [0, 1]})).mark_line(strokeDash=[4, 4]).encode(x="x", y="y")
+        st.altair_chart(chart + diag, use_container_width=True)
+    except Exception:
+        st.line_chart(rel.pivot_table(index="pred", columns="method", values="actual"))
+with right:
+    st.subheader("Scores & ROI")
+    st.dataframe(ms.set_index("method").round(4), use_container_width=True)
+    st.caption("ROI: flat $1 on every pick the method prices +EV at its odds; exp_roi is what that method promised.")
+
+with st.expander("Per-season out-of-fold scores"):
+    st.dataframe(summarize(sub, methods, by="season").round(4), use_container_width=True, hide_index=True)
+
+st.markdown("---")
+st.subheader("Save")
+st.caption("Saves every fold's calibrator; scoring picks the latest one for the row's season and the best method per market.")
+if st.button("💾 Save calibrators"):
+    out = CalibratorSet(cal).save()
+    st.success(f"Saved {len(cal)} calibrators → {out}")
+saved = store_dir() / "calibrators.parquet"
+if saved.exists():
+    try:
+        cur = CalibratorSet.load().cal
+        st.dataframe(cur[cur["best"]].groupby("market").agg(method=("method", "first"), folds=("season", "size"),
+                     latest=("season", "max")).reset_index(), use_container_width=True, hide_index=True)
+    except Exception as e:
+        st.caption(f"Saved set unreadable: {e}")
+
+page.rendered()
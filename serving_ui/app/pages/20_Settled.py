@@ -1,63 +1,16 @@
 from __future__ import annotations
-# === AppImportGuard (nuclear) ===
+# === Bootstrap (once per process: paths, optional-module shims, timings) ===
 try:
-    from app.lib.auth import login, show_logout
-except ModuleNotFoundError:
-    import sys
-    from pathlib import Path
-    here = Path(__file__).resolve()
+    from app.bootstrap import boot
+except ModuleNotFoundError:  # page opened directly: only serving_ui/app is on sys.path yet
+    from bootstrap import boot
+page = boot(__file__)
+from app.bootstrap import login, show_logout, mount_in_sidebar
+# === /Bootstrap ===
 
-    base = None
-    auth_path = None
-    for p in [here] + list(here.parents):
-        cand1 = p / "app" / "lib" / "auth.py"
-        cand2 = p / "serving_ui" / "app" / "lib" / "auth.py"
-        if cand1.exists():
-            base, auth_path = p, cand1
-            break
-        if cand2.exists():
-            base, auth_path = (p / "serving_ui"), cand2
-            break
 
-    if base and auth_path:
-        s = str(base)
-        if s not in sys.path:
-            sys.path.insert(0, s)
-        try:
-            from app.lib.auth import login, show_logout  # type: ignore
-        except ModuleNotFoundError:
-            import types, importlib.util
-            if "app" not in sys.modules:
-                pkg_app = types.ModuleType("app")
-                pkg_app.__path__ = [str(Path(base) / "app")]
-                sys.modules["app"] = pkg_app
-            if "app.lib" not in sys.modules:
-                pkg_lib = types.ModuleType("app.lib")
-                pkg_lib.__path__ = [str(Path(base) / "app" / "lib")]
-                sys.modules["app.lib"] = pkg_lib
-            spec = importlib.util.spec_from_file_location("app.lib.auth", str(auth_path))
-            mod = importlib.util.module_from_spec(spec)  # type: ignore[arg-type]
-            assert spec and spec.loader
-            spec.loader.exec_module(mod)  # type: ignore[attr-defined]
-            sys.modules["app.lib.auth"] = mod
-            login = mod.login
-            show_logout = mod.show_logout
-    else:
-        raise
-# === /AppImportGuard ===
-
-
-import sys
-from pathlib import Path
 import streamlit as st
-_here = Path(__file__).resolve()
-for up in [_here] + list(_here.parents):
-    cand = up / 'serving_ui' / 'app' / '__init__.py'
-    if cand.exists():
-        base = str((up / 'serving_ui').resolve())
-        if base not in sys.path:
-            sys.path.insert(0, base)
-        break
+from app.lib.paged_table import filter_index, paged_dataframe
 PAGE_PROTECTED = False
 auth = login(required=PAGE_PROTECTED)
 if not auth.ok:
@@ -67,12 +20,6 @@ auth = login(required=False)
 if not auth.authenticated:
     st.info('You are in read-only mode.')
 show_logout()
-import sys, os
-from pathlib import Path
-_HERE = Path(__file__).resolve()
-_SERVING_UI = _HERE.parents[2]
-if str(_SERVING_UI) not in sys.path:
-    sys.path.insert(0, str(_SERVING_UI))
 st.set_page_config(page_title='20 Settled', page_icon='📈', layout='wide')
 from app.lib.compliance_gate import require_eligibility  # compliance gate
 require_eligibility(min_age=18, restricted_states={"WA","ID","NV"})
@@ -122,21 +69,6 @@ from pathlib import Path
 from typing import List, Optional, Dict
 import numpy as np
 import pandas as pd
-try:
-    from app.utils.diagnostics import mount_in_sidebar
-except ModuleNotFoundError:
-    try:
-        import sys
-        from pathlib import Path as _efP
-        sys.path.append(str(_efP(__file__).resolve().parents[3]))
-        from app.utils.diagnostics import mount_in_sidebar
-    except Exception:
-        try:
-            from utils.diagnostics import mount_in_sidebar
-        except Exception:
-
-            def mount_in_sidebar(page_name: str):
-                return None
 TZ = 'America/New_York'
 
 def _exports_dir() -> Path:
@@ -251,29 +183,32 @@ def _latest_csv(paths: list[Path]) -> Optional[Path]:
     return max(paths, key=lambda p: p.stat().st_mtime)
 
 @st.cache_data(ttl=60)
-def load_live() -> tuple[pd.DataFrame, Path]:
+def load_live() -> tuple[pd.DataFrame, Path, int]:
     exp = _exports_dir()
     cand = [exp / 'lines_live.csv', exp / 'lines_live_latest.csv']
     p = _latest_csv(cand) or cand[0]
+    stamp = _stamp(p)   # before the read, so a filter_index token built from it names this frame
     df = pd.read_csv(p, low_memory=False, encoding='utf-8-sig') if p.exists() else pd.DataFrame()
-    return (df, p)
+    return (df, p, stamp)
 
 @st.cache_data(ttl=60)
-def load_open_close() -> tuple[pd.DataFrame, Path]:
+def load_open_close() -> tuple[pd.DataFrame, Path, int]:
     exp = _exports_dir()
     cand = [exp / 'lines_open_close.csv', exp / 'lines_open_close_latest.csv']
     p = _latest_csv(cand) or cand[0]
+    stamp = _stamp(p)   # before the read, so a filter_index token built from it names this frame
     df = pd.read_csv(p, low_memory=False, encoding='utf-8-sig') if p.exists() else pd.DataFrame()
-    return (df, p)
+    return (df, p, stamp)
 
 @st.cache_data(ttl=60)
-def load_edges() -> tuple[pd.DataFrame, Path]:
+def load_edges() -> tuple[pd.DataFrame, Path, int]:
     exp = _exports_dir()
     names = ['edges_standardized.csv', 'edges_graded_full_normalized_std.csv', 'edges_graded_full.csv', 'edges_normalized.csv', 'edges_master.csv']
     paths = [exp / n for n in names]
     p = _latest_csv(paths) or paths[0]
+    stamp = _stamp(p)   # before the read, so a filter_index token built from it names this frame
     df = pd.read_csv(p, low_memory=False, encoding='utf-8-sig') if p.exists() else pd.DataFrame()
-    return (df, p)
+    return (df, p, stamp)
 diag = mount_in_sidebar('20_Settled')
 st.title('Settled — Results')
 refresh_button(key='refresh_20_settled')
@@ -281,46 +216,63 @@ from tools.lib_settlement import settle_bets
 from lib.join_scores import attach_scores
 
 @st.cache_data(ttl=60)
-def load_scores() -> tuple[pd.DataFrame, Path]:
+def load_scores() -> tuple[pd.DataFrame, Path, int]:
     exp = _exports_dir()
     p = exp / 'scores_1966-2025.csv'
+    stamp = _stamp(p)
     df = pd.read_csv(p, low_memory=False, encoding='utf-8-sig') if p.exists() else pd.DataFrame()
-    return (df, p)
-edges, epath = load_edges()
-scores, spath = load_scores()
+    return (df, p, stamp)
+def _stamp(p: Path) -> int:
+    try:
+        return Path(p).stat().st_mtime_ns
+    except Exception:
+        return 0
+
+@st.cache_data(ttl=60, show_spinner='Settling…')
+def settle_all(estamp: int, sstamp: int) -> tuple[pd.DataFrame, tuple[int, int]]:
+    """
+    (settle_bets over the cached edges + scores, the stamps those frames were read under);
+    recomputed when either file changes.
+    """
+    edges, _, e_read = load_edges()
+    scores, _, s_read = load_scores()
+    stamps = (e_read, s_read)
+    for df in (edges, scores):
+        for c in ['Season', 'Week']:
+            if c in df.columns:
+                df[c] = pd.to_numeric(df[c], errors='coerce').astype('Int64')
+    try:
+        return settle_bets(edges), stamps
+    except TypeError:
+        return settle_bets(edges, scores), stamps
+    except Exception:
+        joined = attach_scores(edges.copy(), scores.copy())
+        return settle_bets(joined), stamps
+edges, epath, _ = load_edges()
+scores, spath, _ = load_scores()
 st.caption(f'Edges: `{epath}` · rows={len(edges):,}')
 st.caption(f'Scores: `{spath}` · rows={len(scores):,}')
-for df in (edges, scores):
-    for c in ['Season', 'Week']:
-        if c in df.columns:
-            df[c] = pd.to_numeric(df[c], errors='coerce').astype('Int64')
 if edges.empty:
     st.warning('No edges to settle.')
     st.stop()
 try:
-    settled = settle_bets(edges)
-except TypeError:
-    settled = settle_bets(edges, scores)
-except Exception:
-    try:
-        joined = attach_scores(edges.copy(), scores.copy())
-        settled = settle_bets(joined)
-    except Exception as e:
-        st.exception(e)
-        st.stop()
+    settled, (estamp, sstamp) = settle_all(_stamp(epath), _stamp(spath))
+except Exception as e:
+    st.exception(e)
+    st.stop()
+# filters run server-side on a cached index; only the visible page goes to the browser
+# the token is the stamps the settled frame was built from, not the files' current ones
+idx = filter_index(settled, token=(str(epath), estamp, str(spath), sstamp), key='20_settled',
+                   categorical=['_has_scores', '_result'])
 st.sidebar.header('Filters')
 only_scored = st.sidebar.checkbox('Only scored bets', value=True)
 result_pick = st.sidebar.multiselect('Result', ['WIN', 'LOSS', 'PUSH', 'VOID'], default=[])
-view = settled.copy()
-if only_scored and '_has_scores' in view.columns:
-    view = view[view['_has_scores']]
-if result_pick:
-    view = view[view.get('_result', '').isin(result_pick)]
-st.write(f'Showing {len(view):,} rows')
-st.dataframe(view, hide_index=True, width='stretch')
+mask = idx.mask(equals={'_has_scores': True if only_scored else None, '_result': result_pick})
+st.write(f'Showing {int(mask.sum()):,} rows')
+view = paged_dataframe(idx, mask, key='20_settled', width='stretch')
 if st.button('Export settled to exports/settled.csv'):
     out = _exports_dir() / 'settled.csv'
-    view.to_csv(out, index=False, encoding='utf-8-sig')
+    idx.df.loc[mask].to_csv(out, index=False, encoding='utf-8-sig')
     st.success(f'Saved → {out}')
 try:
     import pandas as _ef_pd
@@ -345,7 +297,6 @@ except Exception:
     pass
 import pandas as _efpd
 from pathlib import Path as _efP
-from tools.lib_settlement import settle_bets
 try:
     diag = mount_in_sidebar('20_Settled')
 except Exception:
@@ -382,10 +333,4 @@ if do_settle:
     except Exception as err:
         st.error(f'Settlement failed: {err}')
 
-
-
-
-
-
-
-
+page.rendered()
@@ -12,6 +12,13 @@ Sections
 Deps: pandas, numpy, altair, pyarrow; uses likes_export.py utilities if present.
 """
 from __future__ import annotations
+# === Bootstrap (once per process: paths, optional-module shims, timings) ===
+try:
+    from app.bootstrap import boot
+except ModuleNotFoundError:  # page opened directly: only serving_ui/app is on sys.path yet
+    from bootstrap import boot
+page = boot(__file__)
+# === /Bootstrap ===
 
 import io
 from pathlib import Path
@@ -116,6 +123,9 @@ except Exception:
     def build_training_view(master_path: str | Path, **kwargs) -> pd.DataFrame:
         return pd.read_parquet(master_path)
 
+from tools.calib_stats import CalibrationStats, store_for
+from tools.drift import DriftReference, numeric_features
+
 # ---------------- Helpers ----------------
 
 def american_to_decimal(odds: float | int | None) -> float | None:
@@ -160,72 +170,42 @@ def roi_flat_stake(df: pd.DataFrame) -> float:
     return float((total_return - stake) / stake)
 
 
-def beat_closing_bool(row: pd.Series) -> float | None:
-    """Heuristic: did our line beat the closing line for the chosen side/market?
+def beat_closing_bool(df: pd.DataFrame) -> pd.Series:
+    """Heuristic, vectorized: did our line beat the closing line for the chosen side/market?
     Spread: if side="home" -> our line_at_pick > closing_line is better (less negative / more cushion)
             if side="away" -> our line_at_pick < closing_line is better (more positive for away underdogs)
     Total:  if side in {"over"} -> prefer LOWER pick line than closing (closing_line > pick)
             if side in {"under"} -> prefer HIGHER pick line than closing (closing_line < pick)
-    Returns 1.0/0.0/None.
+    Returns 1.0/0.0/NaN per row.
     """
-    try:
-        mkt = str(row.get("market", "")).lower()
-        side = str(row.get("side", "")).lower()
-        pick = float(row.get("line_at_pick"))
-        close = float(row.get("closing_line"))
-    except Exception:
-        return None
-    if any(pd.isna(x) for x in [pick, close]):
-        return None
-
-    if "spread" in mkt:
-        if side == "home" or side == str(row.get("home", "")).lower():
-            return 1.0 if pick > close else 0.0
-        if side == "away" or side == str(row.get("away", "")).lower():
-            return 1.0 if pick < close else 0.0
-        return None
-    if "total" in mkt or mkt.startswith("o/"):
-        if side in ("over", "o"):
-            return 1.0 if close > pick else 0.0
-        if side in ("under", "u"):
-            return 1.0 if close < pick else 0.0
-        return None
-    return None
-
-
-def reliability_curve(df: pd.DataFrame, n_bins: int = 10) -> pd.DataFrame:
-    w = df.copy()
-    w = w[pd.notna(w.get("model_prob")) & pd.notna(w.get("hit_bool"))]
-    if w.empty:
-        return pd.DataFrame(columns=["bin_low", "bin_high", "pred", "actual", "count"])
-    bins = pd.cut(w["model_prob"].astype(float), bins=n_bins, include_lowest=True)
-    g = w.groupby(bins)
-    out = g.agg(pred=("model_prob", "mean"), actual=("hit_bool", "mean"), count=("hit_bool", "size"))
-    out = out.reset_index()
-    out.rename(columns={"model_prob": "pred"}, inplace=True)
-    out["bin_low"] = out["model_prob"].apply(lambda x: x.left if hasattr(x, "left") else np.nan)
-    out["bin_high"] = out["model_prob"].apply(lambda x: x.right if hasattr(x, "right") else np.nan)
-    return out[["bin_low", "bin_high", "pred", "actual", "count"]]
-
-
-def brier_score(df: pd.DataFrame) -> float:
-    w = df.copy()
-    w = w[pd.notna(w.get("model_prob")) & pd.notna(w.get("hit_bool"))]
-    if w.empty:
-        return float("nan")
-    p = w["model_prob"].astype(float)
-    y = w["hit_bool"].astype(float)
-    return float(np.mean((p - y) ** 2))
-
-
-def log_loss(df: pd.DataFrame, eps: float = 1e-9) -> float:
-    w = df.copy()
-    w = w[pd.notna(w.get("model_prob")) & pd.notna(w.get("hit_bool"))]
-    if w.empty:
-        return float("nan")
-    p = w["model_prob"].astype(float).clip(eps, 1 - eps)
-    y = w["hit_bool"].astype(float)
-    return float(-(y * np.log(p) + (1 - y) * np.log(1 - p)).mean())
+    def _low(c: str) -> pd.Series:
+        return df[c].astype("string").str.lower().fillna("") if c in df.columns else pd.Series("", index=df.index)
+    mkt, side = _low("market"), _low("side")
+    pick = pd.to_numeric(df.get("line_at_pick"), errors="coerce")
+    close = pd.to_numeric(df.get("closing_line"), errors="coerce")
+    is_spread = mkt.str.contains("spread")
+    is_total = ~is_spread & (mkt.str.contains("total") | mkt.str.startswith("o/"))
+    home_side = side.eq("home") | (side.ne("") & side.eq(_low("home")))
+    away_side = side.eq("away") | (side.ne("") & side.eq(_low("away")))
+    out = np.select(
+        [is_spread & home_side, is_spread & away_side, is_total & side.isin(["over", "o"]), is_total & side.isin(["under", "u"])],
+        [pick > close, pick < close, close > pick, close < pick],
+        default=np.nan,
+    ).astype(float)
+    out[(pick.isna() | close.isna()).to_numpy()] = np.nan
+    return pd.Series(out, index=df.index)
+
+
+@st.cache_resource(show_spinner=False)
+def _calib_stats(path: str, stamp: str, _df: pd.DataFrame) -> CalibrationStats:
+    """Binned calibration sums (tools/calib_stats.py). A master on disk keeps its store next to it and
+    only folds newly settled rows; an upload gets an in-memory one. Re-keyed when the file changes."""
+    if not path:
+        return CalibrationStats.from_frame(_df)
+    cs = CalibrationStats(store_for(Path(path)))
+    if cs.update(_df):
+        cs.save()
+    return cs
 
 # ---------------- UI ----------------
 
@@ -364,10 +344,17 @@ except Exception:
     st.info("Install altair for charts: pip install altair")
     show_charts = False
 
+_up = st.session_state.get("_upload_master")
+if _up is not None:
+    calib = _calib_stats("", f"upload:{getattr(_up, 'name', '')}:{getattr(_up, 'size', 0)}", master_df)
+else:
+    calib = _calib_stats(master_path, str(Path(master_path).stat().st_mtime_ns), master_df)
+calib_filters = {"season": sel_seasons, "week": sel_weeks, "market": sel_markets, "book": sel_books}
+
 if show_charts:
     left, right = st.columns(2)
     with left:
-        rel = reliability_curve(work, n_bins=10)
+        rel = calib.reliability(10, **calib_filters)
         if rel.empty:
             st.caption("Not enough settled picks for calibration chart.")
         else:
@@ -379,12 +366,16 @@ if show_charts:
             diag = alt.Chart(pd.DataFrame({"x":[0,1],"y":[0,1]})).mark_line(strokeDash=[4,4])\
                 .encode(x="x", y="y")
             st.altair_chart(chart + diag, use_container_width=True)
-            st.caption(f"Brier: {brier_score(work):0.4f} • LogLoss: {log_loss(work):0.4f}")
+            sc = calib.scores(**calib_filters)
+            st.caption(f"Brier: {sc['brier']:0.4f} • LogLoss: {sc['log_loss']:0.4f} • ECE: {sc['ece']:0.4f} • n={sc['n']:,}")
+            with st.expander("Scores by market / model"):
+                grp = [c for c in ["market", "model_name"] if c in master_df.columns] or ["market"]
+                st.dataframe(calib.by(grp, **calib_filters), use_container_width=True)
 
     with right:
         clv_work = work.copy()
         if "closing_line" in clv_work.columns and clv_work["closing_line"].notna().any():
-            clv_work["beat_closing"] = clv_work.apply(beat_closing_bool, axis=1)
+            clv_work["beat_closing"] = beat_closing_bool(clv_work)
             bc = clv_work["beat_closing"].dropna()
             pct = float(bc.mean()) if not bc.empty else float("nan")
             bar = alt.Chart(pd.DataFrame({"Metric":["Beat Closing %"], "Value":[pct*100 if not np.isnan(pct) else 0]})).mark_bar().encode(x="Metric:N", y="Value:Q")
@@ -401,7 +392,7 @@ st.header("Premium Add‑ons")
 # Ensure helper columns
 if "closing_line" in master_df.columns and ("beat_closing" not in master_df.columns or master_df["beat_closing"].isna().all()):
     try:
-        master_df["beat_closing"] = master_df.apply(beat_closing_bool, axis=1)
+        master_df["beat_closing"] = beat_closing_bool(master_df)
     except Exception:
         pass
 
@@ -508,31 +499,37 @@ else:
 # ---- 4) Drift Alerts --------------------------------------------------------
 st.subheader("🚨 Drift Alerts")
 lookback_weeks = st.slider("Lookback (weeks)", min_value=2, max_value=12, value=6, step=1)
+
+
+@st.cache_resource(show_spinner=False)
+def _drift_reference(stamp: str, n_recent: int, segments: tuple, _prior: pd.DataFrame) -> DriftReference:
+    """Reference histograms for everything before the lookback window (tools/drift.py); rebuilt only
+    when the master or the window changes."""
+    feats = numeric_features(_prior, exclude=("season", "week", "hit_bool", "beat_closing") + segments)
+    return DriftReference.build(_prior, feats, segments)
+
+
 if "timestamp" in master_df.columns:
-    ddf = master_df.copy()
-    ddf = ddf.sort_values("timestamp")
-    recent = ddf.tail(lookback_weeks*50)  # heuristic number of rows per week
-    prior = ddf.iloc[:-len(recent)] if len(ddf) > len(recent) else pd.DataFrame()
-    def _mean(x):
-        x = pd.to_numeric(x, errors="coerce"); return float(x.mean()) if len(x.dropna()) else float("nan")
-    rows = []
-    for col in ["model_prob","edge","realized_edge"]:
-        if col in ddf.columns:
-            rows.append({
-                "metric": col,
-                "recent_mean": _mean(recent[col]),
-                "prior_mean": _mean(prior[col]) if not prior.empty else float("nan"),
-                "delta": (_mean(recent[col]) - _mean(prior[col])) if not prior.empty else float("nan"),
-            })
-    drift_tbl = pd.DataFrame(rows)
-    st.dataframe(drift_tbl, use_container_width=True)
-    # Simple flags
-    alerts = []
-    for _, r in drift_tbl.iterrows():
-        if pd.notna(r["delta"]) and abs(r["delta"]) > 0.05:
-            alerts.append(f"{r['metric']} shifted by {r['delta']:+.3f}")
-    if alerts:
-        st.warning("\n".join(alerts))
+    ddf = master_df.sort_values("timestamp")
+    n_recent = min(lookback_weeks*50, len(ddf))  # heuristic number of rows per week
+    recent, prior = ddf.iloc[len(ddf) - n_recent:], ddf.iloc[:len(ddf) - n_recent]
+    if prior.empty:
+        st.caption("Not enough history before the lookback window for a drift reference.")
+    else:
+        seg = tuple(c for c in ["market"] if c in ddf.columns)
+        stamp = f"{master_path}:{Path(master_path).stat().st_mtime_ns if Path(master_path).exists() else 0}:{len(ddf)}"
+        ref = _drift_reference(stamp, n_recent, seg, prior)
+        drift_tbl = ref.score(recent)
+        drift_tbl = drift_tbl.rename(columns={"feature": "metric", "mean_cur": "recent_mean", "mean_ref": "prior_mean"})
+        show_seg = st.selectbox("Segment", drift_tbl["segment"].unique().tolist()[::-1], index=0) if seg else "*"
+        view = drift_tbl[drift_tbl["segment"] == show_seg]
+        st.dataframe(view[["metric","n_cur","recent_mean","prior_mean","delta","psi","ks","wasserstein","flag"]]
+                     .sort_values("psi", ascending=False), use_container_width=True)
+        # Simple flags: PSI over threshold anywhere, or a >0.05 mean shift on the probability/edge columns
+        hit = drift_tbl[(drift_tbl["flag"] != "") | (drift_tbl["metric"].isin(["model_prob","edge","realized_edge"]) & (drift_tbl["delta"].abs() > 0.05))]
+        if not hit.empty:
+            st.warning("\n".join((hit["metric"] + " [" + hit["segment"] + "] shifted by " + hit["delta"].map("{:+.3f}".format)
+                                   + " (PSI " + hit["psi"].map("{:.2f}".format) + ")").head(20)))
 else:
     st.caption("Timestamp column required for drift checks.")
 
@@ -565,3 +562,4 @@ else:
 # Footer
 st.markdown(":gray[Analytics page · v0.2 — staking sim, model compare, cohorts, drift, CLV heatmap, leak‑free export.]")
 
+page.rendered()
@@ -1,89 +1,15 @@
 from __future__ import annotations
-# === AccessImportGuard ===
+# === Bootstrap (once per process: paths, optional-module shims, timings) ===
 try:
-    from app.lib.access import require_allowed_page, beta_banner, live_enabled  # type: ignore
-except ModuleNotFoundError:
-    import sys
-    from pathlib import Path
-    _here = Path(__file__).resolve()
-    for up in (_here,) + tuple(_here.parents):
-        cand = up / "serving_ui" / "app" / "lib" / "access.py"
-        if cand.exists():
-            base = str((up / "serving_ui").resolve())
-            if base not in sys.path:
-                sys.path.insert(0, base)
-            break
-    try:
-        from app.lib.access import require_allowed_page, beta_banner, live_enabled  # type: ignore
-    except Exception:
-        def live_enabled() -> bool: return False
-        def require_allowed_page(_page_path: str) -> None: return None
-        def beta_banner() -> None:
-            try:
-                import streamlit as st
-                st.caption("🧪 Beta mode — access module missing; using shim.")
-            except Exception:
-                pass
-# === /AccessImportGuard ===
-# === AppImportGuard (nuclear) ===
-try:
-    from app.lib.auth import login, show_logout
-except ModuleNotFoundError:
-    import sys
-    from pathlib import Path
-    here = Path(__file__).resolve()
-
-    base = None
-    auth_path = None
-    for p in [here] + list(here.parents):
-        cand1 = p / "app" / "lib" / "auth.py"
-        cand2 = p / "serving_ui" / "app" / "lib" / "auth.py"
-        if cand1.exists():
-            base, auth_path = p, cand1
-            break
-        if cand2.exists():
-            base, auth_path = (p / "serving_ui"), cand2
-            break
+    from app.bootstrap import boot
+except ModuleNotFoundError:  # page opened directly: only serving_ui/app is on sys.path yet
+    from bootstrap import boot
+page = boot(__file__)
+from app.bootstrap import login, show_logout, live_enabled, do_expensive_refresh
+# === /Bootstrap ===
 
-    if base and auth_path:
-        s = str(base)
-        if s not in sys.path:
-            sys.path.insert(0, s)
-        try:
-            from app.lib.auth import login, show_logout  # type: ignore
-        except ModuleNotFoundError:
-            import types, importlib.util
-            if "app" not in sys.modules:
-                pkg_app = types.ModuleType("app")
-                pkg_app.__path__ = [str(Path(base) / "app")]
-                sys.modules["app"] = pkg_app
-            if "app.lib" not in sys.modules:
-                pkg_lib = types.ModuleType("app.lib")
-                pkg_lib.__path__ = [str(Path(base) / "app" / "lib")]
-                sys.modules["app.lib"] = pkg_lib
-            spec = importlib.util.spec_from_file_location("app.lib.auth", str(auth_path))
-            mod = importlib.util.module_from_spec(spec)  # type: ignore[arg-type]
-            assert spec and spec.loader
-            spec.loader.exec_module(mod)  # type: ignore[attr-defined]
-            sys.modules["app.lib.auth"] = mod
-            login = mod.login
-            show_logout = mod.show_logout
-    else:
-        raise
-# === /AppImportGuard ===
 
-
-import sys
-from pathlib import Path
 import streamlit as st
-_here = Path(__file__).resolve()
-for up in [_here] + list(_here.parents):
-    cand = up / 'serving_ui' / 'app' / '__init__.py'
-    if cand.exists():
-        base = str((up / 'serving_ui').resolve())
-        if base not in sys.path:
-            sys.path.insert(0, base)
-        break
 PAGE_PROTECTED = False
 auth = login(required=PAGE_PROTECTED)
 if not auth.ok:
@@ -93,12 +19,6 @@ auth = login(required=False)
 if not auth.authenticated:
     st.info('You are in read-only mode.')
 show_logout()
-import sys
-from pathlib import Path
-_HERE = Path(__file__).resolve()
-_SERVING_UI = _HERE.parents[2]
-if str(_SERVING_UI) not in sys.path:
-    sys.path.insert(0, str(_SERVING_UI))
 if live_enabled():
     do_expensive_refresh()
 else:
@@ -147,21 +67,6 @@ bump_usage("page_visit")
 show_nudge(feature="analytics", metric="page_visit", threshold=10, period="1D", demo_unlock=True, location="inline")
 # === /Nudge (auto-injected) ===
 
-try:
-    from app.utils.diagnostics import mount_in_sidebar
-except ModuleNotFoundError:
-    try:
-        import sys
-        from pathlib import Path as _efP
-        sys.path.append(str(_efP(__file__).resolve().parents[3]))
-        from app.utils.diagnostics import mount_in_sidebar
-    except Exception:
-        try:
-            from utils.diagnostics import mount_in_sidebar
-        except Exception:
-
-            def mount_in_sidebar(page_name: str):
-                return None
 try:
     pass
 except Exception:
@@ -178,19 +83,10 @@ except Exception:
             return
 __nfp_apply(st)
 from pathlib import Path
-import sys
 HERE = Path(__file__).resolve()
 APP_DIR = HERE.parents[1]
 PKG_PARENT = APP_DIR.parent
 REPO = PKG_PARENT.parent
-for p in (str(PKG_PARENT), str(REPO)):
-    if p not in sys.path:
-        sys.path.insert(0, p)
-try:
-    from app.bootstrap import bootstrap_paths
-    bootstrap_paths()
-except Exception:
-    pass
 from pathlib import Path as _P_OVERRIDE
 REPO = _P_OVERRIDE('C:\\Projects\\edge-finder')
 import pandas as pd
@@ -207,8 +103,9 @@ except Exception:
                 return default
         return default
 try:
-    from app.lib.models import find_models, set_active_model
+    from app.lib.models import find_models, set_active_model, model_files
 except Exception:
+    model_files = None
 
     def _scan_model_dirs():
         bases = [REPO / 'models', REPO / 'exports' / 'models', REPO / 'artifacts' / 'models']
@@ -248,9 +145,11 @@ cur = current_model_version()
 st.caption(f'Current model version: **{cur}**')
 models = find_models()
 if not models:
-    st.warning('No models found. Add models under `models/`, `exports/models/`, or `artifacts/models/`.\nOptional metadata: `model.json`, `metadata.json`, or `meta.json` with `name`, `version`, `updated`, `notes`.')
+    st.warning('No models found. Train one with `python -m tools.train_parlay` (it registers itself in `exports/models/registry.json`).')
     st.stop()
-df = pd.DataFrame(models, columns=['name', 'version', 'updated', 'notes', 'path'])
+df = pd.DataFrame(models)
+metric_cols = [c for c in ('cv_logloss', 'cv_brier', 'cv_auc', 'cv_folds', 'train_rows') if c in df.columns]
+df = df.reindex(columns=['name', 'version', 'updated'] + metric_cols + ['notes', 'path'])
 st.dataframe(df, hide_index=True, width='stretch')
 st.subheader('Activate')
 col1, col2 = st.columns([2, 1])
@@ -269,19 +168,15 @@ with col2:
         st.success(f'Set active model to: {ver}')
 with st.expander('🔎 Inspect selected model files'):
     sel_idx = choices.index(picked)
-    p = Path(models[sel_idx]['path'])
-    files = [f for f in p.rglob('*') if f.is_file()]
-    if not files:
+    if model_files is not None:
+        table = model_files(models[sel_idx]['version'])
+    else:
+        p = Path(models[sel_idx]['path'])
+        files = [f for f in p.rglob('*') if f.is_file()]
+        table = pd.DataFrame({'relpath': [str(f.relative_to(p)) for f in files], 'size_kb': [round(f.stat().st_size / 1024, 2) for f in files]}).sort_values('relpath') if files else pd.DataFrame()
+    if table.empty:
         st.info('No files under this model fnewer.')
     else:
-        table = pd.DataFrame({'relpath': [str(f.relative_to(p)) for f in files], 'size_kb': [round(f.stat().st_size / 1024, 2) for f in files]}).sort_values('relpath')
         st.dataframe(table, hide_index=True, width='stretch')
 
-
-
-
-
-
-
-
-
+page.rendered()
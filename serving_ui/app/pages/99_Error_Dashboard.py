@@ -1,5 +1,12 @@
 
 from __future__ import annotations
+# === Bootstrap (once per process: paths, optional-module shims, timings) ===
+try:
+    from app.bootstrap import boot
+except ModuleNotFoundError:  # page opened directly: only serving_ui/app is on sys.path yet
+    from bootstrap import boot
+page = boot(__file__)
+# === /Bootstrap ===
 import json
 from pathlib import Path
 import pandas as pd
@@ -168,5 +175,4 @@ What it does:
 - Keeps the original Streamlit behavior (red/amber boxes still show on the page)
 """)
 
-
-
+page.rendered()
@@ -0,0 +1,190 @@
+# tools/arb_scanner.py
+# Vectorized arbitrage and middle scanner across books.
+#
+# 1) Reduce quotes to the best decimal price per (game, market, side, line) with one grouped max.
+# 2) Arbitrage: lay the best prices of each market's outcomes (HOME/AWAY[/DRAW], OVER/UNDER at the
+#    same number) into a slot matrix; sum(1/decimal) < 1 is an arb. Stakes are split so every outcome
+#    returns the same amount.
+# 3) Middles: opposing numbers that leave a window (HOME -2.5 vs AWAY +3.5, OVER 44.5 vs UNDER 46.5).
+#    For every line on one side a searchsorted sweep over the other side's sorted lines finds the
+#    best-priced opposing quote that still opens a window — no per-pair Python.
+#
+# Player props work the same way: OVER/UNDER rows are keyed by game + player + market.
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from tools.pathing import exports_dir
+from tools.fair_price import american_to_decimal, canon_quotes, _s
+
+SLOT = {"HOME": 0, "OVER": 0, "AWAY": 1, "UNDER": 1, "DRAW": 2, "TIE": 2}
+ARB_COLS = ["_event", "_market_norm", "_pair_line", "n_legs", "inv_sum", "profit_pct",
+            "leg1_side", "leg1_line", "leg1_book", "leg1_price", "leg1_stake",
+            "leg2_side", "leg2_line", "leg2_book", "leg2_price", "leg2_stake",
+            "leg3_side", "leg3_line", "leg3_book", "leg3_price", "leg3_stake"]
+MIDDLE_COLS = ["_event", "_market_norm", "kind", "a_side", "a_line", "a_book", "a_price",
+               "b_side", "b_line", "b_book", "b_price", "window_lo", "window_hi", "width",
+               "inv_sum", "a_stake", "b_stake", "miss_pnl", "hit_pnl", "is_arb"]
+
+# -------------------- reduce --------------------
+
+def best_quotes(df: pd.DataFrame) -> pd.DataFrame:
+    """Best decimal price per (event, market, side, line), with the book that offers it."""
+    q = canon_quotes(df)
+    player = _s(df["player_name"]) if "player_name" in df.columns else pd.Series("", index=df.index, dtype="string")
+    q["_event"] = q["_game"].where(player.eq(""), q["_game"] + "|" + player)
+    q["line"] = q["line"].fillna(0.0)
+    q["decimal"] = american_to_decimal(q["price"])
+    q = q[q["decimal"].gt(1.0) & q["side"].isin(list(SLOT))]
+    if q.empty:
+        return q.assign(_pair_line=pd.Series(dtype="float64"))
+    key = ["_event", "_market_norm", "side", "line"]
+    i = q.groupby(key, sort=False)["decimal"].idxmax()
+    b = q.loc[i.to_numpy(), key + ["book", "price", "decimal"]].reset_index(drop=True)
+    ou = b["side"].isin(["OVER", "UNDER"])
+    b["_pair_line"] = np.where(ou, b["line"],
+                      np.where(b["_market_norm"].eq("SPREADS"), np.where(b["side"].eq("AWAY"), -b["line"], b["line"]), 0.0))
+    return b
+
+def equal_return_stakes(dec: np.ndarray, bankroll: float = 100.0) -> np.ndarray:
+    """Stakes (rows = bets, cols = legs, NaN = absent leg) that return the same on every leg."""
+    inv = 1.0 / dec
+    return bankroll * inv / np.nansum(inv, axis=1, keepdims=True)
+
+# -------------------- arbitrage --------------------
+
+def scan_arbs(best: pd.DataFrame, bankroll: float = 100.0, min_profit: float = 0.0) -> pd.DataFrame:
+    """Same-number arbitrage across books: sum(1/best decimal) < 1 over all outcomes of a market."""
+    if best.empty:
+        return pd.DataFrame(columns=ARB_COLS)
+    mk = ["_event", "_market_norm", "_pair_line"]
+    codes, uniq = pd.factorize(pd.MultiIndex.from_frame(best[mk]))
+    slot = best["side"].map(SLOT).to_numpy(dtype="int64")
+    n = codes.max() + 1
+    dec = np.full((n, 3), np.nan); book = np.full((n, 3), "", dtype=object)
+    price = np.full((n, 3), np.nan); line = np.full((n, 3), np.nan); side = np.full((n, 3), "", dtype=object)
+    dec[codes, slot] = best["decimal"].to_numpy(); book[codes, slot] = best["book"].to_numpy(dtype=object)
+    price[codes, slot] = best["price"].to_numpy(); line[codes, slot] = best["line"].to_numpy()
+    side[codes, slot] = best["side"].to_numpy(dtype=object)
+
+    # a market with a DRAW anywhere is three-way; every outcome must be quoted
+    has = ~np.isnan(dec)
+    three = pd.Series(has[:, 2]).groupby([uniq.get_level_values(0), uniq.get_level_values(1)]).transform("max").to_numpy()
+    complete = has[:, 0] & has[:, 1] & (has[:, 2] | ~three)
+    inv_sum = np.nansum(1.0 / dec, axis=1)
+    hit = complete & (inv_sum < 1.0) & ((1.0 / inv_sum - 1.0) >= min_profit)
+    if not hit.any():
+        return pd.DataFrame(columns=ARB_COLS)
+
+    stakes = equal_return_stakes(dec[hit], bankroll)
+    out = pd.DataFrame(uniq[hit].to_list(), columns=mk)
+    out["n_legs"] = has[hit].sum(axis=1)
+    out["inv_sum"] = inv_sum[hit]
+    out["profit_pct"] = 100.0 * (1.0 / inv_sum[hit] - 1.0)
+    for j in range(3):
+        out[f"leg{j+1}_side"] = side[hit, j]; out[f"leg{j+1}_line"] = line[hit, j]
+        out[f"leg{j+1}_book"] = book[hit, j]; out[f"leg{j+1}_price"] = price[hit, j]
+        out[f"leg{j+1}_stake"] = np.round(stakes[:, j], 2)
+    return out.sort_values("profit_pct", ascending=False).reset_index(drop=True)[ARB_COLS]
+
+# -------------------- middles --------------------
+
+def _sweep(a_g: np.ndarray, a_thresh: np.ndarray, b_g: np.ndarray, b_line: np.ndarray, b_dec: np.ndarray) -> np.ndarray:
+    """
+    For every `a` row find the best-priced `b` row of the same int group with b_line > a_thresh.
+    `b` is sorted once by (group, line); a suffix max of price per group plus a searchsorted on the
+    composite (group, line) key answers all queries. Returns positions into b, or -1.
+    """
+    order = np.lexsort((b_line, b_g))
+    g_s, l_s, d_s = b_g[order], b_line[order], b_dec[order]
+    n = len(order)
+
+    # suffix max (and where it sits) within each group, via a grouped cummax on the reversed arrays
+    rg, rd = g_s[::-1], d_s[::-1]
+    blk = np.cumsum(np.r_[True, rg[1:] != rg[:-1]])
+    rbest = pd.Series(rd).groupby(blk).cummax().to_numpy()
+    rarg = pd.Series(np.where(rd == rbest, np.arange(n), np.nan)).groupby(blk).ffill().to_numpy()
+    suf_arg = (n - 1 - rarg[::-1]).astype("int64")
+
+    # lines live in (-span/2, span/2), so group * span + line is monotonic over the sorted b rows
+    span = 2.0 * np.nanmax(np.abs(np.r_[l_s, a_thresh])) + 10.0
+    j = np.searchsorted(g_s * span + l_s, a_g * span + a_thresh, side="right")
+    ok = j < np.searchsorted(g_s, a_g, side="right")
+    return np.where(ok, order[suf_arg[np.minimum(j, n - 1)]], -1)
+
+def scan_middles(best: pd.DataFrame, bankroll: float = 100.0, min_width: float = 0.5) -> pd.DataFrame:
+    """
+    Spread middles: HOME h with AWAY a where a > -h (both win when -h < margin < a).
+    Total / prop middles: OVER o with UNDER u where u > o (both win when o < total < u).
+    Stakes equalize the return; miss_pnl is the cost when the result lands outside the window.
+    """
+    if best.empty:
+        return pd.DataFrame(columns=MIDDLE_COLS)
+    frames = []
+    specs = [
+        ("SPREAD", best["_market_norm"].eq("SPREADS") & best["side"].eq("HOME"),
+                   best["_market_norm"].eq("SPREADS") & best["side"].eq("AWAY"), True),
+        ("TOTAL", best["side"].eq("OVER"), best["side"].eq("UNDER"), False),
+    ]
+    for kind, a_mask, b_mask, negate in specs:
+        a = best[a_mask].reset_index(drop=True); b = best[b_mask].reset_index(drop=True)
+        if a.empty or b.empty:
+            continue
+        codes, _ = pd.factorize(pd.concat([a["_event"] + "|" + a["_market_norm"], b["_event"] + "|" + b["_market_norm"]], ignore_index=True))
+        a["_g"] = codes[: len(a)]; b["_g"] = codes[len(a):]
+        thresh = (-a["line"] if negate else a["line"]).to_numpy(dtype="float64")
+        j = _sweep(a["_g"].to_numpy(), thresh + min_width - 1e-9,
+                   b["_g"].to_numpy(), b["line"].to_numpy(dtype="float64"), b["decimal"].to_numpy())
+        hit = j >= 0
+        if not hit.any():
+            continue
+        A = a[hit].reset_index(drop=True); B = b.iloc[j[hit]].reset_index(drop=True)
+        m = pd.DataFrame({
+            "_event": A["_event"], "_market_norm": A["_market_norm"], "kind": kind,
+            "a_side": A["side"], "a_line": A["line"], "a_book": A["book"], "a_price": A["price"],
+            "b_side": B["side"], "b_line": B["line"], "b_book": B["book"], "b_price": B["price"],
+        })
+        m["window_lo"] = thresh[hit]; m["window_hi"] = B["line"].to_numpy()
+        m["width"] = m["window_hi"] - m["window_lo"]
+        dec = np.c_[A["decimal"].to_numpy(), B["decimal"].to_numpy()]
+        inv = (1.0 / dec).sum(axis=1)
+        st = equal_return_stakes(dec, bankroll)
+        m["inv_sum"] = inv
+        m["a_stake"] = np.round(st[:, 0], 2); m["b_stake"] = np.round(st[:, 1], 2)
+        m["miss_pnl"] = np.round(bankroll / inv - bankroll, 2)
+        m["hit_pnl"] = np.round(st[:, 0] * dec[:, 0] + st[:, 1] * dec[:, 1] - bankroll, 2)
+        m["is_arb"] = inv < 1.0
+        frames.append(m)
+    if not frames:
+        return pd.DataFrame(columns=MIDDLE_COLS)
+    return pd.concat(frames, ignore_index=True).sort_values(["width", "miss_pnl"], ascending=[False, False]).reset_index(drop=True)[MIDDLE_COLS]
+
+def scan(df: pd.DataFrame, bankroll: float = 100.0, min_profit: float = 0.0, min_width: float = 0.5) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Convenience: best-price reduction, then (arbs, middles)."""
+    best = best_quotes(df)
+    return scan_arbs(best, bankroll, min_profit), scan_middles(best, bankroll, min_width)
+
+# -------------------- CLI --------------------
+
+def main():
+    ap = argparse.ArgumentParser(description="Scan current quotes for arbitrage and middles across books.")
+    ap.add_argument("--input", default="", help="quotes CSV (default: exports/lines_live.csv)")
+    ap.add_argument("--bankroll", type=float, default=100.0)
+    ap.add_argument("--min-width", type=float, default=0.5, help="smallest middle window (points)")
+    args = ap.parse_args()
+    exp = exports_dir()
+    src = Path(args.input) if args.input else exp / "lines_live.csv"
+    if not src.exists():
+        print(f"[arb] {src} not found"); return
+    df = pd.read_csv(src, low_memory=False, encoding="utf-8-sig")
+    arbs, mids = scan(df, bankroll=args.bankroll, min_width=args.min_width)
+    arbs.to_csv(exp / "arbs.csv", index=False, encoding="utf-8-sig")
+    mids.to_csv(exp / "middles.csv", index=False, encoding="utf-8-sig")
+    print(f"[arb] quotes={len(df):,} arbs={len(arbs):,} middles={len(mids):,} -> {exp}")
+
+if __name__ == "__main__":
+    main()
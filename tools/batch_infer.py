@@ -0,0 +1,334 @@
+# tools/batch_infer.py
+# Chunked, process-parallel batch scoring for the parlay model.
+#
+# Candidate sets from combinatorial parlay generation do not fit in memory as one frame. The runner
+# streams the input (CSV or Parquet) in fixed-size chunks, builds the saved feature list from
+# parlay_model.meta.json as one float64 matrix per chunk, scores it in a worker process (the model
+# is loaded once per worker) and appends the scores to a Parquet (or CSV) writer in input order.
+# At most 2 x workers chunks are in flight, so memory stays bounded by the chunk size, not the input.
+# Reading and writing stay in the parent; --workers pays off once scoring dominates (trees, stacks),
+# for the logistic model one process is already parse-bound.
+#
+# Models saved as sklearn Pipelines (ColumnTransformer front end) are fed the chunk's DataFrame
+# with their numeric block coerced, as predict_parlay_score always did.
+#
+# --calibrate also writes parlay_proba_cal: each chunk's scores through the stored calibrators
+# (tools/calibrators, picked per row by market / season when the input has them), applied in the
+# parent as two table gathers per chunk.
+#
+#   python -m tools.batch_infer --input exports/parlay_candidates.csv --model-dir models/parlay \
+#       --out exports/parlay_scored.parquet --chunk-size 250000 --workers 4 [--calibrate]
+from __future__ import annotations
+
+import argparse
+import json
+import time
+import warnings
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Iterator
+
+import numpy as np
+import pandas as pd
+
+warnings.filterwarnings("ignore", category=UserWarning)
+warnings.filterwarnings("ignore", category=FutureWarning)
+
+MODEL_FILE = "parlay_model.joblib"
+META_FILE  = "parlay_model.meta.json"
+SCORE_COL  = "parlay_proba"
+CAL_COL    = SCORE_COL + "_cal"
+CAL_KEYS   = ["market", "season"]   # input columns the calibrators are picked by
+
+# odds columns the derived training features can be rebuilt from (same order as train_parlay)
+DEC_COLS = ["decimal_odds", "dec_odds", "price_dec", "price", "odds_dec"]
+AM_COLS  = ["american_odds", "odds", "price_am", "am_odds"]
+
+# -------------------- model --------------------
+
+def load_model(model_dir: str | Path, model_file: str = MODEL_FILE):
+    """
+    (estimator, meta). meta is {} for models saved without a sidecar. Served from the process-wide
+    warm cache (tools.model_server), so repeated runs in one process deserialize only on change.
+    """
+    from tools.model_server import get_server
+    model_dir = Path(model_dir)
+    lm = get_server().cache.get(model_dir if model_file == MODEL_FILE else model_dir / model_file)
+    meta = lm.meta
+    if not meta and (model_dir / META_FILE).exists():
+        meta = json.loads((model_dir / META_FILE).read_text(encoding="utf-8"))
+    return lm.model, meta
+
+def _is_pipeline(model) -> bool:
+    return hasattr(model, "named_steps")
+
+def _coerce_numeric_expected(pipe, df: pd.DataFrame) -> pd.DataFrame:
+    """Make sure numeric block columns are numeric, so median imputer won't choke."""
+    try:
+        pre = pipe.named_steps.get("pre") or pipe.named_steps.get("ct")
+    except Exception:
+        pre = None
+    num_cols = []
+    if pre is not None and hasattr(pre, "transformers_"):
+        for name, trans, cols in pre.transformers_:
+            if name in ("num", "numeric", "num_pipe"):
+                num_cols = list(cols)
+                break
+    for c in num_cols:
+        if c in df.columns:
+            df[c] = pd.to_numeric(df[c], errors="coerce")
+    return df
+
+def needed_columns(meta: dict) -> list[str]:
+    """Input columns the saved feature list can be built from."""
+    feats = list(meta.get("feature_cols") or [])
+    cols = [c for c in feats if c not in ("price_dec", "implied_prob", "dummy_zero")]
+    if "price_dec" in feats or "implied_prob" in feats:
+        cols += DEC_COLS + AM_COLS
+    return list(dict.fromkeys(cols))
+
+def _first(df: pd.DataFrame, names: list[str]) -> str | None:
+    return next((c for c in names if c in df.columns), None)
+
+def feature_matrix(df: pd.DataFrame, feature_cols: list[str]) -> np.ndarray:
+    """
+    Saved feature list -> float64 matrix, rebuilt the way train_parlay.prepare_dataframe built it:
+    price_dec from American odds when no decimal column exists, implied_prob = 1 / decimal,
+    missing / non-finite -> 0.0.
+    """
+    X = np.zeros((len(df), len(feature_cols)), dtype="float64")
+    dec = None
+    for j, c in enumerate(feature_cols):
+        if c in df.columns:
+            v = pd.to_numeric(df[c], errors="coerce").to_numpy(dtype="float64")
+        elif c in ("price_dec", "implied_prob"):
+            if dec is None:
+                src = _first(df, DEC_COLS)
+                if src is not None:
+                    dec = pd.to_numeric(df[src], errors="coerce").to_numpy(dtype="float64")
+                else:
+                    am = _first(df, AM_COLS)
+                    a = pd.to_numeric(df[am], errors="coerce").to_numpy(dtype="float64") if am else np.full(len(df), np.nan)
+                    with np.errstate(divide="ignore", invalid="ignore"):
+                        dec = np.where(a >= 100, 1.0 + a / 100.0, np.where(a <= -100, 1.0 + 100.0 / np.abs(a), np.nan))
+                    dec = np.where(dec > 1.0, dec, np.nan)
+            if c == "price_dec":
+                v = dec
+            else:
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    v = 1.0 / dec
+                v = np.where((v > 0) & (v < 1), v, np.nan)
+        else:
+            continue  # dummy_zero and anything absent stay 0.0
+        X[:, j] = v
+    X[~np.isfinite(X)] = 0.0
+    return X
+
+def score_frame(model, meta: dict, df: pd.DataFrame) -> np.ndarray:
+    if _is_pipeline(model) or not meta.get("feature_cols"):
+        return model.predict_proba(_coerce_numeric_expected(model, df))[:, 1]
+    return model.predict_proba(feature_matrix(df, meta["feature_cols"]))[:, 1]
+
+# -------------------- worker --------------------
+
+_MODEL = None
+_META: dict = {}
+
+def _init_worker(model_dir: str, model_file: str) -> None:
+    global _MODEL, _META
+    _MODEL, _META = load_model(model_dir, model_file)
+
+def _score_job(df: pd.DataFrame) -> np.ndarray:
+    return score_frame(_MODEL, _META, df).astype("float64")
+
+# -------------------- IO --------------------
+
+def read_chunks(path: str | Path, chunk_size: int, columns: list[str] | None = None) -> Iterator[pd.DataFrame]:
+    """Stream an input table in chunks of `chunk_size` rows; column names are stripped and lowercased."""
+    path = Path(path)
+    want = None if columns is None else {c.lower() for c in columns}
+    if path.suffix.lower() == ".parquet":
+        import pyarrow.parquet as pq
+        pf = pq.ParquetFile(path)
+        names = [n for n in pf.schema_arrow.names if want is None or n.strip().lower() in want]
+        for batch in pf.iter_batches(batch_size=chunk_size, columns=names):
+            df = batch.to_pandas()
+            df.columns = [c.strip().lower() for c in df.columns]
+            yield df
+        return
+    usecols = None if want is None else (lambda c: c.strip().lower() in want)
+    for df in pd.read_csv(path, chunksize=chunk_size, usecols=usecols, low_memory=False, encoding="utf-8-sig"):
+        df.columns = [c.strip().lower() for c in df.columns]
+        yield df
+
+def _normalize(df: pd.DataFrame) -> pd.DataFrame:
+    """Integers -> Int64, floats -> float64, everything else -> string, so per-chunk inference cannot drift far."""
+    out = {}
+    for c in df.columns:
+        s = df[c]
+        k = s.dtype.kind
+        out[c] = s.astype("Int64") if k in "iu" else s.astype("float64") if k == "f" else s.astype("string")
+    return pd.DataFrame(out, index=df.index)
+
+class ScoreWriter:
+    """
+    Append scored chunks to Parquet (row groups) or CSV. The first chunk fixes the Parquet schema;
+    later chunks are conformed to it (a column that turns textual or fractional where the schema says
+    numeric keeps only the values that still fit).
+    """
+    def __init__(self, out: str | Path):
+        self.out = Path(out)
+        self.out.parent.mkdir(parents=True, exist_ok=True)
+        self.parquet = self.out.suffix.lower() == ".parquet"
+        self._w = None
+        self._schema = None
+        self.rows = 0
+        if not self.parquet:
+            self.out.unlink(missing_ok=True)
+
+    def write(self, df: pd.DataFrame) -> None:
+        if self.parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            if self._w is None:
+                tbl = pa.Table.from_pandas(df, preserve_index=False)
+                self._schema = tbl.schema
+                self._w = pq.ParquetWriter(self.out, self._schema, compression="zstd")
+            else:
+                df = df.reindex(columns=self._schema.names)
+                for f in self._schema:
+                    if pa.types.is_integer(f.type) and not pd.api.types.is_integer_dtype(df[f.name]):
+                        v = pd.to_numeric(df[f.name], errors="coerce")
+                        df[f.name] = v.where(v == v.round()).astype("Int64")
+                    elif pa.types.is_floating(f.type) and df[f.name].dtype.kind not in "iuf":
+                        df[f.name] = pd.to_numeric(df[f.name], errors="coerce")
+                    elif pa.types.is_string(f.type) or pa.types.is_large_string(f.type):
+                        df[f.name] = df[f.name].astype("string")
+                tbl = pa.Table.from_pandas(df, schema=self._schema, preserve_index=False)
+            self._w.write_table(tbl)
+        else:
+            df.to_csv(self.out, mode="a", header=self.rows == 0, index=False)
+        self.rows += len(df)
+
+    def close(self) -> None:
+        if self._w is not None:
+            self._w.close()
+
+# -------------------- runner --------------------
+
+def peak_rss_mb() -> float | None:
+    """Peak resident set size of this process plus its (finished) workers, in MB."""
+    try:
+        import resource, sys
+        scale = 1.0 if sys.platform == "darwin" else 1024.0  # bytes on macOS, KiB elsewhere
+        own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+        kids = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale
+        return round((own + kids) / 2**20, 1)
+    except ImportError:
+        pass
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        return round(getattr(info, "peak_wset", info.rss) / 2**20, 1)
+    except ImportError:
+        return None
+
+def run(
+    input_path: str | Path,
+    model_dir: str | Path,
+    out: str | Path | None = None,
+    model_file: str = MODEL_FILE,
+    chunk_size: int = 200_000,
+    workers: int = 1,
+    keep: list[str] | None = None,
+    on_chunk: Callable[[pd.DataFrame, np.ndarray], None] | None = None,
+    verbose: bool = True,
+    calibrate: bool = False,
+    cal_store: str | Path | None = None,
+) -> dict:
+    """
+    Score `input_path` chunk by chunk. `keep` limits the passthrough columns written next to the
+    score (default: all input columns). `on_chunk(df, proba)` sees every chunk in order, e.g. to
+    accumulate evaluation stats without writing anything. calibrate=True adds CAL_COL from the
+    calibrators stored under `cal_store` (default exports/calibration). Returns throughput / memory stats.
+    """
+    model, meta = load_model(model_dir, model_file)
+    cal = None
+    if calibrate:
+        from tools.calibrators import CalibratorSet
+        cal = CalibratorSet.load(Path(cal_store) if cal_store else None)
+    columns = None
+    if keep is not None and meta.get("feature_cols") and not _is_pipeline(model):
+        columns = list(dict.fromkeys([k.lower() for k in keep] + needed_columns(meta) + (CAL_KEYS if cal else [])))
+    writer = ScoreWriter(out) if out else None
+    t0 = time.perf_counter()
+    n = 0
+
+    def _emit(df: pd.DataFrame, p: np.ndarray) -> None:
+        nonlocal n
+        n += len(df)
+        if on_chunk is not None:
+            on_chunk(df, p)
+        if writer is not None:
+            cols = list(df.columns) if keep is None else [c for c in (k.lower() for k in keep) if c in df.columns]
+            out = {SCORE_COL: p} if cal is None else {SCORE_COL: p, CAL_COL: cal.apply_scores(p, df)}
+            writer.write(_normalize(df[cols]).assign(**out))
+        if verbose:
+            dt = time.perf_counter() - t0
+            print(f"[batch_infer] {n:,} rows  {n / dt:,.0f} rows/s", flush=True)
+
+    chunks = read_chunks(input_path, chunk_size, columns)
+    try:
+        if workers <= 1:
+            for df in chunks:
+                _emit(df, score_frame(model, meta, df))
+        else:
+            del model  # workers hold their own copy
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(str(model_dir), model_file)) as ex:
+                pending: deque = deque()
+                for df in chunks:
+                    pending.append((df, ex.submit(_score_job, df)))
+                    if len(pending) >= 2 * workers:
+                        d, f = pending.popleft(); _emit(d, f.result())
+                while pending:
+                    d, f = pending.popleft(); _emit(d, f.result())
+    finally:
+        if writer is not None:
+            writer.close()
+
+    dt = time.perf_counter() - t0
+    return {"rows": n, "seconds": round(dt, 2), "rows_per_sec": round(n / dt, 1) if dt > 0 else None,
+            "peak_rss_mb": peak_rss_mb(), "workers": workers, "chunk_size": chunk_size, "calibrated": cal is not None}
+
+def report(stats: dict, tag: str = "batch_infer") -> None:
+    rss = f"{stats['peak_rss_mb']:,.1f} MB" if stats.get("peak_rss_mb") is not None else "n/a"
+    print(f"[{tag}] rows={stats['rows']:,} in {stats['seconds']}s -> {stats['rows_per_sec'] or 0:,.0f} rows/s "
+          f"(workers={stats['workers']}, chunk={stats['chunk_size']:,}); peak RSS {rss}")
+
+def add_cli_args(ap: argparse.ArgumentParser) -> None:
+    ap.add_argument("--chunk-size", type=int, default=200_000, help="rows per chunk")
+    ap.add_argument("--workers", type=int, default=1, help="scoring processes")
+
+# -------------------- CLI --------------------
+
+def main():
+    ap = argparse.ArgumentParser(description="Stream-score a large candidate table with the saved parlay model.")
+    ap.add_argument("--input", required=True, help="CSV or Parquet candidates")
+    ap.add_argument("--model-dir", required=True)
+    ap.add_argument("--model-file", default=MODEL_FILE)
+    ap.add_argument("--out", required=True, help=".parquet (row groups per chunk) or .csv")
+    ap.add_argument("--keep", default="", help="comma list of passthrough columns (default: all)")
+    ap.add_argument("--calibrate", action="store_true", help=f"also write {CAL_COL} through the stored calibrators")
+    ap.add_argument("--cal-store", default=None, help="calibrator folder (default exports/calibration)")
+    add_cli_args(ap)
+    args = ap.parse_args()
+    keep = [c.strip() for c in args.keep.split(",") if c.strip()] or None
+    stats = run(args.input, args.model_dir, args.out, args.model_file, args.chunk_size, args.workers, keep,
+                calibrate=args.calibrate, cal_store=args.cal_store)
+    report(stats)
+    print(f"[batch_infer] wrote {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+# tools/bench_startup.py
+# Cold-start benchmark for the Streamlit pages: every page runs once in a fresh interpreter through
+# Streamlit's AppTest harness (no browser, no server), so the number is a true first paint for that
+# process: interpreter + streamlit + page imports + the page body.
+#
+#   wall       measured around the subprocess (what a user waits for on a cold worker)
+#   boot / import / render
+#              the page's own record from app.bootstrap (EDGE_PAGE_TIMINGS), present when the
+#              script reached page.rendered() (pages that st.stop() early report wall only)
+#   budget     --budget seconds for every page, --budgets JSON {"10_Edge_Scanner": 4.0, ...} for
+#              per-page overrides; the exit code is 1 when any page is over budget or fails
+#
+#   python -m tools.bench_startup [--pages "0*,10_*"] [--budget 3.0] [--budgets budgets.json] [--out bench.csv]
+from __future__ import annotations
+
+import argparse
+import fnmatch
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+REPO = Path(__file__).resolve().parents[1]
+APP_DIR = REPO / "serving_ui" / "app"
+PAGES_DIR = APP_DIR / "pages"
+DEFAULT_BUDGET_S = 3.0
+
+_RUNNER = """
+import sys
+from streamlit.testing.v1 import AppTest
+compile(open(sys.argv[1], encoding="utf-8").read(), sys.argv[1], "exec")  # AppTest swallows syntax errors
+at = AppTest.from_file(sys.argv[1], default_timeout=float(sys.argv[2]))
+at.run()
+errs = [e.value for e in at.exception]
+print("\\n".join(map(str, errs)), file=sys.stderr)
+sys.exit(3 if errs else 0)
+"""
+
+def discover(patterns: list[str] | None = None) -> list[Path]:
+    """Page scripts Streamlit would list (pages/*.py) plus Home.py, filtered by name globs."""
+    pages = [APP_DIR / "Home.py"] + sorted(PAGES_DIR.glob("*.py"))
+    pages = [p for p in pages if p.exists() and not p.name.startswith("_")]
+    if patterns:
+        pages = [p for p in pages if any(fnmatch.fnmatch(p.stem, pat) or fnmatch.fnmatch(p.name, pat) for pat in patterns)]
+    return pages
+
+def run_page(page: Path, timeout: float = 60.0) -> dict:
+    """Run one page cold; wall time plus the bootstrap's own record when the page got that far."""
+    with tempfile.NamedTemporaryFile("w+", suffix=".jsonl", delete=False) as fh:
+        log = Path(fh.name)
+    env = dict(os.environ, EDGE_PAGE_TIMINGS=str(log),
+               PYTHONPATH=os.pathsep.join([str(APP_DIR.parent), str(REPO), os.environ.get("PYTHONPATH", "")]).rstrip(os.pathsep))
+    t = time.perf_counter()
+    try:
+        proc = subprocess.run([sys.executable, "-c", _RUNNER, str(page), str(timeout)], cwd=REPO, env=env,
+                              capture_output=True, text=True, timeout=timeout + 30)
+        rc, err = proc.returncode, proc.stderr.strip()
+    except subprocess.TimeoutExpired:
+        rc, err = -1, f"timed out after {timeout:.0f}s"
+    wall = time.perf_counter() - t
+    rec = {}
+    try:
+        lines = log.read_text(encoding="utf-8").splitlines()
+        rec = json.loads(lines[-1]) if lines else {}
+    except (OSError, ValueError):
+        pass
+    finally:
+        log.unlink(missing_ok=True)
+    return {
+        "page": page.stem,
+        "wall_s": round(wall, 3),
+        "boot_s": rec.get("boot_s"),
+        "import_s": rec.get("import_s"),
+        "render_s": rec.get("render_s"),
+        "ok": rc == 0,
+        "error": "" if rc == 0 else (err.splitlines()[-1] if err else f"exit {rc}")[:160],
+    }
+
+def bench(pages: list[Path], budget: float = DEFAULT_BUDGET_S, budgets: dict | None = None,
+          timeout: float = 60.0) -> pd.DataFrame:
+    budgets = budgets or {}
+    rows = []
+    for p in pages:
+        r = run_page(p, timeout)
+        r["budget_s"] = float(budgets.get(p.stem, budget))
+        r["over"] = r["wall_s"] > r["budget_s"]
+        rows.append(r)
+        print(f"[bench] {r['page']:<32} {r['wall_s']:6.2f}s / {r['budget_s']:.1f}s"
+              f"{'  OVER' if r['over'] else ''}{'' if r['ok'] else '  FAILED: ' + r['error']}", flush=True)
+    return pd.DataFrame(rows)
+
+# -------------------- CLI --------------------
+
+def main():
+    ap = argparse.ArgumentParser(description="Cold-start time of every Streamlit page against a budget.")
+    ap.add_argument("--pages", default="", help="comma list of name globs, e.g. '09_*,10_Edge_Scanner' (default: all)")
+    ap.add_argument("--budget", type=float, default=DEFAULT_BUDGET_S, help="seconds per page")
+    ap.add_argument("--budgets", type=Path, default=None, help='JSON {"page_stem": seconds} overrides')
+    ap.add_argument("--timeout", type=float, default=60.0)
+    ap.add_argument("--out", type=Path, default=None, help="write the results CSV here")
+    args = ap.parse_args()
+
+    try:
+        import streamlit.testing.v1  # noqa: F401
+    except ImportError:
+        print("[bench] streamlit (with streamlit.testing) is required: pip install streamlit")
+        sys.exit(2)
+    pats = [s.strip() for s in args.pages.split(",") if s.strip()] or None
+    pages = discover(pats)
+    if not pages:
+        print("[bench] no pages matched")
+        sys.exit(2)
+    budgets = json.loads(args.budgets.read_text(encoding="utf-8")) if args.budgets else {}
+    res = bench(pages, args.budget, budgets, args.timeout)
+    if args.out:
+        res.to_csv(args.out, index=False)
+    bad = res[res["over"] | ~res["ok"]]
+    print(f"[bench] {len(res)} pages, median {res['wall_s'].median():.2f}s, slowest {res['wall_s'].max():.2f}s; "
+          f"{int(res['over'].sum())} over budget, {int((~res['ok']).sum())} failed")
+    sys.exit(1 if len(bad) else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,311 @@
+# tools/best_price.py
+# Incrementally maintained best-price index across books.
+#
+# Keyed on (game, market, side, line). Each key keeps the current quote of every book and a cached
+# top-K (best decimal price first, with the quote timestamp). update() only touches the keys whose
+# quotes actually changed, so the cost of a snapshot is proportional to the changed rows.
+# Keys are also kept in a sorted list, which serves point lookups and line-range lookups by bisect.
+#
+# A snapshot is authoritative for the (game, market) pairs it covers: a book that no longer quotes a
+# key there has pulled it and is evicted. Games with no quote newer than `max_age_h` hours before the
+# snapshot (kicked off, taken down) are evicted whole, so a dead line never keeps "winning".
+#
+# Persistence is an append-only journal of changed quotes (exports/best_price_quotes.csv); evictions
+# are journaled as tombstones (empty price). The index stays in memory across captures of one process
+# (capture_scheduler), so a capture applies its batch only; a cold process replays the journal once,
+# and the journal is compacted to the live quotes whenever it outgrows them by COMPACT_RATIO.
+from __future__ import annotations
+
+import argparse
+import bisect
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from tools.pathing import exports_dir
+from tools.fair_price import american_to_decimal, canon_quotes
+
+JOURNAL_CSV = "best_price_quotes.csv"
+JOURNAL_COLS = ["_game", "_market_norm", "side", "line", "book", "price", "decimal", "ts"]
+TOP_COLS = ["_game", "_market_norm", "side", "line", "rank", "book", "price", "decimal", "ts"]
+MAX_AGE_H = 6.0
+COMPACT_RATIO = 4
+COMPACT_MIN_ROWS = 20_000
+
+# index kept per (journal path, k) with the journal size it matches: a capture reuses it unless
+# another process appended to / compacted the journal since
+_LIVE: dict[tuple[str, int], tuple["BestPriceIndex", int]] = {}
+
+# -------------------- helpers --------------------
+
+def _quotes_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Canonical quotes with a float line (0.0 for moneylines), decimal price and an ISO ts."""
+    q = canon_quotes(df)
+    q["line"] = q["line"].fillna(0.0).astype("float64")
+    q["decimal"] = american_to_decimal(q["price"])
+    ts = None
+    for c in ("_snapshot_ts_utc", "asof_ts", "pulled_ts", "ts"):
+        if c in df.columns:
+            ts = pd.to_datetime(df[c], errors="coerce", utc=True)
+            break
+    if ts is None:
+        ts = pd.Series(pd.Timestamp.now(tz="UTC"), index=df.index)
+    q["ts"] = ts.dt.strftime("%Y-%m-%dT%H:%M:%SZ").fillna("")
+    ok = q["decimal"].gt(1.0) & q["book"].ne("") & q["side"].ne("") & q["_market_norm"].ne("")
+    return q.loc[ok, JOURNAL_COLS]
+
+def top_k(quotes: pd.DataFrame, k: int = 3) -> pd.DataFrame:
+    """Vectorized top-K books per key from a quotes frame (one sort, grouped cumcount)."""
+    if quotes.empty:
+        return pd.DataFrame(columns=TOP_COLS)
+    key = ["_game", "_market_norm", "side", "line"]
+    d = quotes.sort_values(key + ["decimal", "book"], ascending=[True] * len(key) + [False, True], kind="stable")
+    d = d.assign(rank=d.groupby(key, sort=False).cumcount() + 1)
+    return d[d["rank"] <= k][TOP_COLS].reset_index(drop=True)
+
+# -------------------- index --------------------
+
+class BestPriceIndex:
+    """
+    In-memory best-price index. `quotes[key][book] = (decimal, price, ts)`; `top[key]` holds the
+    cached top-K as a list of (decimal, book, price, ts) tuples, best first.
+    """
+
+    def __init__(self, k: int = 3):
+        self.k = int(k)
+        self.quotes: dict[tuple, dict[str, tuple]] = {}
+        self.top: dict[tuple, list[tuple]] = {}
+        self._keys: list[tuple] = []  # sorted (game, market, side, line)
+        self._game_ts: dict[str, str] = {}  # newest quote ts per game (ISO strings compare as times)
+        self.journal_rows = 0
+
+    def __len__(self) -> int:
+        return len(self.top)
+
+    def _rerank(self, key: tuple) -> None:
+        books = self.quotes[key]
+        ranked = sorted(((v[0], b, v[1], v[2]) for b, v in books.items()), key=lambda r: (-r[0], r[1]))
+        self.top[key] = ranked[: self.k]
+
+    def _keys_of(self, *prefix) -> list[tuple]:
+        lo = bisect.bisect_left(self._keys, prefix)
+        hi = bisect.bisect_left(self._keys, prefix[:-1] + (prefix[-1] + "\x00",))
+        return self._keys[lo:hi]
+
+    def _drop_key(self, key: tuple) -> None:
+        i = bisect.bisect_left(self._keys, key)
+        if i < len(self._keys) and self._keys[i] == key:
+            del self._keys[i]
+        self.quotes.pop(key, None); self.top.pop(key, None)
+
+    def update(self, df: pd.DataFrame, max_age_h: float | None = MAX_AGE_H) -> pd.DataFrame:
+        """
+        Fold a snapshot (any quotes schema) into the index. Returns the journal rows for it: quotes that
+        changed plus tombstones (empty price) for pulled / aged-out quotes. Only keys of the games in the
+        snapshot are visited, plus one pass over the per-game timestamps for the age check.
+        """
+        q = _quotes_frame(df).drop_duplicates(["_game", "_market_norm", "side", "line", "book"], keep="last")
+        if q.empty:
+            return pd.DataFrame(columns=JOURNAL_COLS)
+        rows = []
+        touched = set()
+        for g, m, s, ln, b, p, dec, ts in q.itertuples(index=False, name=None):
+            key = (g, m, s, ln)
+            if ts > self._game_ts.get(g, ""):
+                self._game_ts[g] = ts
+            books = self.quotes.get(key)
+            if books is None:
+                books = self.quotes[key] = {}
+                bisect.insort(self._keys, key)
+            cur = books.get(b)
+            if cur is not None and cur[1] == p:
+                continue
+            books[b] = (dec, p, ts)
+            touched.add(key)
+            rows.append((g, m, s, ln, b, p, dec, ts))
+
+        # pulled: within a (game, market) the snapshot covers, anything it no longer quotes
+        now = q["ts"].max()
+        quoted = set(zip(q["_game"], q["_market_norm"], q["side"], q["line"], q["book"]))
+        for g, m in q[["_game", "_market_norm"]].drop_duplicates().itertuples(index=False, name=None):
+            for key in self._keys_of(g, m):
+                gone = [b for b in self.quotes[key] if (*key, b) not in quoted]
+                for b in gone:
+                    del self.quotes[key][b]
+                    rows.append((*key, b, np.nan, np.nan, now))
+                if gone:
+                    touched.add(key)
+        for key in touched:
+            if self.quotes.get(key):
+                self._rerank(key)
+            else:
+                self._drop_key(key)
+
+        # aged out: games with nothing newer than the cutoff
+        if max_age_h is not None and now:
+            cutoff = (pd.Timestamp(now) - pd.Timedelta(hours=max_age_h)).strftime("%Y-%m-%dT%H:%M:%SZ")
+            for g in [g for g, t in self._game_ts.items() if t and t < cutoff]:
+                rows.extend(self.remove_game(g, ts=now))
+        return pd.DataFrame(rows, columns=JOURNAL_COLS)
+
+    def remove_game(self, game: str, ts: str = "") -> list[tuple]:
+        """Drop every key of a game (e.g. after kickoff). Returns the tombstone rows for the journal."""
+        rows = []
+        for key in self._keys_of(game):
+            rows.extend((*key, b, np.nan, np.nan, ts) for b in self.quotes.get(key, {}))
+            self._drop_key(key)
+        self._game_ts.pop(game, None)
+        return rows
+
+    # -------- lookups --------
+
+    def best(self, game: str, market: str, side: str, line: float = 0.0) -> list[dict]:
+        """Point lookup: top-K quotes for one key (empty list when unknown)."""
+        return [
+            {"book": b, "price": p, "decimal": d, "ts": ts, "rank": i + 1}
+            for i, (d, b, p, ts) in enumerate(self.top.get((game, market, side, float(line)), []))
+        ]
+
+    def range(self, game: str, market: str | None = None, side: str | None = None,
+              lo: float = -np.inf, hi: float = np.inf) -> pd.DataFrame:
+        """
+        Range lookup over the sorted keys: every line in [lo, hi] for a game, optionally narrowed to
+        a market and side. Returns the top-K rows of each matching key.
+        """
+        prefix = tuple(x for x in (game, market, side) if x is not None)
+        if len(prefix) == 3:
+            start = bisect.bisect_left(self._keys, prefix + (lo,))
+        else:
+            start = bisect.bisect_left(self._keys, prefix)
+        rows = []
+        for key in self._keys[start:]:
+            if key[: len(prefix)] != prefix:
+                break
+            if not (lo <= key[3] <= hi):
+                continue
+            for i, (d, b, p, ts) in enumerate(self.top.get(key, [])):
+                rows.append((*key, i + 1, b, p, d, ts))
+        return pd.DataFrame(rows, columns=TOP_COLS)
+
+    def to_frame(self) -> pd.DataFrame:
+        """Flattened top-K for all keys, in key order."""
+        rows = [(*key, i + 1, b, p, d, ts) for key in self._keys for i, (d, b, p, ts) in enumerate(self.top.get(key, []))]
+        return pd.DataFrame(rows, columns=TOP_COLS)
+
+    def live_quotes(self) -> pd.DataFrame:
+        rows = [(*key, b, v[1], v[0], v[2]) for key in self._keys for b, v in self.quotes[key].items()]
+        return pd.DataFrame(rows, columns=JOURNAL_COLS)
+
+    @classmethod
+    def from_quotes(cls, quotes: pd.DataFrame, k: int = 3) -> "BestPriceIndex":
+        """Build from live quotes (journal schema) with one vectorized top-K pass."""
+        idx = cls(k=k)
+        if quotes.empty:
+            return idx
+        for g, m, s, ln, b, p, dec, ts in quotes[JOURNAL_COLS].itertuples(index=False, name=None):
+            idx.quotes.setdefault((g, m, s, ln), {})[b] = (dec, p, ts)
+            if ts > idx._game_ts.get(g, ""):
+                idx._game_ts[g] = ts
+        idx._keys = sorted(idx.quotes)
+        top = top_k(quotes, k=k)
+        for g, m, s, ln, _r, b, p, dec, ts in top.itertuples(index=False, name=None):
+            idx.top.setdefault((g, m, s, ln), []).append((dec, b, p, ts))
+        return idx
+
+# -------------------- persistence --------------------
+
+def _read_raw(path: Path) -> pd.DataFrame:
+    if not path.exists() or path.stat().st_size == 0:
+        return pd.DataFrame(columns=JOURNAL_COLS)
+    j = pd.read_csv(path, low_memory=False, encoding="utf-8-sig",
+                    dtype={"_game": "string", "_market_norm": "string", "side": "string", "book": "string", "ts": "string"})
+    for c in ("_game", "_market_norm", "side", "book", "ts"):
+        j[c] = j[c].fillna("").astype(str)
+    j["line"] = pd.to_numeric(j["line"], errors="coerce").fillna(0.0).astype("float64")
+    j["price"] = pd.to_numeric(j["price"], errors="coerce")
+    j["decimal"] = american_to_decimal(j["price"])
+    return j
+
+def _live_quotes(raw: pd.DataFrame) -> pd.DataFrame:
+    """Last journal row per key/book, tombstones (empty price) dropped."""
+    j = raw.drop_duplicates(["_game", "_market_norm", "side", "line", "book"], keep="last")
+    return j[j["price"].notna()].reset_index(drop=True)
+
+def _read_journal(path: Path) -> pd.DataFrame:
+    return _live_quotes(_read_raw(path))
+
+def _write_journal(path: Path, quotes: pd.DataFrame) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    quotes[JOURNAL_COLS].to_csv(tmp, index=False, encoding="utf-8-sig")
+    tmp.replace(path)
+
+def _size(path: Path) -> int:
+    try:
+        return path.stat().st_size
+    except OSError:
+        return 0
+
+def load_index(exp: Path | None = None, k: int = 3) -> BestPriceIndex:
+    """Replay the journal into an index (last quote per key/book wins, tombstones removed)."""
+    exp = exp or exports_dir()
+    raw = _read_raw(exp / JOURNAL_CSV)
+    idx = BestPriceIndex.from_quotes(_live_quotes(raw), k=k)
+    idx.journal_rows = len(raw)
+    return idx
+
+def update_best_price_index(exp: Path | None = None, quotes: pd.DataFrame | None = None,
+                            index: BestPriceIndex | None = None, k: int = 3,
+                            max_age_h: float | None = MAX_AGE_H) -> BestPriceIndex:
+    """
+    Apply one snapshot to the index and append only its journal rows. Without `index`, the process
+    keeps the index from its previous capture (reloading only if the journal changed underneath).
+    """
+    exp = exp or exports_dir()
+    path = exp / JOURNAL_CSV
+    slot = (str(path), int(k))
+    if index is None:
+        cached = _LIVE.get(slot)
+        index = cached[0] if cached and cached[1] == _size(path) else load_index(exp, k=k)
+    if quotes is None:
+        live = exp / "lines_live.csv"
+        if not live.exists() or live.stat().st_size == 0:
+            return index
+        quotes = pd.read_csv(live, low_memory=False, encoding="utf-8-sig")
+    changed = index.update(quotes, max_age_h=max_age_h)
+    if not changed.empty:
+        changed.to_csv(path, mode="a", header=not path.exists(), index=False, encoding="utf-8-sig")
+        index.journal_rows += len(changed)
+    n_live = sum(len(b) for b in index.quotes.values())
+    if index.journal_rows > max(COMPACT_MIN_ROWS, COMPACT_RATIO * n_live):
+        _write_journal(path, index.live_quotes())
+        index.journal_rows = n_live
+    _LIVE[slot] = (index, _size(path))
+    return index
+
+def compact(exp: Path | None = None) -> int:
+    """Rewrite the journal to the live quotes only. Returns the number of rows kept."""
+    exp = exp or exports_dir()
+    live = _read_journal(exp / JOURNAL_CSV)
+    _write_journal(exp / JOURNAL_CSV, live)
+    return len(live)
+
+# -------------------- CLI --------------------
+
+def main():
+    ap = argparse.ArgumentParser(description="Update / query the best-price index.")
+    ap.add_argument("--k", type=int, default=3, help="books kept per key")
+    ap.add_argument("--compact", action="store_true", help="rewrite the journal to live quotes")
+    ap.add_argument("--game", default="", help="print the index rows for one game id / key")
+    args = ap.parse_args()
+    exp = exports_dir()
+    if args.compact:
+        print(f"[best_price] compacted journal -> {compact(exp):,} live quotes")
+        return
+    idx = update_best_price_index(exp, k=args.k)
+    print(f"[best_price] {len(idx):,} keys indexed")
+    if args.game:
+        print(idx.range(args.game).to_string(index=False))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+# tools/calib_stats.py
+# Streaming calibration / scoring-rule analytics for master_likes.
+#
+# Instead of re-scanning the whole master on every page rerun, settled rows are folded once into
+# binned sufficient statistics per segment:
+#
+#   key  = (market, season, week, book, model_name, bin)      bin = floor(model_prob * N_BINS)
+#   sums = n, Σp, Σy, Σp², Σp·y, Σ log-loss
+#
+# Everything the analytics pages show is a sum of those: reliability curve (Σp/n vs Σy/n per bin,
+# coarser curves by merging adjacent bins), Brier = (Σp² - 2Σpy + Σy)/n since y² = y, log loss,
+# ECE. A slice is a boolean mask over a table that is at most one row per segment x bin, so any
+# filter combination reads in milliseconds.
+#
+# Incremental: every ingested row's identity hash is kept (seen.npy); update() only folds rows not
+# seen before, so re-running after a backfill adds just the newly settled picks. Changed outcomes on
+# already-counted rows need --rebuild.
+#
+#   <store>/stats.parquet   segment x bin sums
+#   <store>/seen.npy        sorted uint64 row hashes already counted
+#
+#   python -m tools.calib_stats --master serving_ui/data/master_likes.parquet [--rebuild]
+from __future__ import annotations
+
+import argparse
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+N_BINS = 20
+EPS = 1e-9
+KEYS = ["market", "season", "week", "book", "model_name"]
+SUMS = ["n", "sum_p", "sum_y", "sum_p2", "sum_py", "sum_ll"]
+ID_COLS = ["game_id", "market", "side", "book", "model_name", "line_at_pick", "timestamp"]
+STATS_FILE = "stats.parquet"
+SEEN_FILE = "seen.npy"
+
+def store_for(master_path: Path) -> Path:
+    """Default store location: a calibration/ folder next to the master file."""
+    return Path(master_path).parent / "calibration"
+
+# -------------------- fold --------------------
+
+def _settled(df: pd.DataFrame) -> pd.DataFrame:
+    if "model_prob" not in df.columns or "hit_bool" not in df.columns:
+        return df.iloc[0:0]
+    p = pd.to_numeric(df["model_prob"], errors="coerce")
+    y = pd.to_numeric(df["hit_bool"], errors="coerce")
+    return df[p.notna() & y.notna()]
+
+def row_ids(df: pd.DataFrame) -> np.ndarray:
+    """uint64 identity per row from the pick-identifying columns present (dtype-sensitive, like the master)."""
+    cols = [c for c in ID_COLS if c in df.columns] or list(df.columns)
+    return pd.util.hash_pandas_object(df[cols], index=False).to_numpy(dtype=np.uint64)
+
+def _keys(df: pd.DataFrame) -> pd.DataFrame:
+    out = pd.DataFrame(index=df.index)
+    for c in KEYS:
+        if c in ("season", "week"):
+            v = pd.to_numeric(df[c], errors="coerce") if c in df.columns else pd.Series(np.nan, index=df.index)
+            out[c] = v.fillna(-1).astype("int64")
+        else:
+            v = df[c].astype("string") if c in df.columns else pd.Series(pd.NA, index=df.index, dtype="string")
+            out[c] = v.fillna("").astype(object)
+    return out
+
+def aggregate(df: pd.DataFrame) -> pd.DataFrame:
+    """Segment x bin sums for the settled rows of `df` (rows without model_prob / hit_bool are ignored)."""
+    df = _settled(df)
+    if df.empty:
+        return _empty()
+    p = pd.to_numeric(df["model_prob"], errors="coerce").to_numpy(dtype="float64")
+    y = pd.to_numeric(df["hit_bool"], errors="coerce").to_numpy(dtype="float64")
+    pc = np.clip(p, EPS, 1 - EPS)
+    w = _keys(df)
+    w["bin"] = np.clip(np.floor(p * N_BINS), 0, N_BINS - 1).astype("int64")
+    w["n"] = 1
+    w["sum_p"], w["sum_y"], w["sum_p2"], w["sum_py"] = p, y, p * p, p * y
+    w["sum_ll"] = -(y * np.log(pc) + (1 - y) * np.log(1 - pc))
+    return w.groupby(KEYS + ["bin"], sort=False, dropna=False)[SUMS].sum().reset_index()
+
+def _empty() -> pd.DataFrame:
+    cols = {c: pd.Series(dtype="int64" if c in ("season", "week", "bin", "n") else object) for c in KEYS + ["bin"]}
+    cols.update({c: pd.Series(dtype="int64" if c == "n" else "float64") for c in SUMS})
+    return pd.DataFrame(cols)
+
+def _merge(a: pd.DataFrame, b: pd.DataFrame) -> pd.DataFrame:
+    if a.empty:
+        return b.reset_index(drop=True)
+    if b.empty:
+        return a
+    return pd.concat([a, b], ignore_index=True).groupby(KEYS + ["bin"], sort=False)[SUMS].sum().reset_index()
+
+# -------------------- scores from sums --------------------
+
+def _scores(s: pd.DataFrame) -> pd.DataFrame:
+    """Per-row scores from summed columns (s may be grouped or a single total row)."""
+    n = s["n"].astype("float64").where(s["n"] > 0)
+    out = pd.DataFrame(index=s.index)
+    out["n"] = s["n"].astype("int64")
+    out["mean_p"] = s["sum_p"] / n
+    out["hit_rate"] = s["sum_y"] / n
+    out["brier"] = (s["sum_p2"] - 2 * s["sum_py"] + s["sum_y"]) / n
+    out["log_loss"] = s["sum_ll"] / n
+    return out
+
+class CalibrationStats:
+    """Binned calibration sums for one master file; see the module header."""
+
+    def __init__(self, root: Path | None = None):
+        self.root = Path(root) if root is not None else None
+        self.table = _empty()
+        self.seen = np.empty(0, dtype=np.uint64)
+        if self.root is not None and (self.root / STATS_FILE).exists():
+            self.table = pd.read_parquet(self.root / STATS_FILE)
+            seen = self.root / SEEN_FILE
+            self.seen = np.load(seen) if seen.exists() else self.seen
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "CalibrationStats":
+        """In-memory stats (nothing persisted), e.g. for an uploaded master."""
+        cs = cls()
+        cs.update(df)
+        return cs
+
+    def reset(self) -> None:
+        self.table = _empty()
+        self.seen = np.empty(0, dtype=np.uint64)
+
+    def update(self, df: pd.DataFrame) -> int:
+        """Fold settled rows not counted before; returns how many were added."""
+        df = _settled(df)
+        if df.empty:
+            return 0
+        ids = row_ids(df)
+        # duplicates inside the batch count once, like they would across batches
+        _, first = np.unique(ids, return_index=True)
+        keep = np.zeros(len(ids), dtype=bool)
+        keep[first] = True
+        keep &= ~np.isin(ids, self.seen, assume_unique=False)
+        if not keep.any():
+            return 0
+        self.table = _merge(self.table, aggregate(df[keep]))
+        self.seen = np.union1d(self.seen, ids[keep])
+        return int(keep.sum())
+
+    def save(self) -> None:
+        if self.root is None:
+            return
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self.root / (STATS_FILE + ".tmp")
+        self.table.to_parquet(tmp, index=False)
+        tmp.replace(self.root / STATS_FILE)
+        tmp = self.root / (SEEN_FILE + ".tmp.npy")
+        np.save(tmp, self.seen)
+        tmp.replace(self.root / SEEN_FILE)
+
+    # ---- reads ----
+
+    def slice(self, **filters) -> pd.DataFrame:
+        """
+        Rows of the sums table matching `filters` (column -> allowed values; None / empty = all).
+        season/week compare numerically, the rest as strings.
+        """
+        t = self.table
+        mask = np.ones(len(t), dtype=bool)
+        for col, vals in filters.items():
+            if vals is None or (hasattr(vals, "__len__") and not isinstance(vals, str) and len(vals) == 0):
+                continue
+            vals = [vals] if isinstance(vals, (str, int, float)) else list(vals)
+            if col in ("season", "week"):
+                vals = pd.to_numeric(pd.Series(vals), errors="coerce").dropna().astype("int64").tolist()
+            else:
+                vals = [str(v) for v in vals]
+            mask &= t[col].isin(vals).to_numpy()
+        return t[mask]
+
+    def reliability(self, n_bins: int = 10, **filters) -> pd.DataFrame:
+        """bin_low, bin_high, pred, actual, count over fixed-width bins of [0, 1]; empty bins dropped."""
+        if N_BINS % n_bins:
+            raise ValueError(f"n_bins must divide {N_BINS}")
+        s = self.slice(**filters)
+        g = (s["bin"] // (N_BINS // n_bins)).rename("b")
+        agg = s[["n", "sum_p", "sum_y"]].groupby(g).sum()
+        agg = agg[agg["n"] > 0]
+        out = pd.DataFrame({
+            "bin_low": agg.index / n_bins,
+            "bin_high": (agg.index + 1) / n_bins,
+            "pred": agg["sum_p"] / agg["n"],
+            "actual": agg["sum_y"] / agg["n"],
+            "count": agg["n"].astype("int64"),
+        })
+        return out.reset_index(drop=True)
+
+    def scores(self, **filters) -> dict:
+        """n, mean_p, hit_rate, brier, log_loss and ECE (N_BINS bins) for a slice."""
+        s = self.slice(**filters)
+        tot = _scores(s[SUMS].sum().to_frame().T).iloc[0].to_dict()
+        per_bin = s.groupby("bin")[["n", "sum_p", "sum_y"]].sum()
+        n = per_bin["n"].sum()
+        tot["ece"] = float((per_bin["sum_p"] - per_bin["sum_y"]).abs().sum() / n) if n else float("nan")
+        tot["n"] = int(tot["n"])
+        return tot
+
+    def by(self, group: list[str] | str, **filters) -> pd.DataFrame:
+        """Scores per group (e.g. ["market"], ["model_name", "season"]) for a slice."""
+        group = [group] if isinstance(group, str) else list(group)
+        s = self.slice(**filters)
+        g = s.groupby(group, sort=True)[SUMS].sum()
+        return _scores(g).reset_index()
+
+# -------------------- CLI --------------------
+
+def main():
+    ap = argparse.ArgumentParser(description="Update the binned calibration stats for a master_likes file.")
+    ap.add_argument("--master", type=Path, required=True, help="master_likes.parquet (or .csv)")
+    ap.add_argument("--store", type=Path, default=None, help="stats folder (default <master dir>/calibration)")
+    ap.add_argument("--rebuild", action="store_true", help="drop the stored sums and refold every settled row")
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    df = pd.read_csv(args.master, low_memory=False) if args.master.suffix == ".csv" else pd.read_parquet(args.master)
+    cs = CalibrationStats(args.store or store_for(args.master))
+    if args.rebuild:
+        cs.reset()
+    added = cs.update(df)
+    cs.save()
+    dt = time.perf_counter() - t0
+    print(f"[calib_stats] +{added:,} settled rows ({len(cs.seen):,} total, {len(cs.table):,} segment-bins) in {dt:.2f}s -> {cs.root}")
+    t = time.perf_counter()
+    sc = cs.scores()
+    print(f"[calib_stats] all: n={sc['n']:,} brier={sc['brier']:.4f} log_loss={sc['log_loss']:.4f} "
+          f"ece={sc['ece']:.4f} (read in {(time.perf_counter() - t) * 1000:.1f} ms)")
+
+if __name__ == "__main__":
+    main()
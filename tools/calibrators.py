@@ -0,0 +1,311 @@
+# tools/calibrators.py
+# Probability calibration: Platt, beta and isotonic calibrators per market and season, fitted on
+# out-of-time folds and stored as lookup tables.
+#
+#   fold       the calibrator applied to season S is fitted on the `window` seasons before S only,
+#              so its scores on S are honest; one more per market is fitted on the latest window
+#              and keyed S_max + 1 for live scoring
+#   methods    platt     sigmoid(a * logit(p) + b)
+#              beta      sigmoid(a * ln p - b * ln(1 - p) + c), a, b >= 0   (Kull et al. 2017)
+#              isotonic  PAV step function (monotone, non-parametric)
+#   tables     every calibrator is tabulated on GRID (1001 points of [0, 1]); applying one is a
+#              linear interpolation, so scoring is the same two gathers whatever the method
+#   pooled     market "*" = all markets together, used for markets without enough rows of their own
+#
+# Methods are compared per market by out-of-fold log loss; the winner is flagged best and is what
+# apply() uses unless a method is named. Scoring applies the stored set with --calibrate on
+# tools.batch_infer and the "calibrate" option of tools.model_server (<score>_cal next to the raw score).
+#
+#   <exports>/calibration/calibrators.parquet   market, season, method, n_train, train seasons, best, table
+#
+#   python -m tools.calibrators --master serving_ui/data/master_likes.parquet [--window 3] [--apply in.csv --out out.csv]
+from __future__ import annotations
+
+import argparse
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from tools.pathing import exports_dir
+
+METHODS = ("platt", "beta", "isotonic")
+GRID = np.linspace(0.0, 1.0, 1001)
+EPS = 1e-6
+POOLED = "*"
+STORE_FILE = "calibrators.parquet"
+
+def store_dir(root: Path | None = None) -> Path:
+    d = root or (exports_dir() / "calibration")
+    d.mkdir(parents=True, exist_ok=True)
+    return d
+
+# -------------------- fitters (each returns a table on GRID) --------------------
+
+def _expit(z: np.ndarray) -> np.ndarray:
+    return 0.5 * (1.0 + np.tanh(0.5 * z))
+
+def _logistic(X: np.ndarray, y: np.ndarray, l2: float = 1e-4, iters: int = 50) -> np.ndarray:
+    """Newton-Raphson for a small logistic regression; last column of X is the intercept (unpenalized)."""
+    beta = np.zeros(X.shape[1])
+    pen = np.full(X.shape[1], l2 * len(y))
+    pen[-1] = 0.0
+    for _ in range(iters):
+        mu = _expit(X @ beta)
+        g = X.T @ (mu - y) + pen * beta
+        H = (X * (mu * (1 - mu))[:, None]).T @ X + np.diag(pen + 1e-9)
+        step = np.linalg.solve(H, g)
+        beta -= step
+        if np.max(np.abs(step)) < 1e-8:
+            break
+    return beta
+
+def fit_platt(p: np.ndarray, y: np.ndarray) -> np.ndarray:
+    lg = lambda q: np.log(q / (1 - q))
+    a, b = _logistic(np.column_stack([lg(np.clip(p, EPS, 1 - EPS)), np.ones(len(p))]), y)
+    return _expit(a * lg(np.clip(GRID, EPS, 1 - EPS)) + b)
+
+def fit_beta(p: np.ndarray, y: np.ndarray) -> np.ndarray:
+    pc = np.clip(p, EPS, 1 - EPS)
+    X = np.column_stack([np.log(pc), -np.log(1 - pc), np.ones(len(p))])
+    coef = _logistic(X, y)
+    # a, b >= 0 keeps the map monotone; drop a negative term and refit the rest
+    for j in (0, 1):
+        if coef[j] < 0:
+            keep = [k for k in range(3) if k != j]
+            coef = np.zeros(3)
+            coef[keep] = _logistic(X[:, keep], y)
+    g = np.clip(GRID, EPS, 1 - EPS)
+    return _expit(coef[0] * np.log(g) - coef[1] * np.log(1 - g) + coef[2])
+
+def fit_isotonic(p: np.ndarray, y: np.ndarray) -> np.ndarray:
+    from sklearn.isotonic import IsotonicRegression
+    iso = IsotonicRegression(y_min=0.0, y_max=1.0, out_of_bounds="clip").fit(p, y)
+    return iso.predict(GRID)
+
+FITTERS = {"platt": fit_platt, "beta": fit_beta, "isotonic": fit_isotonic}
+
+def fit_table(method: str, p: np.ndarray, y: np.ndarray) -> np.ndarray:
+    return np.clip(FITTERS[method](np.asarray(p, dtype="float64"), np.asarray(y, dtype="float64")), EPS, 1 - EPS).astype("float32")
+
+def apply_tables(tables: np.ndarray, which: np.ndarray, p: np.ndarray) -> np.ndarray:
+    """Calibrated p per row: row i goes through tables[which[i]] (which < 0 = leave uncalibrated)."""
+    p = np.asarray(p, dtype="float64")
+    x = np.clip(np.nan_to_num(p, nan=0.0), 0.0, 1.0) * (len(GRID) - 1)
+    i = np.minimum(x.astype(np.int64), len(GRID) - 2)
+    f = x - i
+    k = np.maximum(which, 0)
+    out = tables[k, i] * (1 - f) + tables[k, i + 1] * f
+    return np.where((which < 0) | np.isnan(p), p, out)
+
+# -------------------- scoring rules --------------------
+
+def scores(p: np.ndarray, y: np.ndarray, n_bins: int = 10) -> dict:
+    p = np.asarray(p, dtype="float64")
+    y = np.asarray(y, dtype="float64")
+    pc = np.clip(p, EPS, 1 - EPS)
+    b = np.clip((p * n_bins).astype(np.int64), 0, n_bins - 1)
+    cnt = np.bincount(b, minlength=n_bins)
+    gap = np.abs(np.bincount(b, p, n_bins) - np.bincount(b, y, n_bins))
+    return {
+        "n": int(len(p)),
+        "log_loss": float(-np.mean(y * np.log(pc) + (1 - y) * np.log(1 - pc))) if len(p) else float("nan"),
+        "brier": float(np.mean((p - y) ** 2)) if len(p) else float("nan"),
+        "ece": float(gap.sum() / cnt.sum()) if cnt.sum() else float("nan"),
+    }
+
+def decimal_odds(df: pd.DataFrame) -> np.ndarray:
+    """Decimal price per row from decimal_odds / payout_odds (American); -110 when neither is there."""
+    if "decimal_odds" in df.columns and df["decimal_odds"].notna().any():
+        dec = pd.to_numeric(df["decimal_odds"], errors="coerce").to_numpy(dtype="float64")
+    elif "payout_odds" in df.columns:
+        am = pd.to_numeric(df["payout_odds"], errors="coerce").to_numpy(dtype="float64")
+        dec = np.where(am > 0, 1 + am / 100.0, 1 + 100.0 / np.abs(am))
+    else:
+        dec = np.full(len(df), np.nan)
+    return np.where(np.isfinite(dec) & (dec > 1), dec, 1 + 100 / 110)
+
+def roi(p: np.ndarray, y: np.ndarray, dec: np.ndarray, min_edge: float = 0.0) -> dict:
+    """Flat $1 on every row whose p says +EV at its price: expected (by p) and realized ROI."""
+    ev = p * dec - 1.0
+    bet = ev > min_edge
+    n = int(bet.sum())
+    return {
+        "bets": n,
+        "exp_roi": float(ev[bet].mean()) if n else float("nan"),
+        "roi": float((y[bet] * dec[bet] - 1.0).mean()) if n else float("nan"),
+    }
+
+# -------------------- out-of-time fitting --------------------
+
+def _frame(df: pd.DataFrame, prob_col: str, y_col: str) -> pd.DataFrame:
+    out = pd.DataFrame({
+        "market": df["market"].astype("string").fillna("").astype(object) if "market" in df.columns else "",
+        "season": pd.to_numeric(df["season"], errors="coerce") if "season" in df.columns else np.nan,
+        "p": pd.to_numeric(df[prob_col], errors="coerce"),
+        "y": pd.to_numeric(df[y_col], errors="coerce"),
+    }, index=df.index)
+    out["dec"] = decimal_odds(df)
+    return out[out["p"].between(0, 1) & out["y"].isin([0, 1]) & out["season"].notna()]
+
+def fit_out_of_time(
+    df: pd.DataFrame,
+    window: int = 3,
+    methods=METHODS,
+    min_rows: int = 200,
+    prob_col: str = "model_prob",
+    y_col: str = "hit_bool",
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    (calibrators, oof). calibrators: one row per (market, season, method) with its GRID table;
+    oof: every row of a season that had a calibrator, with p_raw and p_<method> columns.
+    """
+    d = _frame(df, prob_col, y_col)
+    recs, oof = [], []
+    groups = [(POOLED, d)] + [(m, g) for m, g in d.groupby("market", sort=True)]
+    for market, g in groups:
+        seasons = np.sort(g["season"].unique())
+        s_arr = g["season"].to_numpy()
+        for target in list(seasons[1:]) + [seasons[-1] + 1] if len(seasons) else []:
+            tr = (s_arr < target) & (s_arr >= target - window)
+            if tr.sum() < min_rows:
+                continue
+            p_tr, y_tr = g["p"].to_numpy()[tr], g["y"].to_numpy()[tr]
+            te = s_arr == target
+            fold = g[te][["market", "season", "p", "y", "dec"]].rename(columns={"p": "p_raw"}) if te.any() else None
+            if fold is not None:
+                fold.insert(0, "cal_market", market)
+            for m in methods:
+                table = fit_table(m, p_tr, y_tr)
+                recs.append({"market": market, "season": int(target), "method": m, "n_train": int(tr.sum()),
+                             "train_from": int(s_arr[tr].min()), "train_to": int(s_arr[tr].max()), "table": table})
+                if fold is not None:
+                    fold[f"p_{m}"] = apply_tables(table[None, :], np.zeros(len(fold), dtype=np.int64), fold["p_raw"].to_numpy())
+            if fold is not None:
+                oof.append(fold)
+    cal = pd.DataFrame(recs, columns=["market", "season", "method", "n_train", "train_from", "train_to", "table"])
+    oof = pd.concat(oof, ignore_index=True) if oof else pd.DataFrame()
+    cal["best"] = False
+    if not oof.empty:
+        summ = summarize(oof, methods)
+        best = summ[summ["method"] != "raw"].sort_values("log_loss").drop_duplicates("cal_market").set_index("cal_market")["method"]
+        cal["best"] = cal["method"].eq(cal["market"].map(best))
+    return cal, oof
+
+def summarize(oof: pd.DataFrame, methods=METHODS, by: str = "cal_market") -> pd.DataFrame:
+    """Out-of-fold scores + ROI per group and method ('raw' = uncalibrated)."""
+    rows = []
+    for key, g in oof.groupby(by, sort=True):
+        y, dec = g["y"].to_numpy(dtype="float64"), g["dec"].to_numpy(dtype="float64")
+        for m in ("raw",) + tuple(methods):
+            col = f"p_{m}"
+            if col not in g.columns:
+                continue
+            p = g[col].to_numpy(dtype="float64")
+            rows.append({by: key, "method": m, **scores(p, y), **roi(p, y, dec)})
+    return pd.DataFrame(rows)
+
+# -------------------- persisted set --------------------
+
+class CalibratorSet:
+    """All fitted calibrators; apply() picks per row by market (pooled fallback) and season."""
+
+    def __init__(self, cal: pd.DataFrame):
+        self.cal = cal.reset_index(drop=True)
+        self.tables = np.stack(self.cal["table"].to_numpy()) if len(self.cal) else np.zeros((0, len(GRID)), dtype="float32")
+
+    @classmethod
+    def load(cls, root: Path | None = None) -> "CalibratorSet":
+        p = store_dir(root) / STORE_FILE
+        if not p.exists():
+            raise FileNotFoundError(f"no calibrators at {p} (run python -m tools.calibrators)")
+        cal = pd.read_parquet(p)
+        cal["table"] = [np.asarray(t, dtype="float32") for t in cal["table"]]
+        return cls(cal)
+
+    def save(self, root: Path | None = None) -> Path:
+        d = store_dir(root)
+        out = self.cal.assign(table=[np.asarray(t, dtype="float32").tolist() for t in self.cal["table"]])
+        tmp = d / (STORE_FILE + ".tmp")
+        out.to_parquet(tmp, index=False)
+        tmp.replace(d / STORE_FILE)
+        return d / STORE_FILE
+
+    def best_method(self, market: str) -> str | None:
+        c = self.cal[self.cal["best"] & self.cal["market"].isin([market, POOLED])]
+        return None if c.empty else c.sort_values("market", key=lambda s: s.eq(POOLED))["method"].iloc[0]
+
+    def which(self, markets, seasons, method: str | None = None) -> np.ndarray:
+        """
+        Calibrator row per (market, season): latest fold keyed <= season, market's own else pooled.
+        Rows the market's own set can't serve (no best-flagged fold, e.g. a one-season market that
+        only has the live fold, or a season before its first fold) fall back to pooled.
+        """
+        codes, uniq = pd.factorize(pd.Series(markets, dtype=object).fillna(""))
+        seasons = pd.to_numeric(pd.Series(seasons), errors="coerce").to_numpy(dtype="float64")
+        seasons = np.where(np.isnan(seasons), np.inf, seasons)  # unknown season -> newest calibrator
+        out = np.full(len(codes), -1, dtype=np.int64)
+        c = self.cal
+        own = set(c["market"]) - {POOLED}
+        pick = c["method"] == method if method else c["best"]
+        for code, mk in enumerate(uniq):
+            rows = codes == code
+            for key in ([str(mk)] if str(mk) in own else []) + [POOLED]:
+                todo = rows & (out < 0)
+                sel = c[(c["market"] == key) & pick].sort_values("season")
+                if sel.empty or not todo.any():
+                    continue
+                pos = np.searchsorted(sel["season"].to_numpy(dtype="float64"), seasons[todo], side="right") - 1
+                out[todo] = np.where(pos >= 0, sel.index.to_numpy()[np.maximum(pos, 0)], -1)
+        return out
+
+    def apply(self, df: pd.DataFrame, prob_col: str = "model_prob", method: str | None = None) -> np.ndarray:
+        """Calibrated probabilities for `df` (market / season columns optional), vectorized."""
+        return self.apply_scores(pd.to_numeric(df[prob_col], errors="coerce").to_numpy(dtype="float64"), df, method)
+
+    def apply_scores(self, p: np.ndarray, rows: pd.DataFrame, method: str | None = None) -> np.ndarray:
+        """apply() for scores held outside the frame (scoring time): p[i] belongs to row i of `rows`."""
+        n = len(rows)
+        markets = rows["market"].to_numpy() if "market" in rows.columns else np.full(n, "", dtype=object)
+        seasons = rows["season"].to_numpy() if "season" in rows.columns else np.full(n, np.nan)
+        return apply_tables(self.tables, self.which(markets, seasons, method), np.asarray(p, dtype="float64"))
+
+# -------------------- CLI --------------------
+
+def main():
+    ap = argparse.ArgumentParser(description="Fit out-of-time probability calibrators per market / season.")
+    ap.add_argument("--master", type=Path, required=True, help="settled picks (master_likes.parquet or .csv)")
+    ap.add_argument("--prob-col", default="model_prob")
+    ap.add_argument("--y-col", default="hit_bool")
+    ap.add_argument("--window", type=int, default=3, help="seasons of history per calibrator")
+    ap.add_argument("--min-rows", type=int, default=200, help="fewer training rows -> no calibrator for that fold")
+    ap.add_argument("--methods", default=",".join(METHODS))
+    ap.add_argument("--store", type=Path, default=None, help="output folder (default exports/calibration)")
+    ap.add_argument("--apply", type=Path, default=None, help="also calibrate this file with the fitted set")
+    ap.add_argument("--out", type=Path, default=None, help="where --apply writes (adds <prob-col>_cal)")
+    args = ap.parse_args()
+
+    read = lambda p: pd.read_csv(p, low_memory=False) if p.suffix == ".csv" else pd.read_parquet(p)
+    t0 = time.perf_counter()
+    df = read(args.master)
+    methods = tuple(m.strip() for m in args.methods.split(",") if m.strip())
+    cal, oof = fit_out_of_time(df, args.window, methods, args.min_rows, args.prob_col, args.y_col)
+    cs = CalibratorSet(cal)
+    path = cs.save(args.store)
+    dt = time.perf_counter() - t0
+    print(f"[calibrators] {len(cal)} calibrators ({cal['market'].nunique() if len(cal) else 0} markets) "
+          f"from {len(df):,} rows in {dt:.2f}s -> {path}")
+    if not oof.empty:
+        with pd.option_context("display.width", 200, "display.max_rows", 200):
+            print(summarize(oof, methods).to_string(index=False, float_format=lambda v: f"{v:.4f}"))
+    if args.apply:
+        rows = read(args.apply)
+        t = time.perf_counter()
+        rows[f"{args.prob_col}_cal"] = cs.apply(rows, args.prob_col)
+        print(f"[calibrators] calibrated {len(rows):,} rows in {(time.perf_counter() - t) * 1000:.1f} ms")
+        if args.out:
+            rows.to_csv(args.out, index=False) if args.out.suffix == ".csv" else rows.to_parquet(args.out, index=False)
+
+if __name__ == "__main__":
+    main()
@@ -46,16 +46,9 @@ def american_to_decimal(american: pd.Series) -> pd.Series:
         return np.where(a > 0, 1 + a/100.0,
                         np.where(a < 0, 1 + 100.0/np.abs(a), np.nan))
 
-def main():
-    exp = exports_dir()
-    live_path = exp / "lines_live.csv"
-    if not live_path.exists():
-        print(f"[capture] {live_path} not found; nothing to snapshot."); sys.exit(0)
-
-    df = pd.read_csv(live_path, low_memory=False, encoding="utf-8-sig")
-    if df.empty:
-        print("[capture] lines_live.csv is empty; nothing to snapshot."); sys.exit(0)
-
+def snapshot_rows(df: pd.DataFrame, snap_utc: pd.Timestamp | None = None) -> pd.DataFrame:
+    """lines_live rows -> thin snapshot schema, stamped with one capture time."""
+    df = df.copy()
     # Expect columns; create safe defaults if any is missing
     for col in ["home","away","book","market","selection","price_american","point","commence_time","game_id"]:
         if col not in df.columns:
@@ -85,7 +78,7 @@ def main():
     df["_date_iso"]     = event_dt_utc.dt.tz_convert(TZ).dt.strftime("%Y-%m-%d")
 
     # Snapshot timestamps
-    snap_utc = pd.Timestamp.now(tz="UTC")
+    snap_utc = snap_utc if snap_utc is not None else pd.Timestamp.now(tz="UTC")
     snap_est = snap_utc.tz_convert(TZ)
     df["_snapshot_ts_utc"] = snap_utc.strftime("%Y-%m-%dT%H:%M:%SZ")
     df["_snapshot_ts_est"] = snap_est.strftime("%Y-%m-%dT%H:%M:%S%z")
@@ -111,13 +104,48 @@ def main():
         "_home_nick","_away_nick","book","_market_norm","side","line","price","decimal",
         "player_name","prop_type","_key","event_id","game_id"
     ]
-    snap = df.reindex(columns=keep)
+    return df.reindex(columns=keep)
+
+def append_snapshot(df: pd.DataFrame, exp: Path | None = None, snap_utc: pd.Timestamp | None = None,
+                    verbose: bool = True) -> pd.DataFrame:
+    """Append lines_live-shaped rows to lines_snapshots.csv and fold them into the downstream views."""
+    exp = exp or exports_dir()
+    snap = snapshot_rows(df, snap_utc)
 
     # Append
     snaps_path = exp / "lines_snapshots.csv"
     header = not snaps_path.exists()
     snap.to_csv(snaps_path, mode="a", header=header, index=False, encoding="utf-8-sig")
-    print(f"[capture] appended {len(snap):,} rows -> {snaps_path}")
+    if verbose:
+        print(f"[capture] appended {len(snap):,} rows -> {snaps_path}")
+
+    # Fold just-appended rows into movement outputs (steam / RLM / stale books) and fair odds
+    try:
+        from tools.line_movement import update_movement
+        from tools.fair_price import refresh_fair_odds
+        from tools.best_price import update_best_price_index
+    except ImportError:
+        return snap
+    mv = update_movement(exp)
+    fair = refresh_fair_odds(exp, quotes=snap)
+    idx = update_best_price_index(exp, quotes=snap)
+    if verbose:
+        print(f"[capture] movement: moves={mv['moves']:,} steam={mv['steam']:,} stale={mv['stale']:,}")
+        print(f"[capture] fair odds: {len(fair):,} rows")
+        print(f"[capture] best-price index: {len(idx):,} keys")
+    return snap
+
+def main():
+    exp = exports_dir()
+    live_path = exp / "lines_live.csv"
+    if not live_path.exists():
+        print(f"[capture] {live_path} not found; nothing to snapshot."); sys.exit(0)
+
+    df = pd.read_csv(live_path, low_memory=False, encoding="utf-8-sig")
+    if df.empty:
+        print("[capture] lines_live.csv is empty; nothing to snapshot."); sys.exit(0)
+
+    append_snapshot(df, exp)
 
 if __name__ == "__main__":
     main()
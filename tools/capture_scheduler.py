@@ -0,0 +1,449 @@
+# tools/capture_scheduler.py
+# Adaptive capture scheduler: per-game capture cadence from time-to-kickoff and recent volatility.
+#
+# Every game in the queue carries its own next-capture time. The base interval comes from a
+# kickoff ladder (default: 6h two days out -> 1h on game day -> 15m inside two hours -> 2m in the
+# last half hour) and shrinks while the game's quotes keep moving. The Odds API charges per request
+# (markets x regions), not per event, so every due game — plus any game within --pull-frac of its
+# own interval — is fetched in one eventIds request.
+#
+# Quota: a daily credit budget. When the rest of the day's planned requests would overrun what is
+# left, all intervals are stretched; when the budget is gone the daemon waits for the next UTC day.
+# The event list comes from the free /events endpoint.
+#
+# State (queue, per-game quote fingerprints, quota ledger) lives in exports/capture_queue.json and
+# is rewritten atomically after every step, so the daemon resumes where it left off after a restart.
+#
+#   python -m tools.capture_scheduler run              long-lived daemon
+#   python -m tools.capture_scheduler run --once       one scheduling step (cron / Task Scheduler)
+#   python -m tools.capture_scheduler status           queue and quota
+#   python -m tools.capture_scheduler plan --hours 48  simulate the schedule and credit spend offline
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import signal
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import pandas as pd
+
+from tools.pathing import exports_dir
+
+QUEUE_JSON = "capture_queue.json"
+LOCK_FILE  = "capture_scheduler.lock"
+LIVE_CSV   = "lines_live.csv"
+
+API_BASE = "https://api.the-odds-api.com/v4"
+LIVE_COLS = ["pulled_ts", "game_id", "commence_time", "home", "away", "book", "market", "selection", "price_american", "point"]
+
+# hours-to-kickoff threshold -> interval in minutes (first threshold the game is beyond wins)
+DEFAULT_LADDER = "48:360,24:120,6:60,2:15,0.5:5,0:2"
+
+@dataclass
+class Config:
+    sport: str = "americanfootball_nfl"
+    regions: str = "us"
+    markets: str = "h2h,spreads,totals"
+    ladder: list[tuple[float, float]] = field(default_factory=lambda: parse_ladder(DEFAULT_LADDER))
+    min_interval_min: float = 1.0
+    vol_gain: float = 4.0          # interval / (1 + vol_gain * changed share)
+    vol_alpha: float = 0.5         # EWMA weight of the newest capture's changed share
+    pull_frac: float = 0.3         # fetch a not-yet-due game along if within this share of its interval
+    max_batch: int = 40            # eventIds per request
+    daily_budget: int = 400        # credits per UTC day
+    refresh_events_min: float = 30.0
+    horizon_days: float = 7.0      # only queue games kicking off within this window
+
+    @property
+    def cost(self) -> int:
+        return len(self.markets.split(",")) * len(self.regions.split(","))
+
+def parse_ladder(spec: str) -> list[tuple[float, float]]:
+    """'48:360,24:120,...' -> [(48.0, 360.0), ...] sorted by threshold, farthest first."""
+    rungs = []
+    for part in spec.split(","):
+        h, m = part.split(":")
+        rungs.append((float(h), float(m)))
+    return sorted(rungs, key=lambda r: -r[0])
+
+# -------------------- cadence --------------------
+
+def base_interval(hours_to_kick: float, ladder: list[tuple[float, float]]) -> float:
+    for h, m in ladder:
+        if hours_to_kick > h:
+            return m
+    return ladder[-1][1]
+
+def next_interval(g: dict, now: float, cfg: Config, stretch: float = 1.0) -> float:
+    """Seconds until this game's next capture."""
+    htk = (g["kick"] - now) / 3600.0
+    m = base_interval(htk, cfg.ladder) / (1.0 + cfg.vol_gain * g.get("vol", 0.0))
+    return max(cfg.min_interval_min, m) * 60.0 * stretch
+
+def quota_stretch(state: dict, now: float, cfg: Config) -> float:
+    """
+    >= 1: how much to slow everything down so the rest of today's requests fit the budget.
+    Batching means the request rate is set by the fastest game; the rest ride along.
+    """
+    games = state["games"]
+    if not games:
+        return 1.0
+    left = _budget_left(state, now, cfg)
+    if left <= 0:
+        return float("inf")
+    day_end = (now // 86400 + 1) * 86400
+    fastest = min(next_interval(g, now, cfg) for g in games.values())
+    planned = (day_end - now) / fastest * cfg.cost
+    return max(1.0, planned / left)
+
+# -------------------- state --------------------
+
+def _today(now: float) -> str:
+    return time.strftime("%Y-%m-%d", time.gmtime(now))
+
+def _budget_left(state: dict, now: float, cfg: Config) -> int:
+    q = state["quota"]
+    used = q["used"] if q.get("day") == _today(now) else 0
+    return cfg.daily_budget - used
+
+def new_state() -> dict:
+    return {"games": {}, "quota": {"day": "", "used": 0, "remaining": None}, "events_ts": 0.0, "requests": 0}
+
+def load_state(exp: Path) -> dict:
+    p = exp / QUEUE_JSON
+    if p.exists():
+        try:
+            return json.loads(p.read_text(encoding="utf-8"))
+        except Exception:
+            pass
+    return new_state()
+
+def save_state(exp: Path, state: dict) -> None:
+    tmp = exp / (QUEUE_JSON + ".tmp")
+    tmp.write_text(json.dumps(state, indent=1), encoding="utf-8")
+    tmp.replace(exp / QUEUE_JSON)
+
+def sync_games(state: dict, events: list[dict], now: float, cfg: Config) -> None:
+    """Add new events (due now), update kickoffs, drop games that have started or left the feed."""
+    seen = set()
+    for ev in events:
+        kick = pd.Timestamp(ev["commence_time"]).timestamp()
+        if kick <= now or kick - now > cfg.horizon_days * 86400:
+            continue
+        gid = ev["id"]; seen.add(gid)
+        g = state["games"].setdefault(gid, {"next_due": now, "last": 0.0, "vol": 0.0, "fp": {}})
+        g.update(kick=kick, home=ev.get("home_team", ""), away=ev.get("away_team", ""))
+    for gid in [k for k, g in state["games"].items() if k not in seen or g["kick"] <= now]:
+        del state["games"][gid]
+    state["events_ts"] = now
+
+def due_batch(state: dict, now: float, cfg: Config) -> list[str]:
+    """Games that are due, topped up with games close enough to due that the shared request covers them."""
+    games = state["games"]
+    due = [k for k, g in games.items() if g["next_due"] <= now]
+    if not due:
+        return []
+    extra = [k for k, g in games.items()
+             if k not in due and g["next_due"] - now <= cfg.pull_frac * next_interval(g, now, cfg)]
+    order = sorted(due, key=lambda k: games[k]["next_due"]) + sorted(extra, key=lambda k: games[k]["next_due"])
+    return order[: cfg.max_batch]
+
+def record_capture(state: dict, gids: list[str], rows: pd.DataFrame, now: float, cfg: Config, cost: int) -> None:
+    """Update volatility fingerprints, reschedule the batch, and book the credits."""
+    stretch = quota_stretch(state, now, cfg)
+    by_game = dict(tuple(rows.groupby("game_id"))) if not rows.empty else {}
+    for gid in gids:
+        g = state["games"].get(gid)
+        if g is None:
+            continue
+        d = by_game.get(gid)
+        if d is not None:
+            fp = dict(zip(d["book"].astype(str) + "|" + d["market"].astype(str) + "|" + d["selection"].astype(str),
+                          d["point"].astype(str) + "|" + d["price_american"].astype(str)))
+            if g["fp"]:
+                common = fp.keys() & g["fp"].keys()
+                share = sum(fp[k] != g["fp"][k] for k in common) / len(common) if common else 0.0
+                g["vol"] = cfg.vol_alpha * share + (1 - cfg.vol_alpha) * g["vol"]
+            g["fp"] = fp
+        g["last"] = now
+        g["next_due"] = now + next_interval(g, now, cfg, stretch if stretch != float("inf") else 1.0)
+    q = state["quota"]
+    if q.get("day") != _today(now):
+        q.update(day=_today(now), used=0)
+    q["used"] += cost
+    state["requests"] = state.get("requests", 0) + 1
+
+# -------------------- API --------------------
+
+def _api_key() -> str:
+    key = os.environ.get("ODDS_API_KEY", "").strip()
+    if key:
+        return key
+    env = exports_dir().parent / ".env"
+    if env.exists():
+        for line in env.read_text(encoding="utf-8").splitlines():
+            k, _, v = line.partition("=")
+            if k.strip() == "ODDS_API_KEY":
+                return v.strip()
+    return ""
+
+def fetch_events(cfg: Config) -> list[dict]:
+    """Upcoming events; this endpoint does not count against the quota."""
+    import requests
+    r = requests.get(f"{API_BASE}/sports/{cfg.sport}/events", params={"apiKey": _api_key()}, timeout=30)
+    r.raise_for_status()
+    return r.json()
+
+def fetch_odds(gids: list[str], cfg: Config) -> tuple[pd.DataFrame, dict]:
+    """One odds request for all `gids`. Returns (lines_live rows, quota headers)."""
+    import requests
+    params = {"apiKey": _api_key(), "regions": cfg.regions, "markets": cfg.markets,
+              "oddsFormat": "american", "eventIds": ",".join(gids)}
+    r = requests.get(f"{API_BASE}/sports/{cfg.sport}/odds", params=params, timeout=30)
+    r.raise_for_status()
+    ts = pd.Timestamp.now(tz="UTC").isoformat()
+    rows = []
+    for game in r.json():
+        for bk in game.get("bookmakers", []):
+            for mk in bk.get("markets", []):
+                for o in mk.get("outcomes", []):
+                    rows.append((ts, game.get("id"), game.get("commence_time"), game.get("home_team"), game.get("away_team"),
+                                 bk.get("title"), mk.get("key"), o.get("name"), o.get("price"), o.get("point")))
+    hdr = {k: r.headers.get(f"x-requests-{k}") for k in ("used", "remaining", "last")}
+    return pd.DataFrame(rows, columns=LIVE_COLS), hdr
+
+def merge_live(exp: Path, rows: pd.DataFrame, gids: list[str]) -> None:
+    """Replace the captured games in lines_live.csv, keep every other game's last quotes."""
+    p = exp / LIVE_CSV
+    if p.exists() and p.stat().st_size:
+        cur = pd.read_csv(p, low_memory=False, encoding="utf-8-sig")
+        if "game_id" in cur.columns:
+            cur = cur[~cur["game_id"].astype(str).isin(gids)]
+        rows = pd.concat([cur, rows], ignore_index=True) if not cur.empty else rows
+    rows.to_csv(p, index=False, encoding="utf-8-sig")
+
+# -------------------- daemon --------------------
+
+def _pid_alive(pid: int) -> bool:
+    """Is `pid` running? Never signals it: on Windows os.kill(pid, 0) is TerminateProcess."""
+    if pid <= 0:
+        return False
+    try:
+        import psutil
+        return psutil.pid_exists(pid)
+    except ImportError:
+        pass
+    if sys.platform == "win32":
+        import ctypes
+        from ctypes import wintypes
+        k32 = ctypes.WinDLL("kernel32", use_last_error=True)
+        k32.OpenProcess.restype = wintypes.HANDLE
+        h = k32.OpenProcess(0x1000, False, pid)             # PROCESS_QUERY_LIMITED_INFORMATION
+        if not h:
+            return ctypes.get_last_error() == 5             # ERROR_ACCESS_DENIED: exists, not ours
+        try:
+            code = wintypes.DWORD()
+            ok = k32.GetExitCodeProcess(h, ctypes.byref(code))
+            return not ok or code.value == 259              # STILL_ACTIVE
+        finally:
+            k32.CloseHandle(h)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:                                 # exists, owned by another user
+        return True
+    return True
+
+class _Lock:
+    """
+    One daemon per exports folder. The lock file is created atomically (O_CREAT | O_EXCL) and holds
+    the owner's pid; a lock whose owner is no longer running is taken over.
+    """
+    GRACE_S = 5.0        # a lock file with no pid yet may be a starting daemon mid-write
+
+    def __init__(self, path: Path):
+        self.path = path
+    def _owner(self) -> int | None:
+        """pid in the lock file; 0 when the file is gone, None when it holds no pid (yet)."""
+        try:
+            return int(self.path.read_text().strip())
+        except FileNotFoundError:
+            return 0
+        except ValueError:
+            return None
+    def __enter__(self):
+        while True:
+            try:
+                fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                pid = self._owner()
+                if pid == 0:
+                    continue
+                if pid is None:
+                    try:
+                        young = time.time() - self.path.stat().st_mtime < self.GRACE_S
+                    except FileNotFoundError:
+                        continue
+                    if young:
+                        time.sleep(0.1)
+                        continue
+                elif _pid_alive(pid):
+                    raise SystemExit(f"[sched] already running (pid {pid}); remove {self.path} if stale")
+                if self._owner() == pid:                    # still the stale owner, not a new daemon
+                    print(f"[sched] taking over stale lock {self.path} (pid {pid})", flush=True)
+                    self.path.unlink(missing_ok=True)
+                continue
+            os.write(fd, str(os.getpid()).encode())
+            os.close(fd)
+            return self
+    def __exit__(self, *exc):
+        if self._owner() == os.getpid():
+            self.path.unlink(missing_ok=True)
+
+def step(exp: Path, state: dict, cfg: Config, now: float, fetch_events=fetch_events, fetch_odds=fetch_odds,
+         capture: bool = True, verbose: bool = True) -> float:
+    """One scheduling step. Returns seconds until the next thing is due."""
+    if now - state.get("events_ts", 0.0) >= cfg.refresh_events_min * 60 or not state["games"]:
+        try:
+            sync_games(state, fetch_events(cfg), now, cfg)
+        except Exception as e:
+            print(f"[sched] events refresh failed: {e}", flush=True)
+            state["events_ts"] = now  # back off to the normal refresh period
+
+    if _budget_left(state, now, cfg) < cfg.cost:
+        tomorrow = (now // 86400 + 1) * 86400
+        return tomorrow - now
+
+    gids = due_batch(state, now, cfg)
+    if gids:
+        try:
+            rows, hdr = fetch_odds(gids, cfg)
+        except Exception as e:
+            print(f"[sched] odds request failed for {len(gids)} games: {e}", flush=True)
+            for k in gids:
+                state["games"][k]["next_due"] = now + 60.0
+            return 60.0
+        cost = int(hdr["last"]) if hdr.get("last") not in (None, "") else cfg.cost
+        record_capture(state, gids, rows, now, cfg, cost)
+        if hdr.get("remaining") not in (None, ""):
+            state["quota"]["remaining"] = int(float(hdr["remaining"]))
+        if capture and not rows.empty:
+            from tools.capture_lines import append_snapshot
+            merge_live(exp, rows, gids)
+            append_snapshot(rows, exp, snap_utc=pd.Timestamp(now, unit="s", tz="UTC"), verbose=False)
+        q = state["quota"]
+        if verbose:
+            print(f"[sched] {time.strftime('%H:%M:%S', time.gmtime(now))}Z games={len(gids)} rows={len(rows):,} "
+                  f"credits={q['used']}/{cfg.daily_budget} remaining={q.get('remaining')}", flush=True)
+
+    nxt = min((g["next_due"] for g in state["games"].values()), default=now + cfg.refresh_events_min * 60)
+    return max(1.0, min(nxt, state["events_ts"] + cfg.refresh_events_min * 60) - now)
+
+def run(exp: Path, cfg: Config, once: bool = False) -> None:
+    stop = {"flag": False}
+    def _stop(*_):
+        stop["flag"] = True
+    signal.signal(signal.SIGINT, _stop)
+    if hasattr(signal, "SIGTERM"):
+        signal.signal(signal.SIGTERM, _stop)
+
+    with _Lock(exp / LOCK_FILE):
+        state = load_state(exp)
+        print(f"[sched] resuming with {len(state['games'])} queued games", flush=True)
+        while not stop["flag"]:
+            wait = step(exp, state, cfg, time.time())
+            save_state(exp, state)
+            if once:
+                break
+            end = time.time() + wait
+            while not stop["flag"] and time.time() < end:  # short naps so signals land promptly
+                time.sleep(max(0.0, min(1.0, end - time.time())))
+        save_state(exp, state)
+        print("[sched] stopped; queue saved", flush=True)
+
+# -------------------- offline plan --------------------
+
+def simulate(kicks: list[pd.Timestamp], start: pd.Timestamp, hours: float, cfg: Config, vol: float = 0.0) -> pd.DataFrame:
+    """Replay the scheduler against a fixed slate with no network; one row per request."""
+    t0 = start.timestamp()
+    events = [{"id": f"g{i}", "commence_time": k.isoformat()} for i, k in enumerate(kicks)]
+    state = new_state()
+    sync_games(state, events, t0, cfg)
+    for g in state["games"].values():
+        g["vol"] = vol
+    log, now = [], t0
+    fake_odds = lambda gids, _cfg: (pd.DataFrame(columns=LIVE_COLS), {})
+    while now < t0 + hours * 3600 and state["games"]:
+        n0 = state["requests"]
+        wait = step(Path("."), state, cfg, now, fetch_events=lambda _c: events, fetch_odds=fake_odds,
+                    capture=False, verbose=False)
+        if state["requests"] > n0:
+            log.append({"ts": pd.Timestamp(now, unit="s", tz="UTC"), "credits_today": state["quota"]["used"],
+                        "games_left": len(state["games"])})
+        for g in state["games"].values():
+            g["vol"] = vol
+        now += wait
+    return pd.DataFrame(log)
+
+# -------------------- CLI --------------------
+
+def main():
+    ap = argparse.ArgumentParser(description="Adaptive line-capture scheduler (kickoff- and volatility-aware, quota-paced).")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    for name in ("run", "plan"):
+        s = sub.add_parser(name)
+        s.add_argument("--ladder", default=DEFAULT_LADDER, help="hours:minutes rungs, farthest first")
+        s.add_argument("--budget", type=int, default=400, help="credits per UTC day")
+        s.add_argument("--markets", default="h2h,spreads,totals")
+        s.add_argument("--regions", default="us")
+        s.add_argument("--pull-frac", type=float, default=0.3)
+        s.add_argument("--vol-gain", type=float, default=4.0)
+    sub.choices["run"].add_argument("--once", action="store_true", help="one step, then exit")
+    sub.choices["plan"].add_argument("--hours", type=float, default=48.0)
+    sub.choices["plan"].add_argument("--kickoffs", default="", help="comma list of UTC kickoffs (default: queued games)")
+    sub.choices["plan"].add_argument("--vol", type=float, default=0.0, help="assumed changed share per capture")
+    sub.add_parser("status")
+    args = ap.parse_args()
+    exp = exports_dir()
+
+    if args.cmd == "status":
+        state = load_state(exp)
+        now = time.time()
+        q = state["quota"]
+        print(f"[sched] games={len(state['games'])} requests={state.get('requests', 0)} "
+              f"credits_today={q['used'] if q.get('day') == _today(now) else 0} api_remaining={q.get('remaining')}")
+        for gid, g in sorted(state["games"].items(), key=lambda kv: kv[1]["next_due"]):
+            print(f"  {g.get('away', '')} @ {g.get('home', '')}  kick in {(g['kick'] - now) / 3600:6.1f}h  "
+                  f"next in {(g['next_due'] - now) / 60:7.1f}m  vol={g.get('vol', 0):.2f}")
+        return
+
+    cfg = Config(markets=args.markets, regions=args.regions, ladder=parse_ladder(args.ladder),
+                 daily_budget=args.budget, pull_frac=args.pull_frac, vol_gain=args.vol_gain)
+    if args.cmd == "run":
+        if not _api_key():
+            print("[sched] ODDS_API_KEY missing (env or .env)", file=sys.stderr); sys.exit(2)
+        run(exp, cfg, once=args.once)
+        return
+
+    if args.kickoffs:
+        kicks = [pd.Timestamp(k) for k in args.kickoffs.split(",")]
+        kicks = [k.tz_localize("UTC") if k.tzinfo is None else k for k in kicks]
+    else:
+        kicks = [pd.Timestamp(g["kick"], unit="s", tz="UTC") for g in load_state(exp)["games"].values()]
+    if not kicks:
+        print("[sched] no kickoffs to plan against"); return
+    log = simulate(kicks, pd.Timestamp.now(tz="UTC"), args.hours, cfg, vol=args.vol)
+    if log.empty:
+        print("[sched] no requests in window"); return
+    per_day = log.groupby(log["ts"].dt.strftime("%Y-%m-%d")).size() * cfg.cost
+    print(f"[sched] requests={len(log):,} credits={len(log) * cfg.cost:,} over {args.hours:g}h")
+    for day, c in per_day.items():
+        print(f"  {day}: {c:,} credits")
+
+if __name__ == "__main__":
+    main()
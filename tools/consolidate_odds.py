@@ -67,9 +67,20 @@ def read_csv(p: Path):
         print(f"[warn] failed reading {p.name}: {e}")
         return None
 
-def first_non_null(s: pd.Series):
-    s = s.dropna()
-    return s.iloc[0] if len(s) else np.nan
+def consolidate(merged_all: pd.DataFrame, group_cols: list[str], value_cols: list[str]) -> pd.DataFrame:
+    """
+    One stable sort by (key, src_priority, src_id), then a single groupby().first(), which already
+    skips nulls per column. Provenance rides along: for each value column, src_<col> (int8) is the
+    src_id masked to where that column is present, so first() returns the id of the source that
+    supplied the cell (-1 when no source had it).
+    """
+    d = merged_all.sort_values(group_cols + ["src_priority", "src_id"], kind="stable")
+    src = d["src_id"].astype("float32")
+    prov = pd.DataFrame({f"src_{c}": src.where(d[c].notna()) for c in value_cols}, index=d.index)
+    canon = pd.concat([d, prov], axis=1).groupby(group_cols, dropna=False, sort=True).first().reset_index()
+    for c in prov.columns:
+        canon[c] = canon[c].fillna(-1).astype("int8")
+    return canon
 
 def main():
     exports = Path("exports"); exports.mkdir(exist_ok=True)
@@ -83,16 +94,19 @@ def main():
             candidates.append(p)
 
     frames=[]
+    sources=[]
     for p in candidates:
         df = read_csv(p)
         if df is None or df.empty: continue
         nd = normalize(df)
         nd["source_file"] = p.name
+        nd["src_id"] = np.int8(len(sources))
+        sources.append(p.name)
         # tag row kind (closing > opening)
         has_close = nd["spread_close"].notna() | nd["total_close"].notna()
         has_open  = nd["spread_open"].notna()  | nd["total_open"].notna()
         nd["src_kind"]     = np.where(has_close, "closing", np.where(has_open, "opening", "unknown"))
-        nd["src_priority"] = np.where(nd["src_kind"].eq("closing"), 1, np.where(nd["src_kind"].eq("opening"), 2, 9))
+        nd["src_priority"] = np.where(nd["src_kind"].eq("closing"), 1, np.where(nd["src_kind"].eq("opening"), 2, 9)).astype("int8")
         frames.append(nd)
 
     if not frames: raise FileNotFoundError("No source odds CSVs found in ./exports")
@@ -101,12 +115,10 @@ def main():
     merged_all = merged_all[merged_all["home"].notna() & merged_all["away"].notna()]
 
     group_cols = ["season","week","home","away"]
-    merged_all = merged_all.sort_values(group_cols + ["src_priority"])
+    value_cols = ["spread_close","total_close","spread_open","total_open","ml_home","ml_away","date"]
 
-    # aggregate by priority then first non-null
-    agg_cols = [c for c in merged_all.columns if c not in group_cols]
-    agg_map = {c: first_non_null for c in agg_cols}
-    canon = merged_all.groupby(group_cols, dropna=False, as_index=False).agg(agg_map)
+    # by priority then first non-null, with per-cell source ids
+    canon = consolidate(merged_all, group_cols, [c for c in value_cols if c in merged_all.columns])
 
     # fallback + flag
     canon["used_opening_fallback"] = False
@@ -114,21 +126,25 @@ def main():
         need_sp = canon["spread_close"].isna() & canon["spread_open"].notna()
         canon.loc[need_sp, "spread_close"] = canon.loc[need_sp, "spread_open"]
         canon.loc[need_sp, "used_opening_fallback"] = True
+        canon.loc[need_sp, "src_spread_close"] = canon.loc[need_sp, "src_spread_open"]  # provenance follows the value
     if "total_open" in canon.columns:
         need_to = canon["total_close"].isna() & canon["total_open"].notna()
         canon.loc[need_to, "total_close"] = canon.loc[need_to, "total_open"]
         canon.loc[need_to, "used_opening_fallback"] = True
+        canon.loc[need_to, "src_total_close"] = canon.loc[need_to, "src_total_open"]
 
     canon["line_source"] = np.where(canon["used_opening_fallback"], "opening", "closing")
 
     # ensure order
     for c in PIPE_COLS:
         if c not in canon.columns: canon[c] = np.nan
-    cols_out = PIPE_COLS + [c for c in ["spread_open","total_open","line_source","used_opening_fallback","source_file","date"] if c in canon.columns]
+    src_cols = [c for c in canon.columns if c.startswith("src_") and c not in ("src_kind","src_priority","src_id")]
+    cols_out = PIPE_COLS + [c for c in ["spread_open","total_open","line_source","used_opening_fallback","source_file","date"] if c in canon.columns] + src_cols
 
     # write
     canon[cols_out].to_csv(exports / "historical_odds_merged.csv", index=False)
     canon[PIPE_COLS].to_csv(exports / "historical_odds.csv", index=False)
+    pd.DataFrame({"src_id": range(len(sources)), "source_file": sources}).to_csv(exports / "historical_odds_sources.csv", index=False)
 
     # report
     def pct(col): return f"{(canon[col].notna().mean()*100):.1f}%"
@@ -0,0 +1,224 @@
+# tools/drift.py
+# Feature drift monitor: PSI, KS and Wasserstein for every numeric feature and every segment at once.
+#
+#   edges      per-feature quantile edges from the pooled reference (shared by all segments, so a
+#              segment's histogram is comparable with the pooled one and with any later week)
+#   binning    searchsorted per feature column -> bin codes [N, F] (NaN gets its own bucket), then a
+#              single bincount over (segment, feature, bin) gives every histogram in one pass
+#   reference  counts [S, F, B+1] + pooled per-bin means, built once and cached (npz); scoring a new
+#              week only bins the new rows
+#   metrics    PSI  = sum (c - r) ln(c / r) over bins; every bin count gets PSI_PSEUDO (half a row)
+#                     before the proportions are taken, so empty bins stay finite without dominating
+#              KS   = max |CDF_cur - CDF_ref| at the shared edges (non-missing values)
+#              W1   = integral |CDF_cur - CDF_ref| dx on the reference bins, each bin placed at its
+#                     reference mean (so the open outer bins are not stretched to the extremes)
+#              missing-rate shift and the mean shift ride along; segments with fewer than MIN_N_CUR
+#              current rows are scored but never flagged (a few dozen rows are mostly noise)
+#   segments   any list of columns (e.g. market, season); "*" is the pooled reference and is what
+#              segments unseen in the reference are compared against
+#
+#   python -m tools.drift --ref last_season.parquet --cur this_week.parquet --segments market [--out drift.csv]
+from __future__ import annotations
+
+import argparse
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+POOLED = "*"
+PSI_PSEUDO = 0.5
+MIN_N_CUR = 100
+PSI_MINOR, PSI_MAJOR = 0.10, 0.25
+
+def numeric_features(df: pd.DataFrame, exclude=()) -> list[str]:
+    skip = set(exclude)
+    return [c for c in df.columns if c not in skip and pd.api.types.is_numeric_dtype(df[c]) and not pd.api.types.is_bool_dtype(df[c])]
+
+def _matrix(df: pd.DataFrame, features: list[str]) -> np.ndarray:
+    return df.reindex(columns=features).apply(pd.to_numeric, errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+
+def _labels(df: pd.DataFrame, segments: list[str]) -> tuple[np.ndarray, list[str]]:
+    """(code per row, label per code) for the segment columns; labels are 'a|b' strings."""
+    if not segments:
+        return np.zeros(len(df), dtype=np.int64), [POOLED]
+    keys = df[segments].astype("string").fillna("").astype(object)
+    codes, uniq = pd.MultiIndex.from_frame(keys).factorize()
+    return codes.astype(np.int64), ["|".join(map(str, u)) for u in uniq]
+
+class DriftReference:
+    """Cached reference histograms; see the module header."""
+
+    def __init__(self, features, segments, labels, edges, counts, sums, centers):
+        self.features = list(features)
+        self.segments = list(segments)
+        self.labels = list(labels)
+        self.edges = edges        # [F, B-1] (padded with +inf for features with fewer distinct quantiles)
+        self.counts = counts      # [S, F, B+1] last bucket = missing
+        self.sums = sums          # [S, F] sum of non-missing values
+        self.centers = centers    # [F, B] pooled reference mean of each bin
+        self._index = {l: i for i, l in enumerate(self.labels)}
+
+    @property
+    def n_bins(self) -> int:
+        return self.edges.shape[1] + 1
+
+    # ---- build / bin ----
+
+    @classmethod
+    def build(cls, df: pd.DataFrame, features: list[str] | None = None, segments=(), n_bins: int = 10) -> "DriftReference":
+        segments = list(segments)
+        features = features or numeric_features(df, exclude=segments)
+        X = _matrix(df, features)
+        q = np.nanquantile(X, np.linspace(0, 1, n_bins + 1)[1:-1], axis=0).T if len(X) else np.full((len(features), n_bins - 1), np.nan)
+        edges = np.full((len(features), n_bins - 1), np.inf)
+        for f in range(len(features)):
+            u = np.unique(q[f][np.isfinite(q[f])])
+            edges[f, :len(u)] = u
+        codes, labels = _labels(df, segments)
+        ref = cls(features, segments, labels + ([POOLED] if segments else []), edges, None, None, None)
+        counts, sums = ref._hist(X, codes, len(labels))
+        # per-bin means of the pooled reference; empty padding bins sit on the last edge
+        F, B = len(features), ref.n_bins
+        b = ref._bin(X)
+        ok = b < B
+        cell = (np.arange(F)[None, :] * B + np.minimum(b, B - 1))[ok]
+        n = np.bincount(cell, minlength=F * B).reshape(F, B)
+        tot = np.bincount(cell, weights=X[ok], minlength=F * B).reshape(F, B)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            centers = np.where(n > 0, tot / n, np.nan)
+        centers = pd.DataFrame(centers.T).ffill().bfill().fillna(0.0).to_numpy().T
+        ref.centers = np.maximum.accumulate(centers, axis=1)
+        if segments:
+            counts = np.concatenate([counts, counts.sum(axis=0, keepdims=True)])
+            sums = np.concatenate([sums, sums.sum(axis=0, keepdims=True)])
+        ref.counts, ref.sums = counts, sums
+        return ref
+
+    def _bin(self, X: np.ndarray) -> np.ndarray:
+        B = self.n_bins
+        out = np.empty(X.shape, dtype=np.int64)
+        for f in range(X.shape[1]):
+            out[:, f] = np.searchsorted(self.edges[f], X[:, f], side="right")
+        out[np.isnan(X)] = B
+        return out
+
+    def _hist(self, X: np.ndarray, codes: np.ndarray, n_seg: int) -> tuple[np.ndarray, np.ndarray]:
+        F, B1 = X.shape[1], self.n_bins + 1
+        b = self._bin(X)
+        cell = codes[:, None] * F + np.arange(F)[None, :]
+        counts = np.bincount((cell * B1 + b).ravel(), minlength=n_seg * F * B1).reshape(n_seg, F, B1)
+        sums = np.bincount(cell.ravel(), weights=np.nan_to_num(X).ravel(), minlength=n_seg * F).reshape(n_seg, F)
+        return counts.astype("float64"), sums
+
+    # ---- score ----
+
+    def score(self, df: pd.DataFrame, min_n: int = MIN_N_CUR) -> pd.DataFrame:
+        """One row per (segment, feature) of `df` against its reference segment (pooled if unseen)."""
+        X = _matrix(df, self.features)
+        codes, labels = _labels(df, self.segments)
+        cur, cur_sum = self._hist(X, codes, len(labels))
+        if self.segments:
+            labels = labels + [POOLED]
+            cur = np.concatenate([cur, cur.sum(axis=0, keepdims=True)])
+            cur_sum = np.concatenate([cur_sum, cur_sum.sum(axis=0, keepdims=True)])
+        pooled = self._index.get(POOLED, 0)
+        ri = np.array([self._index.get(l, pooled) for l in labels], dtype=np.int64)
+        ref, ref_sum = self.counts[ri], self.sums[ri]
+
+        B = self.n_bins
+        n_ref, n_cur = ref.sum(axis=2), cur.sum(axis=2)
+        r = (ref + PSI_PSEUDO) / (n_ref[..., None] + PSI_PSEUDO * (B + 1))
+        c = (cur + PSI_PSEUDO) / (n_cur[..., None] + PSI_PSEUDO * (B + 1))
+        psi = ((c - r) * np.log(c / r)).sum(axis=2)
+
+        ref_ok, cur_ok = ref[..., :B].sum(axis=2), cur[..., :B].sum(axis=2)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            F_ref = np.cumsum(ref[..., :B], axis=2) / ref_ok[..., None]
+            F_cur = np.cumsum(cur[..., :B], axis=2) / cur_ok[..., None]
+            d = np.abs(F_cur - F_ref)[..., :-1]                       # at the B-1 edges
+            ks = d.max(axis=2)
+            w1 = (d * np.diff(self.centers, axis=1)[None]).sum(axis=2)
+            mean_ref, mean_cur = ref_sum / ref_ok, cur_sum / cur_ok
+            miss_ref, miss_cur = ref[..., B] / n_ref, cur[..., B] / n_cur
+
+        S, F = len(labels), len(self.features)
+        out = pd.DataFrame({
+            "segment": np.repeat(labels, F),
+            "feature": np.tile(self.features, S),
+            "n_ref": n_ref.ravel().astype("int64"),
+            "n_cur": n_cur.ravel().astype("int64"),
+            "psi": psi.ravel(),
+            "ks": ks.ravel(),
+            "wasserstein": w1.ravel(),
+            "mean_ref": mean_ref.ravel(),
+            "mean_cur": mean_cur.ravel(),
+            "missing_ref": miss_ref.ravel(),
+            "missing_cur": miss_cur.ravel(),
+        })
+        out["delta"] = out["mean_cur"] - out["mean_ref"]
+        out["flag"] = np.select([out["psi"] >= PSI_MAJOR, out["psi"] >= PSI_MINOR], ["major", "minor"], default="")
+        out.loc[out["n_cur"] < min_n, "flag"] = ""
+        out.loc[out["n_cur"] == 0, ["psi", "ks", "wasserstein", "flag"]] = [np.nan, np.nan, np.nan, ""]
+        return out
+
+    # ---- persistence ----
+
+    def save(self, path: Path) -> Path:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.stem + ".tmp.npz")
+        np.savez(tmp, features=np.array(self.features, dtype=object), segments=np.array(self.segments, dtype=object),
+                 labels=np.array(self.labels, dtype=object), edges=self.edges, counts=self.counts, sums=self.sums,
+                 centers=self.centers)
+        tmp.replace(path)
+        return path
+
+    @classmethod
+    def load(cls, path: Path) -> "DriftReference":
+        z = np.load(path, allow_pickle=True)
+        return cls(z["features"].tolist(), z["segments"].tolist(), z["labels"].tolist(), z["edges"], z["counts"],
+                   z["sums"], z["centers"])
+
+# -------------------- CLI --------------------
+
+def main():
+    ap = argparse.ArgumentParser(description="PSI / KS / Wasserstein drift of a new slice against a reference.")
+    ap.add_argument("--ref", type=Path, required=True, help="reference data (.parquet/.csv) or a saved reference (.npz)")
+    ap.add_argument("--cur", type=Path, required=True, help="data to check")
+    ap.add_argument("--segments", default="", help="comma list of segment columns, e.g. market,season")
+    ap.add_argument("--features", default="", help="comma list (default: every numeric column)")
+    ap.add_argument("--bins", type=int, default=10)
+    ap.add_argument("--min-n", type=int, default=MIN_N_CUR, help="segments with fewer current rows are not flagged")
+    ap.add_argument("--save-ref", type=Path, default=None, help="write the built reference (.npz) for reuse")
+    ap.add_argument("--out", type=Path, default=None)
+    ap.add_argument("--all", action="store_true", help="print every row, not only flagged ones")
+    args = ap.parse_args()
+
+    read = lambda p: pd.read_csv(p, low_memory=False) if p.suffix == ".csv" else pd.read_parquet(p)
+    t0 = time.perf_counter()
+    if args.ref.suffix == ".npz":
+        ref = DriftReference.load(args.ref)
+    else:
+        segs = [s.strip() for s in args.segments.split(",") if s.strip()]
+        feats = [s.strip() for s in args.features.split(",") if s.strip()] or None
+        ref = DriftReference.build(read(args.ref), feats, segs, args.bins)
+    t_ref = time.perf_counter() - t0
+    if args.save_ref:
+        ref.save(args.save_ref)
+    cur = read(args.cur)
+    t = time.perf_counter()
+    res = ref.score(cur, min_n=args.min_n)
+    dt = (time.perf_counter() - t) * 1000
+    print(f"[drift] reference: {len(ref.features)} features x {len(ref.labels)} segments ({t_ref:.2f}s); "
+          f"scored {len(cur):,} rows in {dt:.1f} ms")
+    show = res if args.all else res[res["flag"] != ""]
+    with pd.option_context("display.width", 200, "display.max_rows", 500):
+        print(show.sort_values("psi", ascending=False).to_string(index=False, float_format=lambda v: f"{v:.4f}")
+              if not show.empty else "[drift] no feature over the PSI threshold")
+    if args.out:
+        res.to_csv(args.out, index=False)
+
+if __name__ == "__main__":
+    main()
@@ -2,60 +2,58 @@ import argparse
 import warnings
 import pandas as pd
 import numpy as np
-import joblib
 from sklearn.metrics import roc_auc_score
 
+from tools.batch_infer import MODEL_FILE, add_cli_args, report, run
+
 warnings.filterwarnings("ignore", category=UserWarning)
 warnings.filterwarnings("ignore", category=FutureWarning)
 
-def _coerce_numeric_expected(pipe, df: pd.DataFrame) -> pd.DataFrame:
-    """Make sure numeric block columns are numeric, so median imputer won't choke."""
-    try:
-        pre = pipe.named_steps.get("pre") or pipe.named_steps.get("ct")
-    except Exception:
-        pre = None
-    num_cols = []
-    if pre is not None and hasattr(pre, "transformers_"):
-        for name, trans, cols in pre.transformers_:
-            if name in ("num", "numeric", "num_pipe"):
-                num_cols = list(cols)
-                break
-    for c in num_cols:
-        if c in df.columns:
-            df[c] = pd.to_numeric(df[c], errors="coerce")
-    return df
+LABEL_CANDIDATES = ("result", "result_str", "outcome", "win_flag", "label")
+LABEL_MAP = {
+    "win": 1, "won": 1, "1": 1, "true": 1,
+    "loss": 0, "lost": 0, "0": 0, "false": 0
+}
 
-def infer_label(df: pd.DataFrame):
-    """Try to find a binary result label."""
-    for candidate in ("result", "result_str", "outcome", "win_flag", "label"):
-        if candidate in df.columns:
-            y = df[candidate].astype(str).str.lower().map({
-                "win": 1, "won": 1, "1": 1, "true": 1,
-                "loss": 0, "lost": 0, "0": 0, "false": 0
-            })
-            if y.notna().sum() >= 100 and y.dropna().nunique() == 2:
-                return y.fillna(0).astype(int)
+def infer_label(labels: dict[str, np.ndarray]):
+    """Try to find a binary result label among the accumulated candidate columns."""
+    for candidate in LABEL_CANDIDATES:
+        y = labels.get(candidate)
+        if y is None:
+            continue
+        known = ~np.isnan(y)
+        if known.sum() >= 100 and len(np.unique(y[known])) == 2:
+            return np.nan_to_num(y, nan=0.0).astype(int)
     return None
 
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--edges", required=True)
     ap.add_argument("--model-dir", required=True)
-    ap.add_argument("--model-file", default="parlay_model.joblib")
+    ap.add_argument("--model-file", default=MODEL_FILE)
+    add_cli_args(ap)
     args = ap.parse_args()
 
-    df = pd.read_csv(args.edges, low_memory=False)
-    df.columns = [c.strip().lower() for c in df.columns]
-
-    model_path = f"{args.model_dir.rstrip('/\\')}/{args.model_file}"
-    pipe = joblib.load(model_path)
+    # stream the file; only the scores and the label candidates are kept in memory
+    probas: list[np.ndarray] = []
+    labels: dict[str, list[np.ndarray]] = {}
+    def _collect(df: pd.DataFrame, p: np.ndarray) -> None:
+        probas.append(p)
+        for c in LABEL_CANDIDATES:
+            if c in df.columns:
+                y = df[c].astype(str).str.lower().map(LABEL_MAP)
+                labels.setdefault(c, []).append(pd.to_numeric(y, errors="coerce").to_numpy(dtype="float64"))
 
-    df = _coerce_numeric_expected(pipe, df)
-    proba = pipe.predict_proba(df)[:, 1]
+    stats = run(args.edges, args.model_dir, None, args.model_file,
+                chunk_size=args.chunk_size, workers=args.workers, on_chunk=_collect, verbose=False)
+    report(stats, "evaluate_parlay")
+    if not probas:
+        print("[evaluate_parlay] No rows scored."); return
+    proba = np.concatenate(probas)
 
     # Optional AUC if we have a label
-    y = infer_label(df)
-    if y is not None and y.nunique() == 2:
+    y = infer_label({c: np.concatenate(v) for c, v in labels.items()})
+    if y is not None and len(np.unique(y)) == 2:
         try:
             auc = roc_auc_score(y, proba)
             print(f"[evaluate_parlay] AUC={auc:.3f} on {len(y):,} rows")
@@ -65,7 +63,7 @@ def main():
         print("[evaluate_parlay] No binary label found; skipping AUC.")
 
     # quick distribution
-    qs = np.quantile(pd.Series(proba), [0, .25, .5, .75, .9, .95, .99, 1])
+    qs = np.quantile(proba, [0, .25, .5, .75, .9, .95, .99, 1])
     print("[evaluate_parlay] proba quantiles:",
           dict(zip(["min","25%","50%","75%","90%","95%","99%","max"],
                    [round(float(x), 3) for x in qs])))
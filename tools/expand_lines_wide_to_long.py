@@ -62,118 +62,19 @@ def _ensure_cols(df: pd.DataFrame) -> pd.DataFrame:
     return w
 
 def expand(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Wide game rows -> one row per outcome, driven by odds_reshape.WIDE_GAME_SPEC:
+    moneyline home/away price pairs, spread (away line = -home unless handicap_away is given),
+    totals with over/under prices; a missing side price falls back to the generic `odds` column.
+    """
+    from tools.odds_reshape import WIDE_GAME_SPEC, reshape
     w = _ensure_cols(df)
 
-    rows = []
-
-    # Heuristics: your files may have any subset of these sets. We create rows only when fields exist.
-    # --- MONEYLINE ---
-    for home_col, away_col in [("home_odds","away_odds"), ("home_price","away_price"), ("price_home","price_away")]:
-        if home_col in w.columns or away_col in w.columns:
-            base_cols = ["game_id","book","kickoff","captured_at"]
-            keep = [c for c in base_cols + ["market"] if c in w.columns]
-            sub = w[keep].copy()
-            sub["market"] = sub.get("market","H2H")
-            # HOME row
-            if home_col in w.columns:
-                rH = sub.copy()
-                rH["side"] = "HOME"
-                rH["line"] = np.nan
-                rH["odds"] = pd.to_numeric(w[home_col], errors="coerce")
-                rows.append(rH)
-            # AWAY row
-            if away_col in w.columns:
-                rA = sub.copy()
-                rA["side"] = "AWAY"
-                rA["line"] = np.nan
-                rA["odds"] = pd.to_numeric(w[away_col], errors="coerce")
-                rows.append(rA)
-            break  # don’t double-add if multiple pairs exist
-
-    # --- SPREADS ---
-    # Patterns:
-    # 1) one spread line column (home favored negative, away is the negation): spread / spread_line / handicap
-    for spread_col in ("spread","spread_line","handicap","handicap_home"):
-        if spread_col in w.columns:
-            base_cols = ["game_id","book","kickoff","captured_at"]
-            keep = [c for c in base_cols + ["market"] if c in w.columns]
-            sub = w[keep].copy()
-            sub["market"] = "SPREADS"
-            line_home = pd.to_numeric(w[spread_col], errors="coerce")
-            line_away = -line_home
-            # odds columns if split by side
-            home_odds = None
-            away_odds = None
-            for hc, ac in [("home_spread_odds","away_spread_odds"), ("price_home","price_away")]:
-                if hc in w.columns and ac in w.columns:
-                    home_odds = pd.to_numeric(w[hc], errors="coerce")
-                    away_odds = pd.to_numeric(w[ac], errors="coerce")
-                    break
-            # HOME
-            rH = sub.copy()
-            rH["side"] = "HOME"
-            rH["line"] = line_home
-            rH["odds"] = home_odds if home_odds is not None else pd.to_numeric(w.get("odds"), errors="coerce")
-            rows.append(rH)
-            # AWAY
-            rA = sub.copy()
-            rA["side"] = "AWAY"
-            rA["line"] = line_away
-            rA["odds"] = away_odds if away_odds is not None else pd.to_numeric(w.get("odds"), errors="coerce")
-            rows.append(rA)
-            break
-
-    # 2) explicit home/away handicap columns
-    if "handicap_home" in w.columns and "handicap_away" in w.columns:
-        base_cols = ["game_id","book","kickoff","captured_at"]
-        keep = [c for c in base_cols + ["market"] if c in w.columns]
-        sub = w[keep].copy()
-        sub["market"] = "SPREADS"
-        # HOME
-        rH = sub.copy()
-        rH["side"] = "HOME"
-        rH["line"] = pd.to_numeric(w["handicap_home"], errors="coerce")
-        rH["odds"] = pd.to_numeric(w.get("home_spread_odds", w.get("price_home")), errors="coerce")
-        rows.append(rH)
-        # AWAY
-        rA = sub.copy()
-        rA["side"] = "AWAY"
-        rA["line"] = pd.to_numeric(w["handicap_away"], errors="coerce")
-        rA["odds"] = pd.to_numeric(w.get("away_spread_odds", w.get("price_away")), errors="coerce")
-        rows.append(rA)
-
-    # --- TOTALS ---
-    # Common pattern: one total line + separate over/under odds
-    if "total" in w.columns or "total_line" in w.columns or "points_total" in w.columns:
-        tot_col = next(c for c in ("total","total_line","points_total") if c in w.columns)
-        base_cols = ["game_id","book","kickoff","captured_at"]
-        keep = [c for c in base_cols + ["market"] if c in w.columns]
-        sub = w[keep].copy()
-        sub["market"] = "TOTALS"
-        line_total = pd.to_numeric(w[tot_col], errors="coerce")
-        # odds columns for OU
-        over_odds  = None
-        under_odds = None
-        for oc, uc in [("over_odds","under_odds"), ("price_over","price_under"), ("ou_price_over","ou_price_under")]:
-            if oc in w.columns and uc in w.columns:
-                over_odds  = pd.to_numeric(w[oc], errors="coerce")
-                under_odds = pd.to_numeric(w[uc], errors="coerce")
-                break
-        # OVER
-        rO = sub.copy()
-        rO["side"] = "OVER"
-        rO["line"] = line_total
-        rO["odds"] = over_odds if over_odds is not None else pd.to_numeric(w.get("odds"), errors="coerce")
-        rows.append(rO)
-        # UNDER
-        rU = sub.copy()
-        rU["side"] = "UNDER"
-        rU["line"] = line_total
-        rU["odds"] = under_odds if under_odds is not None else pd.to_numeric(w.get("odds"), errors="coerce")
-        rows.append(rU)
+    base_cols = [c for c in ["game_id","book","kickoff","captured_at"] if c in w.columns]
+    long = reshape(w, WIDE_GAME_SPEC, id_cols=base_cols, dropna=False, price_name="odds")
 
     # If we didn’t create any rows (no wide cols found), just pass through any existing tidy rows.
-    if not rows:
+    if long.empty:
         tidy = w.copy()
         if "side" not in tidy.columns:
             tidy["side"] = np.nan
@@ -183,11 +84,9 @@ def expand(df: pd.DataFrame) -> pd.DataFrame:
         tidy["odds"] = pd.to_numeric(tidy.get("odds"), errors="coerce")
         return tidy
 
-    out = pd.concat(rows, ignore_index=True)
-    # ensure dtypes
-    out["line"] = pd.to_numeric(out["line"], errors="coerce")
-    out["odds"] = pd.to_numeric(out["odds"], errors="coerce")
-    return out
+    for c in ("market","side"):
+        long[c] = long[c].astype(str)
+    return long
 
 def main():
     df, src = _load_first(CANDIDATES)
@@ -0,0 +1,240 @@
+# tools/fair_price.py
+# De-vig and consensus fair-price engine.
+#
+# Per book, the quotes of one market (HOME/AWAY, OVER/UNDER, or HOME/AWAY/DRAW at the same line) are
+# laid out as rows of a (n_markets, 3) implied-probability matrix and de-vigged in one vectorized pass
+# with the multiplicative, additive, power or Shin method. A weighted cross-book consensus per
+# game/market/side/line is then built from the per-book fair probabilities.
+#
+# Output: exports/fair_odds.csv (one row per game/market/side/line), refreshed by capture_lines.py.
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from tools.pathing import exports_dir
+
+FAIR_CSV = "fair_odds.csv"
+METHODS = ("multiplicative", "additive", "power", "shin")
+
+# sharper books carry more weight in the consensus; everything else is 1.0
+BOOK_WEIGHTS = {
+    "PINNACLE": 3.0, "CIRCA": 2.0, "CIRCASPORTS": 2.0, "BOOKMAKER": 2.0, "BETCRIS": 1.5,
+}
+
+SIDE_SLOT = {"HOME": 0, "OVER": 0, "AWAY": 1, "UNDER": 1, "DRAW": 2, "TIE": 2}
+FAIR_KEY = ["_game", "_market_norm", "side", "_pair_line"]
+
+# -------------------- price math --------------------
+
+def american_to_decimal(a) -> np.ndarray:
+    a = pd.to_numeric(pd.Series(a), errors="coerce").to_numpy(dtype="float64")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(a > 0, 1 + a / 100.0, np.where(a < 0, 1 + 100.0 / np.abs(a), np.nan))
+
+def decimal_to_american(d) -> np.ndarray:
+    d = np.asarray(d, dtype="float64")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out = np.where(d >= 2.0, 100.0 * (d - 1.0), -100.0 / (d - 1.0))
+    return np.where(d > 1.0, np.round(out), np.nan)
+
+# -------------------- de-vig --------------------
+
+def devig(imp: np.ndarray, method: str = "multiplicative", iters: int = 60) -> np.ndarray:
+    """
+    De-vig each row of an (n, k) implied-probability matrix. NaN marks an absent outcome
+    (two-way markets in a three-slot matrix). Rows with fewer than two quotes come back NaN.
+    """
+    q = np.asarray(imp, dtype="float64")
+    have = ~np.isnan(q)
+    k = have.sum(axis=1, keepdims=True)
+    S = np.nansum(q, axis=1, keepdims=True)
+    ok = (k >= 2) & (S > 0)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if method == "multiplicative":
+            p = q / S
+        elif method == "additive":
+            p = q - (S - 1.0) / k
+            p = np.clip(p, 1e-9, None)
+            p = p / np.nansum(p, axis=1, keepdims=True)
+        elif method == "power":
+            # solve sum(q_i ** e) = 1 for e by Newton steps from e = 1, all rows at once
+            lq = np.log(np.where(have, q, 1.0))
+            e = np.ones_like(S)
+            for _ in range(iters):
+                qe = np.where(have, np.exp(e * lq), 0.0)
+                f = qe.sum(axis=1, keepdims=True) - 1.0
+                fp = (qe * lq).sum(axis=1, keepdims=True)
+                step = np.where(fp != 0, f / fp, 0.0)
+                e = np.clip(e - step, 1e-3, 50.0)
+                if np.nanmax(np.abs(step)) < 1e-12:
+                    break
+            p = np.where(have, np.exp(e * lq), np.nan)
+        elif method == "shin":
+            # Shin (1993): find insider share z with sum p_i(z) = 1, bisection on all rows at once
+            lo = np.zeros_like(S); hi = np.full_like(S, 0.999)
+            def _p(z):
+                return (np.sqrt(z * z + 4.0 * (1.0 - z) * q * q / S) - z) / (2.0 * (1.0 - z))
+            for _ in range(iters):
+                mid = 0.5 * (lo + hi)
+                over = np.nansum(_p(mid), axis=1, keepdims=True) > 1.0
+                lo = np.where(over, mid, lo); hi = np.where(over, hi, mid)
+            p = _p(0.5 * (lo + hi))
+            p = p / np.nansum(p, axis=1, keepdims=True)
+        else:
+            raise ValueError(f"unknown de-vig method {method!r}; expected one of {METHODS}")
+
+    return np.where(ok & have, p, np.nan)
+
+# -------------------- canonical quotes --------------------
+
+def _s(x) -> pd.Series:
+    if isinstance(x, pd.Series):
+        return x.astype("string").fillna("")
+    return pd.Series([x], dtype="string")
+
+def _one_of(df: pd.DataFrame, names: list[str], default="") -> pd.Series:
+    for n in names:
+        if n in df.columns:
+            return df[n]
+    return pd.Series([default] * len(df), index=df.index)
+
+def _tok(s: pd.Series) -> pd.Series:
+    return s.str.replace(r"[^A-Z0-9]+", "_", regex=True).str.strip("_")
+
+def canon_quotes(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Map snapshot / lines_live / odds_history schemas to: _game, _market_norm, side, book, line,
+    price, _pair_line. Team-name selections are resolved to HOME/AWAY; spreads are paired on the
+    home-perspective line so HOME -3 meets AWAY +3.
+    """
+    d = pd.DataFrame(index=df.index)
+    home = _s(_one_of(df, ["_home_nick", "home", "home_team"])).str.upper()
+    away = _s(_one_of(df, ["_away_nick", "away", "away_team"])).str.upper()
+    date = _s(_one_of(df, ["_date_iso", "_DateISO", "date"]))
+    gid = _s(_one_of(df, ["game_id"]))
+    d["_game"] = gid.where(gid != "", date + "|" + home + "@" + away)
+
+    mkt = _s(_one_of(df, ["_market_norm", "market_norm", "market"])).str.upper()
+    d["_market_norm"] = mkt.replace({"ML": "H2H", "MONEYLINE": "H2H", "SPREAD": "SPREADS", "TOTAL": "TOTALS"})
+
+    side = _s(_one_of(df, ["side", "side_norm", "selection"])).str.upper().str.strip()
+    side_t, home_t, away_t = _tok(side), _tok(home), _tok(away)
+    side = side.mask(side_t.eq(home_t) & home_t.ne(""), "HOME").mask(side_t.eq(away_t) & away_t.ne(""), "AWAY")
+    d["side"] = side.replace({"O": "OVER", "U": "UNDER", "X": "DRAW"})
+
+    d["book"] = _s(_one_of(df, ["book", "sportsbook", "bookmaker"]))
+    d["line"] = pd.to_numeric(_one_of(df, ["line", "point", "Line/Point"], np.nan), errors="coerce")
+    d["price"] = pd.to_numeric(_one_of(df, ["price", "price_american", "odds", "American"], np.nan), errors="coerce")
+
+    ln = d["line"].fillna(0.0)
+    d["_pair_line"] = np.where(d["_market_norm"].eq("SPREADS"), np.where(d["side"].eq("AWAY"), -ln, ln),
+                      np.where(d["_market_norm"].eq("TOTALS"), ln, 0.0))
+    return d
+
+# -------------------- per-book and consensus --------------------
+
+def book_fair(df: pd.DataFrame, method: str = "multiplicative") -> pd.DataFrame:
+    """
+    Add fair_prob (de-vigged within the book's own market) and overround to every quote.
+    Quotes whose side is not a known slot, or whose market has a single quoted side, get NaN.
+    """
+    q = canon_quotes(df)
+    slot = q["side"].map(SIDE_SLOT)
+    ok = slot.notna() & q["price"].notna()
+    q["fair_prob"] = np.nan
+    q["overround"] = np.nan
+    if not ok.any():
+        return q
+
+    sub = q[ok]
+    codes, _ = pd.factorize(pd.MultiIndex.from_frame(sub[["_game", "_market_norm", "book", "_pair_line"]]))
+    with np.errstate(divide="ignore"):
+        imp = 1.0 / american_to_decimal(sub["price"])
+    mat = np.full((codes.max() + 1, 3), np.nan)
+    mat[codes, slot[ok].astype(int).to_numpy()] = imp  # duplicates: last quote wins
+
+    fair = devig(mat, method=method)
+    q.loc[ok, "fair_prob"] = fair[codes, slot[ok].astype(int).to_numpy()]
+    q.loc[ok, "overround"] = np.nansum(mat, axis=1)[codes] - 1.0
+    return q
+
+def consensus_fair(
+    df: pd.DataFrame,
+    method: str = "multiplicative",
+    weights: dict[str, float] | None = None,
+) -> pd.DataFrame:
+    """
+    Weighted cross-book consensus fair probability per (game, market, side, pair line).
+    Consensus probabilities of one market are re-normalized to sum to 1.
+    """
+    q = book_fair(df, method=method)
+    q = q[q["fair_prob"].notna()]
+    if q.empty:
+        return pd.DataFrame(columns=FAIR_KEY + ["line", "fair_prob", "fair_dec", "fair_american", "n_books", "best_price", "method"])
+
+    w = weights or BOOK_WEIGHTS
+    q = q.assign(_w=q["book"].str.upper().map(w).fillna(1.0).astype("float64"))
+    q = q.assign(_wp=q["_w"] * q["fair_prob"], _dec=american_to_decimal(q["price"]))
+
+    out = q.groupby(FAIR_KEY, sort=False).agg(
+        _wp=("_wp", "sum"), _w=("_w", "sum"), n_books=("book", "nunique"),
+        line=("line", "first"), _best_dec=("_dec", "max"),
+    ).reset_index()
+    out["fair_prob"] = out["_wp"] / out["_w"]
+    out["fair_prob"] = out["fair_prob"] / out.groupby(["_game", "_market_norm", "_pair_line"], sort=False)["fair_prob"].transform("sum")
+    out["fair_dec"] = 1.0 / out["fair_prob"]
+    out["fair_american"] = decimal_to_american(out["fair_dec"])
+    out["best_price"] = decimal_to_american(out["_best_dec"])
+    out["method"] = method
+    return out.drop(columns=["_wp", "_w", "_best_dec"])
+
+def attach_fair(df: pd.DataFrame, fair: pd.DataFrame, price_col: str | None = None) -> pd.DataFrame:
+    """
+    Left-join consensus fair_prob onto quotes (any supported schema) and add ev_vs_fair per $1
+    at the row's own price. Does not mutate the caller's frame.
+    """
+    out = df.copy()
+    q = canon_quotes(out)
+    keys = q[FAIR_KEY].reset_index(drop=True)
+    m = keys.merge(fair[FAIR_KEY + ["fair_prob"]].drop_duplicates(FAIR_KEY), on=FAIR_KEY, how="left")
+    out["fair_prob"] = m["fair_prob"].to_numpy()
+    price = pd.to_numeric(out[price_col], errors="coerce") if price_col else q["price"]
+    dec = american_to_decimal(price)
+    out["ev_vs_fair"] = out["fair_prob"] * dec - 1.0
+    return out
+
+# -------------------- refresh --------------------
+
+def refresh_fair_odds(
+    exp: Path | None = None,
+    quotes: pd.DataFrame | None = None,
+    method: str = "multiplicative",
+) -> pd.DataFrame:
+    """Rebuild exports/fair_odds.csv from the given snapshot (default: exports/lines_live.csv)."""
+    exp = exp or exports_dir()
+    if quotes is None:
+        live = exp / "lines_live.csv"
+        if not live.exists() or live.stat().st_size == 0:
+            return pd.DataFrame()
+        quotes = pd.read_csv(live, low_memory=False, encoding="utf-8-sig")
+    fair = consensus_fair(quotes, method=method)
+    fair.to_csv(exp / FAIR_CSV, index=False, encoding="utf-8-sig")
+    return fair
+
+def main():
+    ap = argparse.ArgumentParser(description="Build de-vigged consensus fair odds from the current snapshot.")
+    ap.add_argument("--method", choices=METHODS, default="multiplicative")
+    ap.add_argument("--input", default="", help="quotes CSV (default: exports/lines_live.csv)")
+    args = ap.parse_args()
+    exp = exports_dir()
+    quotes = pd.read_csv(args.input, low_memory=False, encoding="utf-8-sig") if args.input else None
+    fair = refresh_fair_odds(exp, quotes=quotes, method=args.method)
+    print(f"[fair] {len(fair):,} rows ({args.method}) -> {exp / FAIR_CSV}")
+
+if __name__ == "__main__":
+    main()
@@ -23,13 +23,24 @@ def norm_team(x: str) -> str:
     x = x.strip()
     return TEAM_FIX.get(x, x)
 
+# Oddsshark historical results URL pattern (works for regular season & playoffs pages)
+SCORES_URL = "https://www.oddsshark.com/nfl/scores?season={season}&week={week}"
+
+def week_url(season: int, week: int) -> str:
+    return SCORES_URL.format(season=season, week=week)
+
 def parse_week(season: int, week: int) -> pd.DataFrame:
-    # Oddsshark historical results URL pattern (works for regular season & playoffs pages)
-    url = f"https://www.oddsshark.com/nfl/scores"
-    params = {"season": season, "week": week}
-    r = requests.get(url, params=params, timeout=20)
+    r = requests.get(week_url(season, week), timeout=20)
     r.raise_for_status()
-    soup = BeautifulSoup(r.text, "lxml")
+    return parse_html(r.text, season, week)
+
+def parse_page(url: str, html: str) -> pd.DataFrame:
+    """scrape_core parser: season/week from the query string."""
+    q = dict(re.findall(r"[?&](season|week)=(\d+)", url))
+    return parse_html(html, int(q["season"]), int(q["week"]))
+
+def parse_html(html: str, season: int, week: int) -> pd.DataFrame:
+    soup = BeautifulSoup(html, "lxml")
 
     # Table rows generally contain team names & final score; structure can vary slightly season-to-season.
     rows = []
@@ -70,6 +81,7 @@ def parse_week(season: int, week: int) -> pd.DataFrame:
     return df
 
 def fetch_season(season: int, max_weeks: int = 23, delay: float = 0.8) -> pd.DataFrame:
+    """Sequential, uncached fetch of one season (kept for callers; main() uses scrape_core)."""
     frames = []
     for w in range(1, max_weeks+1):
         try:
@@ -86,27 +98,38 @@ def fetch_season(season: int, max_weeks: int = 23, delay: float = 0.8) -> pd.Dat
     return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
 
 def main():
+    from tools.scrape_core import add_cli_args, scrape_from_args
     ap = argparse.ArgumentParser()
     ap.add_argument("--start", type=int, required=True)
     ap.add_argument("--end", type=int, required=True)
     ap.add_argument("--outdir", type=str, default=str(OUT_DIR))
+    ap.add_argument("--max-weeks", type=int, default=23)
+    add_cli_args(ap)
+    ap.set_defaults(delay=0.8)
     args = ap.parse_args()
     outdir = Path(args.outdir)
     outdir.mkdir(parents=True, exist_ok=True)
 
     all_frames = []
+    todo = []
     for season in range(args.start, args.end+1):
         out_file = outdir / f"nfl_scores_{season}.csv"
         if out_file.exists():
             print(f"[skip] {out_file} exists")
-            df = pd.read_csv(out_file)
+            all_frames.append(pd.read_csv(out_file))
         else:
-            print(f"[fetch] season {season}")
-            df = fetch_season(season)
+            todo.append(season)
+
+    if todo:
+        # every week of every missing season goes through one fetch pool + one parse pool
+        urls = [week_url(s, w) for s in todo for w in range(1, args.max_weeks + 1)]
+        got = scrape_from_args(args, urls, parse_page)
+        for season in todo:
+            df = got[got["season"].eq(season)] if not got.empty else pd.DataFrame()
             if df.empty:
                 print(f"[warn] season {season} yielded 0 games")
-            df.to_csv(out_file, index=False)
-        all_frames.append(df)
+            df.to_csv(outdir / f"nfl_scores_{season}.csv", index=False)
+            all_frames.append(df)
 
     all_df = pd.concat(all_frames, ignore_index=True) if all_frames else pd.DataFrame()
     combo = outdir / "nfl_scores_oddsshark_all.csv"
@@ -0,0 +1,196 @@
+# tools/game_model.py
+# Game outcome model: mean margin / total from team features + a discrete outcome distribution
+# around them, priced through precomputed CDF tables.
+#
+#   margin (home - away) and total points are integers with heavy key numbers (3, 7, 10, 14 for
+#   margins; 37, 41, 44, 47, 51 for totals). The outcome PMF for a predicted mean mu is
+#       P(Y = y | mu)  ∝  f(y - mu) * w(y)
+#   f = smoothed density of the training residuals (skew kept, no normal assumption),
+#   w = key-number weight: empirical frequency of y over its smoothed frequency (symmetric for margins).
+#   PMF rows are tabulated once on a fine grid of mu and stored as CDFs, so pricing any line for
+#   any game is an index lookup + two table reads — no simulation at scoring time.
+#
+# Used by tools/train_game.py (fit) and for pricing slates:
+#   python -m tools.game_model --model-id game-... --games upcoming.csv [--history scores.csv] --out priced.csv
+from __future__ import annotations
+
+import argparse
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from tools.pathing import exports_dir
+
+FEATURES = [
+    "elo_spread", "elo_total", "rating_diff", "margin_l5_diff", "rest_diff",
+    "home_ppg", "home_papg", "away_ppg", "away_papg", "home_margin_l10", "away_margin_l10",
+    "home_ou_over_pct", "away_ou_over_pct", "home_games_played", "away_games_played",
+]
+
+# ---- features ----
+
+def game_features(games: pd.DataFrame, elo_params=None) -> pd.DataFrame:
+    """
+    Pre-game features for every game in `games` (played history + any unplayed rows to price).
+    Point-in-time: team-form features come from the feature store's as-of lookup and the Elo
+    columns from the rating pass, both of which only see earlier games.
+    """
+    from core_engine.etl.feature_store import GAME_COLS, FeatureStore, normalize_games
+    from core_engine.etl.ratings import rate
+
+    g = games if set(GAME_COLS) <= set(games.columns) else normalize_games(games, played_only=False)
+    store = FeatureStore.from_games(g)
+    feats = store.matchup_features(g)
+    elo, _ = rate(g, elo_params)
+    elo = elo.rename(columns={"spread_pred": "elo_spread", "total_pred": "elo_total", "p_home": "elo_p_home"})
+    feats = feats.merge(elo[["game_id", "elo_spread", "elo_total", "elo_p_home"]], on="game_id", how="left")
+    feats = feats.merge(g[["game_id", "home_score", "away_score", "home_spread", "total_line", "neutral"]],
+                        on="game_id", how="left")
+    feats["margin"] = feats["home_score"] - feats["away_score"]
+    feats["total"] = feats["home_score"] + feats["away_score"]
+    return feats
+
+# ---- outcome distribution ----
+
+def _smooth(x: np.ndarray, y: np.ndarray, bw: float) -> np.ndarray:
+    """Gaussian smoothing of values y on an evenly spaced grid x."""
+    step = x[1] - x[0]
+    k = np.arange(-int(4 * bw / step) - 1, int(4 * bw / step) + 2) * step
+    ker = np.exp(-0.5 * (k / bw) ** 2)
+    return np.convolve(y, ker / ker.sum(), mode="same")
+
+def key_weights(values: np.ndarray, lo: int, hi: int, bw: float = 2.0, symmetric: bool = False,
+                clip: tuple[float, float] = (0.3, 3.0)) -> np.ndarray:
+    """w(y) for y in lo..hi: empirical frequency over Gaussian-smoothed frequency."""
+    y = np.arange(lo, hi + 1)
+    cnt = np.bincount(np.clip(np.rint(values).astype(int), lo, hi) - lo, minlength=len(y)).astype("float64")
+    if symmetric:
+        cnt = 0.5 * (cnt + cnt[::-1])
+    smooth = _smooth(y.astype("float64"), cnt, bw)
+    alpha = max(cnt.sum() * 1e-4, 1.0)
+    return np.clip((cnt + alpha) / (smooth + alpha), *clip)
+
+def residual_density(resid: np.ndarray, lo: float = -80.0, hi: float = 80.0, step: float = 0.25,
+                     bw: float | None = None) -> tuple[np.ndarray, np.ndarray]:
+    """(grid, density) of residuals, histogram + Gaussian kernel (Silverman bandwidth by default)."""
+    resid = resid[np.isfinite(resid)]
+    bw = bw or 1.06 * resid.std() * len(resid) ** -0.2
+    x = np.arange(lo, hi + step / 2, step)
+    h = np.bincount(np.clip(np.rint((resid - lo) / step).astype(int), 0, len(x) - 1), minlength=len(x)).astype("float64")
+    f = _smooth(x, h, max(bw, step))
+    return x, f / (f.sum() * step)
+
+class CdfTable:
+    """
+    CDF of an integer outcome for a grid of means: cdf[i, j] = P(Y <= y_lo + j | row i), where row i
+    has mean row_mean[i] (rows span mu_lo..mu_hi in mu_step increments).
+    """
+    def __init__(self, x: np.ndarray, f: np.ndarray, weights: np.ndarray, y_lo: int,
+                 mu_lo: float, mu_hi: float, mu_step: float = 0.05):
+        self.y_lo = int(y_lo)
+        self.y = np.arange(y_lo, y_lo + len(weights))
+        mu = np.arange(mu_lo, mu_hi + mu_step / 2, mu_step)
+        pmf = np.interp(self.y[None, :] - mu[:, None], x, f, left=0.0, right=0.0) * weights[None, :]
+        pmf /= pmf.sum(axis=1, keepdims=True)
+        self.cdf = np.cumsum(pmf, axis=1).astype("float32")
+        self.cdf[:, -1] = 1.0
+        # key-number weights pull row means off the grid value; look rows up by their actual mean
+        self.row_mean = np.maximum.accumulate(pmf @ self.y)
+
+    def _rows(self, mu) -> np.ndarray:
+        i = np.rint(np.interp(np.asarray(mu, dtype="float64"), self.row_mean, np.arange(len(self.cdf))))
+        return np.nan_to_num(i, nan=0).astype(np.int64)
+
+    def le(self, mu, y) -> np.ndarray:
+        """P(Y <= y) for integer-valued y (floored), vectorized over games."""
+        r = self._rows(mu)
+        j = np.floor(np.asarray(y, dtype="float64")) - self.y_lo
+        out = self.cdf[r, np.clip(np.nan_to_num(j, nan=0), 0, self.cdf.shape[1] - 1).astype(np.int64)].astype("float64")
+        out = np.where(j < 0, 0.0, np.where(j >= self.cdf.shape[1], 1.0, out))
+        return np.where(np.isnan(np.asarray(y, dtype="float64")), np.nan, out)
+
+    def eq(self, mu, y) -> np.ndarray:
+        """P(Y == y); zero for half-point y."""
+        y = np.asarray(y, dtype="float64")
+        whole = y == np.floor(y)
+        return np.where(whole, self.le(mu, y) - self.le(mu, y - 1), 0.0)
+
+    def mean(self, mu) -> np.ndarray:
+        return self.row_mean[self._rows(mu)]
+
+# ---- model ----
+
+class GameModel:
+    """Two mean regressions (margin, total) + CDF tables. Pickled whole into the model registry."""
+    def __init__(self, margin_est, total_est, features: list[str], margin_table: CdfTable, total_table: CdfTable):
+        self.margin_est = margin_est
+        self.total_est = total_est
+        self.features = list(features)
+        self.margin_table = margin_table
+        self.total_table = total_table
+
+    def predict_means(self, feats: pd.DataFrame) -> tuple[np.ndarray, np.ndarray]:
+        X = feats.reindex(columns=self.features).to_numpy(dtype="float64", na_value=np.nan)
+        return self.margin_est.predict(X), self.total_est.predict(X)
+
+    def price(self, feats: pd.DataFrame, spread=None, total=None) -> pd.DataFrame:
+        """
+        Probabilities for each game at the given home spread (negative = home favoured) and total.
+        Lines default to the home_spread / total_line columns, else the model's own numbers.
+        """
+        mu_m, mu_t = self.predict_means(feats)
+        sp = np.asarray(spread if spread is not None else feats.get("home_spread", pd.Series(np.nan, index=feats.index)),
+                        dtype="float64")
+        tl = np.asarray(total if total is not None else feats.get("total_line", pd.Series(np.nan, index=feats.index)),
+                        dtype="float64")
+        sp = np.where(np.isnan(sp), np.round(-mu_m * 2) / 2, sp)
+        tl = np.where(np.isnan(tl), np.round(mu_t * 2) / 2, tl)
+        M, T = self.margin_table, self.total_table
+        out = pd.DataFrame(index=feats.index)
+        out["pred_margin"], out["pred_total"] = mu_m, mu_t
+        out["spread"], out["total_line"] = sp, tl
+        # home covers when margin + spread > 0  <=>  margin > -spread
+        out["p_home_cover"] = 1.0 - M.le(mu_m, -sp)
+        out["p_spread_push"] = M.eq(mu_m, -sp)
+        out["p_away_cover"] = 1.0 - out["p_home_cover"] - out["p_spread_push"]
+        out["p_over"] = 1.0 - T.le(mu_t, tl)
+        out["p_total_push"] = T.eq(mu_t, tl)
+        out["p_under"] = 1.0 - out["p_over"] - out["p_total_push"]
+        out["p_home_win"] = 1.0 - M.le(mu_m, 0)
+        out["p_tie"] = M.eq(mu_m, 0)
+        out["p_away_win"] = 1.0 - out["p_home_win"] - out["p_tie"]
+        return out
+
+# ---- CLI: price a slate ----
+
+def main():
+    ap = argparse.ArgumentParser(description="Price games with a registered game model.")
+    ap.add_argument("--model-id", default=None, help="registry id (default: active 'game' model)")
+    ap.add_argument("--games", type=Path, required=True, help="games to price (home/away/date, optional home_spread/total_line)")
+    ap.add_argument("--history", type=Path, default=None, help="scores history (default exports/scores_1966-2025.csv)")
+    ap.add_argument("--out", type=Path, default=None)
+    args = ap.parse_args()
+
+    from tools.model_registry import active_id, load
+    mid = args.model_id or active_id("game")
+    if not mid:
+        raise SystemExit("[game_model] no game model registered (run python -m tools.train_game)")
+    model, _ = load(mid)
+    from core_engine.etl.feature_store import normalize_games
+    hist = normalize_games(pd.read_csv(args.history or exports_dir() / "scores_1966-2025.csv", low_memory=False))
+    slate = normalize_games(pd.read_csv(args.games, low_memory=False), played_only=False)
+    slate = slate[~slate["game_id"].isin(hist["game_id"])].assign(home_score=np.nan, away_score=np.nan)
+    feats = game_features(pd.concat([hist, slate], ignore_index=True).sort_values(["date", "game_id"]))
+    feats = feats[feats["game_id"].isin(slate["game_id"])].reset_index(drop=True)
+    t = time.perf_counter()
+    priced = pd.concat([feats[["season", "week", "date", "game_id", "home_team", "away_team"]], model.price(feats)], axis=1)
+    dt = (time.perf_counter() - t) * 1000
+    print(priced.to_string(index=False, float_format=lambda v: f"{v:.4f}"))
+    print(f"[game_model] priced {len(priced)} games in {dt:.1f} ms ({mid})")
+    if args.out:
+        priced.to_csv(args.out, index=False)
+
+if __name__ == "__main__":
+    main()
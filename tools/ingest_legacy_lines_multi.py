@@ -1,12 +1,25 @@
 #!/usr/bin/env python
-import re, sys, argparse
+# Streaming ingest of legacy closing-line text archives (many weeks / seasons per file).
+#
+# Files are read line by line through a small state machine: a heading line sets (season, week),
+# game lines are matched either as one 5-column row (tabs or 2+ spaces) or as a 5-line block
+# (date/time, favorite, line, underdog, total) held in a 5-line window. Records are yielded in
+# fixed-size chunks and appended straight to a per-file part CSV, so memory stays flat and output
+# starts with the first chunk. Several files are parsed in separate processes; the parts are then
+# merged into exports/historical_odds_oddsshark.csv.
+import re, sys, argparse, hashlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from typing import Iterable, Iterator
 import pandas as pd
 import numpy as np
 
 # ---------- regex helpers ----------
 NUM_RE = re.compile(r'(-?\d+(?:\.\d+)?)')
 PK_RE  = re.compile(r'\bP(?:K|k)\b')
+AT_RE  = re.compile(r'^(At\s+|at\s+)')
+WIDE_RE = re.compile(r'\s{2,}')
 
 # Headings (multiple styles):
 HDRS = [
@@ -53,8 +66,7 @@ TEAMS = {
 
 def _canon(name: str):
     if not name: return None
-    name = name.strip()
-    name = re.sub(r'^(At\s+|at\s+)', '', name)
+    name = AT_RE.sub('', name.strip())
     return TEAMS.get(name, name)
 
 def _to_float(x):
@@ -64,133 +76,215 @@ def _to_float(x):
     m = NUM_RE.search(s)
     return float(m.group(1)) if m else None
 
-# ---------- per-block parsing ----------
-def parse_block(lines, season:int, week:int) -> pd.DataFrame:
+OUT_COLS = ["season","week","home","away","spread_close","total_close"]
+KEY = ["season","week","home","away"]
+
+# ---------- record builders ----------
+def _game(season, week, fav, ln, dog, tot):
+    """One game dict from favorite / line / underdog / total text, or None if it is not a game line."""
+    if not (fav and dog and (NUM_RE.search(ln) or PK_RE.search(ln))):
+        return None
+    fav_c = _canon(fav); dog_c = _canon(dog)
+    ln_v  = _to_float(ln);  tot_v = _to_float(tot)
+    fav_is_home = fav.lower().startswith("at ")
+    dog_is_home = dog.lower().startswith("at ")
+    if fav_is_home and not dog_is_home:
+        home, away = fav_c, dog_c; spread_home = -ln_v if ln_v is not None else None
+    else:
+        # underdog at home, or no "At" marker: legacy files list the home side second
+        home, away = dog_c, fav_c; spread_home = ln_v if ln_v is not None else None
+    if home is None or away is None:
+        return None
+    return {"season":season,"week":week,"home":home,"away":away,
+            "spread_close":spread_home,"total_close":tot_v}
+
+def _one_line(line: str, season, week):
+    """Format A: one line with 5 tab-separated (or 2+ space separated) columns."""
+    parts = [p.strip() for p in line.split('\t') if p.strip()]
+    if len(parts) < 5:
+        parts = WIDE_RE.split(line.strip())
+    if len(parts) < 5:
+        return None
+    dt, fav, ln, dog, tot = parts[:5]
+    return _game(season, week, fav, ln, dog, tot)
+
+def _heading(line: str):
+    for rx in HDRS:
+        m = rx.search(line)
+        if m:
+            return int(m.group(2)), int(m.group(1))
+    return None
+
+# ---------- streaming state machine ----------
+def iter_games(lines: Iterable[str]) -> Iterator[dict]:
     """
-    Accepts either:
-      A) one line with 5 tab-separated columns:
-         Date/Time \t Favorite \t Line \t Underdog \t Total
-      B) 5-line blocks (date/time, favorite, line, underdog, total)
+    Yield game records from an iterable of text lines. States: before the first heading (skip),
+    inside a week block (match). The window holds at most 5 pending lines: line 0 is tried as a
+    5-column row; when 5 lines are pending they are tried as a 5-line block, else line 0 is dropped.
+    A heading (or end of input) drains the window with single-line matches only.
     """
-    rows = []
-    i = 0
-    while i < len(lines):
-        line = lines[i]
-
-        # Try tabbed 5-col first
-        parts = [p.strip() for p in line.split('\t') if p.strip()]
-        if len(parts) < 5:
-            # fallback: split by 2+ spaces
-            parts = re.split(r'\s{2,}', line.strip())
-        if len(parts) >= 5:
-            dt, fav, ln, dog, tot = parts[:5]
-            if fav and dog and (NUM_RE.search(ln) or PK_RE.search(ln)):
-                fav_c = _canon(fav); dog_c = _canon(dog)
-                ln_v  = _to_float(ln);  tot_v = _to_float(tot)
-                fav_is_home = fav.lower().startswith("at ")
-                dog_is_home = dog.lower().startswith("at ")
-                if fav_is_home and not dog_is_home:
-                    home, away = fav_c, dog_c; spread_home = -ln_v if ln_v is not None else None
-                elif dog_is_home and not fav_is_home:
-                    home, away = dog_c, fav_c; spread_home = ln_v if ln_v is not None else None
-                else:
-                    home, away = dog_c, fav_c; spread_home = ln_v if ln_v is not None else None
-
-                rows.append({"season":season,"week":week,"home":home,"away":away,
-                             "spread_close":spread_home,"total_close":tot_v})
-                i += 1
-                continue
-
-        # Try 5-line block
-        if i + 4 < len(lines):
-            fav   = lines[i+1] if lines[i+1] else ""
-            ln    = lines[i+2] if lines[i+2] else ""
-            dog   = lines[i+3] if lines[i+3] else ""
-            tot   = lines[i+4] if lines[i+4] else ""
-            if fav and dog and (NUM_RE.search(ln) or PK_RE.search(ln)):
-                fav_c = _canon(fav); dog_c = _canon(dog)
-                ln_v  = _to_float(ln);  tot_v = _to_float(tot)
-                fav_is_home = fav.lower().startswith("at ")
-                dog_is_home = dog.lower().startswith("at ")
-                if fav_is_home and not dog_is_home:
-                    home, away = fav_c, dog_c; spread_home = -ln_v if ln_v is not None else None
-                elif dog_is_home and not fav_is_home:
-                    home, away = dog_c, fav_c; spread_home = ln_v if ln_v is not None else None
-                else:
-                    home, away = dog_c, fav_c; spread_home = ln_v if ln_v is not None else None
-
-                rows.append({"season":season,"week":week,"home":home,"away":away,
-                             "spread_close":spread_home,"total_close":tot_v})
-                i += 5
-                continue
-
-        i += 1
-
-    df = pd.DataFrame(rows)
-    if df.empty: return df
+    season = week = None
+    win: deque = deque()
+
+    def drain(final: bool):
+        while win:
+            rec = _one_line(win[0], season, week)
+            if rec is not None:
+                win.popleft(); yield rec; continue
+            if len(win) >= 5:
+                fav, ln, dog, tot = win[1], win[2], win[3], win[4]
+                rec = _game(season, week, fav, ln, dog, tot)
+                if rec is not None:
+                    for _ in range(5): win.popleft()
+                    yield rec; continue
+                win.popleft(); continue
+            if not final:
+                return
+            win.popleft()
+
+    for raw in lines:
+        line = raw.rstrip()
+        if not line.strip():
+            continue
+        hd = _heading(line)
+        if hd is not None:
+            yield from drain(final=True)
+            season, week = hd
+            continue
+        if season is None:
+            continue
+        win.append(line)
+        yield from drain(final=False)
+    yield from drain(final=True)
+
+def iter_chunks(lines: Iterable[str], chunk_size: int = 5000) -> Iterator[pd.DataFrame]:
+    """Typed, de-duplicated (first occurrence wins) chunks of at most chunk_size games."""
+    seen = set()
+    buf = []
+    for rec in iter_games(lines):
+        k = (rec["season"], rec["week"], rec["home"], rec["away"])
+        if k in seen:
+            continue
+        seen.add(k)
+        buf.append(rec)
+        if len(buf) >= chunk_size:
+            yield _frame(buf); buf = []
+    if buf:
+        yield _frame(buf)
+
+def _frame(rows) -> pd.DataFrame:
+    df = pd.DataFrame(rows, columns=OUT_COLS)
     for c in ["season","week"]:
         df[c] = pd.to_numeric(df[c], errors="coerce").astype("Int64")
     for c in ["spread_close","total_close"]:
         df[c] = pd.to_numeric(df[c], errors="coerce")
-    df = df[df["home"].notna() & df["away"].notna()]
-    df = df.drop_duplicates(subset=["season","week","home","away"])
     return df
 
-# ---------- multi-heading sweep ----------
+def open_lines(path) -> Iterator[str]:
+    with open(path, encoding="utf-8", errors="ignore") as f:
+        yield from f
+
+# ---------- compatibility wrappers (whole-text API) ----------
+def parse_block(lines, season:int, week:int) -> pd.DataFrame:
+    """
+    Accepts either:
+      A) one line with 5 tab-separated columns:
+         Date/Time \t Favorite \t Line \t Underdog \t Total
+      B) 5-line blocks (date/time, favorite, line, underdog, total)
+    """
+    # a synthetic heading puts the machine straight into the week block
+    head = f"Closing NFL Lines Week {int(week)}, {int(season)}"
+    dfs = list(iter_chunks([head, *lines]))
+    return pd.concat(dfs, ignore_index=True) if dfs else pd.DataFrame()
+
 def find_headings(lines):
     """Return list of (index, week, season)."""
     hits = []
     for i, l in enumerate(lines):
-        for rx in HDRS:
-            m = rx.search(l)
-            if m:
-                week = int(m.group(1))
-                season = int(m.group(2))
-                hits.append((i, week, season))
-                break
+        hd = _heading(l)
+        if hd:
+            hits.append((i, hd[1], hd[0]))
     return hits
 
 def parse_multi(text: str) -> pd.DataFrame:
-    lines = [l.rstrip() for l in text.splitlines() if l.strip()]
-    idx = find_headings(lines)
-    if not idx:
-        return pd.DataFrame()
-
-    # add sentinel end
-    idx.append((len(lines), None, None))
-    dfs = []
-    for (start, week, season), (end, _, __) in zip(idx, idx[1:]):
-        block = lines[start:end]
-        # skip the heading line itself
-        df = parse_block(block[1:], season, week)
-        if not df.empty:
-            dfs.append(df)
-
+    dfs = list(iter_chunks(text.splitlines()))
     if not dfs:
         return pd.DataFrame()
     out = pd.concat(dfs, ignore_index=True)
-    out = out.drop_duplicates(subset=["season","week","home","away"]).sort_values(["season","week","home","away"])
+    return out.sort_values(KEY)
+
+# ---------- per-file workers ----------
+def _part_path(parts_dir: Path, src: Path) -> Path:
+    tag = hashlib.sha1(str(src.resolve()).encode()).hexdigest()[:10]
+    return parts_dir / f"{src.stem}.{tag}.csv"
+
+def ingest_file(src, parts_dir, chunk_size: int = 5000) -> tuple[str, int, int]:
+    """Stream one archive into its part CSV (rewritten from scratch). Returns (src, rows, chunks)."""
+    src = Path(src); parts_dir = Path(parts_dir)
+    part = _part_path(parts_dir, src)
+    tmp = part.with_suffix(".tmp")
+    rows = chunks = 0
+    with open(tmp, "w", encoding="utf-8", newline="") as f:
+        for df in iter_chunks(open_lines(src), chunk_size=chunk_size):
+            df.to_csv(f, header=(chunks == 0), index=False)
+            rows += len(df); chunks += 1
+        if chunks == 0:
+            f.write(",".join(OUT_COLS) + "\n")
+    tmp.replace(part)
+    return str(src), rows, chunks
+
+def ingest_files(paths, parts_dir, jobs: int = 0, chunk_size: int = 5000) -> list[Path]:
+    """Parse files in parallel (jobs=0: one per CPU, 1: in-process). Returns the part paths."""
+    paths = [Path(p) for p in paths]
+    parts_dir = Path(parts_dir); parts_dir.mkdir(parents=True, exist_ok=True)
+    if jobs == 1 or len(paths) == 1:
+        results = [ingest_file(p, parts_dir, chunk_size) for p in paths]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs or None) as ex:
+            results = list(ex.map(ingest_file, paths, [parts_dir] * len(paths), [chunk_size] * len(paths)))
+    for src, rows, chunks in results:
+        print(f"[parse] {src} rows={rows:,} chunks={chunks}")
+    return [_part_path(parts_dir, p) for p in paths]
+
+def merge_parts(parts, dest: Path) -> int:
+    """Existing rows win over new ones (same as the old whole-file ingest); output sorted by key."""
+    frames = []
+    if dest.exists():
+        frames.append(pd.read_csv(dest))
+    frames += [pd.read_csv(p) for p in parts if Path(p).exists()]
+    frames = [f for f in frames if not f.empty]
+    if not frames:
+        return 0
+    df = pd.concat(frames, ignore_index=True)
+    df = df.drop_duplicates(subset=KEY).sort_values(KEY)
+    df.to_csv(dest, index=False)
+    return len(df)
+
+def _expand(paths) -> list[Path]:
+    out = []
+    for p in map(Path, paths):
+        out += sorted(p.glob("*.txt")) if p.is_dir() else [p]
     return out
 
 def main():
     ap = argparse.ArgumentParser()
-    ap.add_argument("--txt", required=True, help="Path to legacy closing-lines .txt containing many weeks/years")
+    ap.add_argument("--txt", required=True, nargs="+",
+                    help="Legacy closing-lines .txt file(s) or folders of .txt, each with many weeks/years")
+    ap.add_argument("--jobs", type=int, default=0, help="parse processes (0 = one per CPU)")
+    ap.add_argument("--chunk-size", type=int, default=5000, help="games per streamed chunk")
+    ap.add_argument("--dest", default="exports/historical_odds_oddsshark.csv")
     args = ap.parse_args()
 
-    txt = Path(args.txt).read_text(encoding="utf-8", errors="ignore")
-    df = parse_multi(txt)
-    if df.empty:
+    files = _expand(args.txt)
+    if not files:
+        print("[warn] no input files"); sys.exit(0)
+    dest = Path(args.dest)
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    parts = ingest_files(files, dest.parent / "_legacy_lines_parts", jobs=args.jobs, chunk_size=args.chunk_size)
+    n = merge_parts(parts, dest)
+    if n == 0:
         print("[warn] no rows parsed"); sys.exit(0)
-
-    dest = Path("exports/historical_odds_oddsshark.csv")
-    if dest.exists():
-        old = pd.read_csv(dest)
-        df = pd.concat([old, df], ignore_index=True)
-
-    df = df.drop_duplicates(subset=["season","week","home","away"]).sort_values(["season","week","home","away"])
-    df.to_csv(dest, index=False)
-    print(f"[write] {dest} rows={len(df)}")
+    print(f"[write] {dest} rows={n}")
 
 if __name__ == "__main__":
     main()
-
@@ -20,6 +20,7 @@ ALIASES = {
 }
 
 def pick(df, names):
+    # same rule as odds_reshape.pick_col (case-insensitive, first alias wins)
     lower = {c.lower(): c for c in df.columns}
     for n in names:
         if n.lower() in lower: return lower[n.lower()]
@@ -54,6 +55,8 @@ def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--csv", nargs="+", required=True, help="One or more CSVs with modern odds (2019+)")
     ap.add_argument("--out", default="exports/historical_odds_modern.csv", help="Output path")
+    ap.add_argument("--long", action="store_true",
+                    help="Also write the canonical long form (one row per market/side/phase) next to --out")
     args = ap.parse_args()
 
     frames = []
@@ -78,6 +81,13 @@ def main():
     out.to_csv(args.out, index=False)
     print(f"[write] {args.out} rows={len(out)}")
 
+    if args.long:
+        from tools.odds_reshape import HISTORICAL_SPEC, reshape
+        long = reshape(out, HISTORICAL_SPEC, id_cols=["season","week","date","home","away"])
+        dest = str(Path(args.out).with_name(Path(args.out).stem + "_long.csv"))
+        long.to_csv(dest, index=False)
+        print(f"[write] {dest} rows={len(long)}")
+
 if __name__ == "__main__":
     main()
 
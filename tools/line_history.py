@@ -0,0 +1,373 @@
+# tools/line_history.py
+# Snapshot compaction and tiered retention for line history.
+#
+# Most captured rows repeat the previous capture for the same (game, market, side, book). Compaction
+# collapses every run of unchanged (line, price) into one interval row with first_seen / last_seen,
+# so storage and downstream scans grow with the number of changes, not with capture frequency.
+#
+# Tiers:
+#   exports/lines_snapshots.csv          full resolution, the last --keep-days of captures
+#   exports/lines_history.parquet        compacted intervals for everything older
+#   exports/lines_history_captures.csv   the capture timestamps folded into the history
+#   exports/lines_archive/<day>/         archived lines_live copies; compacted and (opt-in) pruned
+#   --drop-days                          intervals that ended before this are dropped entirely
+#
+# Readers (history + recent snapshots, stitched into one interval set):
+#   load_intervals()   intervals, optionally clipped to a time range
+#   snapshot_at(ts)    the board as it stood at any point in time
+#   expand(iv, times)  intervals back to one row per key per capture
+#
+# Trimming lines_snapshots.csv never cuts past the byte offset line_movement has consumed, and the
+# movement state offset is shifted so incremental runs continue where they left off.
+from __future__ import annotations
+
+import argparse
+import io
+import json
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from tools.pathing import exports_dir
+from tools.line_movement import SNAPSHOTS_CSV, STATE_JSON, SERIES_COLS, prepare_snapshots
+
+HISTORY_PARQUET = "lines_history.parquet"
+CAPTURES_CSV    = "lines_history_captures.csv"
+ARCHIVE_DIR     = "lines_archive"
+
+HIST_COLS = SERIES_COLS + ["game_id", "line", "price", "first_seen", "last_seen", "n_obs"]
+TZ = "America/New_York"
+
+# -------------------- normalize --------------------
+
+def prepare_rows(raw: pd.DataFrame) -> pd.DataFrame:
+    """
+    Capture rows (snapshots or archived lines_live) -> ts + series key + line/price.
+    Archived live files carry raw team names and commence_time; they get the same nick / ET date
+    keys capture_lines writes, so both sources land on the same series.
+    """
+    if raw.empty:
+        return pd.DataFrame(columns=["ts"] + SERIES_COLS + ["game_id", "line", "price"])
+    raw = raw.copy()
+    if "_home_nick" not in raw.columns and "home" in raw.columns:
+        from tools.capture_lines import nickify
+        raw["_home_nick"] = nickify(raw["home"])
+        raw["_away_nick"] = nickify(raw.get("away", pd.Series(pd.NA, index=raw.index)))
+    if "_date_iso" not in raw.columns and "commence_time" in raw.columns:
+        ct = pd.to_datetime(raw["commence_time"], errors="coerce", utc=True)
+        raw["_date_iso"] = ct.dt.tz_convert(TZ).dt.strftime("%Y-%m-%d")
+    d = prepare_snapshots(raw)
+    return d[["ts"] + SERIES_COLS + ["game_id", "line", "price"]].reset_index(drop=True)
+
+# -------------------- compaction --------------------
+
+def _utc(ts) -> pd.Timestamp:
+    ts = pd.Timestamp(ts)
+    return ts.tz_localize("UTC") if ts.tzinfo is None else ts.tz_convert("UTC")
+
+def _ns(ts: pd.Series) -> np.ndarray:
+    return ts.dt.as_unit("ns").astype("int64").to_numpy()
+
+def coalesce(iv: pd.DataFrame, max_gap: pd.Timedelta | None = None) -> pd.DataFrame:
+    """
+    Merge consecutive intervals of a series that carry the same (line, price).
+    Raw rows are intervals with first_seen == last_seen, so this is also the compactor.
+    With `max_gap`, a silence longer than the gap (book pulled the market) starts a new interval.
+    """
+    if iv.empty:
+        return pd.DataFrame(columns=HIST_COLS)
+    iv = iv.copy()
+    iv["_kid"] = pd.factorize(pd.MultiIndex.from_frame(iv[SERIES_COLS]))[0]
+    iv = iv.sort_values(["_kid", "first_seen", "last_seen"], kind="stable").reset_index(drop=True)
+
+    kid = iv["_kid"].to_numpy()
+    line = iv["line"].to_numpy(dtype="float64"); price = iv["price"].to_numpy(dtype="float64")
+    first = _ns(iv["first_seen"]); last = _ns(iv["last_seen"])
+
+    def _chg(a):
+        both_nan = np.isnan(a[1:]) & np.isnan(a[:-1])
+        return (a[1:] != a[:-1]) & ~both_nan
+
+    start = np.r_[True, (kid[1:] != kid[:-1]) | _chg(line) | _chg(price)]
+    if max_gap is not None:
+        start[1:] |= (first[1:] - last[:-1]) > pd.Timedelta(max_gap).value
+    s = np.flatnonzero(start)
+
+    out = iv.loc[s, SERIES_COLS + ["game_id", "line", "price", "first_seen"]].reset_index(drop=True)
+    out["last_seen"] = pd.to_datetime(np.maximum.reduceat(last, s), utc=True)
+    out["n_obs"] = np.add.reduceat(iv["n_obs"].to_numpy(dtype="int64"), s)
+    return out[HIST_COLS]
+
+def stitch(a: pd.DataFrame, b: pd.DataFrame, max_gap: pd.Timedelta | None = None) -> pd.DataFrame:
+    """Union of two interval sets, re-coalesced so runs spanning the seam become one interval."""
+    if a.empty or b.empty:
+        return (b if a.empty else a).reset_index(drop=True)
+    return coalesce(pd.concat([a, b], ignore_index=True), max_gap)
+
+def compact(rows: pd.DataFrame, max_gap: pd.Timedelta | None = None) -> pd.DataFrame:
+    """Prepared capture rows (prepare_rows) -> interval rows."""
+    if rows.empty:
+        return pd.DataFrame(columns=HIST_COLS)
+    iv = rows.rename(columns={"ts": "first_seen"})
+    iv["last_seen"] = iv["first_seen"]
+    iv["n_obs"] = 1
+    return coalesce(iv, max_gap)
+
+# -------------------- storage --------------------
+
+def read_history(exp: Path | None = None) -> pd.DataFrame:
+    p = (exp or exports_dir()) / HISTORY_PARQUET
+    if not p.exists():
+        return pd.DataFrame(columns=HIST_COLS)
+    iv = pd.read_parquet(p)
+    for c in SERIES_COLS + ["game_id"]:
+        iv[c] = iv[c].astype("string").fillna("")
+    return iv
+
+def read_captures(exp: Path | None = None) -> pd.DatetimeIndex:
+    p = (exp or exports_dir()) / CAPTURES_CSV
+    if not p.exists() or p.stat().st_size == 0:
+        return pd.DatetimeIndex([], tz="UTC")
+    return pd.DatetimeIndex(pd.to_datetime(pd.read_csv(p)["ts"], errors="coerce", utc=True).dropna().unique()).sort_values()
+
+def _write_history(exp: Path, iv: pd.DataFrame, captures: pd.DatetimeIndex) -> None:
+    tmp = exp / (HISTORY_PARQUET + ".tmp")
+    iv.reset_index(drop=True).to_parquet(tmp, index=False)
+    tmp.replace(exp / HISTORY_PARQUET)
+    pd.DataFrame({"ts": captures.strftime("%Y-%m-%dT%H:%M:%SZ")}).to_csv(exp / CAPTURES_CSV, index=False)
+
+# -------------------- retention --------------------
+
+def _movement_offset(exp: Path) -> int | None:
+    p = exp / STATE_JSON
+    if not p.exists():
+        return None
+    try:
+        return int(json.loads(p.read_text(encoding="utf-8")).get("offset") or 0)
+    except Exception:
+        return None
+
+def _plan_trim(exp: Path, cutoff: pd.Timestamp) -> tuple[pd.DataFrame, dict | None]:
+    """
+    Find the leading run of captures older than `cutoff` in lines_snapshots.csv.
+    Returns (those rows, a byte plan for _apply_trim); nothing is written here.
+    """
+    p = exp / SNAPSHOTS_CSV
+    if not p.exists() or p.stat().st_size == 0:
+        return pd.DataFrame(), None
+    data = p.read_bytes()
+    nl = np.flatnonzero(np.frombuffer(data, dtype=np.uint8) == ord("\n"))
+    if len(nl) < 2:
+        return pd.DataFrame(), None
+    df = pd.read_csv(io.BytesIO(data[: int(nl[-1]) + 1]), low_memory=False, encoding="utf-8-sig")
+    if len(df) != len(nl) - 1:  # quoted newlines; byte math would be wrong
+        print(f"[history] {p.name}: embedded newlines, not trimming")
+        return pd.DataFrame(), None
+    if "_snapshot_ts_utc" not in df.columns:
+        return pd.DataFrame(), None
+
+    ts = pd.to_datetime(df["_snapshot_ts_utc"], errors="coerce", utc=True)
+    recent = (ts >= cutoff).to_numpy()
+    k = int(np.argmax(recent)) if recent.any() else len(df)
+    offset = _movement_offset(exp)
+    if offset is not None:  # never drop rows line_movement has not consumed yet
+        k = min(k, int(np.searchsorted(nl + 1, offset, side="right")) - 1)
+    if k <= 0:
+        return pd.DataFrame(), None
+    plan = {"size": len(data), "header_end": int(nl[0]) + 1, "cut": int(nl[k]) + 1, "offset": offset}
+    return df.iloc[:k], plan
+
+def _apply_trim(exp: Path, plan: dict) -> int:
+    """Rewrite lines_snapshots.csv without the planned prefix; rows captured meanwhile are carried over."""
+    p = exp / SNAPSHOTS_CSV
+    tmp = p.with_suffix(".csv.tmp")
+    with open(p, "rb") as cur, open(tmp, "wb") as fh:
+        fh.write(cur.read(plan["header_end"]))
+        cur.seek(plan["cut"])
+        fh.write(cur.read())
+    tmp.replace(p)
+
+    removed = plan["cut"] - plan["header_end"]
+    if plan["offset"] is not None:
+        state = json.loads((exp / STATE_JSON).read_text(encoding="utf-8"))
+        state["offset"] = max(plan["header_end"], int(state.get("offset") or 0) - removed)
+        (exp / STATE_JSON).write_text(json.dumps(state), encoding="utf-8")
+    return removed
+
+def _archive_days(exp: Path, before: str) -> list[Path]:
+    root = exp / ARCHIVE_DIR
+    if not root.exists():
+        return []
+    return sorted(d for d in root.iterdir() if d.is_dir() and d.name < before)
+
+def _read_archive_day(day_dir: Path) -> pd.DataFrame:
+    frames = []
+    for f in sorted(day_dir.glob("*.csv")):
+        d = pd.read_csv(f, low_memory=False, encoding="utf-8-sig")
+        if "asof_ts" not in d.columns and "pulled_ts" not in d.columns:
+            d["asof_ts"] = pd.Timestamp(f.stat().st_mtime, unit="s", tz="UTC")
+        frames.append(d)
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+def run_retention(
+    exp: Path | None = None,
+    keep_days: float = 3.0,
+    drop_days: float | None = None,
+    prune_archive: bool = False,
+    max_gap: pd.Timedelta | None = None,
+    now: pd.Timestamp | None = None,
+) -> dict:
+    """
+    Move captures older than `keep_days` from the full-resolution tier into the compacted history,
+    optionally dropping intervals that ended more than `drop_days` ago. Archived day folders older
+    than the cutoff are folded in too and, with `prune_archive`, deleted afterwards.
+    """
+    exp = exp or exports_dir()
+    now = now or pd.Timestamp.now(tz="UTC")
+    cutoff = now - pd.Timedelta(days=keep_days)
+    summary = {"rows_in": 0, "bytes_trimmed": 0, "archive_days": 0, "intervals_added": 0, "intervals": 0, "dropped": 0}
+
+    old, plan = _plan_trim(exp, cutoff)
+    days = _archive_days(exp, cutoff.tz_convert(TZ).strftime("%Y-%m-%d"))
+    parts = [d for d in [old] + [_read_archive_day(d) for d in days] if not d.empty]
+    rows = prepare_rows(pd.concat(parts, ignore_index=True) if parts else pd.DataFrame())
+
+    hist = read_history(exp)
+    captures = read_captures(exp)
+    rows = rows[~rows["ts"].isin(captures)]  # archive days left in place by an earlier run
+    summary.update(rows_in=int(len(rows)), archive_days=len(days))
+    if not rows.empty:
+        new_iv = compact(rows, max_gap)
+        summary["intervals_added"] = int(len(new_iv))
+        hist = stitch(hist, new_iv, max_gap)
+        captures = captures.append(pd.DatetimeIndex(rows["ts"].unique())).unique().sort_values()
+    if drop_days is not None and not hist.empty:
+        horizon = now - pd.Timedelta(days=drop_days)
+        keep = hist["last_seen"] >= horizon
+        summary["dropped"] = int((~keep).sum())
+        hist = hist[keep]
+        captures = captures[captures >= horizon]
+    if not rows.empty or summary["dropped"]:
+        _write_history(exp, hist, captures)
+    summary["intervals"] = int(len(hist))
+
+    # only after the history is on disk
+    if plan is not None:
+        summary["bytes_trimmed"] = _apply_trim(exp, plan)
+    if prune_archive:
+        for d in days:
+            shutil.rmtree(d, ignore_errors=True)
+    return summary
+
+# -------------------- readers --------------------
+
+def load_intervals(
+    exp: Path | None = None,
+    start: pd.Timestamp | str | None = None,
+    end: pd.Timestamp | str | None = None,
+    include_recent: bool = True,
+) -> pd.DataFrame:
+    """History plus the (compacted on the fly) full-resolution tier, clipped to intervals touching [start, end]."""
+    exp = exp or exports_dir()
+    iv = read_history(exp)
+    if include_recent:
+        p = exp / SNAPSHOTS_CSV
+        if p.exists() and p.stat().st_size:
+            recent = compact(prepare_rows(pd.read_csv(p, low_memory=False, encoding="utf-8-sig")))
+            iv = stitch(iv, recent)
+    if start is not None:
+        iv = iv[iv["last_seen"] >= _utc(start)]
+    if end is not None:
+        iv = iv[iv["first_seen"] <= _utc(end)]
+    return iv.reset_index(drop=True)
+
+def as_of(iv: pd.DataFrame, ts: pd.Timestamp | str, max_age: pd.Timedelta | None = None) -> pd.DataFrame:
+    """
+    The last known (line, price) per series at `ts`: the latest interval that started at or before it.
+    `age` is how long before `ts` the value was last confirmed (0 inside the interval); `max_age`
+    drops series that had gone quiet for longer than that.
+    """
+    ts = _utc(ts)
+    cur = iv[iv["first_seen"] <= ts].sort_values("first_seen", kind="stable")
+    cur = cur.drop_duplicates(SERIES_COLS, keep="last").copy()
+    cur["age"] = (ts - cur["last_seen"]).clip(lower=pd.Timedelta(0))
+    if max_age is not None:
+        cur = cur[cur["age"] <= pd.Timedelta(max_age)]
+    return cur.reset_index(drop=True)
+
+def snapshot_at(ts: pd.Timestamp | str, exp: Path | None = None, max_age: pd.Timedelta | None = None) -> pd.DataFrame:
+    """Board state at `ts`, read across both tiers."""
+    return as_of(load_intervals(exp, end=ts), ts, max_age)
+
+def expand(iv: pd.DataFrame, times: pd.DatetimeIndex | None = None, exp: Path | None = None) -> pd.DataFrame:
+    """
+    Intervals -> one row per series per capture time inside [first_seen, last_seen].
+    With the stored capture times (default) this rebuilds the original snapshot rows for the
+    history tier; a series briefly missing from a capture inside an interval comes back as present
+    unless compaction ran with max_gap.
+    """
+    if times is None:
+        times = read_captures(exp)
+    t = np.sort(pd.DatetimeIndex(times).as_unit("ns").asi8)
+    if iv.empty or not len(t):
+        return pd.DataFrame(columns=["ts"] + SERIES_COLS + ["game_id", "line", "price"])
+    lo = np.searchsorted(t, _ns(iv["first_seen"]), side="left")
+    hi = np.searchsorted(t, _ns(iv["last_seen"]), side="right")
+    n = np.maximum(hi - lo, 0)
+    rep = np.repeat(np.arange(len(iv)), n)
+    pos = np.repeat(lo, n) + (np.arange(n.sum()) - np.repeat(np.cumsum(n) - n, n))
+    out = iv.iloc[rep][SERIES_COLS + ["game_id", "line", "price"]].reset_index(drop=True)
+    out.insert(0, "ts", pd.to_datetime(t[pos], utc=True))
+    return out
+
+def stats(exp: Path | None = None) -> dict:
+    exp = exp or exports_dir()
+    hist = read_history(exp)
+    p = exp / SNAPSHOTS_CSV
+    return {
+        "intervals": int(len(hist)),
+        "observations": int(hist["n_obs"].sum()) if len(hist) else 0,
+        "captures": int(len(read_captures(exp))),
+        "history_bytes": (exp / HISTORY_PARQUET).stat().st_size if (exp / HISTORY_PARQUET).exists() else 0,
+        "snapshot_bytes": p.stat().st_size if p.exists() else 0,
+        "archive_days": len(_archive_days(exp, "9999")),
+    }
+
+# -------------------- CLI --------------------
+
+def main():
+    ap = argparse.ArgumentParser(description="Compact line snapshots into intervals and apply tiered retention.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    c = sub.add_parser("compact", help="fold old captures into the interval history")
+    c.add_argument("--keep-days", type=float, default=3.0, help="full-resolution window kept in lines_snapshots.csv")
+    c.add_argument("--drop-days", type=float, default=None, help="drop intervals that ended longer ago than this")
+    c.add_argument("--prune-archive", action="store_true", help="delete lines_archive/<day> folders once compacted")
+    c.add_argument("--max-gap-min", type=float, default=None, help="split an interval when a series goes quiet this long")
+    a = sub.add_parser("asof", help="write the board as it stood at a point in time")
+    a.add_argument("--ts", required=True, help="UTC timestamp, e.g. 2025-09-07T16:55:00Z")
+    a.add_argument("--max-age-min", type=float, default=None)
+    a.add_argument("--out", default="")
+    sub.add_parser("stats")
+    args = ap.parse_args()
+    exp = exports_dir()
+
+    if args.cmd == "compact":
+        gap = pd.Timedelta(minutes=args.max_gap_min) if args.max_gap_min else None
+        out = run_retention(exp, keep_days=args.keep_days, drop_days=args.drop_days,
+                            prune_archive=args.prune_archive, max_gap=gap)
+        print(f"[history] rows_in={out['rows_in']:,} +intervals={out['intervals_added']:,} total={out['intervals']:,} "
+              f"dropped={out['dropped']:,} archive_days={out['archive_days']} trimmed={out['bytes_trimmed']:,}B")
+    elif args.cmd == "asof":
+        age = pd.Timedelta(minutes=args.max_age_min) if args.max_age_min else None
+        board = snapshot_at(args.ts, exp, age)
+        dest = Path(args.out) if args.out else exp / f"lines_asof_{_utc(args.ts).strftime('%Y%m%d_%H%M%S')}.csv"
+        board.to_csv(dest, index=False, encoding="utf-8-sig")
+        print(f"[history] {len(board):,} series as of {args.ts} -> {dest}")
+    else:
+        for k, v in stats(exp).items():
+            print(f"{k:>15}: {v:,}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,338 @@
+# tools/line_movement.py
+# Line-movement engine over capture snapshots: per-key deltas, steam, reverse line movement, stale books.
+#
+# Reads exports/lines_snapshots.csv incrementally (byte offset kept in a small state file), so each run
+# only parses rows appended since the last run. Per-series "last seen" rows and the recent move tail are
+# persisted next to the outputs, which keeps the work per capture proportional to the new rows.
+#
+# Outputs (appended):
+#   exports/line_moves.csv         one row per price/line change per (game, market, side, book)
+#   exports/line_steam.csv         moves that completed a synchronized multi-book move (steam)
+# Outputs (current view, rewritten for touched markets only):
+#   exports/line_stale_books.csv   books lagging a market that has moved elsewhere
+from __future__ import annotations
+
+import argparse
+import io
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from tools.pathing import exports_dir
+
+SNAPSHOTS_CSV = "lines_snapshots.csv"
+MOVES_CSV     = "line_moves.csv"
+STEAM_CSV     = "line_steam.csv"
+STALE_CSV     = "line_stale_books.csv"
+LAST_CSV      = "line_moves_last.csv"
+RECENT_CSV    = "line_moves_recent.csv"
+STATE_JSON    = "line_moves_state.json"
+
+MARKET_COLS = ["_date_iso", "_home_nick", "_away_nick", "_market_norm", "side"]
+SERIES_COLS = MARKET_COLS + ["book"]
+
+MOVE_COLS = SERIES_COLS + [
+    "ts", "prev_ts", "line", "prev_line", "d_line", "price", "prev_price", "d_price",
+    "imp", "d_imp", "move_dir", "public_pct", "rlm", "steam", "steam_books", "game_id",
+]
+
+# -------------------- helpers --------------------
+
+def _s(x) -> pd.Series:
+    if isinstance(x, pd.Series):
+        return x.astype("string").fillna("")
+    return pd.Series([x], dtype="string")
+
+def _one_of(df: pd.DataFrame, names: list[str], default=pd.NA) -> pd.Series:
+    for n in names:
+        if n in df.columns:
+            return df[n]
+    return pd.Series([default] * len(df), index=df.index)
+
+def _american_to_decimal(a: pd.Series) -> np.ndarray:
+    a = pd.to_numeric(a, errors="coerce").to_numpy(dtype="float64")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(a > 0, 1 + a / 100.0, np.where(a < 0, 1 + 100.0 / np.abs(a), np.nan))
+
+def _ts_seconds(ts: pd.Series) -> np.ndarray:
+    return ts.dt.as_unit("s").astype("int64").to_numpy() if len(ts) else np.array([], dtype="int64")
+
+def prepare_snapshots(raw: pd.DataFrame) -> pd.DataFrame:
+    """
+    Coerce capture rows (lines_snapshots.csv or archived lines_live.csv) to the movement schema.
+    Rows missing a timestamp, key parts or price are dropped.
+    """
+    d = pd.DataFrame(index=raw.index)
+    d["ts"]           = pd.to_datetime(_one_of(raw, ["_snapshot_ts_utc", "asof_ts", "pulled_ts", "ts"]), errors="coerce", utc=True)
+    d["_date_iso"]    = _s(_one_of(raw, ["_date_iso", "event_date", "date"], ""))
+    d["_home_nick"]   = _s(_one_of(raw, ["_home_nick", "home"], "")).str.upper()
+    d["_away_nick"]   = _s(_one_of(raw, ["_away_nick", "away"], "")).str.upper()
+    d["_market_norm"] = _s(_one_of(raw, ["_market_norm", "market_norm", "market"], "")).str.upper()
+    d["side"]         = _s(_one_of(raw, ["side", "side_norm", "selection"], "")).str.upper()
+    d["book"]         = _s(_one_of(raw, ["book", "sportsbook"], ""))
+    d["line"]         = pd.to_numeric(_one_of(raw, ["line", "point"]), errors="coerce")
+    d["price"]        = pd.to_numeric(_one_of(raw, ["price", "price_american", "odds"]), errors="coerce")
+    d["game_id"]      = _s(_one_of(raw, ["game_id"], ""))
+    pub = pd.to_numeric(_one_of(raw, ["public_pct", "bet_pct", "tickets_pct"]), errors="coerce")
+    d["public_pct"]   = pub.where(pub <= 1.0, pub / 100.0)
+
+    ok = d["ts"].notna() & d["price"].notna() & (d["book"] != "") & (d["_market_norm"] != "") & (d["side"] != "")
+    d = d[ok].copy()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        d["imp"] = 1.0 / _american_to_decimal(d["price"])
+    return d
+
+def _move_direction(market: pd.Series, side: pd.Series, d_line: pd.Series, d_imp: pd.Series) -> np.ndarray:
+    """
+    +1 when the market moved toward this side (side got more expensive), -1 when away from it.
+    Spreads: a falling line (-3 -> -3.5) favours the side. Totals: a rising line favours OVER.
+    Falls back to the implied-probability change when the line did not move.
+    """
+    dl = d_line.fillna(0.0).to_numpy()
+    by_line = np.where(market.eq("SPREADS"), -dl,
+              np.where(market.eq("TOTALS") & side.eq("OVER"), dl,
+              np.where(market.eq("TOTALS") & side.eq("UNDER"), -dl, 0.0)))
+    return np.where(by_line != 0, np.sign(by_line), np.sign(d_imp.fillna(0.0).to_numpy())).astype("int8")
+
+# -------------------- core --------------------
+
+def compute_moves(last: pd.DataFrame, new: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Diff new snapshot rows against the last seen row per series.
+    Returns (moves among the new rows, updated last-seen state).
+    """
+    if new.empty:
+        return pd.DataFrame(columns=MOVE_COLS), last
+
+    prev = last.assign(_is_new=False) if last is not None and not last.empty else None
+    both = pd.concat([prev, new.assign(_is_new=True, changed_ts=pd.NaT)] if prev is not None else
+                     [new.assign(_is_new=True, changed_ts=pd.NaT)], ignore_index=True)
+    both["changed_ts"] = pd.to_datetime(both["changed_ts"], errors="coerce", utc=True)
+
+    # int series key, then one stable sort by (key, ts)
+    both["_kid"] = pd.factorize(pd.MultiIndex.from_frame(both[SERIES_COLS]))[0].astype("int32")
+    both = both.sort_values(["_kid", "ts"], kind="stable").reset_index(drop=True)
+
+    g = both.groupby("_kid", sort=False)
+    both["prev_ts"]    = g["ts"].shift()
+    both["prev_line"]  = g["line"].shift()
+    both["prev_price"] = g["price"].shift()
+    both["d_line"]     = g["line"].diff()
+    both["d_price"]    = g["price"].diff()
+    both["d_imp"]      = g["imp"].diff()
+
+    has_prev = both["prev_ts"].notna()
+    line_chg = (both["line"].ne(both["prev_line"]) & ~(both["line"].isna() & both["prev_line"].isna()))
+    changed  = both["_is_new"] & (~has_prev | both["price"].ne(both["prev_price"]) | line_chg)
+    both["changed_ts"] = both["changed_ts"].where(~changed, both["ts"])
+    both["changed_ts"] = both.groupby("_kid", sort=False)["changed_ts"].ffill()
+
+    moves = both[both["_is_new"] & has_prev & changed].copy()
+    moves["move_dir"] = _move_direction(moves["_market_norm"], moves["side"], moves["d_line"], moves["d_imp"])
+    moves["steam"] = False
+    moves["steam_books"] = 0
+
+    new_last = both.groupby("_kid", sort=False).tail(1)
+    new_last = new_last[SERIES_COLS + ["ts", "changed_ts", "line", "price", "imp", "game_id"]].reset_index(drop=True)
+    return moves.reset_index(drop=True), new_last
+
+def flag_steam(moves: pd.DataFrame, window_min: float = 5.0, min_books: int = 3) -> pd.DataFrame:
+    """
+    Mark moves where at least `min_books` distinct books moved the same side the same direction
+    within `window_min` minutes (inclusive) ending at the move. Uses one sort and a searchsorted
+    window over a composite (group, seconds) key — no per-group Python.
+    """
+    m = moves.copy()
+    m["steam"] = False
+    m["steam_books"] = 0
+    live = m["move_dir"].ne(0)
+    if not live.any():
+        return m
+
+    sub = m[live]
+    grp = pd.factorize(pd.MultiIndex.from_frame(sub[MARKET_COLS].assign(_dir=sub["move_dir"])))[0].astype("int64")
+    t = _ts_seconds(sub["ts"])
+    win = int(window_min * 60)
+    t0 = t.min() if len(t) else 0
+    t = t - t0
+
+    # distinct books per window: expand every move into its (move, move in window) pairs,
+    # dedupe on (move, book) and count; windows hold a handful of moves, so the expansion stays small
+    order = np.lexsort((t, grp))
+    span = int(t.max()) + win + 1
+    comp = grp[order] * span + t[order]
+    n = len(order)
+    left = np.searchsorted(comp, comp - win, side="left")
+    cnt = np.searchsorted(comp, comp, side="right") - left     # moves in the same second count too
+    i_idx = np.repeat(np.arange(n), cnt)
+    j_idx = np.repeat(left, cnt) + (np.arange(cnt.sum()) - np.repeat(np.cumsum(cnt) - cnt, cnt))
+    bcode, buniq = pd.factorize(sub["book"], use_na_sentinel=False)
+    bcode = bcode[order].astype("int64")
+    pairs = np.unique(i_idx * max(len(buniq), 1) + bcode[j_idx])
+    books = np.empty(n, dtype="int64")
+    books[order] = np.bincount(pairs // max(len(buniq), 1), minlength=n)
+
+    m.loc[live, "steam_books"] = books
+    m.loc[live, "steam"] = books >= min_books
+    return m
+
+def flag_rlm(moves: pd.DataFrame, public_threshold: float = 0.6) -> pd.Series:
+    """
+    Reverse line movement: the line moved against a side holding the public majority.
+    Needs a public/ticket percentage column in the snapshots; otherwise every row is False.
+    """
+    pub = pd.to_numeric(moves.get("public_pct"), errors="coerce")
+    if pub is None or pub.isna().all():
+        return pd.Series(False, index=moves.index)
+    return (pub >= public_threshold) & (moves["move_dir"] < 0)
+
+def find_stale(last: pd.DataFrame, touched: pd.DataFrame, stale_min: float = 10.0, min_gap: float = 0.01) -> pd.DataFrame:
+    """
+    For markets touched by the new rows, flag books whose last price change is at least `stale_min`
+    minutes older than the market's most recent change and whose implied probability sits at least
+    `min_gap` away from the cross-book median.
+    """
+    if last.empty or touched.empty:
+        return pd.DataFrame(columns=SERIES_COLS + ["ts", "changed_ts", "price", "imp", "consensus_imp", "lag_min"])
+    keys = touched[MARKET_COLS].drop_duplicates()
+    cur = last.merge(keys, on=MARKET_COLS, how="inner")
+    g = cur.groupby(MARKET_COLS, sort=False)
+    cur["consensus_imp"] = g["imp"].transform("median")
+    cur["n_books"] = g["book"].transform("size")
+    lag = g["changed_ts"].transform("max") - cur["changed_ts"]
+    cur["lag_min"] = lag.dt.total_seconds() / 60.0
+    stale = (cur["n_books"] >= 2) & (cur["lag_min"] >= stale_min) & ((cur["imp"] - cur["consensus_imp"]).abs() >= min_gap)
+    return cur.loc[stale, SERIES_COLS + ["ts", "changed_ts", "price", "imp", "consensus_imp", "lag_min"]].reset_index(drop=True)
+
+# -------------------- incremental IO --------------------
+
+def _read_state(exp: Path) -> dict:
+    p = exp / STATE_JSON
+    if p.exists():
+        try:
+            return json.loads(p.read_text(encoding="utf-8"))
+        except Exception:
+            pass
+    return {"offset": 0, "header": None}
+
+def _read_csv_ts(p: Path, ts_cols: list[str]) -> pd.DataFrame:
+    if not p.exists() or p.stat().st_size == 0:
+        return pd.DataFrame()
+    d = pd.read_csv(p, low_memory=False, dtype={c: "string" for c in SERIES_COLS + ["game_id"]})
+    for c in ts_cols:
+        if c in d.columns:
+            d[c] = pd.to_datetime(d[c], errors="coerce", utc=True)
+    for c in SERIES_COLS + ["game_id"]:
+        if c in d.columns:
+            d[c] = _s(d[c])
+    return d
+
+def read_new_rows(snapshots: Path, state: dict) -> tuple[pd.DataFrame, dict]:
+    """Parse only complete lines appended after state['offset']."""
+    if not snapshots.exists():
+        return pd.DataFrame(), state
+    size = snapshots.stat().st_size
+    offset = int(state.get("offset") or 0)
+    if size < offset:  # file was rewritten; start over
+        offset, state = 0, {"offset": 0, "header": None}
+    with open(snapshots, "rb") as fh:
+        fh.seek(offset)
+        chunk = fh.read()
+    cut = chunk.rfind(b"\n")
+    if cut < 0:
+        return pd.DataFrame(), state
+    chunk = chunk[: cut + 1]
+    if offset == 0:
+        df = pd.read_csv(io.BytesIO(chunk), low_memory=False, encoding="utf-8-sig")
+        header = list(df.columns)
+    else:
+        header = state.get("header")
+        df = pd.read_csv(io.BytesIO(chunk), low_memory=False, encoding="utf-8-sig", header=None, names=header)
+    return df, {**state, "offset": offset + len(chunk), "header": header}
+
+def _append(df: pd.DataFrame, p: Path) -> None:
+    if df.empty:
+        return
+    df.to_csv(p, mode="a", header=not p.exists(), index=False, encoding="utf-8-sig")
+
+def update_movement(
+    exp: Path | None = None,
+    window_min: float = 5.0,
+    min_books: int = 3,
+    stale_min: float = 10.0,
+    keep_days: int = 3,
+) -> dict:
+    """Fold newly captured snapshot rows into the movement outputs. Returns a small summary dict."""
+    exp = exp or exports_dir()
+    state = _read_state(exp)
+    raw, state = read_new_rows(exp / SNAPSHOTS_CSV, state)
+    new = prepare_snapshots(raw) if not raw.empty else pd.DataFrame()
+    summary = {"new_rows": int(len(new)), "moves": 0, "steam": 0, "stale": 0}
+    if new.empty:
+        (exp / STATE_JSON).write_text(json.dumps(state), encoding="utf-8")
+        return summary
+
+    last = _read_csv_ts(exp / LAST_CSV, ["ts", "changed_ts"])
+    moves, last = compute_moves(last, new)
+
+    # steam needs the moves that landed within one window before this batch
+    recent = _read_csv_ts(exp / RECENT_CSV, ["ts", "prev_ts"])
+    if not moves.empty:
+        pool = pd.concat([recent.assign(_is_new=False), moves.assign(_is_new=True)], ignore_index=True) if not recent.empty \
+            else moves.assign(_is_new=True)
+        pool["move_dir"] = pd.to_numeric(pool["move_dir"], errors="coerce").fillna(0).astype("int8")
+        pool = flag_steam(pool, window_min=window_min, min_books=min_books)
+        moves = pool[pool["_is_new"]].drop(columns="_is_new")
+        moves["rlm"] = flag_rlm(moves)
+        moves = moves.reindex(columns=MOVE_COLS)
+        _append(moves, exp / MOVES_CSV)
+        _append(moves[moves["steam"]], exp / STEAM_CSV)
+        recent = pool.drop(columns="_is_new").reindex(columns=MOVE_COLS)
+
+    # prune state to what later batches can still reference
+    newest = new["ts"].max()
+    if not recent.empty:
+        recent = recent[recent["ts"] >= newest - pd.Timedelta(minutes=window_min)]
+    recent.reindex(columns=MOVE_COLS).to_csv(exp / RECENT_CSV, index=False, encoding="utf-8-sig")
+    cutoff = (newest - pd.Timedelta(days=keep_days)).strftime("%Y-%m-%d")
+    last = last[(last["_date_iso"] == "") | (last["_date_iso"] >= cutoff)]
+    last.to_csv(exp / LAST_CSV, index=False, encoding="utf-8-sig")
+
+    # stale view: replace rows for the markets this batch touched
+    stale_new = find_stale(last, new, stale_min=stale_min)
+    stale_old = _read_csv_ts(exp / STALE_CSV, ["ts", "changed_ts"])
+    if not stale_old.empty:
+        touched = new[MARKET_COLS].drop_duplicates().assign(_hit=True)
+        stale_old = stale_old.merge(touched, on=MARKET_COLS, how="left")
+        stale_old = stale_old[stale_old["_hit"].isna()].drop(columns="_hit")
+    pd.concat([stale_old, stale_new], ignore_index=True).to_csv(exp / STALE_CSV, index=False, encoding="utf-8-sig")
+
+    (exp / STATE_JSON).write_text(json.dumps(state), encoding="utf-8")
+    summary.update(moves=int(len(moves)), steam=int(moves["steam"].sum()) if len(moves) else 0, stale=int(len(stale_new)))
+    return summary
+
+def reset_movement(exp: Path | None = None) -> None:
+    """Drop all movement state and outputs so the next run replays lines_snapshots.csv from the start."""
+    exp = exp or exports_dir()
+    for name in (MOVES_CSV, STEAM_CSV, STALE_CSV, LAST_CSV, RECENT_CSV, STATE_JSON):
+        (exp / name).unlink(missing_ok=True)
+
+# -------------------- CLI --------------------
+
+def main():
+    ap = argparse.ArgumentParser(description="Fold new line snapshots into movement / steam / stale-book outputs.")
+    ap.add_argument("--window-min", type=float, default=5.0, help="steam window in minutes")
+    ap.add_argument("--min-books", type=int, default=3, help="distinct books needed for steam")
+    ap.add_argument("--stale-min", type=float, default=10.0, help="minutes a book may lag before it is stale")
+    ap.add_argument("--rebuild", action="store_true", help="drop state and replay all snapshots")
+    args = ap.parse_args()
+    exp = exports_dir()
+    if args.rebuild:
+        reset_movement(exp)
+    out = update_movement(exp, window_min=args.window_min, min_books=args.min_books, stale_min=args.stale_min)
+    print(f"[movement] new_rows={out['new_rows']:,} moves={out['moves']:,} steam={out['steam']:,} stale={out['stale']:,}")
+
+if __name__ == "__main__":
+    main()
@@ -102,6 +102,15 @@ def make_picks(edges: pd.DataFrame, odds: pd.DataFrame) -> pd.DataFrame:
     else:
         best["_ev_per_$1"] = np.nan
 
+    # Market-fair reference: de-vigged cross-book consensus at the best price
+    try:
+        from tools.fair_price import consensus_fair, attach_fair
+    except ImportError:
+        best["p_fair"] = best["_ev_vs_fair"] = np.nan
+    else:
+        fair = consensus_fair(odds)
+        best = attach_fair(best, fair, price_col="odds").rename(columns={"fair_prob": "p_fair", "ev_vs_fair": "_ev_vs_fair"})
+
     # Enforce one pick per (date,game,market): prefer highest EV then best price
     best["_sort_ev"] = best["_ev_per_$1"].fillna(-9e9)
     picks = (best
@@ -114,7 +123,7 @@ def make_picks(edges: pd.DataFrame, odds: pd.DataFrame) -> pd.DataFrame:
     # Final schema for Backtest
     out_cols = [
         "_date_iso","_home_nick","_away_nick","market_norm","side_norm",
-        "line","odds","book","_ev_per_$1","p_win","game_id","source"
+        "line","odds","book","_ev_per_$1","p_win","p_fair","_ev_vs_fair","game_id","source"
     ]
     for c in ("game_id","source"):
         if c not in picks.columns: picks[c] = ""
@@ -0,0 +1,261 @@
+# tools/model_registry.py
+# Local model registry: one JSON index of every trained model, so pages load by id instead of
+# scanning folders.
+#
+#   exports/models/registry.json        {"models": {id: entry}, "active": {name: id}}
+#   exports/models/<name>/<id>/         model.joblib + meta.json (what batch_infer / pages load)
+#   exports/models/ACTIVE.txt           active id of the default model (read by 95_Models_Browser)
+#
+# An entry records name, created, path, metrics (CV summary), feature list + feature hash, the
+# training data fingerprint and free-form params / notes. Ids are "<name>-<UTC stamp>-<fp6>", so the
+# same data retrained later gets a new id but is easy to spot; two trainings finishing in the same
+# second get a "-2", "-3" ... suffix (the model folder is claimed with an exclusive mkdir). Every
+# read-modify-write of registry.json holds registry.lock, so concurrent registrations don't drop entries.
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import pandas as pd
+
+from tools.pathing import exports_dir
+
+INDEX_JSON  = "registry.json"
+ACTIVE_TXT  = "ACTIVE.txt"
+MODEL_FILE  = "model.joblib"
+META_FILE   = "meta.json"
+LOCK_FILE   = "registry.lock"
+LOCK_STALE_S = 60.0
+
+def registry_dir(root: Path | None = None) -> Path:
+    d = root or (exports_dir() / "models")
+    d.mkdir(parents=True, exist_ok=True)
+    return d
+
+# -------------------- fingerprints --------------------
+
+def feature_hash(features: list[str]) -> str:
+    """Order matters: the model's coefficient layout follows the list."""
+    return hashlib.sha1("\x1f".join(features).encode("utf-8")).hexdigest()[:12]
+
+def data_fingerprint(df: pd.DataFrame) -> str:
+    """Content hash of a training frame (values + column names), independent of the index."""
+    h = hashlib.sha1("\x1f".join(map(str, df.columns)).encode("utf-8"))
+    h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return h.hexdigest()[:16]
+
+# -------------------- index --------------------
+
+_CACHE: dict = {"path": None, "mtime": None, "index": None}
+_LOADED: dict = {}
+
+def _read_index(root: Path) -> dict:
+    p = root / INDEX_JSON
+    if not p.exists():
+        return {"models": {}, "active": {}}
+    mtime = p.stat().st_mtime_ns
+    if _CACHE["path"] == p and _CACHE["mtime"] == mtime:
+        return _CACHE["index"]
+    idx = json.loads(p.read_text(encoding="utf-8"))
+    _CACHE.update(path=p, mtime=mtime, index=idx)
+    return idx
+
+@contextmanager
+def _index_lock(root: Path, timeout: float = 30.0):
+    """Exclusive lock around an index update; a lock older than LOCK_STALE_S (dead writer) is taken over."""
+    p = root / LOCK_FILE
+    t0 = time.monotonic()
+    while True:
+        try:
+            fd = os.open(p, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            try:
+                if time.time() - p.stat().st_mtime > LOCK_STALE_S:
+                    p.unlink(missing_ok=True)
+                    continue
+            except FileNotFoundError:
+                continue
+            if time.monotonic() - t0 > timeout:
+                raise TimeoutError(f"model registry locked: remove {p} if no training is running")
+            time.sleep(0.05)
+    try:
+        os.write(fd, str(os.getpid()).encode())
+        os.close(fd)
+        yield
+    finally:
+        p.unlink(missing_ok=True)
+
+def _claim_dir(root: Path, name: str, base: str) -> tuple[str, Path]:
+    """First free "<base>", "<base>-2", ... under root/name, created atomically."""
+    (root / name).mkdir(parents=True, exist_ok=True)
+    n = 1
+    while True:
+        mid = base if n == 1 else f"{base}-{n}"
+        d = root / name / mid
+        try:
+            d.mkdir()
+            return mid, d
+        except FileExistsError:
+            n += 1
+
+def _write_index(root: Path, idx: dict) -> None:
+    tmp = root / (INDEX_JSON + ".tmp")
+    tmp.write_text(json.dumps(idx, indent=2, default=str), encoding="utf-8")
+    tmp.replace(root / INDEX_JSON)
+    _CACHE.update(path=None, mtime=None, index=None)
+
+def register(
+    model,
+    name: str,
+    features: list[str],
+    data: pd.DataFrame | None = None,
+    metrics: dict | None = None,
+    params: dict | None = None,
+    notes: str = "",
+    extra_meta: dict | None = None,
+    root: Path | None = None,
+    activate: bool = False,
+) -> str:
+    """Persist `model` under a new id and add it to the index. Returns the id."""
+    import joblib
+    root = registry_dir(root)
+    fp = data_fingerprint(data) if data is not None else ""
+    mid, d = _claim_dir(root, name, f"{name}-{time.strftime('%Y%m%d%H%M%S', time.gmtime())}-{(fp or feature_hash(features))[:6]}")
+    joblib.dump(model, d / MODEL_FILE)
+
+    entry = {
+        "id": mid, "name": name, "created": pd.Timestamp.now(tz="UTC").isoformat(timespec="seconds"),
+        "path": str(d.relative_to(root)), "model_file": MODEL_FILE,
+        "estimator": type(model).__name__,
+        "feature_cols": list(features), "feature_hash": feature_hash(features),
+        "data_fingerprint": fp, "train_rows": int(len(data)) if data is not None else None,
+        "metrics": metrics or {}, "params": params or {}, "notes": notes,
+    }
+    meta = {**(extra_meta or {}), **entry}
+    (d / META_FILE).write_text(json.dumps(meta, indent=2, default=str), encoding="utf-8")
+
+    with _index_lock(root):
+        idx = _read_index(root)
+        idx = {"models": {**idx["models"], mid: entry}, "active": dict(idx.get("active", {}))}
+        if activate or name not in idx["active"]:
+            idx["active"][name] = mid
+        _write_index(root, idx)
+        if activate or not (root / ACTIVE_TXT).exists():
+            (root / ACTIVE_TXT).write_text(mid, encoding="utf-8")
+    return mid
+
+def get(model_id: str, root: Path | None = None) -> dict:
+    """Index entry for `model_id` (KeyError when unknown)."""
+    return _read_index(registry_dir(root))["models"][model_id]
+
+def model_dir(model_id: str, root: Path | None = None) -> Path:
+    root = registry_dir(root)
+    return root / get(model_id, root)["path"]
+
+def load(model_id: str, root: Path | None = None):
+    """(estimator, meta) for `model_id`; cached per process until the artifact changes."""
+    import joblib
+    d = model_dir(model_id, root)
+    f = d / MODEL_FILE
+    key = (str(f), f.stat().st_mtime_ns)
+    hit = _LOADED.get(model_id)
+    if hit is not None and hit[0] == key:
+        return hit[1], hit[2]
+    meta = json.loads((d / META_FILE).read_text(encoding="utf-8")) if (d / META_FILE).exists() else {}
+    model = joblib.load(f)
+    _LOADED[model_id] = (key, model, meta)
+    return model, meta
+
+def list_models(name: str | None = None, root: Path | None = None) -> pd.DataFrame:
+    """One row per registered model, newest first, with the CV metrics flattened into columns."""
+    idx = _read_index(registry_dir(root))
+    rows = []
+    for e in idx["models"].values():
+        if name and e["name"] != name:
+            continue
+        rows.append({k: v for k, v in e.items() if k not in ("metrics", "params", "feature_cols")}
+                    | {f"m_{k}": v for k, v in (e.get("metrics") or {}).items() if not isinstance(v, (list, dict))}
+                    | {"active": idx.get("active", {}).get(e["name"]) == e["id"]})
+    if not rows:
+        return pd.DataFrame(columns=["id", "name", "created", "active"])
+    return pd.DataFrame(rows).sort_values("created", ascending=False).reset_index(drop=True)
+
+def active_id(name: str | None = None, root: Path | None = None) -> str | None:
+    root = registry_dir(root)
+    if name:
+        return _read_index(root).get("active", {}).get(name)
+    p = root / ACTIVE_TXT
+    if not p.exists():
+        return None
+    return p.read_text(encoding="utf-8").strip() or None
+
+def set_active(model_id: str, root: Path | None = None) -> None:
+    root = registry_dir(root)
+    with _index_lock(root):
+        idx = _read_index(root)
+        e = idx["models"][model_id]
+        idx = {"models": idx["models"], "active": {**idx.get("active", {}), e["name"]: model_id}}
+        _write_index(root, idx)
+        (root / ACTIVE_TXT).write_text(model_id, encoding="utf-8")
+
+def remove(model_id: str, root: Path | None = None) -> None:
+    """
+    Drop `model_id` from the index and disk. If it was active, the newest remaining model of the
+    same name takes over (per-name active and ACTIVE.txt); with none left both are cleared.
+    """
+    root = registry_dir(root)
+    with _index_lock(root):
+        idx = _read_index(root)
+        e = idx["models"][model_id]
+        models = {k: v for k, v in idx["models"].items() if k != model_id}
+        same = sorted((v for v in models.values() if v["name"] == e["name"]), key=lambda v: v["created"])
+        successor = same[-1]["id"] if same else None
+        active = {k: v for k, v in idx.get("active", {}).items() if v != model_id}
+        if idx.get("active", {}).get(e["name"]) == model_id and successor:
+            active[e["name"]] = successor
+        _write_index(root, {"models": models, "active": active})
+        if active_id(root=root) == model_id:
+            if successor:
+                (root / ACTIVE_TXT).write_text(successor, encoding="utf-8")
+            else:
+                (root / ACTIVE_TXT).unlink(missing_ok=True)
+    shutil.rmtree(root / e["path"], ignore_errors=True)
+    _LOADED.pop(model_id, None)
+
+def export_legacy(model_id: str, out_dir: Path, model_file: str, meta_file: str, root: Path | None = None) -> None:
+    """Copy a registered model to the fixed file names older scripts load (parlay_model.joblib ...)."""
+    d = model_dir(model_id, root)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    shutil.copyfile(d / MODEL_FILE, out_dir / model_file)
+    shutil.copyfile(d / META_FILE, out_dir / meta_file)
+
+# -------------------- CLI --------------------
+
+def main():
+    ap = argparse.ArgumentParser(description="Inspect the local model registry.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    ls = sub.add_parser("list"); ls.add_argument("--name", default=None)
+    sa = sub.add_parser("activate"); sa.add_argument("id")
+    rm = sub.add_parser("remove"); rm.add_argument("id")
+    sh = sub.add_parser("show"); sh.add_argument("id")
+    args = ap.parse_args()
+    if args.cmd == "list":
+        df = list_models(args.name)
+        with pd.option_context("display.width", 200, "display.max_columns", 20):
+            print(df.to_string(index=False) if len(df) else "[registry] empty")
+    elif args.cmd == "activate":
+        set_active(args.id); print(f"[registry] active -> {args.id}")
+    elif args.cmd == "remove":
+        remove(args.id); print(f"[registry] removed {args.id}")
+    else:
+        print(json.dumps(get(args.id), indent=2))
+
+if __name__ == "__main__":
+    main()
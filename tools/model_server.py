@@ -0,0 +1,538 @@
+# tools/model_server.py
+# In-process model server: warm model cache + micro-batched scoring + latency counters.
+#
+# Cache: deserialized estimators keyed by (model id, file fingerprint). The fingerprint is a sha1 of
+# the artifact, recomputed only when its size / mtime change, so a retrained model under the same id
+# or path is picked up on the next call and an unchanged one is never reloaded. Models are named by
+# registry id (tools/model_registry), a model directory (parlay_model.joblib + meta) or a .joblib path.
+#
+# Batching: score() / submit() calls for the same model from any thread (Streamlit sessions, CLI
+# workers, HTTP handlers) go onto one queue; a worker thread per model drains it for up to
+# max_wait_ms or max_batch_rows, builds one feature matrix and makes one predict_proba call, then
+# hands each caller its slice. When the shared call raises, the batch is rescored request by request
+# and only the requests that fail on their own get the exception. Counters: requests, rows, batches,
+# rows/batch, errors, queue wait and end-to-end latency percentiles, throughput.
+#
+# Calibration: a request sent with calibrate=True (or any request, on a server started with
+# --calibrate) gets its slice back through the stored calibrators (tools/calibrators, per row by
+# market / season), applied vectorized after the shared predict. The calibrator store is reloaded
+# when its file changes, like a retrained model.
+#
+#   python -m tools.model_server serve --http 127.0.0.1:8765 [--model <id|dir>] [--calibrate]   POST /score, GET /stats
+#   python -m tools.model_server serve --stdin                                     JSON lines in / out
+#   python -m tools.model_server bench --model <id|dir> --rows sample.csv --threads 8 --requests 200 --batch 20
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import queue
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# -------------------- cache --------------------
+
+def _sha1(path: Path, block: int = 1 << 20) -> str:
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(block), b""):
+            h.update(chunk)
+    return h.hexdigest()[:16]
+
+@dataclass
+class LoadedModel:
+    model_id: str
+    path: Path
+    fingerprint: str
+    model: object
+    meta: dict
+    load_ms: float
+    loaded_at: float = field(default_factory=time.time)
+
+class ModelCache:
+    """LRU of deserialized models keyed by (model id, artifact fingerprint)."""
+    def __init__(self, max_models: int = 8):
+        self.max_models = max_models
+        self._models: OrderedDict[tuple[str, str], LoadedModel] = OrderedDict()
+        self._sig: dict[Path, tuple[int, int, str]] = {}
+        self._lock = threading.RLock()
+        self.hits = self.misses = self.evictions = 0
+
+    @staticmethod
+    def resolve(model: str | Path | None) -> tuple[str, Path, Path | None]:
+        """(model id, artifact path, meta path) for a registry id, model dir or .joblib path."""
+        from tools.batch_infer import META_FILE, MODEL_FILE
+        if model is None or str(model) in ("", "active", "parlay"):
+            from tools.model_registry import active_id
+            model = active_id("parlay") or active_id()
+            if not model:
+                raise KeyError("no active model in the registry")
+        p = Path(str(model))
+        if p.suffix == ".joblib" and p.exists():
+            meta = p.with_name(p.stem + ".meta.json")
+            return str(p.resolve()), p, meta if meta.exists() else None
+        if p.is_dir():
+            meta = p / META_FILE
+            return str(p.resolve()), p / MODEL_FILE, meta if meta.exists() else None
+        from tools.model_registry import META_FILE as REG_META, MODEL_FILE as REG_MODEL, model_dir
+        d = model_dir(str(model))
+        return str(model), d / REG_MODEL, d / REG_META
+
+    def fingerprint(self, path: Path) -> str:
+        st = path.stat()
+        sig = self._sig.get(path)
+        if sig is None or sig[:2] != (st.st_size, st.st_mtime_ns):
+            sig = (st.st_size, st.st_mtime_ns, _sha1(path))
+            self._sig[path] = sig
+        return sig[2]
+
+    def get(self, model: str | Path | None) -> LoadedModel:
+        import joblib
+        mid, path, meta_path = self.resolve(model)
+        with self._lock:
+            fp = self.fingerprint(path)
+            key = (mid, fp)
+            hit = self._models.get(key)
+            if hit is not None:
+                self._models.move_to_end(key)
+                self.hits += 1
+                return hit
+            self.misses += 1
+            # a new fingerprint for the same id replaces the stale entry
+            for k in [k for k in self._models if k[0] == mid]:
+                del self._models[k]
+            t = time.perf_counter()
+            est = joblib.load(path)
+            meta = json.loads(meta_path.read_text(encoding="utf-8")) if meta_path and meta_path.exists() else {}
+            lm = LoadedModel(mid, path, fp, est, meta, (time.perf_counter() - t) * 1000)
+            self._models[key] = lm
+            while len(self._models) > self.max_models:
+                self._models.popitem(last=False)
+                self.evictions += 1
+            return lm
+
+    def info(self) -> list[dict]:
+        with self._lock:
+            return [{"model_id": m.model_id, "fingerprint": m.fingerprint, "path": str(m.path),
+                     "estimator": type(m.model).__name__, "load_ms": round(m.load_ms, 2),
+                     "loaded_at": pd.Timestamp(m.loaded_at, unit="s", tz="UTC").isoformat(timespec="seconds")}
+                    for m in self._models.values()]
+
+# -------------------- counters --------------------
+
+class Counters:
+    def __init__(self, window: int = 20000):
+        self._lock = threading.Lock()
+        self.started = time.perf_counter()
+        self.requests = self.rows = self.batches = self.errors = 0
+        self.latency_ms: deque = deque(maxlen=window)
+        self.wait_ms: deque = deque(maxlen=window)
+        self.batch_rows: deque = deque(maxlen=window)
+        self.predict_ms = 0.0
+
+    def batch(self, n_req: int, n_rows: int, predict_ms: float, waits: list[float], latencies: list[float]) -> None:
+        with self._lock:
+            self.requests += n_req
+            self.rows += n_rows
+            self.batches += 1
+            self.predict_ms += predict_ms
+            self.batch_rows.append(n_rows)
+            self.wait_ms.extend(waits)
+            self.latency_ms.extend(latencies)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            up = time.perf_counter() - self.started
+            lat = np.asarray(self.latency_ms) if self.latency_ms else np.array([np.nan])
+            wait = np.asarray(self.wait_ms) if self.wait_ms else np.array([np.nan])
+            return {
+                "requests": self.requests, "rows": self.rows, "batches": self.batches, "errors": self.errors,
+                "rows_per_batch": round(self.rows / self.batches, 1) if self.batches else 0.0,
+                "requests_per_batch": round(self.requests / self.batches, 2) if self.batches else 0.0,
+                "latency_p50_ms": round(float(np.nanpercentile(lat, 50)), 3),
+                "latency_p95_ms": round(float(np.nanpercentile(lat, 95)), 3),
+                "latency_p99_ms": round(float(np.nanpercentile(lat, 99)), 3),
+                "queue_wait_p50_ms": round(float(np.nanpercentile(wait, 50)), 3),
+                "predict_ms_total": round(self.predict_ms, 1),
+                "rows_per_s": round(self.rows / up, 1) if up > 0 else 0.0,
+                "uptime_s": round(up, 1),
+            }
+
+# -------------------- batching --------------------
+
+@dataclass
+class _Request:
+    rows: pd.DataFrame
+    future: Future
+    t0: float
+    calibrate: bool = False
+
+class _Batcher(threading.Thread):
+    def __init__(self, server: "ModelServer", model: str | Path | None):
+        super().__init__(daemon=True, name=f"batcher[{model}]")
+        self.server = server
+        self.model = model
+        self.q: queue.Queue[_Request | None] = queue.Queue()
+        self.counters = Counters()
+
+    def run(self) -> None:
+        from tools.batch_infer import score_frame
+        max_rows, max_wait = self.server.max_batch_rows, self.server.max_wait_ms / 1000.0
+        while True:
+            first = self.q.get()
+            if first is None:
+                return
+            batch, n = [first], len(first.rows)
+            deadline = time.perf_counter() + max_wait
+            while n < max_rows:
+                left = deadline - time.perf_counter()
+                try:
+                    nxt = self.q.get(timeout=left) if left > 0 else self.q.get_nowait()
+                except queue.Empty:
+                    break
+                if nxt is None:
+                    self.q.put(None)
+                    break
+                batch.append(nxt)
+                n += len(nxt.rows)
+            t_start = time.perf_counter()
+            try:
+                lm = self.server.cache.get(self.model)
+            except Exception as e:  # the model itself failed to load: every caller sees it
+                self._settle(batch, [e] * len(batch))
+                continue
+            t = time.perf_counter()
+            try:
+                df = batch[0].rows if len(batch) == 1 else pd.concat([r.rows for r in batch], ignore_index=True, sort=False)
+                proba = score_frame(lm.model, lm.meta, df).astype("float64")
+                bounds = np.cumsum([0] + [len(r.rows) for r in batch])
+                results = [proba[lo:hi] for lo, hi in zip(bounds[:-1], bounds[1:])]
+            except Exception as e:
+                # one request's rows can sink the shared call: score each request alone and fail
+                # only the ones that raise, so other sessions in the batch still get their answer
+                results = [e] if len(batch) == 1 else [self._score_one(score_frame, lm, r.rows) for r in batch]
+            if any(r.calibrate for r in batch):
+                results = self._calibrate(batch, results)
+            predict_ms = (time.perf_counter() - t) * 1000
+            self._settle(batch, results, t_start, predict_ms)
+
+    @staticmethod
+    def _score_one(score_frame, lm, rows: pd.DataFrame):
+        try:
+            return score_frame(lm.model, lm.meta, rows).astype("float64")
+        except Exception as e:
+            return e
+
+    def _calibrate(self, batch: list[_Request], results: list) -> list:
+        """Slices of the requests that asked for it go through the calibrators; a missing store fails only those."""
+        try:
+            cal, err = self.server.calibrators(), None
+        except Exception as e:
+            cal, err = None, e
+        return [res if not r.calibrate or isinstance(res, Exception) else err if cal is None else cal.apply_scores(res, r.rows)
+                for r, res in zip(batch, results)]
+
+    def _settle(self, batch: list[_Request], results: list, t_start: float | None = None, predict_ms: float = 0.0) -> None:
+        """Hand each caller its slice or its own exception; successful requests go into the counters."""
+        done = time.perf_counter()
+        ok = [r for r, res in zip(batch, results) if not isinstance(res, Exception)]
+        for r, res in zip(batch, results):
+            if isinstance(res, Exception):
+                r.future.set_exception(res)
+            else:
+                r.future.set_result(res)
+        if len(ok) < len(batch):
+            with self.counters._lock:
+                self.counters.errors += len(batch) - len(ok)
+        if ok:
+            self.counters.batch(len(ok), sum(len(r.rows) for r in ok), predict_ms,
+                                [(t_start - r.t0) * 1000 for r in ok], [(done - r.t0) * 1000 for r in ok])
+
+class ModelServer:
+    """
+    score(model, rows) -> P(class 1) per row. Thread-safe; concurrent calls for one model share a
+    predict_proba. max_wait_ms=0 still merges whatever is already queued. calibrate is the default
+    for calls that don't say (score(..., calibrate=True) returns calibrated probabilities).
+    """
+    def __init__(self, max_batch_rows: int = 65536, max_wait_ms: float = 2.0, max_models: int = 8,
+                 calibrate: bool = False, cal_store: str | Path | None = None):
+        self.max_batch_rows = max_batch_rows
+        self.max_wait_ms = max_wait_ms
+        self.cache = ModelCache(max_models)
+        self.calibrate = calibrate
+        self.cal_store = Path(cal_store) if cal_store else None
+        self._cal: tuple[int, object] | None = None
+        self._cal_lock = threading.Lock()
+        self._batchers: dict[str, _Batcher] = {}
+        self._lock = threading.Lock()
+
+    def calibrators(self):
+        """Stored CalibratorSet, reloaded when calibrators.parquet changes (raises if there is none)."""
+        from tools.calibrators import STORE_FILE, CalibratorSet, store_dir
+        path = store_dir(self.cal_store) / STORE_FILE
+        with self._cal_lock:
+            sig = path.stat().st_mtime_ns if path.exists() else None
+            if self._cal is None or sig is None or self._cal[0] != sig:
+                self._cal = (sig, CalibratorSet.load(self.cal_store))
+            return self._cal[1]
+
+    def _batcher(self, model) -> _Batcher:
+        key = str(model)
+        b = self._batchers.get(key)
+        if b is None:
+            with self._lock:
+                b = self._batchers.get(key)
+                if b is None:
+                    b = _Batcher(self, model)
+                    b.start()
+                    self._batchers[key] = b
+        return b
+
+    def submit(self, model, rows: pd.DataFrame | list[dict] | dict, calibrate: bool | None = None) -> Future:
+        if isinstance(rows, dict):
+            rows = pd.DataFrame([rows])
+        elif not isinstance(rows, pd.DataFrame):
+            rows = pd.DataFrame(list(rows))
+        fut: Future = Future()
+        if rows.empty:
+            fut.set_result(np.empty(0))
+            return fut
+        cal = self.calibrate if calibrate is None else bool(calibrate)
+        self._batcher(model).q.put(_Request(rows, fut, time.perf_counter(), cal))
+        return fut
+
+    def score(self, model, rows, timeout: float | None = 60.0, calibrate: bool | None = None) -> np.ndarray:
+        return self.submit(model, rows, calibrate).result(timeout)
+
+    def warm(self, model) -> LoadedModel:
+        return self.cache.get(model)
+
+    def stats(self) -> dict:
+        return {
+            "cache": {"hits": self.cache.hits, "misses": self.cache.misses, "evictions": self.cache.evictions,
+                      "models": self.cache.info()},
+            "models": {k: b.counters.snapshot() for k, b in self._batchers.items()},
+            "max_batch_rows": self.max_batch_rows, "max_wait_ms": self.max_wait_ms, "calibrate": self.calibrate,
+        }
+
+    def close(self) -> None:
+        for b in self._batchers.values():
+            b.q.put(None)
+        for b in self._batchers.values():
+            b.join(timeout=5)
+        self._batchers.clear()
+
+_SERVER: ModelServer | None = None
+_SERVER_LOCK = threading.Lock()
+
+def get_server() -> ModelServer:
+    """Process-wide server (one warm cache and one batcher per model for every caller)."""
+    global _SERVER
+    if _SERVER is None:
+        with _SERVER_LOCK:
+            if _SERVER is None:
+                _SERVER = ModelServer()
+    return _SERVER
+
+# -------------------- interfaces --------------------
+
+def _rows_from(req: dict) -> pd.DataFrame:
+    if "columns" in req:
+        return pd.DataFrame(req.get("data") or [], columns=req["columns"])
+    return pd.DataFrame(req.get("rows") or [])
+
+def handle(server: ModelServer, req: dict, default_model=None) -> dict:
+    cmd = req.get("cmd", "score")
+    if cmd == "stats":
+        return server.stats()
+    if cmd == "warm":
+        lm = server.warm(req.get("model", default_model))
+        return {"model_id": lm.model_id, "fingerprint": lm.fingerprint, "load_ms": round(lm.load_ms, 2)}
+    t = time.perf_counter()
+    cal = req.get("calibrate")
+    proba = server.score(req.get("model", default_model), _rows_from(req), calibrate=cal)
+    return {"proba": [round(float(p), 6) for p in proba], "ms": round((time.perf_counter() - t) * 1000, 3),
+            "calibrated": server.calibrate if cal is None else bool(cal)}
+
+def serve_stdin(server: ModelServer, default_model=None) -> None:
+    """One JSON request per line -> one JSON response per line (errors as {"error": ...})."""
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            out = handle(server, json.loads(line), default_model)
+        except Exception as e:
+            out = {"error": f"{type(e).__name__}: {e}"}
+        sys.stdout.write(json.dumps(out, default=str) + "\n")
+        sys.stdout.flush()
+
+def serve_http(server: ModelServer, host: str, port: int, default_model=None) -> None:
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _send(self, code: int, body: dict) -> None:
+            data = json.dumps(body, default=str).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path.startswith("/stats"):
+                self._send(200, server.stats())
+            elif self.path.startswith("/health"):
+                self._send(200, {"ok": True})
+            else:
+                self._send(404, {"error": "not found"})
+
+        def do_POST(self):
+            try:
+                n = int(self.headers.get("Content-Length") or 0)
+                req = json.loads(self.rfile.read(n) or b"{}")
+                if self.path.startswith("/warm"):
+                    req["cmd"] = "warm"
+                self._send(200, handle(server, req, default_model))
+            except Exception as e:
+                self._send(400, {"error": f"{type(e).__name__}: {e}"})
+
+        def log_message(self, *args):
+            pass
+
+    httpd = ThreadingHTTPServer((host, port), Handler)
+    httpd.daemon_threads = True
+    print(f"[model_server] http://{host}:{port}  (POST /score, POST /warm, GET /stats)", flush=True)
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+
+# -------------------- benchmark --------------------
+
+def _bench_rows(model, path: str | None, n: int) -> pd.DataFrame:
+    if path:
+        from tools.batch_infer import read_chunks
+        return next(iter(read_chunks(path, n)))
+    lm = ModelCache().get(model)
+    feats = list(lm.meta.get("feature_cols") or [])
+    rng = np.random.default_rng(0)
+    return pd.DataFrame(rng.normal(size=(n, len(feats))), columns=feats)
+
+def bench(model, rows: pd.DataFrame, threads: int, requests: int, batch: int, url: str | None = None,
+          max_wait_ms: float = 2.0) -> dict:
+    """
+    `threads` callers each sending `requests` calls of `batch` rows. Compares direct per-call
+    predict_proba (warm model, no batching) with the batching server (or a running HTTP server).
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    from tools.batch_infer import score_frame
+    reqs = [rows.iloc[(i * batch) % max(len(rows) - batch, 1):][:batch] for i in range(threads * requests)]
+
+    def timed(fn) -> dict:
+        lat = []
+        lock = threading.Lock()
+
+        def one(df):
+            t = time.perf_counter()
+            fn(df)
+            with lock:
+                lat.append((time.perf_counter() - t) * 1000)
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(threads) as ex:
+            list(ex.map(one, reqs))
+        wall = time.perf_counter() - t0
+        lat = np.asarray(lat)
+        return {"calls": len(reqs), "rows": len(reqs) * batch, "wall_s": round(wall, 3),
+                "calls_per_s": round(len(reqs) / wall, 1), "rows_per_s": round(len(reqs) * batch / wall, 1),
+                "p50_ms": round(float(np.percentile(lat, 50)), 3), "p95_ms": round(float(np.percentile(lat, 95)), 3)}
+
+    out = {}
+    lm = ModelCache().get(model)
+    out["direct"] = timed(lambda df: score_frame(lm.model, lm.meta, df))
+    if url:
+        import urllib.request
+
+        def post(df):
+            body = json.dumps({"model": str(model) if model else None, "columns": list(df.columns),
+                               "data": df.to_numpy().tolist()}).encode("utf-8")
+            r = urllib.request.Request(url.rstrip("/") + "/score", data=body, headers={"Content-Type": "application/json"})
+            with urllib.request.urlopen(r, timeout=30) as resp:
+                json.loads(resp.read())
+        out["http"] = timed(post)
+    else:
+        srv = ModelServer(max_wait_ms=max_wait_ms)
+        srv.warm(model)
+        out["batched"] = timed(lambda df: srv.score(model, df))
+        out["server"] = srv.stats()["models"]
+        srv.close()
+    return out
+
+# -------------------- CLI --------------------
+
+def main():
+    ap = argparse.ArgumentParser(description="Local model server (warm cache + micro-batching).")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    sv = sub.add_parser("serve")
+    sv.add_argument("--model", default=None, help="default model: registry id, model dir or .joblib (default: active)")
+    sv.add_argument("--http", default="", metavar="HOST:PORT", help="listen on localhost HTTP (e.g. 127.0.0.1:8765)")
+    sv.add_argument("--stdin", action="store_true", help="JSON lines on stdin/stdout")
+    sv.add_argument("--max-wait-ms", type=float, default=2.0)
+    sv.add_argument("--max-batch-rows", type=int, default=65536)
+    sv.add_argument("--calibrate", action="store_true", help="calibrate every request that doesn't say otherwise")
+    sv.add_argument("--cal-store", default=None, help="calibrator folder (default exports/calibration)")
+    bn = sub.add_parser("bench")
+    bn.add_argument("--model", default=None)
+    bn.add_argument("--rows", default=None, help="CSV/Parquet with input rows (default: random features)")
+    bn.add_argument("--threads", type=int, default=8)
+    bn.add_argument("--requests", type=int, default=200, help="calls per thread")
+    bn.add_argument("--batch", type=int, default=20, help="rows per call")
+    bn.add_argument("--max-wait-ms", type=float, default=2.0)
+    bn.add_argument("--url", default=None, help="benchmark a running HTTP server instead of in-process batching")
+    args = ap.parse_args()
+
+    if args.cmd == "serve":
+        srv = ModelServer(max_batch_rows=args.max_batch_rows, max_wait_ms=args.max_wait_ms,
+                          calibrate=args.calibrate, cal_store=args.cal_store)
+        if args.model or not args.stdin:
+            try:
+                lm = srv.warm(args.model)
+                print(f"[model_server] warm {lm.model_id} ({lm.fingerprint}) in {lm.load_ms:.1f} ms",
+                      file=sys.stderr if args.stdin else sys.stdout, flush=True)
+            except Exception as e:
+                print(f"[model_server] no model warmed: {e}", file=sys.stderr, flush=True)
+        if args.calibrate:
+            try:
+                print(f"[model_server] calibrators: {len(srv.calibrators().cal)} tables", file=sys.stderr, flush=True)
+            except Exception as e:
+                print(f"[model_server] calibrate requested but {e}", file=sys.stderr, flush=True)
+        if args.stdin:
+            serve_stdin(srv, args.model)
+        else:
+            host, _, port = (args.http or "127.0.0.1:8765").rpartition(":")
+            serve_http(srv, host or "127.0.0.1", int(port), args.model)
+        srv.close()
+    else:
+        rows = _bench_rows(args.model, args.rows, max(args.batch * 50, 1000))
+        res = bench(args.model, rows, args.threads, args.requests, args.batch, args.url, args.max_wait_ms)
+        for k in ("direct", "batched", "http"):
+            if k in res:
+                print(f"[bench] {k:8s} " + " ".join(f"{a}={b}" for a, b in res[k].items()))
+        for k, v in (res.get("server") or {}).items():
+            print(f"[bench] server[{k}] rows_per_batch={v['rows_per_batch']} requests_per_batch={v['requests_per_batch']} "
+                  f"p95={v['latency_p95_ms']}ms")
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
-import pandas as pd, os, sys, math
+import pandas as pd, os, sys, math, hashlib
+from pathlib import Path
 src = r'exports\tmp\props_latest.csv'
 dst = r'exports\tmp\props_latest_std.csv'
 if not os.path.exists(src):
@@ -50,10 +51,23 @@ else:
     work['price'] = pd.to_numeric(price_raw, errors='coerce')
 
 if work['player_id'].isna().all() and 'player' in df.columns:
-    work['player_id'] = df['player'].astype(str).apply(lambda s: abs(hash(s)) % (10**9))
+    # player_key from the player dimension (exact/token-set/fuzzy name resolution, cached); names
+    # not in the dimension get a new key instead of being dropped. player_id stays the stats source
+    # id (empty here), so settlement never reads a dimension key as a source id.
+    try:
+        from tools.player_index import load_index, save_index
+    except ImportError:
+        work['player_id'] = df['player'].astype(str).map(lambda s: int(hashlib.sha1(s.encode()).hexdigest()[:8], 16))
+    else:
+        exp = os.path.dirname(os.path.dirname(src)) or 'exports'
+        index = load_index(Path(exp))
+        work['player_key'] = index.resolve(df['player'], season=work['season'], create=True)
+        save_index(index, Path(exp))
+    work['player_name'] = df['player']
 
-req = need
-ok = pd.Series(True, index=work.index)
+# a row needs a player: the source id, or the dimension key resolved from its name
+req = [r for r in need if r != 'player_id']
+ok = work['player_id'].notna() | (work['player_key'].notna() if 'player_key' in work.columns else False)
 for r in req: ok &= work[r].notna()
 out = work[ok].copy()
 
@@ -0,0 +1,265 @@
+# tools/odds_reshape.py
+# Declarative wide -> long odds reshaping.
+#
+# A spec is a list of legs. Each leg names one output outcome (market, side) and the candidate
+# source columns for its line and price; the first candidate present in the frame wins. A line
+# candidate may carry a sign, so AWAY spread = -home spread is just ("spread", -1).
+#
+#   {"market": "SPREADS", "side": "AWAY",
+#    "line":  [("handicap_away", 1), ("spread", -1)],
+#    "price": ["away_spread_odds", "price_away", "odds"]}
+#
+# A leg with a "line" entry is emitted only when one of its line columns exists; a leg without one
+# (moneylines) only when one of its price columns exists. reshape() then builds every leg at once
+# from stacked numpy columns (one take() for the id columns, categorical market/side codes), so
+# the cost is a few array copies regardless of the number of legs — no Python row loops.
+#
+# Canonical long schema: <id columns> + market, side, line, price.
+#
+# Also here: the row-wise long -> edges normalization shared by edges_from_lines.py and
+# build_edges_from_lines.py (market rules as regexes, vectorized side / odds clean-up).
+#
+# Benchmark: python -m tools.odds_reshape --bench 2000000
+from __future__ import annotations
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+LONG_COLS = ["market", "side", "line", "price"]
+
+# -------------------- specs --------------------
+
+ML_HOME = ["home_odds", "home_price", "price_home", "ml_home", "home_ml", "moneyline_home"]
+ML_AWAY = ["away_odds", "away_price", "price_away", "ml_away", "away_ml", "moneyline_away"]
+SPREAD = ["spread", "spread_line", "handicap", "handicap_home"]
+TOTAL = ["total", "total_line", "points_total"]
+
+# odds_lines_all-style snapshots (one row per game x book)
+WIDE_GAME_SPEC = [
+    {"market": "H2H", "side": "HOME", "price": ML_HOME},
+    {"market": "H2H", "side": "AWAY", "price": ML_AWAY},
+    {"market": "SPREADS", "side": "HOME", "line": SPREAD,
+     "price": ["home_spread_odds", "price_home", "odds"]},
+    {"market": "SPREADS", "side": "AWAY", "line": [("handicap_away", 1)] + [(c, -1) for c in SPREAD],
+     "price": ["away_spread_odds", "price_away", "odds"]},
+    {"market": "TOTALS", "side": "OVER", "line": TOTAL, "price": ["over_odds", "price_over", "ou_price_over", "odds"]},
+    {"market": "TOTALS", "side": "UNDER", "line": TOTAL, "price": ["under_odds", "price_under", "ou_price_under", "odds"]},
+]
+
+# historical per-game closers / openers (historical_odds_*.csv); spreads are home-perspective
+HISTORICAL_SPEC = [
+    {"market": "H2H", "side": "HOME", "price": ["ml_home"], "phase": "close"},
+    {"market": "H2H", "side": "AWAY", "price": ["ml_away"], "phase": "close"},
+    {"market": "SPREADS", "side": "HOME", "line": ["spread_close"], "phase": "close"},
+    {"market": "SPREADS", "side": "AWAY", "line": [("spread_close", -1)], "phase": "close"},
+    {"market": "TOTALS", "side": "OVER", "line": ["total_close"], "phase": "close"},
+    {"market": "TOTALS", "side": "UNDER", "line": ["total_close"], "phase": "close"},
+    {"market": "SPREADS", "side": "HOME", "line": ["spread_open"], "phase": "open"},
+    {"market": "SPREADS", "side": "AWAY", "line": [("spread_open", -1)], "phase": "open"},
+    {"market": "TOTALS", "side": "OVER", "line": ["total_open"], "phase": "open"},
+    {"market": "TOTALS", "side": "UNDER", "line": ["total_open"], "phase": "open"},
+]
+
+# -------------------- engine --------------------
+
+def pick_col(df: pd.DataFrame, names) -> str | None:
+    """First of `names` present in df (case-insensitive); returns the frame's own spelling."""
+    lower = {str(c).lower(): c for c in df.columns}
+    for n in names:
+        c = lower.get(str(n).lower())
+        if c is not None:
+            return c
+    return None
+
+def _cands(entries) -> list[tuple[str, float]]:
+    return [(e, 1.0) if isinstance(e, str) else (e[0], float(e[1])) for e in entries or []]
+
+def resolve_spec(df: pd.DataFrame, spec: list[dict]) -> list[dict]:
+    """Bind each leg to the concrete columns of `df`; legs without their required column are dropped."""
+    legs = []
+    for leg in spec:
+        line_col, sign = None, 1.0
+        if "line" in leg:
+            for c, s in _cands(leg["line"]):
+                hit = pick_col(df, [c])
+                if hit is not None:
+                    line_col, sign = hit, s
+                    break
+            if line_col is None:
+                continue
+        price_col = pick_col(df, leg.get("price", []))
+        if "line" not in leg and price_col is None:
+            continue
+        legs.append({**leg, "line_col": line_col, "line_sign": sign, "price_col": price_col})
+    return legs
+
+def _num(s: pd.Series) -> np.ndarray:
+    if isinstance(s.dtype, np.dtype) and s.dtype.kind == "f":
+        return s.to_numpy()
+    return pd.to_numeric(s, errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+
+def _codes(labels: list[str]) -> tuple[np.ndarray, list[str]]:
+    cats = list(dict.fromkeys(labels))
+    return np.array([cats.index(x) for x in labels], dtype="int16"), cats
+
+def reshape(
+    df: pd.DataFrame,
+    spec: list[dict],
+    id_cols: list[str] | None = None,
+    dropna: bool = True,
+    price_name: str = "price",
+) -> pd.DataFrame:
+    """
+    Wide -> long per `spec`. Output rows are leg-major (all rows of leg 1, then leg 2, ...).
+    id_cols default to every column the spec does not consume. dropna drops rows with neither a
+    line nor a price. Extra scalar leg keys (e.g. "phase") become columns.
+    """
+    legs = resolve_spec(df, spec)
+    used = {c for leg in legs for c in (leg["line_col"], leg["price_col"]) if c}
+    ids = [c for c in (id_cols if id_cols is not None else df.columns) if c in df.columns and (id_cols is not None or c not in used)]
+    cols = ids + LONG_COLS[:-1] + [price_name]
+    if not legs:
+        return pd.DataFrame(columns=cols)
+
+    n, k = len(df), len(legs)
+    nan = np.full(n, np.nan)
+    num = {c: _num(df[c]) for c in used}
+    line = np.concatenate([num[l["line_col"]] * l["line_sign"] if l["line_col"] else nan for l in legs])
+    price = np.concatenate([num[l["price_col"]] if l["price_col"] else nan for l in legs])
+    rows = np.tile(np.arange(n), k)
+
+    keep = ~(np.isnan(line) & np.isnan(price)) if dropna else np.ones(n * k, dtype=bool)
+    rows, line, price = rows[keep], line[keep], price[keep]
+    leg_of = np.repeat(np.arange(k), n)[keep]
+
+    out = df[ids].take(rows).reset_index(drop=True) if ids else pd.DataFrame(index=np.arange(len(rows)))
+    for key in ("market", "side"):
+        codes, cats = _codes([l[key] for l in legs])
+        out[key] = pd.Categorical.from_codes(codes[leg_of], cats)
+    out["line"] = line
+    out[price_name] = price
+    reserved = ("market", "side", "line", "price", "line_col", "line_sign", "price_col")
+    extra = list(dict.fromkeys(key for l in legs for key in l if key not in reserved))
+    for key in extra:
+        codes, cats = _codes([str(l.get(key, "")) for l in legs])
+        out[key] = pd.Categorical.from_codes(codes[leg_of], cats)
+    return out[cols + extra]
+
+# -------------------- long rows -> edges --------------------
+
+EDGE_COLS = ["game_id", "market", "side", "line", "book", "odds", "p_win", "ref"]
+
+def to_int_odds(s: pd.Series) -> pd.Series:
+    """'+110' / '-105.0' / 110.4 -> Int64 (NA when not numeric)."""
+    v = pd.to_numeric(s.astype("string").str.strip().str.replace("+", "", regex=False), errors="coerce")
+    return v.round().astype("Int64")
+
+def game_ids(d: pd.DataFrame) -> pd.Series:
+    """Provided game_id, else '<date>-<AWA>@<HOM>' from start_time / away_team / home_team."""
+    gid = d["game_id"].astype("string").str.strip()
+    ht, at = d["home_team"], d["away_team"]
+    dt = d["start_time"].astype("string").fillna("").str[:10]
+    synth = (dt + "-" + at.astype("string").str[:3] + "@" + ht.astype("string").str[:3]).str.replace(" ", "", regex=False)
+    synth = synth.where(ht.notna() & at.notna())
+    return gid.where(gid.notna() & gid.ne(""), synth)
+
+def _over_under(d: pd.DataFrame, default_under: bool = True) -> pd.Series:
+    """Over/Under from `outcome`, else `side`; letters o/u in side as a fallback, else Over."""
+    raw = d["outcome"].astype("string").fillna("")
+    raw = raw.where(raw.str.strip().ne(""), d["side"].astype("string").fillna(""))
+    ou = raw.str.strip().str.title()
+    side = d["side"].astype("string").fillna("").str.lower()
+    guess = pd.Series(np.where(side.str.contains("o", regex=False), "Over",
+                      np.where(side.str.contains("u", regex=False) & default_under, "Under", "Over")), index=d.index)
+    return ou.where(ou.isin(["Over", "Under"]), guess)
+
+def edges_from_long(d: pd.DataFrame, rules: list[dict]) -> pd.DataFrame:
+    """
+    Long market rows -> edges rows, one vectorized pass per rule. A rule is
+    {"label": "Spread", "match": <regex on market>, "kind": "side" | "ou" | "prop", "line": bool}.
+    `d` must already carry the standard columns (game_id, book, market, side, player, line, odds,
+    p_win, ref, home_team, away_team, start_time, outcome).
+    """
+    mk = d["market"].astype("string").fillna("")
+    gid = game_ids(d)
+    odds = to_int_odds(d["odds"])
+    frames = []
+    for r in rules:
+        m = mk.str.contains(r["match"], case=False, regex=True, na=False)
+        if "extra" in r:
+            m |= r["extra"](d)
+        if not m.any():
+            continue
+        sub = d[m]
+        if r["kind"] == "ou":
+            side = _over_under(sub)
+            market = pd.Series(r["label"], index=sub.index)
+        elif r["kind"] == "prop":
+            mm = mk[m].str.strip()
+            ptype = mm.where(~mm.str.contains(":", regex=False), mm.str.split(":", n=1).str[-1].str.strip())
+            ptype = ptype.where(mm.str.contains(":", regex=False) | mm.str.contains("prop", case=False, regex=False), "Prop")
+            market = "Prop: " + ptype
+            ou = _over_under(sub, default_under=False)
+            ou = ou.where(ou.isin(["Over", "Under"]), "Over")
+            who = sub["player"].astype("string").fillna(sub["side"].astype("string")).fillna("").str.strip()
+            side = (ou + " " + who).str.strip()
+        else:
+            side = sub["side"]
+            market = pd.Series(r["label"], index=sub.index)
+        frames.append(pd.DataFrame({
+            "game_id": gid[m], "market": market, "side": side,
+            "line": sub["line"] if r.get("line", True) else None,
+            "book": sub["book"], "odds": odds[m], "p_win": sub["p_win"], "ref": sub["ref"],
+        }))
+    if not frames:
+        return pd.DataFrame(columns=EDGE_COLS)
+    out = pd.concat(frames, ignore_index=True)[EDGE_COLS]
+    return out[out["odds"].notna()].reset_index(drop=True)
+
+# -------------------- benchmark --------------------
+
+def bench(n: int = 2_000_000, seed: int = 7) -> dict:
+    rng = np.random.default_rng(seed)
+    books = np.array(["DK", "FD", "MGM", "CZR", "PIN", "BOL"], dtype=object)
+    wide = pd.DataFrame({
+        "game_id": pd.Categorical.from_codes(rng.integers(0, 5000, n), [f"G{i}" for i in range(5000)]),
+        "book": pd.Categorical(books[rng.integers(0, len(books), n)]),
+        "captured_at": np.arange(n, dtype="int64"),
+        "home_odds": rng.choice([-150, -120, -110, 105, 130], n).astype("float64"),
+        "away_odds": rng.choice([-150, -120, -110, 105, 130], n).astype("float64"),
+        "spread": rng.choice(np.arange(-14, 14.5, 0.5), n),
+        "home_spread_odds": -110.0, "away_spread_odds": -110.0,
+        "total": rng.choice(np.arange(36, 56.5, 0.5), n),
+        "over_odds": -110.0, "under_odds": -110.0,
+    })
+    t0 = time.perf_counter()
+    long = reshape(wide, WIDE_GAME_SPEC, id_cols=["game_id", "book", "captured_at"])
+    dt = time.perf_counter() - t0
+    return {"wide_rows": n, "long_rows": len(long), "seconds": round(dt, 3),
+            "long_rows_per_min": int(len(long) / dt * 60) if dt else None}
+
+def main():
+    ap = argparse.ArgumentParser(description="Wide -> long odds reshaping (library + benchmark).")
+    ap.add_argument("--bench", type=int, default=0, help="benchmark with N synthetic wide rows")
+    ap.add_argument("--input", default="", help="wide CSV to reshape with the game spec")
+    ap.add_argument("--spec", choices=["game", "historical"], default="game")
+    ap.add_argument("--out", default="", help="long CSV output")
+    args = ap.parse_args()
+    if args.bench:
+        r = bench(args.bench)
+        print(f"[reshape] {r['wide_rows']:,} wide -> {r['long_rows']:,} long in {r['seconds']}s "
+              f"({r['long_rows_per_min']:,} rows/min)")
+        return
+    if not args.input:
+        ap.error("--input or --bench required")
+    df = pd.read_csv(args.input, low_memory=False)
+    long = reshape(df, WIDE_GAME_SPEC if args.spec == "game" else HISTORICAL_SPEC)
+    out = args.out or str(args.input).rsplit(".", 1)[0] + "_long.csv"
+    long.to_csv(out, index=False)
+    print(f"[reshape] {args.input} -> {out} rows={len(long):,}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,366 @@
+# tools/player_index.py
+# Persisted player dimension + name resolver for props ingestion and settlement.
+#
+# Dimension (exports/player_dim.parquet): one row per player with a stable int `player_key`, the
+# source id from player_game_stats (`source_id`), a display name and normalized name forms:
+#   name_norm  "patrick mahomes"   (lowercase, accents/punctuation/suffixes stripped)
+#   name_set   "mahomes patrick"   (sorted tokens: order-insensitive)
+#   name_abbr  "p mahomes"         (first initial + last token: matches play-by-play "P.Mahomes")
+#   merged_into                    (keys created for unknown names, once that player shows up in
+#                                   stats: the source-backed key; canonical() follows it)
+# History (exports/player_history.parquet): player_key x season x team x role with game counts,
+# used to break ties between namesakes when the caller knows the season / team.
+#
+# Resolver: exact name_norm -> token set -> initial+last (unique only) -> bounded fuzzy (difflib on
+# candidates sharing the last-name prefix, with a minimum score and a margin over the runner-up).
+# It only runs over the unique (name, season, team) combinations it has not decided before; every
+# decision is appended to exports/player_resolve_cache.csv, so re-runs are repeatable and cheap.
+from __future__ import annotations
+
+import argparse
+import difflib
+import re
+import unicodedata
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from tools.pathing import exports_dir
+
+DIM_FILE = "player_dim.parquet"
+HIST_FILE = "player_history.parquet"
+CACHE_FILE = "player_resolve_cache.csv"
+
+DIM_COLS = ["player_key", "source_id", "player_name", "name_norm", "name_set", "name_abbr", "merged_into"]
+HIST_COLS = ["player_key", "season", "team", "role", "games"]
+CACHE_COLS = ["name_norm", "season", "team", "player_key", "method", "score", "decided_ts"]
+
+SUFFIXES = {"jr", "sr", "ii", "iii", "iv", "v"}
+FUZZY_CUTOFF = 0.86
+FUZZY_MARGIN = 0.03
+FUZZY_MAX_CANDIDATES = 400
+
+# -------------------- name forms --------------------
+
+_PUNCT_RE = re.compile(r"[^a-z0-9 ]+")
+_WS_RE = re.compile(r"\s+")
+
+def norm_name(x) -> str:
+    """'Odell Beckham Jr.' -> 'odell beckham'; 'P.Mahomes' -> 'p mahomes'."""
+    if x is None or (isinstance(x, float) and np.isnan(x)):
+        return ""
+    s = unicodedata.normalize("NFKD", str(x)).encode("ascii", "ignore").decode().lower()
+    s = s.replace("'", "").replace("’", "")
+    s = _WS_RE.sub(" ", _PUNCT_RE.sub(" ", s)).strip()
+    toks = [t for t in s.split(" ") if t and t not in SUFFIXES]
+    return " ".join(toks)
+
+def name_forms(norm: pd.Series) -> pd.DataFrame:
+    """Vectorized name_set / name_abbr / last token for a Series of normalized names."""
+    toks = norm.str.split(" ")
+    out = pd.DataFrame(index=norm.index)
+    out["name_set"] = toks.map(lambda t: " ".join(sorted(t)) if t and t != [""] else "")
+    first = toks.str[0].fillna("").str[:1]
+    last = toks.str[-1].fillna("")
+    out["name_abbr"] = (first + " " + last).where(toks.str.len().fillna(0) >= 2, norm)
+    out["last"] = last
+    return out
+
+def _sid(x) -> str:
+    """Source ids compare as strings; integral floats lose the '.0'."""
+    if x is None or (isinstance(x, float) and np.isnan(x)) or x is pd.NA:
+        return ""
+    if isinstance(x, (int, np.integer)) or (isinstance(x, (float, np.floating)) and float(x).is_integer()):
+        return str(int(x))
+    return str(x).strip()
+
+# -------------------- build --------------------
+
+def _team_col(df: pd.DataFrame) -> str | None:
+    for c in ("team", "recent_team", "posteam", "player_team"):
+        if c in df.columns:
+            return c
+    return None
+
+def build_dim(stats: pd.DataFrame, dim: pd.DataFrame | None = None) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    (dim, history) from a player_game_stats frame. Existing keys in `dim` are kept; new source ids
+    get the next free keys, so ids never move between builds.
+    """
+    s = stats.copy()
+    s["source_id"] = s["player_id"].map(_sid)
+    s["player_name"] = s["player_name"].astype("string").fillna("")
+    s = s[s["source_id"].ne("") & s["player_name"].ne("")]
+
+    # one display name per source id: the most frequent spelling
+    names = (s.groupby(["source_id", "player_name"], sort=False).size().rename("n").reset_index()
+              .sort_values(["source_id", "n"], ascending=[True, False], kind="stable")
+              .drop_duplicates("source_id"))
+    dim = dim.reindex(columns=DIM_COLS) if dim is not None and not dim.empty else pd.DataFrame(columns=DIM_COLS)
+    known = set(dim["source_id"].astype(str))
+    new = names[~names["source_id"].isin(known)].reset_index(drop=True)
+    if not new.empty:
+        start = int(pd.to_numeric(dim["player_key"]).max()) + 1 if not dim.empty else 1
+        new["player_key"] = np.arange(start, start + len(new), dtype="int64")
+        new["name_norm"] = new["player_name"].map(norm_name)
+        forms = name_forms(new["name_norm"])
+        new["name_set"] = forms["name_set"]; new["name_abbr"] = forms["name_abbr"]
+        new["merged_into"] = pd.NA
+        dim = pd.concat([dim, new[DIM_COLS]], ignore_index=True)
+    dim["player_key"] = pd.to_numeric(dim["player_key"]).astype("int64")
+    dim["merged_into"] = pd.to_numeric(dim["merged_into"]).astype("Int64")
+
+    key_of = dict(zip(dim["source_id"].astype(str), dim["player_key"]))
+    tc = _team_col(s)
+    h = pd.DataFrame({
+        "player_key": s["source_id"].map(key_of).astype("int64"),
+        "season": pd.to_numeric(s.get("season"), errors="coerce").astype("Int64"),
+        "team": s[tc].astype("string").fillna("").str.upper() if tc else "",
+        "role": s["role"].astype("string").fillna("") if "role" in s.columns else "",
+        "game_id": s.get("game_id", pd.Series(np.arange(len(s)), index=s.index)),
+    })
+    hist = (h.groupby(["player_key", "season", "team", "role"], dropna=False)["game_id"].nunique()
+             .rename("games").reset_index())
+    return dim[DIM_COLS], hist[HIST_COLS]
+
+# -------------------- resolver --------------------
+
+class PlayerIndex:
+    """In-memory lookups over the dimension plus the persisted decision cache."""
+
+    def __init__(self, dim: pd.DataFrame, hist: pd.DataFrame | None = None, cache: pd.DataFrame | None = None):
+        self.dim = dim.reindex(columns=DIM_COLS).reset_index(drop=True)
+        self.dim["merged_into"] = pd.to_numeric(self.dim["merged_into"]).astype("Int64")
+        self.hist = hist if hist is not None else pd.DataFrame(columns=HIST_COLS)
+        merged = self.dim["merged_into"].notna()
+        self._merged = dict(zip(self.dim.loc[merged, "player_key"].astype("int64"), self.dim.loc[merged, "merged_into"].astype("int64")))
+        live = self.dim[~merged]             # the resolver never hands out a merged key
+        self._by = {}
+        for col in ("name_norm", "name_set", "name_abbr"):
+            self._by[col] = live.groupby(col, sort=False)["player_key"].agg(lambda k: tuple(sorted(set(k)))).to_dict()
+        last = name_forms(live["name_norm"])["last"]
+        self._block = {}
+        for norm, key, ln in zip(live["name_norm"], live["player_key"], last):
+            self._block.setdefault(ln[:2], []).append((norm, int(key)))
+        self._initial_only = dict(zip(live["player_key"].astype("int64"), live["name_norm"].str.split(" ").str[0].str.len().eq(1)))
+        backed = live[live["source_id"].astype(str).ne("")]
+        self._source = dict(zip(backed["source_id"].astype(str), backed["player_key"].astype("int64")))
+        self._seasons = self.hist.groupby("player_key")["season"].agg(lambda s: set(s.dropna().astype(int))).to_dict() \
+            if not self.hist.empty else {}
+        self._teams = self.hist.assign(_k=list(zip(self.hist["season"], self.hist["team"]))) \
+            .groupby("player_key")["_k"].agg(set).to_dict() if not self.hist.empty else {}
+        self.cache: dict[tuple, tuple] = {}
+        self._new: list[tuple] = []
+        if cache is not None and not cache.empty:
+            for n, se, t, k, m, sc in cache[CACHE_COLS[:-1]].itertuples(index=False, name=None):
+                self.cache[(n, int(se), t)] = (int(k) if pd.notna(k) else -1, m, float(sc))
+
+    def __len__(self) -> int:
+        return len(self.dim)
+
+    # -------- single-name stages --------
+
+    def _narrow(self, keys: tuple, season: int, team: str) -> tuple:
+        """Namesakes: keep the candidates that played that season (and for that team, if known)."""
+        if len(keys) <= 1 or season < 0:
+            return keys
+        hit = tuple(k for k in keys if season in self._seasons.get(k, ()))
+        if team and len(hit) > 1:
+            hit_t = tuple(k for k in hit if (season, team) in self._teams.get(k, ()))
+            hit = hit_t or hit
+        return hit or keys
+
+    def _fuzzy(self, norm: str) -> tuple[int, float]:
+        last = norm.split(" ")[-1]
+        cands = self._block.get(last[:2], [])[:FUZZY_MAX_CANDIDATES]
+        if not cands:
+            return -1, 0.0
+        sm = difflib.SequenceMatcher(a=norm, autojunk=False)
+        best = {}
+        for cn, k in cands:
+            sm.set_seq2(cn)
+            if sm.real_quick_ratio() < FUZZY_CUTOFF or sm.quick_ratio() < FUZZY_CUTOFF:
+                continue
+            r = sm.ratio()
+            if r > best.get(k, 0.0):
+                best[k] = r
+        if not best:
+            return -1, 0.0
+        ranked = sorted(best.items(), key=lambda kv: -kv[1])
+        k, r = ranked[0]
+        if r < FUZZY_CUTOFF or (len(ranked) > 1 and r - ranked[1][1] < FUZZY_MARGIN):
+            return -1, r
+        return int(k), r
+
+    def _decide(self, norm: str, season: int, team: str) -> tuple[int, str, float]:
+        if not norm:
+            return -1, "empty", 0.0
+        forms = name_forms(pd.Series([norm]))
+        for col, val, method in (("name_norm", norm, "exact"),
+                                 ("name_set", forms["name_set"].iat[0], "token_set"),
+                                 ("name_abbr", forms["name_abbr"].iat[0], "initial_last")):
+            keys = self._by[col].get(val, ())
+            if method == "initial_last" and len(norm.split(" ")[0]) > 1:
+                # a full first name only matches initial-only spellings ("Jon Allen" != "Josh Allen")
+                keys = tuple(k for k in keys if self._initial_only.get(k, False))
+            keys = self._narrow(keys, season, team)
+            if len(keys) == 1:
+                return int(keys[0]), method, 1.0
+            if len(keys) > 1:
+                return -1, f"ambiguous_{method}", 1.0
+        k, r = self._fuzzy(norm)
+        return (k, "fuzzy", r) if k >= 0 else (-1, "unresolved", r)
+
+    # -------- vectorized entry points --------
+
+    def resolve(self, names, season=None, team=None, create: bool = False) -> pd.Series:
+        """
+        player_key per row (Int64, <NA> when unresolved). Only unique (name, season, team)
+        combinations missing from the cache are resolved. With create=True unresolved names get
+        a new key (source_id empty), so downstream joins stay int-keyed.
+        """
+        names = pd.Series(names)
+        idx = names.index
+        norm = names.map(norm_name)
+        se = pd.to_numeric(pd.Series(season, index=idx) if season is not None else pd.Series(-1, index=idx),
+                           errors="coerce").fillna(-1).astype("int64")
+        tm = (pd.Series(team, index=idx) if team is not None else pd.Series("", index=idx)).astype("string").fillna("").str.upper()
+        combos = pd.MultiIndex.from_arrays([norm, se, tm])
+        codes, uniq = pd.factorize(combos)
+        keys = np.full(len(uniq), -1, dtype="int64")
+        for i, c in enumerate(uniq):
+            hit = self.cache.get(c)
+            if hit is None:
+                hit = self._decide(*c)
+                if hit[0] < 0 and create and c[0]:
+                    hit = (self._add(names[codes == i].iat[0], c[0]), "created", 0.0)
+                self.cache[c] = hit
+                self._new.append((*c, hit[0], hit[1], hit[2]))
+            keys[i] = hit[0]
+        out = pd.Series(keys[codes], index=idx)
+        return out.where(out >= 0).astype("Int64")
+
+    def keys_for_source(self, ids) -> pd.Series:
+        """Map stats player_id values to player_key (Int64)."""
+        s = pd.Series(ids)
+        return s.map(_sid).map(self._source).astype("Int64")
+
+    def canonical(self, keys) -> pd.Series:
+        """player_key values as stored earlier (e.g. on normalized props), with merged keys followed (Int64)."""
+        k = pd.to_numeric(pd.Series(keys), errors="coerce").astype("Int64")
+        return k.map(lambda v: self._merged.get(int(v), int(v)) if pd.notna(v) else pd.NA).astype("Int64")
+
+    def _add(self, display: str, norm: str) -> int:
+        key = int(self.dim["player_key"].max()) + 1 if not self.dim.empty else 1
+        forms = name_forms(pd.Series([norm]))
+        row = {"player_key": key, "source_id": "", "player_name": str(display), "name_norm": norm,
+               "name_set": forms["name_set"].iat[0], "name_abbr": forms["name_abbr"].iat[0], "merged_into": pd.NA}
+        self.dim = pd.concat([self.dim, pd.DataFrame([row])], ignore_index=True)
+        for col in ("name_norm", "name_set", "name_abbr"):
+            self._by[col][row[col]] = self._by[col].get(row[col], ()) + (key,)
+        self._initial_only[key] = len(norm.split(" ")[0]) == 1
+        self._block.setdefault(forms["last"].iat[0][:2], []).append((norm, key))
+        return key
+
+    def pending(self) -> pd.DataFrame:
+        """Decisions made since load (cache journal rows)."""
+        ts = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+        return pd.DataFrame([(*r, ts) for r in self._new], columns=CACHE_COLS)
+
+# -------------------- persistence --------------------
+
+def load_index(exp: Path | None = None) -> PlayerIndex:
+    exp = exp or exports_dir()
+    dim = pd.read_parquet(exp / DIM_FILE) if (exp / DIM_FILE).exists() else pd.DataFrame(columns=DIM_COLS)
+    hist = pd.read_parquet(exp / HIST_FILE) if (exp / HIST_FILE).exists() else pd.DataFrame(columns=HIST_COLS)
+    cp = exp / CACHE_FILE
+    cache = None
+    if cp.exists() and cp.stat().st_size > 0:
+        cache = pd.read_csv(cp, dtype={"name_norm": "string", "team": "string", "method": "string"}, keep_default_na=False)
+        cache["player_key"] = pd.to_numeric(cache["player_key"], errors="coerce")
+        cache = cache.drop_duplicates(["name_norm", "season", "team"], keep="last")
+    return PlayerIndex(dim, hist, cache)
+
+def save_index(index: PlayerIndex, exp: Path | None = None) -> int:
+    """Write the dimension and append new decisions to the cache journal. Returns decisions written."""
+    exp = exp or exports_dir()
+    index.dim[DIM_COLS].to_parquet(exp / DIM_FILE, index=False)
+    new = index.pending()
+    if not new.empty:
+        cp = exp / CACHE_FILE
+        new.to_csv(cp, mode="a", header=not cp.exists(), index=False, encoding="utf-8")
+        index._new.clear()
+    return len(new)
+
+def merge_created(dim: pd.DataFrame, hist: pd.DataFrame, cache: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame, dict]:
+    """
+    Re-resolve the cache rows whose key was created for an unknown name against the source-backed
+    players only. A created key that now resolves is merged: its dim row gets merged_into and every
+    cache row pointing at it is repointed. Returns (dim, cache, {orphan_key: player_key}).
+    """
+    dim = dim.copy(); cache = cache.copy()
+    cache["player_key"] = pd.to_numeric(cache["player_key"], errors="coerce")
+    orphans = set(dim.loc[dim["source_id"].astype(str).eq("") & dim["merged_into"].isna(), "player_key"].astype("int64"))
+    created = cache["method"].astype(str).eq("created") & cache["player_key"].isin(orphans)
+    if not created.any():
+        return dim, cache, {}
+    backed = PlayerIndex(dim[dim["source_id"].astype(str).ne("")], hist)
+    remap = {}
+    for i, n, se, t, k in cache.loc[created, ["name_norm", "season", "team", "player_key"]].itertuples(name=None):
+        nk, method, score = backed._decide(str(n), int(se), str(t))
+        if nk < 0:
+            continue
+        remap.setdefault(int(k), nk)
+        cache.loc[i, ["method", "score"]] = [method, score]
+    if remap:
+        cache["player_key"] = cache["player_key"].map(lambda v: remap.get(int(v), v) if pd.notna(v) else v)
+        hit = dim["player_key"].isin(list(remap))
+        dim.loc[hit, "merged_into"] = dim.loc[hit, "player_key"].map(remap).astype("Int64")
+    return dim, cache, remap
+
+def refresh_dim(stats: pd.DataFrame | None = None, exp: Path | None = None) -> PlayerIndex:
+    """Fold player_game_stats into the persisted dimension/history. Cached misses are dropped
+    (a player may now exist), created keys whose player now exists are merged into it
+    (merge_created); other resolved decisions are kept."""
+    exp = exp or exports_dir()
+    if stats is None:
+        stats = pd.read_parquet(exp / "player_game_stats.parquet")
+    old = load_index(exp)
+    dim, hist = build_dim(stats, old.dim)
+    cp = exp / CACHE_FILE
+    if cp.exists():
+        c = pd.read_csv(cp, keep_default_na=False)
+        c = c[pd.to_numeric(c["player_key"], errors="coerce").fillna(-1) >= 0]
+        dim, c, merged = merge_created(dim, hist, c)
+        if merged:
+            print(f"[players] merged {len(merged):,} created keys into players now in stats")
+        c.to_csv(cp, index=False, encoding="utf-8")
+    hist.to_parquet(exp / HIST_FILE, index=False)
+    dim.to_parquet(exp / DIM_FILE, index=False)
+    return load_index(exp)
+
+def main():
+    ap = argparse.ArgumentParser(description="Build the player dimension / resolve player names.")
+    ap.add_argument("--stats", default="", help="player_game_stats parquet (default: exports/player_game_stats.parquet)")
+    ap.add_argument("--resolve", nargs="*", default=[], help="names to resolve and print")
+    ap.add_argument("--season", type=int, default=None)
+    args = ap.parse_args()
+    exp = exports_dir()
+    if args.resolve:
+        idx = load_index(exp)
+        keys = idx.resolve(args.resolve, season=args.season)
+        dec = idx.pending()
+        save_index(idx, exp)
+        for n, k in zip(args.resolve, keys):
+            name = idx.dim.loc[idx.dim["player_key"].eq(k), "player_name"].iat[0] if pd.notna(k) else ""
+            print(f"{n!r:30} -> {k} {name}")
+        print(f"[players] {len(dec)} new decisions cached")
+        return
+    stats = pd.read_parquet(args.stats) if args.stats else None
+    idx = refresh_dim(stats, exp)
+    print(f"[players] dimension: {len(idx):,} players -> {exp / DIM_FILE}")
+
+if __name__ == "__main__":
+    main()
@@ -1,46 +1,27 @@
 import argparse
 import warnings
-import pandas as pd
-import joblib
+
+from tools.batch_infer import MODEL_FILE, add_cli_args, report, run
 
 warnings.filterwarnings("ignore", category=UserWarning)
 warnings.filterwarnings("ignore", category=FutureWarning)
 
-def _coerce_numeric_expected(pipe, df: pd.DataFrame) -> pd.DataFrame:
-    try:
-        pre = pipe.named_steps.get("pre") or pipe.named_steps.get("ct")
-    except Exception:
-        pre = None
-    num_cols = []
-    if pre is not None and hasattr(pre, "transformers_"):
-        for name, trans, cols in pre.transformers_:
-            if name in ("num", "numeric", "num_pipe"):
-                num_cols = list(cols)
-                break
-    for c in num_cols:
-        if c in df.columns:
-            df[c] = pd.to_numeric(df[c], errors="coerce")
-    return df
-
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--edges", required=True)
     ap.add_argument("--model-dir", required=True)
-    ap.add_argument("--model-file", default="parlay_model.joblib")
-    ap.add_argument("--out", required=True)
+    ap.add_argument("--model-file", default=MODEL_FILE)
+    ap.add_argument("--out", required=True, help=".csv or .parquet")
+    ap.add_argument("--keep", default="", help="comma list of input columns to carry into --out (default: all)")
+    add_cli_args(ap)
     args = ap.parse_args()
 
-    df = pd.read_csv(args.edges, low_memory=False)
-    df.columns = [c.strip().lower() for c in df.columns]
-
-    model_path = f"{args.model_dir.rstrip('/\\')}/{args.model_file}"
-    pipe = joblib.load(model_path)
-
-    df = _coerce_numeric_expected(pipe, df)
-    df["parlay_proba"] = pipe.predict_proba(df)[:, 1]
-
-    df.to_csv(args.out, index=False)
-    print(f"[predict_parlay_score] wrote {args.out} with {len(df):,} rows and column 'parlay_proba'")
+    # streamed in chunks: the candidate file never has to fit in memory
+    keep = [c.strip() for c in args.keep.split(",") if c.strip()] or None
+    stats = run(args.edges, args.model_dir, args.out, args.model_file,
+                chunk_size=args.chunk_size, workers=args.workers, keep=keep, verbose=False)
+    report(stats, "predict_parlay_score")
+    print(f"[predict_parlay_score] wrote {args.out} with {stats['rows']:,} rows and column 'parlay_proba'")
 
 if __name__ == "__main__":
     main()
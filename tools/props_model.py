@@ -0,0 +1,235 @@
+# tools/props_model.py
+# Player prop distributions from exports/player_game_stats.parquet, priced for any line.
+#
+# Per (player, stat) the model stores a few distribution parameters:
+#   count stats (receptions, attempts, completions, TDs, INTs)   negative binomial (mean, r)
+#   yardage (pass / rush / rec yards)                             mixture: point mass at <= 0 (pi0)
+#                                                                 + gamma on positive games (alpha)
+# The player mean is a recency-weighted average shrunk toward its group prior with Bühlmann
+# credibility (k = within-player variance / between-player variance), so a 3-game rookie sits
+# near the group and a 60-game starter near his own history. Groups are `position` when the stats
+# carry one, else role x usage tier (e.g. receiver_t3 = top third of receivers by targets/game);
+# dispersion (r) and shape (pi0, alpha) are fitted per group.
+#
+# Pricing is vectorized: a frame of (player_id, stat or market, line) rows -> P(over/under/push)
+# from NB (regularized incomplete beta) or mixture (regularized incomplete gamma) CDFs in one call,
+# so every alt line of a slate scores at once.
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+# stat -> (family, role in player_game_stats, usage column that sets the tier)
+STATS = {
+    "pass_attempts": ("nb", "qb", "pass_attempts"),
+    "completions":   ("nb", "qb", "pass_attempts"),
+    "pass_yards":    ("mix", "qb", "pass_attempts"),
+    "pass_tds":      ("nb", "qb", "pass_attempts"),
+    "interceptions": ("nb", "qb", "pass_attempts"),
+    "targets":       ("nb", "receiver", "targets"),
+    "receptions":    ("nb", "receiver", "targets"),
+    "rec_yards":     ("mix", "receiver", "targets"),
+    "rec_tds":       ("nb", "receiver", "targets"),
+    "rush_att":      ("nb", "rusher", "rush_att"),
+    "rush_yards":    ("mix", "rusher", "rush_att"),
+    "rush_tds":      ("nb", "rusher", "rush_att"),
+}
+
+# odds-feed market keys (see settle_player_props) -> stat
+MARKET_STAT = {
+    "player_pass_yds": "pass_yards", "player_pass_att": "pass_attempts", "player_pass_attempts": "pass_attempts",
+    "player_pass_completions": "completions", "player_pass_tds": "pass_tds", "player_pass_interceptions": "interceptions",
+    "player_rec": "receptions", "player_receptions": "receptions", "player_rec_yds": "rec_yards",
+    "player_reception_yds": "rec_yards", "player_rush_att": "rush_att", "player_rush_attempts": "rush_att",
+    "player_rush_yds": "rush_yards",
+}
+
+PARAM_COLS = ["stat", "player_id", "player_name", "group", "family", "n_games", "n_eff", "mean", "r", "pi0", "alpha",
+              "last_season", "last_week"]
+PRIOR_COLS = ["stat", "group", "family", "mean", "r", "pi0", "alpha", "k", "players"]
+R_MAX = 1e4       # NB dispersion cap (~Poisson)
+
+# -------------------- fit --------------------
+
+def _recency(df: pd.DataFrame, half_life: float) -> np.ndarray:
+    """Weight 1 for a player's latest game, halving every `half_life` games back."""
+    back = df.groupby("player_id").cumcount(ascending=False).to_numpy()
+    return 0.5 ** (back / half_life) if half_life > 0 else np.ones(len(df))
+
+def _groups(players: pd.DataFrame, role: str, tiers: int) -> pd.Series:
+    if "position" in players.columns and players["position"].notna().any():
+        return players["position"].astype("string").fillna(role)
+    if tiers <= 1 or len(players) < tiers:
+        return pd.Series(f"{role}_t1", index=players.index)
+    # tiers by usage, ranked among players with a few games so one big game does not decide it
+    u = players["usage"].where(players["n_games"] >= 3)
+    q = u.rank(pct=True)
+    t = np.ceil(q * tiers).clip(1, tiers).fillna(1).astype(int)
+    return role + "_t" + t.astype(str)
+
+def fit_stat(df: pd.DataFrame, stat: str, half_life: float = 16.0, tiers: int = 3) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """(player params, group priors) for one stat from that role's game rows."""
+    family, role, usage_col = STATS[stat]
+    d = df[(df["role"] == role) & df[stat].notna() & df["player_id"].notna()]
+    if d.empty:
+        return pd.DataFrame(columns=PARAM_COLS), pd.DataFrame(columns=PRIOR_COLS)
+    d = d.sort_values(["player_id", "season", "week"], kind="stable")
+    x = d[stat].to_numpy(dtype="float64")
+    w = _recency(d, half_life)
+    pid = d["player_id"].to_numpy()
+
+    g = pd.DataFrame({"player_id": pid, "w": w, "wx": w * x, "wxx": w * x * x, "one": 1.0,
+                      "u": d[usage_col].to_numpy(dtype="float64"), "zero": (x <= 0).astype("float64")})
+    agg = g.groupby("player_id", sort=False).agg(n_eff=("w", "sum"), sx=("wx", "sum"), sxx=("wxx", "sum"),
+                                                 n_games=("one", "sum"), usage=("u", "mean"))
+    agg["xbar"] = agg["sx"] / agg["n_eff"]
+    agg["s2"] = np.maximum(agg["sxx"] / agg["n_eff"] - agg["xbar"] ** 2, 0.0)
+    last = d.groupby("player_id", sort=False).tail(1).set_index("player_id")
+    agg["player_name"] = last["player_name"] if "player_name" in last.columns else pd.NA
+    agg["last_season"], agg["last_week"] = last["season"], last["week"]
+    if "position" in d.columns:
+        agg["position"] = last["position"]
+    agg["group"] = _groups(agg, role, tiers)
+
+    params, priors = [], []
+    for grp, a in agg.groupby("group", sort=True):
+        n = a["n_eff"].to_numpy()
+        prior = float(np.average(a["xbar"], weights=n))
+        epv = float(np.average(a["s2"], weights=n)) * (n.sum() / max(n.sum() - len(a), 1.0))
+        vhm = float(np.average((a["xbar"] - prior) ** 2, weights=n)) - epv * len(a) / n.sum()
+        k = epv / vhm if vhm > 1e-9 else 1e6
+        mean = (n * a["xbar"].to_numpy() + k * prior) / (n + k)
+
+        gx = x[np.isin(pid, a.index.to_numpy())]
+        p = pd.DataFrame({"stat": stat, "player_id": a.index, "player_name": a["player_name"].to_numpy(), "group": grp,
+                          "family": family, "n_games": a["n_games"].to_numpy().astype(int), "n_eff": n, "mean": mean,
+                          "last_season": a["last_season"].to_numpy(), "last_week": a["last_week"].to_numpy()})
+        pr = {"stat": stat, "group": grp, "family": family, "mean": prior, "k": k, "players": len(a),
+              "r": np.nan, "pi0": np.nan, "alpha": np.nan}
+        if family == "nb":
+            # var = mu + mu^2 / r over games, pooled in the group
+            m2 = float(np.average(a["xbar"] ** 2, weights=n))
+            excess = epv - prior
+            pr["r"] = float(np.clip(m2 / excess, 0.5, R_MAX)) if excess > 1e-9 else R_MAX
+        else:
+            pos = gx > 0
+            pr["pi0"] = float(np.clip(1.0 - pos.mean(), 0.0, 0.9))
+            # shape of positive games relative to the player's own positive mean
+            gp = pd.DataFrame({"pid": pid[np.isin(pid, a.index.to_numpy())][pos], "x": gx[pos]})
+            z = gp["x"] / gp.groupby("pid")["x"].transform("mean")
+            cnt = gp.groupby("pid")["x"].transform("size")
+            z = z[cnt >= 3]
+            pr["alpha"] = float(np.clip(1.0 / z.var(), 0.5, 100.0)) if len(z) > 10 and z.var() > 0 else 2.0
+        p["r"], p["pi0"], p["alpha"] = pr["r"], pr["pi0"], pr["alpha"]
+        params.append(p)
+        priors.append(pr)
+    return pd.concat(params, ignore_index=True)[PARAM_COLS], pd.DataFrame(priors)[PRIOR_COLS]
+
+def fit(stats: pd.DataFrame, half_life: float = 16.0, tiers: int = 3, stats_list=None) -> "PropsModel":
+    stats = stats.copy()
+    stats.columns = [str(c).lower() for c in stats.columns]
+    for c in ("season", "week"):
+        stats[c] = pd.to_numeric(stats[c], errors="coerce")
+    params, priors = [], []
+    for s in stats_list or STATS:
+        if s not in stats.columns:
+            continue
+        p, pr = fit_stat(stats, s, half_life, tiers)
+        params.append(p); priors.append(pr)
+    params = pd.concat(params, ignore_index=True) if params else pd.DataFrame(columns=PARAM_COLS)
+    priors = pd.concat(priors, ignore_index=True) if priors else pd.DataFrame(columns=PRIOR_COLS)
+    return PropsModel(params, priors, {"half_life": half_life, "tiers": tiers})
+
+# -------------------- CDFs --------------------
+
+def cdf_le(family: np.ndarray, mean: np.ndarray, r: np.ndarray, pi0: np.ndarray, alpha: np.ndarray,
+           y: np.ndarray) -> np.ndarray:
+    """P(X <= floor(y)) for each row; NB exactly, yardage with a continuity correction at +0.5."""
+    from scipy.special import betainc, gammainc
+    y = np.floor(np.asarray(y, dtype="float64"))
+    mean = np.maximum(np.asarray(mean, dtype="float64"), 1e-9)
+    out = np.full(len(y), np.nan)
+    nb = family == "nb"
+    if nb.any():
+        rr = r[nb]
+        k = y[nb]
+        out[nb] = np.where(k < 0, 0.0, betainc(rr, np.maximum(k, 0) + 1.0, rr / (rr + mean[nb])))
+    mx = ~nb
+    if mx.any():
+        p0, a = pi0[mx], alpha[mx]
+        m_pos = mean[mx] / np.maximum(1.0 - p0, 1e-9)
+        yy = y[mx] + 0.5
+        out[mx] = np.where(yy < 0, 0.0, p0 + (1.0 - p0) * gammainc(a, np.maximum(yy, 0) * a / m_pos))
+    return out
+
+# -------------------- model --------------------
+
+class PropsModel:
+    """Player params + group priors; pickled whole into the model registry as "props"."""
+    def __init__(self, params: pd.DataFrame, priors: pd.DataFrame, settings: dict | None = None):
+        self.params = params.reset_index(drop=True)
+        self.priors = priors.reset_index(drop=True)
+        self.settings = settings or {}
+        self._index = None
+
+    def _lookup(self) -> pd.DataFrame:
+        if self._index is None:
+            p = self.params.assign(_pid=self.params["player_id"].astype("string"))
+            self._index = p.drop_duplicates(["stat", "_pid"], keep="last").set_index(["stat", "_pid"])
+        return self._index
+
+    def resolve(self, props: pd.DataFrame) -> pd.DataFrame:
+        """Distribution parameters for each row of `props` (stat or market, player_id[, group])."""
+        stat = props["stat"] if "stat" in props.columns else \
+            props["market"].astype("string").str.lower().str.split(":", n=1).str[0].map(MARKET_STAT)
+        stat = stat.astype("string").reset_index(drop=True)
+        pid = props["player_id"].astype("string").reset_index(drop=True) if "player_id" in props.columns \
+            else pd.Series(pd.NA, index=stat.index, dtype="string")
+        key = pd.MultiIndex.from_arrays([stat.fillna(""), pid.fillna("")])
+        cols = ["group", "family", "mean", "r", "pi0", "alpha", "n_games"]
+        got = self._lookup()[cols].reindex(key).reset_index(drop=True)
+        got.insert(0, "stat", stat)
+        # players without history: their group's prior (given group, else the stat's middle tier)
+        miss = got["family"].isna() & stat.notna()
+        if miss.any():
+            want_group = props["group"].reset_index(drop=True)[miss] if "group" in props.columns else None
+            pri = self.priors.copy()
+            tier_mid = pri.groupby("stat")["group"].agg(lambda g: sorted(g)[len(g) // 2])
+            grp = want_group if want_group is not None else stat[miss].map(tier_mid)
+            fill = pri.set_index(["stat", "group"])[["family", "mean", "r", "pi0", "alpha"]] \
+                .reindex(pd.MultiIndex.from_arrays([stat[miss], grp.astype("string")]))
+            got.loc[miss, ["family", "mean", "r", "pi0", "alpha"]] = fill.to_numpy()
+            got.loc[miss, "group"] = grp.to_numpy()
+            got.loc[miss, "n_games"] = 0
+        return got
+
+    def price(self, props: pd.DataFrame, line_col: str = "line") -> pd.DataFrame:
+        """
+        P(over / under / push) for every row of `props` at its line, plus the model mean and a fair
+        over price. Rows whose player / stat cannot be resolved come back NaN.
+        """
+        d = self.resolve(props)
+        line = pd.to_numeric(props[line_col], errors="coerce").to_numpy(dtype="float64")
+        ok = d["family"].notna().to_numpy() & ~np.isnan(line)
+        fam = d["family"].astype("string").fillna("").to_numpy()
+        args = [d[c].to_numpy(dtype="float64", na_value=np.nan) for c in ("mean", "r", "pi0", "alpha")]
+        p_le = np.full(len(d), np.nan)
+        p_lt = np.full(len(d), np.nan)
+        if ok.any():
+            sub = [a[ok] for a in args]
+            p_le[ok] = cdf_le(fam[ok], *sub, line[ok])
+            p_lt[ok] = cdf_le(fam[ok], *sub, np.ceil(line[ok]) - 1)
+        out = pd.DataFrame({"stat": d["stat"], "group": d["group"], "model_mean": args[0], "n_games": d["n_games"]})
+        out["p_under"] = p_lt
+        out["p_push"] = p_le - p_lt
+        out["p_over"] = 1.0 - p_le
+        po = out["p_over"] / (1.0 - out["p_push"])
+        out["fair_over_american"] = np.where(po >= 0.5, -100 * po / (1 - po), 100 * (1 - po) / po)
+        out.index = props.index
+        return out
+
+    def ladder(self, player_id, stat: str, lines) -> pd.DataFrame:
+        """Alt-line ladder for one player / stat."""
+        lines = np.asarray(list(lines), dtype="float64")
+        q = pd.DataFrame({"player_id": [player_id] * len(lines), "stat": stat, "line": lines})
+        return pd.concat([q[["line"]], self.price(q)[["p_over", "p_push", "p_under", "fair_over_american"]]], axis=1)
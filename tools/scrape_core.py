@@ -0,0 +1,527 @@
+# tools/scrape_core.py
+# Shared scraping framework: raw-page cache, polite parallel fetch, parallel parse.
+#
+# 1) PageCache stores every fetched page once, gzip-compressed and content-addressed
+#    (<root>/blobs/ab/<sha256>.html.gz). An append-only index (index.jsonl) maps url -> sha, so a
+#    re-fetched page with unchanged content costs no extra disk and a parse bug never forces a
+#    re-download.
+# 2) fetch_all() runs fetches on a bounded thread pool. Each host has its own throttle (minimum gap
+#    between requests, one in flight at a time), so many hosts go in parallel while a single host
+#    is still hit politely. 403/429/5xx and connection errors / timeouts are retried with backoff
+#    (Retry-After is honoured).
+# 3) parse_cached() reads pages straight from the cache and runs a module-level parser
+#    `parser(url, html) -> DataFrame | list[dict]` in worker processes.
+# 4) Fixtures: export_fixtures() copies cached pages to a folder with a manifest; serve_fixtures()
+#    serves that folder on localhost, and `bench` fetches + parses everything through the same
+#    code paths for offline re-parses and throughput numbers. A fixture page is a cache blob
+#    (.html.gz) or a plain saved .html; tools/fixtures/<site>/ holds saved pages per scraper with
+#    the rows they must parse to (expected.csv), and `check` re-parses them offline against it.
+#
+# CLI:
+#   python -m tools.scrape_core stats
+#   python -m tools.scrape_core export-fixtures --out tools/fixtures/pfr --match pro-football-reference
+#   python -m tools.scrape_core serve --fixtures tools/fixtures/footballlocks --port 8765
+#   python -m tools.scrape_core bench --fixtures tools/fixtures/footballlocks --parser tools.scrape_footballlocks:parse_page
+#   python -m tools.scrape_core check --fixtures tools/fixtures/footballlocks --parser tools.scrape_footballlocks:parse_page
+#   (check --update rewrites expected.csv after an intended parser change)
+from __future__ import annotations
+
+import argparse
+import gzip
+import hashlib
+import importlib
+import io
+import json
+import random
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, Iterable
+from urllib.parse import quote, unquote, urlsplit
+
+import pandas as pd
+
+from tools.pathing import exports_dir
+
+UA = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+      "(KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36")
+DEFAULT_HEADERS = {
+    "User-Agent": UA,
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.9",
+    "Referer": "https://www.google.com/",
+    "Cache-Control": "no-cache",
+}
+RETRY_STATUS = (403, 429, 500, 502, 503, 504)
+
+# -------------------- cache --------------------
+
+def default_cache_dir() -> Path:
+    return exports_dir() / "raw_pages"
+
+class PageCache:
+    """Compressed content-addressed page store with a url -> sha index."""
+
+    def __init__(self, root: Path | str | None = None):
+        self.root = Path(root) if root else default_cache_dir()
+        (self.root / "blobs").mkdir(parents=True, exist_ok=True)
+        self.index_path = self.root / "index.jsonl"
+        self._lock = threading.Lock()
+        self._index: dict[str, dict] = {}
+        if self.index_path.exists():
+            with open(self.index_path, encoding="utf-8") as f:
+                for ln in f:
+                    ln = ln.strip()
+                    if ln:
+                        rec = json.loads(ln)
+                        self._index[rec["url"]] = rec  # last record per url wins
+
+    def __contains__(self, url: str) -> bool:
+        return url in self._index
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def urls(self) -> list[str]:
+        return list(self._index)
+
+    def blob_path(self, sha: str) -> Path:
+        return self.root / "blobs" / sha[:2] / f"{sha}.html.gz"
+
+    def sha(self, url: str) -> str | None:
+        rec = self._index.get(url)
+        return rec["sha"] if rec else None
+
+    def put(self, url: str, html: str, status: int = 200) -> str:
+        raw = html.encode("utf-8")
+        sha = hashlib.sha256(raw).hexdigest()
+        path = self.blob_path(sha)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(f".tmp{threading.get_ident()}")
+            with gzip.open(tmp, "wb", compresslevel=6) as f:
+                f.write(raw)
+            tmp.replace(path)
+        rec = {"url": url, "sha": sha, "status": int(status), "bytes": len(raw),
+               "fetched_ts": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")}
+        with self._lock:
+            self._index[url] = rec
+            with open(self.index_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(rec) + "\n")
+        return sha
+
+    def get(self, url: str) -> str | None:
+        sha = self.sha(url)
+        return read_blob(self.blob_path(sha)) if sha else None
+
+    def relabel(self, old: str, new: str) -> None:
+        """Point `new` at the page cached under `old` (in memory; used for fixture urls)."""
+        with self._lock:
+            rec = dict(self._index.pop(old), url=new)
+            self._index[new] = rec
+
+    def compact_index(self) -> int:
+        """Rewrite index.jsonl to one record per url."""
+        with self._lock:
+            tmp = self.index_path.with_suffix(".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                for rec in self._index.values():
+                    f.write(json.dumps(rec) + "\n")
+            tmp.replace(self.index_path)
+        return len(self._index)
+
+    def stats(self) -> dict:
+        blobs = list((self.root / "blobs").glob("*/*.html.gz"))
+        raw = sum(r["bytes"] for r in self._index.values())
+        disk = sum(p.stat().st_size for p in blobs)
+        hosts = pd.Series([urlsplit(u).netloc for u in self._index], dtype="string").value_counts()
+        return {"urls": len(self._index), "blobs": len(blobs), "raw_bytes": raw,
+                "disk_bytes": disk, "hosts": hosts.to_dict()}
+
+def read_blob(path: Path | str) -> str:
+    """Page text from a cache blob (.gz) or a plain saved page (committed fixtures)."""
+    if not str(path).endswith(".gz"):
+        return Path(path).read_text(encoding="utf-8", errors="replace")
+    with gzip.open(path, "rb") as f:
+        return f.read().decode("utf-8", errors="replace")
+
+# -------------------- fetch --------------------
+
+class HostThrottle:
+    """Per-host politeness: one request in flight per host and a minimum gap between starts."""
+
+    def __init__(self, delay: float = 1.0, jitter: float = 0.5):
+        self.delay = float(delay)
+        self.jitter = float(jitter)
+        self._guard = threading.Lock()
+        self._locks: dict[str, threading.Lock] = {}
+        self._next: dict[str, float] = {}
+
+    def _lock(self, host: str) -> threading.Lock:
+        with self._guard:
+            return self._locks.setdefault(host, threading.Lock())
+
+    def run(self, host: str, fn: Callable[[], object]):
+        with self._lock(host):
+            wait = self._next.get(host, 0.0) - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            try:
+                return fn()
+            finally:
+                self._next[host] = time.monotonic() + self.delay + random.random() * self.jitter
+
+    def penalize(self, host: str, seconds: float) -> None:
+        """Push the host's next slot out (after 429 / Retry-After)."""
+        self._next[host] = max(self._next.get(host, 0.0), time.monotonic() + seconds)
+
+def _backoff(attempt: int) -> float:
+    return 1.25 + attempt * 0.75 + random.random()
+
+_local = threading.local()
+
+def _session(headers: dict | None):
+    import requests
+    ses = getattr(_local, "session", None)
+    if ses is None:
+        ses = _local.session = requests.Session()
+        ses.headers.update(DEFAULT_HEADERS)
+    if headers:
+        ses.headers.update(headers)
+    return ses
+
+def fetch_one(
+    url: str,
+    throttle: HostThrottle,
+    tries: int = 5,
+    timeout: float = 30.0,
+    headers: dict | None = None,
+    validate: Callable[[str], bool] | None = None,
+) -> tuple[int, str]:
+    """
+    GET through the host throttle with retries. Returns (status, text); raises on final failure.
+    RETRY_STATUS responses and transient network errors (connection reset / refused, timeouts)
+    are retried with backoff; the last network error is re-raised once `tries` run out.
+    """
+    import requests
+    host = urlsplit(url).netloc
+    ses = _session(headers)
+    last = None
+    for i in range(tries):
+        try:
+            r = throttle.run(host, lambda: ses.get(url, timeout=timeout))
+        except (requests.ConnectionError, requests.Timeout) as e:
+            last = e
+            throttle.penalize(host, _backoff(i))
+            continue
+        last = r
+        if r.status_code == 200:
+            if validate is not None and not validate(r.text):
+                raise ValueError(f"unexpected page content for {url}")
+            return r.status_code, r.text
+        if r.status_code in RETRY_STATUS:
+            ra = r.headers.get("Retry-After", "")
+            throttle.penalize(host, float(ra) if ra.isdigit() else _backoff(i))
+            continue
+        r.raise_for_status()
+    if isinstance(last, Exception):
+        raise last
+    raise requests.HTTPError(f"{last.status_code} fetching {url}")
+
+def fetch_all(
+    urls: Iterable[str],
+    cache: PageCache | None = None,
+    workers: int = 8,
+    per_host_delay: float = 1.0,
+    refresh: bool = False,
+    tries: int = 5,
+    headers: dict | None = None,
+    validate: Callable[[str], bool] | None = None,
+    verbose: bool = True,
+) -> dict[str, str]:
+    """
+    Fetch every url not yet cached (all of them with refresh=True) into the cache.
+    Returns {url: error message} for the pages that could not be fetched.
+    """
+    cache = cache if cache is not None else PageCache()
+    todo = [u for u in dict.fromkeys(urls) if refresh or u not in cache]
+    if not todo:
+        return {}
+    throttle = HostThrottle(delay=per_host_delay, jitter=min(0.5, per_host_delay))
+    errors: dict[str, str] = {}
+    t0 = time.perf_counter()
+
+    def _job(u: str):
+        try:
+            status, text = fetch_one(u, throttle, tries=tries, headers=headers, validate=validate)
+            cache.put(u, text, status)
+            if verbose:
+                print(f"[fetch] {u} ({len(text):,} bytes)")
+        except Exception as e:
+            errors[u] = str(e)
+            if verbose:
+                print(f"[fetch] {u} -> {e}")
+
+    with ThreadPoolExecutor(max_workers=max(1, int(workers))) as ex:
+        list(ex.map(_job, todo))
+    if verbose:
+        dt = time.perf_counter() - t0
+        print(f"[fetch] {len(todo) - len(errors)}/{len(todo)} pages in {dt:.1f}s")
+    return errors
+
+# -------------------- parse --------------------
+
+def _rows_frame(out) -> pd.DataFrame:
+    if out is None:
+        return pd.DataFrame()
+    return out if isinstance(out, pd.DataFrame) else pd.DataFrame(list(out))
+
+def _parse_job(parser: Callable, url: str, blob: str) -> tuple[str, pd.DataFrame, str]:
+    try:
+        return url, _rows_frame(parser(url, read_blob(blob))), ""
+    except Exception as e:
+        return url, pd.DataFrame(), f"{type(e).__name__}: {e}"
+
+def parse_cached(
+    urls: Iterable[str],
+    parser: Callable[[str, str], object],
+    cache: PageCache | None = None,
+    processes: int = 0,
+    verbose: bool = True,
+) -> pd.DataFrame:
+    """
+    Run `parser(url, html)` over the cached pages of `urls` (input order is kept) and concatenate.
+    `parser` must be a module-level function so it can be sent to worker processes.
+    processes=0 uses one per CPU; processes=1 parses in-process.
+    """
+    cache = cache if cache is not None else PageCache()
+    jobs = [(u, str(cache.blob_path(cache.sha(u)))) for u in dict.fromkeys(urls) if u in cache]
+    if not jobs:
+        return pd.DataFrame()
+    t0 = time.perf_counter()
+    if processes == 1 or len(jobs) == 1:
+        results = [_parse_job(parser, u, b) for u, b in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=processes or None) as ex:
+            results = list(ex.map(_parse_job, [parser] * len(jobs), *zip(*jobs)))
+    frames = []
+    for url, df, err in results:
+        if verbose:
+            print(f"[parse] {url} -> {err}" if err else f"[parse] {url} rows={len(df)}")
+        if not df.empty:
+            frames.append(df)
+    out = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+    if verbose:
+        dt = time.perf_counter() - t0
+        print(f"[parse] {len(jobs)} pages -> {len(out):,} rows in {dt:.2f}s")
+    return out
+
+def scrape(
+    urls: Iterable[str],
+    parser: Callable[[str, str], object],
+    cache: PageCache | None = None,
+    offline: bool = False,
+    workers: int = 8,
+    per_host_delay: float = 1.0,
+    processes: int = 0,
+    refresh: bool = False,
+    **fetch_kw,
+) -> pd.DataFrame:
+    """fetch_all (unless offline) followed by parse_cached over the same urls."""
+    urls = list(dict.fromkeys(urls))
+    cache = cache if cache is not None else PageCache()
+    if not offline:
+        fetch_all(urls, cache, workers=workers, per_host_delay=per_host_delay, refresh=refresh, **fetch_kw)
+    return parse_cached(urls, parser, cache, processes=processes)
+
+def add_cli_args(ap: argparse.ArgumentParser) -> None:
+    """Common scraper flags (used by the tools/scrape_* entry points)."""
+    ap.add_argument("--offline", action="store_true", help="parse cached pages only, no network")
+    ap.add_argument("--refresh", action="store_true", help="re-download pages that are already cached")
+    ap.add_argument("--workers", type=int, default=8, help="fetch threads (all hosts)")
+    ap.add_argument("--delay", type=float, default=1.0, help="minimum seconds between requests to one host")
+    ap.add_argument("--processes", type=int, default=0, help="parse processes (0 = one per CPU)")
+    ap.add_argument("--cache-dir", default="", help="raw page cache (default: exports/raw_pages)")
+
+def scrape_from_args(args, urls: Iterable[str], parser: Callable, **fetch_kw) -> pd.DataFrame:
+    cache = PageCache(args.cache_dir or None)
+    return scrape(urls, parser, cache, offline=args.offline, workers=args.workers,
+                  per_host_delay=args.delay, processes=args.processes, refresh=args.refresh, **fetch_kw)
+
+# -------------------- fixtures --------------------
+
+MANIFEST = "manifest.json"
+
+def export_fixtures(cache: PageCache, dest: Path | str, match: str = "") -> int:
+    """Copy cached pages (optionally only urls containing `match`) to dest with a url manifest."""
+    dest = Path(dest); dest.mkdir(parents=True, exist_ok=True)
+    manifest = {}
+    for u in cache.urls():
+        if match and match not in u:
+            continue
+        sha = cache.sha(u)
+        name = f"{sha}.html.gz"
+        if not (dest / name).exists():
+            shutil.copyfile(cache.blob_path(sha), dest / name)
+        manifest[u] = name
+    (dest / MANIFEST).write_text(json.dumps(manifest, indent=1), encoding="utf-8")
+    return len(manifest)
+
+def fixture_url(base: str, url: str) -> str:
+    """Address of a real url on the fixture server."""
+    return f"{base.rstrip('/')}/page/{quote(url, safe='')}"
+
+def serve_fixtures(fixtures: Path | str, host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+    """Serve a fixture folder on localhost (in a daemon thread). port=0 picks a free port."""
+    root = Path(fixtures)
+    manifest = json.loads((root / MANIFEST).read_text(encoding="utf-8"))
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            name = manifest.get(unquote(self.path[len("/page/"):])) if self.path.startswith("/page/") else None
+            if name is None:
+                self.send_error(404); return
+            body = read_blob(root / name).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *a):
+            pass
+
+    srv = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv
+
+def _load_parser(ref: str) -> Callable:
+    mod, _, fn = ref.partition(":")
+    return getattr(importlib.import_module(mod), fn or "parse_page")
+
+EXPECTED = "expected.csv"
+
+def _as_text(df: pd.DataFrame) -> pd.DataFrame:
+    """Frame as it reads back from CSV, every cell a string (how check compares rows)."""
+    return pd.read_csv(io.StringIO(df.to_csv(index=False)), dtype=str, keep_default_na=False)
+
+def check(fixtures: Path | str, parser_ref: str, update: bool = False) -> dict:
+    """
+    Parse a fixture folder in-process, with no server or network, and compare the rows to its
+    expected.csv (update=True rewrites expected.csv instead). The parser sees the original urls.
+    """
+    root = Path(fixtures)
+    manifest = json.loads((root / MANIFEST).read_text(encoding="utf-8"))
+    parser = _load_parser(parser_ref)
+    results = [_parse_job(parser, url, str(root / name)) for url, name in manifest.items()]
+    errors = {url: err for url, _, err in results if err}
+    frames = [df for _, df, _ in results if not df.empty]
+    got = _as_text(pd.concat(frames, ignore_index=True) if frames else pd.DataFrame())
+    exp_path = root / EXPECTED
+    if update:
+        if errors:
+            return {"pages": len(manifest), "ok": False, "errors": errors}
+        got.to_csv(exp_path, index=False)
+        return {"pages": len(manifest), "rows": len(got), "updated": str(exp_path)}
+    diff = _diff(got, exp_path)
+    return {"pages": len(manifest), "rows": len(got), "ok": not errors and not diff, "errors": errors, "diff": diff}
+
+def _diff(got: pd.DataFrame, exp_path: Path) -> list[str]:
+    exp = pd.read_csv(exp_path, dtype=str, keep_default_na=False)
+    if list(got.columns) != list(exp.columns):
+        return [f"columns {list(got.columns)} != expected {list(exp.columns)}"]
+    if len(got) != len(exp):
+        return [f"{len(got)} rows != expected {len(exp)}"]
+    bad = (got != exp).any(axis=1)
+    return [f"row {i}: {got.loc[i].to_dict()} != expected {exp.loc[i].to_dict()}" for i in bad[bad].index[:10]]
+
+def bench(fixtures: Path | str, parser_ref: str, workers: int = 8, processes: int = 0, repeat: int = 1) -> dict:
+    """
+    Fetch every fixture from a local server into a scratch cache, then parse it `repeat` times.
+    The parser sees the original urls, so url-derived fields (season, week) parse as in production.
+    """
+    root = Path(fixtures)
+    manifest = json.loads((root / MANIFEST).read_text(encoding="utf-8"))
+    parser = _load_parser(parser_ref)
+    srv = serve_fixtures(root)
+    base = f"http://127.0.0.1:{srv.server_address[1]}"
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = PageCache(tmp)
+        t0 = time.perf_counter()
+        local = {fixture_url(base, u): u for u in manifest}
+        errors = fetch_all(local, cache, workers=workers, per_host_delay=0.0, tries=1, verbose=False)
+        for lu, u in local.items():
+            if lu not in errors:
+                cache.relabel(lu, u)
+        t_fetch = time.perf_counter() - t0
+        t1 = time.perf_counter()
+        for _ in range(max(1, repeat)):
+            out = parse_cached(manifest, parser, cache, processes=processes, verbose=False)
+        t_parse = (time.perf_counter() - t1) / max(1, repeat)
+    srv.shutdown()
+    n = len(manifest)
+    return {"pages": n, "fetch_errors": len(errors), "rows": len(out),
+            "fetch_s": round(t_fetch, 3), "fetch_pages_per_s": round(n / t_fetch, 1) if t_fetch else None,
+            "parse_s": round(t_parse, 3), "parse_pages_per_s": round(n / t_parse, 1) if t_parse else None,
+            "rows_per_s": round(len(out) / t_parse, 1) if t_parse else None}
+
+# -------------------- CLI --------------------
+
+def main():
+    ap = argparse.ArgumentParser(description="Raw page cache, fixtures and scraper benchmarks.")
+    ap.add_argument("--cache-dir", default="", help="raw page cache (default: exports/raw_pages)")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("stats", help="cache size and hosts")
+    sub.add_parser("compact", help="rewrite the url index to one record per url")
+    ex = sub.add_parser("export-fixtures", help="copy cached pages to a fixture folder")
+    ex.add_argument("--out", required=True)
+    ex.add_argument("--match", default="", help="only urls containing this text")
+    sv = sub.add_parser("serve", help="serve a fixture folder on localhost")
+    sv.add_argument("--fixtures", required=True)
+    sv.add_argument("--port", type=int, default=8765)
+    bn = sub.add_parser("bench", help="fetch + parse a fixture folder through a local server")
+    bn.add_argument("--fixtures", required=True)
+    bn.add_argument("--parser", required=True, help="module:function, e.g. tools.scrape_pfr_scores:parse_page")
+    bn.add_argument("--workers", type=int, default=8)
+    bn.add_argument("--processes", type=int, default=0)
+    bn.add_argument("--repeat", type=int, default=1)
+    ck = sub.add_parser("check", help="re-parse a fixture folder offline and compare to its expected.csv")
+    ck.add_argument("--fixtures", required=True)
+    ck.add_argument("--parser", required=True, help="module:function, e.g. tools.scrape_footballlocks:parse_page")
+    ck.add_argument("--update", action="store_true", help="rewrite expected.csv from the current parser")
+    args = ap.parse_args()
+
+    if args.cmd == "serve":
+        srv = serve_fixtures(args.fixtures, port=args.port)
+        print(f"[fixtures] serving {args.fixtures} on http://127.0.0.1:{srv.server_address[1]}/page/<quoted url>")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            srv.shutdown()
+        return
+    if args.cmd == "bench":
+        print(json.dumps(bench(args.fixtures, args.parser, args.workers, args.processes, args.repeat), indent=1))
+        return
+    if args.cmd == "check":
+        res = check(args.fixtures, args.parser, update=args.update)
+        print(json.dumps(res, indent=1))
+        if not res.get("ok", True):
+            raise SystemExit(1)
+        return
+
+    cache = PageCache(args.cache_dir or None)
+    if args.cmd == "stats":
+        print(json.dumps(cache.stats(), indent=1))
+    elif args.cmd == "compact":
+        print(f"[cache] index compacted -> {cache.compact_index():,} urls")
+    elif args.cmd == "export-fixtures":
+        print(f"[fixtures] {export_fixtures(cache, args.out, args.match):,} pages -> {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,8 @@
-import re, time, json, hashlib, math
+import argparse, re, time, json, hashlib
 from pathlib import Path
 from typing import Optional, Tuple, List
 import requests
 from bs4 import BeautifulSoup
-import pandas as pd
 
 BASE = "https://www.footballlocks.com"
 WEEK_PATHS = [f"/nfl_odds_week_{w}.html" for w in range(1,18)]  # regular season
@@ -107,7 +106,7 @@ def parse_week_html(html: str) -> List[dict]:
         )
 
         for ln in chunk.splitlines():
-            ln = ln.strip()
+            ln = ln.strip().replace("−", "-")  # some seasons print a unicode minus
             m2 = line_re.search(ln)
             if not m2:
                 continue
@@ -126,12 +125,11 @@ def parse_week_html(html: str) -> List[dict]:
                 home, away = fav, dog
                 ml_home, ml_away = ml_f, ml_d
                 spread = 0.0 if sp_raw in ("PK","PICK") else float(sp_raw)
-                spread_home = -abs(spread)  # home is favorite
+                spread_home = -abs(spread) if spread else 0.0  # home is favorite
             elif dog_at and not fav_at:
                 home, away = dog, fav
                 ml_home, ml_away = ml_d, ml_f
-                spread = 0.0 if sp_raw in ("PK","PICK") else float(spread := float(sp_raw))
-                spread_home = abs(float(sp_raw))  # home is dog
+                spread_home = 0.0 if sp_raw in ("PK","PICK") else abs(float(sp_raw))  # home is dog
             else:
                 # ambiguous: assume first team is home favorite
                 home, away = fav, dog
@@ -154,26 +152,41 @@ def parse_week_html(html: str) -> List[dict]:
             })
     return rows
 
-def main():
-    s = session()
-    all_rows = []
-    for path in WEEK_PATHS:
-        try:
-            html, src = fetch_with_fallback(s, path)
-            parsed = parse_week_html(html)
-            if parsed:
-                all_rows.extend(parsed)
-                print(f"[ok] {path} -> {len(parsed)} rows  ({src})")
-            else:
-                print(f"[warn] {path} -> 0 rows  ({src})")
-            time.sleep(0.8)
-        except Exception as e:
-            print(f"[skip] {path}: {e}")
+def parse_page(url: str, html: str) -> List[dict]:
+    """scrape_core parser (season/week come from the page's own block headers)."""
+    return parse_week_html(html)
 
-    if not all_rows:
+def is_odds_page(html: str) -> bool:
+    return "Las Vegas NFL Odds" in html
+
+def main():
+    from tools.scrape_core import PageCache, add_cli_args, fetch_all, parse_cached
+    ap = argparse.ArgumentParser(description="FootballLOCKS closing lines -> exports/historical_odds_footballlocks.csv")
+    add_cli_args(ap)
+    args = ap.parse_args()
+
+    # pages are cached under their canonical live url, whichever variant / Wayback copy served them
+    cache = PageCache(args.cache_dir or None)
+    urls = [BASE + path for path in WEEK_PATHS]
+    if not args.offline:
+        failed = fetch_all(urls, cache, workers=args.workers, per_host_delay=args.delay,
+                           refresh=args.refresh, tries=2, headers={"Referer": BASE + "/"}, validate=is_odds_page)
+        s = session()
+        for url in failed:
+            path = url[len(BASE):]
+            try:
+                html, src = fetch_with_fallback(s, path)
+                cache.put(url, html)
+                print(f"[ok] {path} via fallback ({src})")
+                time.sleep(0.8)
+            except Exception as e:
+                print(f"[skip] {path}: {e}")
+
+    df = parse_cached(urls, parse_page, cache, processes=args.processes)
+    if df.empty:
         raise SystemExit("No rows scraped (both live and Wayback failed).")
 
-    df = pd.DataFrame(all_rows).dropna(subset=["date","home","away"])
+    df = df.dropna(subset=["date","home","away"])
     df["game_id_unified"] = df.apply(
         lambda r: hashlib.md5(f"{r['date']}|{r['home']}|{r['away']}|NFL".encode()).hexdigest()[:12], axis=1
     )
@@ -1,5 +1,5 @@
 #!/usr/bin/env python
-import time, random, re
+import argparse, time, random, re
 from io import StringIO
 from pathlib import Path
 
@@ -81,9 +81,19 @@ def teamify(x: str):
             return canon
     return x  # keep original if unsure
 
+PFR_URL = "https://www.pro-football-reference.com/years/{season}/games.htm"
+
+def season_url(season: int) -> str:
+    return PFR_URL.format(season=season)
+
 def parse_season(season: int):
-    url = f"https://www.pro-football-reference.com/years/{season}/games.htm"
-    html = fetch(url)
+    return parse_html(fetch(season_url(season)), season)
+
+def parse_page(url: str, html: str):
+    """scrape_core parser: season comes from the /years/<season>/ path."""
+    return parse_html(html, int(re.search(r"/years/(\d{4})/", url).group(1)))
+
+def parse_html(html: str, season: int):
     # PFR tables load without JS; read_html works fine if we pass a buffer
     tables = pd.read_html(StringIO(html))
     # find the schedule-like table: must contain Winner/tie & Loser/tie
@@ -144,26 +154,23 @@ def parse_season(season: int):
     return out
 
 def main():
+    from tools.scrape_core import add_cli_args, scrape_from_args
+    ap = argparse.ArgumentParser(description="PFR season schedules/scores -> exports/pfr_scores_1966_2024.csv")
+    ap.add_argument("--start", type=int, default=1966)
+    ap.add_argument("--end", type=int, default=2024)
+    add_cli_args(ap)
+    ap.set_defaults(workers=2, delay=3.0)  # be kind to PFR
+    args = ap.parse_args()
+
     exports = Path("exports"); exports.mkdir(exist_ok=True)
-    rows = []
-    for season in range(1966, 2025):  # adjust upper bound as needed
-        try:
-            df = parse_season(season)
-            print(f"[ok] {season} rows={len(df)}")
-            rows.append(df)
-            # be kind to PFR
-            time.sleep(0.75 + random.random()*0.6)
-        except Exception as e:
-            print(f"[err] {season} -> {e}")
-
-    if not rows:
+    urls = [season_url(season) for season in range(args.start, args.end + 1)]
+    all_ = scrape_from_args(args, urls, parse_page)
+    if all_.empty:
         print("[warn] no rows scraped")
         return
 
-    all_ = pd.concat(rows, ignore_index=True)
     all_.to_csv(exports / "pfr_scores_1966_2024.csv", index=False)
     print(f"[write] exports/pfr_scores_1966_2024.csv rows={len(all_)}")
 
 if __name__ == "__main__":
     main()
-
@@ -1,5 +1,6 @@
-import os, re, time, requests
+import argparse, os, re, time, requests
 import numpy as np
+from io import StringIO
 import pandas as pd
 
 OUT_DIR = r"C:\Projects\edge-finder\exports"
@@ -40,14 +41,31 @@ def to_int_ml(x):
         except: return np.nan
     return np.nan
 
+SOH_URL = "https://www.sportsoddshistory.com/nfl-game-odds/?y={year}"
+
+def season_url(year):
+    return SOH_URL.format(year=year)
+
 def parse_season(year, sleep=0.8, save_raw=True):
-    url = f"https://www.sportsoddshistory.com/nfl-game-odds/?y={year}"
+    url = season_url(year)
     print(f"[SOH] {year} -> {url}")
     r = requests.get(url, headers={"User-Agent":"Mozilla/5.0"})
     r.raise_for_status()
+    out = parse_html(r.text, year, save_raw=save_raw)
+    time.sleep(sleep)
+    return out
+
+def parse_page(url, html):
+    """scrape_core parser: season from the ?y= query; also writes the per-season debug CSV."""
+    year = int(re.search(r"[?&]y=(\d{4})", url).group(1))
+    df = parse_html(html, year)
+    if not df.empty:
+        df.to_csv(os.path.join(OUT_DIR, f"soh_edges_{year}.csv"), index=False)
+    return df
 
+def parse_html(html, year, save_raw=True):
     # parse every table; pick likely odds table
-    tables = pd.read_html(r.text)
+    tables = pd.read_html(StringIO(html))
     if not tables:
         print(f"[SOH] {year}: no tables found")
         return pd.DataFrame()
@@ -131,29 +149,24 @@ def parse_season(year, sleep=0.8, save_raw=True):
         print(f"[SOH] {year}: parsed 0 ML rows. Columns seen: {cols}")
     else:
         print(f"[SOH] {year}: parsed {len(out)} ML rows. Columns: {cols}")
-    time.sleep(sleep)
     return pd.DataFrame(out)
 
 def main():
-    years = list(range(1999, 2017))
+    from tools.scrape_core import add_cli_args, scrape_from_args
+    ap = argparse.ArgumentParser(description="SportsOddsHistory moneylines -> " + MASTER)
+    ap.add_argument("--start", type=int, default=1999)
+    ap.add_argument("--end", type=int, default=2016)
+    add_cli_args(ap)
+    args = ap.parse_args()
+
     if os.path.exists(MASTER):
         os.remove(MASTER)
-    all_rows = []
-    for y in years:
-        try:
-            df = parse_season(y)
-            if not df.empty:
-                # save per-season for debug
-                per_path = os.path.join(OUT_DIR, f"soh_edges_{y}.csv")
-                df.to_csv(per_path, index=False)
-                all_rows.append(df)
-        except Exception as e:
-            print(f"[SOH] {y}: ERROR {e}")
-
-    if not all_rows:
+    urls = [season_url(y) for y in range(args.start, args.end + 1)]
+    big = scrape_from_args(args, urls, parse_page, headers={"User-Agent": "Mozilla/5.0"})
+
+    if big.empty:
         print("No season produced ML rows. Check the per-season raw CSVs and column logs above.")
         return
-    big = pd.concat(all_rows, ignore_index=True)
     big.to_csv(MASTER, index=False)
     print(f"Wrote {MASTER} with {len(big)} rows.")
 
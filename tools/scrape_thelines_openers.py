@@ -1,9 +1,11 @@
 #!/usr/bin/env python
 import argparse, re, sys, math, time, random
+from io import StringIO
 from pathlib import Path
 import pandas as pd
 from bs4 import BeautifulSoup
 import requests
+from functools import partial
 
 # ---------- Team normalization ----------
 NFL_ALIASES = {
@@ -131,7 +133,7 @@ def parse_html(html: str, src_name="(html)", estimate_ml=False):
 
     # 1) Tables first
     try:
-        tables = pd.read_html(html)
+        tables = pd.read_html(StringIO(html))  # pandas no longer reads literal html strings
         for t in tables:
             out += _rows_from_table(t, season_hint=None)
     except Exception:
@@ -178,7 +180,9 @@ def parse_html(html: str, src_name="(html)", estimate_ml=False):
     return df.to_dict("records")
 
 def parse_url(url: str, estimate_ml=False):
-    html = fetch(url)
+    return parse_page(url, fetch(url), estimate_ml=estimate_ml)
+
+def parse_page(url: str, html: str, estimate_ml=False):
     # Prefer season from URL when present
     season_hint = _season_from_url(url)
     rows = parse_html(html, src_name=url, estimate_ml=estimate_ml)
@@ -188,26 +192,26 @@ def parse_url(url: str, estimate_ml=False):
     return rows
 
 def main():
+    from tools.scrape_core import add_cli_args, scrape_from_args
     ap = argparse.ArgumentParser()
     ap.add_argument("--urls", nargs="+", help="One or more TheLines URLs")
     ap.add_argument("--files", nargs="+", help="Local HTML files saved from TheLines")
     ap.add_argument("--estimate-ml", action="store_true", help="Estimate moneylines from spread")
+    add_cli_args(ap)
     args = ap.parse_args()
 
-    sources = []
-    if args.urls:  sources += [("url", u) for u in args.urls]
-    if args.files: sources += [("file", f) for f in args.files]
-    if not sources:
+    if not args.urls and not args.files:
         ap.error("Provide --urls and/or --files")
 
     all_rows = []
-    for typ, src in sources:
+    if args.urls:
+        # urls go through the page cache: fetched once, parsed in worker processes
+        parsed = scrape_from_args(args, args.urls, partial(parse_page, estimate_ml=args.estimate_ml))
+        all_rows += parsed.to_dict("records")
+    for src in args.files or []:
         try:
-            if typ == "url":
-                rows = parse_url(src, estimate_ml=args.estimate_ml)
-            else:
-                html = Path(src).read_text(encoding="utf-8", errors="ignore")
-                rows = parse_html(html, src_name=src, estimate_ml=args.estimate_ml)
+            html = Path(src).read_text(encoding="utf-8", errors="ignore")
+            rows = parse_html(html, src_name=src, estimate_ml=args.estimate_ml)
             print(f"[ok] {src} rows={len(rows)}")
             all_rows += rows
         except Exception as e:
@@ -1,5 +1,8 @@
 # tools/settle_player_props.py
 # Grades edges in exports/edges.csv using exports/player_game_stats.parquet and player_tds.parquet (if present)
+# Joins are int-keyed on player_key from the player dimension (tools/player_index.py) when it has
+# been built: a player_key already on the edge is used as-is (merged keys followed), stats source
+# ids in player_id map through the dimension and name-only edges go through the resolver.
 import re
 import pandas as pd
 from pathlib import Path
@@ -13,7 +16,7 @@ def load_edges() -> pd.DataFrame:
         raise FileNotFoundError(EDGES)
     e = pd.read_csv(EDGES)
     e.columns = [c.lower() for c in e.columns]
-    for c in ("season","week","game_id","player_id","line"):
+    for c in ("season","week","game_id","player_id","player_key","line"):
         if c in e.columns:
             e[c] = pd.to_numeric(e[c], errors="coerce")
     return e
@@ -26,14 +29,34 @@ def parse_player_id(row) -> int | None:
     m = re.search(r"player:(\d+)", sel)
     return int(m.group(1)) if m else None
 
-def settle_numeric(e: pd.DataFrame, stats: pd.DataFrame, market_prefix: str, stat_col: str):
+NAME_COLS = ("player_name", "player", "participant", "description")
+
+def attach_player_keys(e: pd.DataFrame, stats: pd.DataFrame, index) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Add int player_key to edges (own key, then source id, then resolved name) and to stats (via source id)."""
+    e = e.copy(); stats = stats.copy()
+    stats["player_key"] = index.keys_for_source(stats["player_id"]).array
+    own = index.canonical(e["player_key"]) if "player_key" in e.columns else pd.Series(pd.NA, index=e.index, dtype="Int64")
+    e["player_key"] = own.array
+    miss = e["player_key"].isna()
+    if miss.any():
+        pid = e.loc[miss].apply(parse_player_id, axis=1)
+        e.loc[miss, "player_key"] = index.keys_for_source(pid).array
+    name_col = next((c for c in NAME_COLS if c in e.columns), None)
+    miss = e["player_key"].isna()
+    if name_col and miss.any():
+        e.loc[miss, "player_key"] = index.resolve(e.loc[miss, name_col], season=e.loc[miss, "season"] if "season" in e.columns else None).array
+    return e, stats
+
+def settle_numeric(e: pd.DataFrame, stats: pd.DataFrame, market_prefix: str, stat_col: str, player_col: str = "player_id"):
     mask = e["market"].str.lower().str.startswith(market_prefix)
     sub = e[mask].copy()
     if sub.empty:
         return e
-    sub["player_id"] = sub.apply(parse_player_id, axis=1)
-    key = ["season","week","game_id","player_id"]
-    joined = sub.merge(stats[key + [stat_col]], on=key, how="left")
+    if player_col == "player_id":
+        sub["player_id"] = sub.apply(parse_player_id, axis=1)
+    key = ["season","week","game_id",player_col]
+    # keep the edges' own index through the merge so results land on the right rows
+    joined = sub.reset_index().merge(stats[key + [stat_col]].drop_duplicates(key), on=key, how="left").set_index("index")
     # market forms: "player_pass_yds:over", "player_rec:under", etc. with numeric 'line'
     side = joined["market"].str.lower().str.split(":", n=1).str[1].fillna("")
     line = pd.to_numeric(joined.get("line"), errors="coerce")
@@ -55,18 +78,30 @@ if __name__ == "__main__":
         raise FileNotFoundError(STATS)
     stats = pd.read_parquet(STATS)
 
+    player_col = "player_id"
+    try:
+        from tools.player_index import load_index, save_index
+        index = load_index(STATS.parent)
+    except ImportError:
+        index = None
+    if index is not None and len(index):
+        edges, stats = attach_player_keys(edges, stats, index)
+        save_index(index, STATS.parent)
+        player_col = "player_key"
+        print(f"[players] keyed {edges['player_key'].notna().sum():,}/{len(edges):,} edges")
+
     # QB passing yards
-    edges = settle_numeric(edges, stats, "player_pass_yds", "pass_yards")
+    edges = settle_numeric(edges, stats, "player_pass_yds", "pass_yards", player_col)
     # QB pass attempts
-    edges = settle_numeric(edges, stats, "player_pass_att", "pass_attempts")
+    edges = settle_numeric(edges, stats, "player_pass_att", "pass_attempts", player_col)
     # Receptions
-    edges = settle_numeric(edges, stats, "player_rec", "receptions")
+    edges = settle_numeric(edges, stats, "player_rec", "receptions", player_col)
     # Receiving yards
-    edges = settle_numeric(edges, stats, "player_rec_yds", "rec_yards")
+    edges = settle_numeric(edges, stats, "player_rec_yds", "rec_yards", player_col)
     # Rushing attempts
-    edges = settle_numeric(edges, stats, "player_rush_att", "rush_att")
+    edges = settle_numeric(edges, stats, "player_rush_att", "rush_att", player_col)
     # Rushing yards
-    edges = settle_numeric(edges, stats, "player_rush_yds", "rush_yards")
+    edges = settle_numeric(edges, stats, "player_rush_yds", "rush_yards", player_col)
 
     # Anytime TD (optional; uses exports/player_tds.parquet if you built it)
     if TDS.exists():
@@ -74,9 +109,12 @@ if __name__ == "__main__":
         td_mask = edges["market"].str.lower().str.startswith("player_td:anytime")
         attd = edges[td_mask].copy()
         if not attd.empty:
-            attd["player_id"] = attd.apply(parse_player_id, axis=1)
-            key = ["season","week","game_id","player_id"]
-            joined = attd.merge(tds[key + ["anytime_td_hit"]], on=key, how="left")
+            if player_col == "player_key":
+                tds = tds.assign(player_key=index.keys_for_source(tds["player_id"]).array)
+            else:
+                attd["player_id"] = attd.apply(parse_player_id, axis=1)
+            key = ["season","week","game_id",player_col]
+            joined = attd.reset_index().merge(tds[key + ["anytime_td_hit"]].drop_duplicates(key), on=key, how="left").set_index("index")
             edges.loc[joined.index, "result"] = joined["anytime_td_hit"].map({1:"win", 0:"lose"})
 
     edges.to_csv(EDGES, index=False)
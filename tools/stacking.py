@@ -0,0 +1,253 @@
+# tools/stacking.py
+# Stacked ensemble over the parlay base models with cached out-of-fold predictions.
+#
+#   bases      "logreg"         train_parlay's LogisticRegression on the prepared edge features
+#              "hgb"            HistGradientBoostingClassifier on the same features
+#              "col:<name>"     a probability already embedded in the edges (col:model_prob, col:implied_prob)
+#   OOF        season walk-forward like train_parlay's CV: predictions for season S come from a base
+#              fitted on the seasons before S only; the first min_train_seasons seasons stay NaN
+#   cache      <exports>/stacking/oof/<base>-<spec hash>-<data fingerprint>.npy, plus the base refit on
+#              all rows as <...>.joblib; the key covers the base definition, the feature list, the
+#              scikit-learn version, min_train_seasons (OOF arrays only) and the training frame's
+#              content hash, so a changed input never reuses a stale cache
+#   meta       logistic regression on the bases' logits over rows where every base has an OOF value,
+#              itself scored walk-forward (out of time twice), then refit on all of them
+#   serving    StackedModel.predict_proba takes the union feature matrix (batch_infer.feature_matrix
+#              layout) and runs each base on its column slice plus one matrix product for the meta
+#              layer; registered as "stack" it is scored by batch_infer / the model server unchanged
+#
+# Refitting the meta layer after the first run only reads the cached arrays (seconds).
+#
+#   python -m tools.stacking --edges exports/edges_graded.csv --bases logreg,hgb,col:model_prob [--register]
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from tools.pathing import exports_dir
+
+EPS = 1e-6
+BASES = {
+    "logreg": {"C": 1.0},
+    "hgb": {"max_iter": 200, "learning_rate": 0.05, "max_leaf_nodes": 15, "l2_regularization": 1.0},
+}
+
+def cache_dir(root: Path | None = None) -> Path:
+    d = root or (exports_dir() / "stacking" / "oof")
+    d.mkdir(parents=True, exist_ok=True)
+    return d
+
+def _logit(p: np.ndarray) -> np.ndarray:
+    p = np.clip(p, EPS, 1 - EPS)
+    return np.log(p / (1 - p))
+
+# -------------------- bases --------------------
+
+def make_base(name: str):
+    if name == "logreg":
+        from sklearn.linear_model import LogisticRegression
+        return LogisticRegression(max_iter=2000, **BASES[name])
+    if name == "hgb":
+        from sklearn.ensemble import HistGradientBoostingClassifier
+        return HistGradientBoostingClassifier(random_state=0, **BASES[name])
+    raise KeyError(f"unknown base {name!r} (known: {', '.join(BASES)}, col:<column>)")
+
+def base_key(name: str, features: list[str], **fold_params) -> str:
+    """Spec hash for cache names; fold_params (e.g. min_train_seasons) are whatever else shapes the array."""
+    import sklearn
+    from tools.model_registry import feature_hash
+    spec = json.dumps({"name": name, "params": BASES.get(name, {}), "features": feature_hash(features),
+                       "sklearn": sklearn.__version__, **fold_params}, sort_keys=True)
+    return hashlib.sha1(spec.encode("utf-8")).hexdigest()[:12]
+
+def _fold(name, X, y, tr, te):
+    return te, make_base(name).fit(X[tr], y[tr]).predict_proba(X[te])[:, 1]
+
+def base_oof(name: str, X: np.ndarray, y: np.ndarray, season: np.ndarray, features: list[str], fp: str,
+             min_train_seasons: int = 2, n_jobs: int = 1, root: Path | None = None) -> tuple[np.ndarray, bool]:
+    """(OOF probabilities aligned to the rows, served from cache?)."""
+    if name.startswith("col:"):
+        return np.clip(X[:, features.index(name[4:])], EPS, 1 - EPS), True
+    path = cache_dir(root) / f"{name}-{base_key(name, features, min_train_seasons=int(min_train_seasons))}-{fp}.npy"
+    if path.exists():
+        return np.load(path), True
+    from joblib import Parallel, delayed
+    from tools.train_parlay import walk_forward_folds
+    oof = np.full(len(y), np.nan)
+    jobs = []
+    for tr_seasons, te_season in walk_forward_folds(season, min_train_seasons):
+        tr, te = np.isin(season, tr_seasons), season == te_season
+        if len(np.unique(y[tr])) == 2 and te.any():
+            jobs.append(delayed(_fold)(name, X, y, tr, te))
+    for te, p in Parallel(n_jobs=n_jobs)(jobs):
+        oof[te] = p
+    tmp = path.with_name(path.stem + ".tmp.npy")
+    np.save(tmp, oof)
+    tmp.replace(path)
+    return oof, False
+
+def base_full(name: str, X: np.ndarray, y: np.ndarray, features: list[str], fp: str, root: Path | None = None):
+    """The base refit on every row (what the stack serves with), cached next to its OOF array."""
+    from joblib import dump, load
+    path = cache_dir(root) / f"{name}-{base_key(name, features)}-{fp}.joblib"
+    if path.exists():
+        return load(path)
+    est = make_base(name).fit(X, y)
+    tmp = path.with_name(path.stem + ".tmp.joblib")
+    dump(est, tmp)
+    tmp.replace(path)
+    return est
+
+# -------------------- stacked model --------------------
+
+class StackedModel:
+    """Bases + logistic meta layer; predict_proba over the union feature matrix (see the module header)."""
+
+    def __init__(self, feature_cols: list[str], bases: list[str], estimators: list, coef: np.ndarray, intercept: float):
+        self.feature_cols = list(feature_cols)
+        self.bases = list(bases)
+        self.estimators = estimators             # fitted estimator, or None for col: bases
+        self.coef = np.asarray(coef, dtype="float64")
+        self.intercept = float(intercept)
+        self.classes_ = np.array([0, 1])
+
+    def base_matrix(self, X) -> np.ndarray:
+        """[n, n_bases] base probabilities."""
+        if isinstance(X, pd.DataFrame):
+            from tools.batch_infer import feature_matrix
+            X = feature_matrix(X, self.feature_cols)
+        P = np.empty((len(X), len(self.bases)))
+        for j, (b, est) in enumerate(zip(self.bases, self.estimators)):
+            P[:, j] = X[:, self.feature_cols.index(b[4:])] if est is None else est.predict_proba(X)[:, 1]
+        return P
+
+    def predict_proba(self, X) -> np.ndarray:
+        z = _logit(self.base_matrix(X)) @ self.coef + self.intercept
+        p = 1.0 / (1.0 + np.exp(-z))
+        return np.column_stack([1 - p, p])
+
+def fit_meta(P: np.ndarray, y: np.ndarray, C: float = 1.0) -> tuple[np.ndarray, float]:
+    from sklearn.linear_model import LogisticRegression
+    m = LogisticRegression(max_iter=1000, C=C).fit(_logit(P), y)
+    return m.coef_[0], float(m.intercept_[0])
+
+def evaluate_meta(P: np.ndarray, y: np.ndarray, season: np.ndarray, bases: list[str], C: float = 1.0,
+                  min_train_seasons: int = 1) -> pd.DataFrame:
+    """Walk-forward scores of the meta layer on the OOF matrix next to each base on the same rows."""
+    from tools.train_parlay import score_metrics, walk_forward_folds
+    rows = []
+    for tr_seasons, te_season in walk_forward_folds(season, min_train_seasons):
+        tr, te = np.isin(season, tr_seasons), season == te_season
+        if len(np.unique(y[tr])) < 2 or not te.any():
+            continue
+        coef, b0 = fit_meta(P[tr], y[tr], C)
+        p = 1.0 / (1.0 + np.exp(-(_logit(P[te]) @ coef + b0)))
+        for name, q in [("stack", p)] + [(b, P[te, j]) for j, b in enumerate(bases)]:
+            rows.append({"test_season": int(te_season), "model": name, **score_metrics(y[te], q)})
+    return pd.DataFrame(rows)
+
+# -------------------- build --------------------
+
+def prepare(df: pd.DataFrame, bases: list[str], min_season: int) -> tuple[np.ndarray, np.ndarray, np.ndarray, list[str], pd.DataFrame]:
+    """(X, y, season, feature_cols, frame) — X built with batch_infer.feature_matrix so training and serving agree."""
+    from tools.batch_infer import feature_matrix
+    from tools.train_parlay import prepare_dataframe
+    df = df.rename(columns={c: c.strip().lower() for c in df.columns})
+    prepped, feats = prepare_dataframe(df, min_season)
+    prepped = prepped.dropna(subset=["result_bin"])
+    if "season" not in prepped.columns:
+        raise SystemExit("[stacking] need a season column for out-of-time folds")
+    cols = list(dict.fromkeys(feats + [b[4:] for b in bases if b.startswith("col:")]))
+    src = df.loc[prepped.index]
+    missing = [c for c in cols if c not in src.columns and c not in ("price_dec", "implied_prob", "dummy_zero")]
+    if any(b[4:] in missing for b in bases if b.startswith("col:")):
+        raise SystemExit(f"[stacking] column base(s) not in the data: {missing}")
+    X = feature_matrix(src, cols)
+    frame = pd.DataFrame(X, columns=cols).assign(result_bin=prepped["result_bin"].to_numpy(), season=prepped["season"].to_numpy())
+    return X, prepped["result_bin"].to_numpy(dtype="int64"), prepped["season"].to_numpy(dtype="float64"), cols, frame
+
+def build(df: pd.DataFrame, bases: list[str], min_season: int = 0, C: float = 1.0, min_train_seasons: int = 2,
+          n_jobs: int = 1, root: Path | None = None, verbose: bool = True) -> tuple[StackedModel, pd.DataFrame, dict]:
+    from tools.model_registry import data_fingerprint
+    X, y, season, cols, frame = prepare(df, bases, min_season)
+    fp = data_fingerprint(frame)
+    t0 = time.perf_counter()
+    P = np.empty((len(y), len(bases)))
+    for j, b in enumerate(bases):
+        t = time.perf_counter()
+        P[:, j], hit = base_oof(b, X, y, season, cols, fp, min_train_seasons, n_jobs, root)
+        if verbose:
+            print(f"[stacking] {b:<16} OOF {'embedded' if b.startswith('col:') else 'cache hit' if hit else 'computed'} in {time.perf_counter() - t:.2f}s")
+    ok = ~np.isnan(P).any(axis=1)
+    t = time.perf_counter()
+    report = evaluate_meta(P[ok], y[ok], season[ok], bases, C)
+    coef, b0 = fit_meta(P[ok], y[ok], C)
+    t_meta = time.perf_counter() - t
+    ests = [None if b.startswith("col:") else base_full(b, X, y, cols, fp, root) for b in bases]
+    model = StackedModel(cols, bases, ests, coef, b0)
+    info = {"data_fingerprint": fp, "rows": int(len(y)), "meta_rows": int(ok.sum()), "bases": bases,
+            "meta_coef": dict(zip(bases, map(float, coef))), "meta_intercept": b0,
+            "meta_fit_s": round(t_meta, 3), "total_s": round(time.perf_counter() - t0, 2)}
+    return model, report, info
+
+def summarize(report: pd.DataFrame) -> pd.DataFrame:
+    """train_parlay.summarize_cv per model (stack and each base), same folds and rows for all."""
+    from tools.train_parlay import summarize_cv
+    if report.empty:
+        return report
+    return pd.DataFrame([{"model": m, **summarize_cv(g)} for m, g in report.groupby("model", sort=False)])
+
+# -------------------- CLI --------------------
+
+def main():
+    ap = argparse.ArgumentParser(description="Stack parlay base models on cached out-of-fold predictions.")
+    ap.add_argument("--edges", type=Path, required=True, help="graded edges (CSV/Parquet), as train_parlay")
+    ap.add_argument("--bases", default="logreg,hgb,col:model_prob", help=f"comma list of {', '.join(BASES)}, col:<column>")
+    ap.add_argument("--min-season", type=int, default=2017)
+    ap.add_argument("--min-train-seasons", type=int, default=2)
+    ap.add_argument("--C", type=float, default=1.0, help="meta layer inverse L2 strength")
+    ap.add_argument("--n-jobs", type=int, default=1, help="base folds in parallel")
+    ap.add_argument("--out", type=Path, default=None, help="also write parlay_model.joblib + meta here")
+    ap.add_argument("--register", action="store_true")
+    ap.add_argument("--name", default="stack")
+    ap.add_argument("--activate", action="store_true")
+    args = ap.parse_args()
+
+    df = pd.read_parquet(args.edges) if args.edges.suffix == ".parquet" else pd.read_csv(args.edges, low_memory=False)
+    bases = [b.strip() for b in args.bases.split(",") if b.strip()]
+    model, report, info = build(df, bases, args.min_season, args.C, args.min_train_seasons, args.n_jobs)
+    summ = summarize(report)
+    with pd.option_context("display.width", 160):
+        print(summ.to_string(index=False, float_format=lambda v: f"{v:.4f}") if not summ.empty else "[stacking] no walk-forward folds")
+    print(f"[stacking] meta weights {', '.join(f'{k}={v:+.3f}' for k, v in info['meta_coef'].items())}; "
+          f"meta fit {info['meta_fit_s']}s, total {info['total_s']}s")
+
+    metrics = {}
+    if not summ.empty:
+        s = summ.set_index("model")
+        metrics = s.loc["stack"].dropna().to_dict()
+    meta = {"feature_cols": model.feature_cols, "train_size": info["rows"], "stack": info, "cv": metrics,
+            "cv_report": summ.to_dict(orient="records"), "version": "stack_v1"}
+    if args.register:
+        from tools.model_registry import register
+        mid = register(model, args.name, model.feature_cols, metrics=metrics,
+                       params={"bases": bases, "C": args.C, "min_train_seasons": args.min_train_seasons},
+                       extra_meta=meta, activate=args.activate)
+        print(f"[stacking] Registered model id: {mid}")
+    if args.out:
+        from joblib import dump
+        args.out.mkdir(parents=True, exist_ok=True)
+        dump(model, args.out / "parlay_model.joblib")
+        (args.out / "parlay_model.meta.json").write_text(json.dumps(meta, indent=2, default=str))
+        print(f"[stacking] wrote {args.out / 'parlay_model.joblib'}")
+
+if __name__ == "__main__":
+    # pickle StackedModel as tools.stacking, not __main__, so registry loads work anywhere
+    from tools.stacking import main as _main
+    _main()
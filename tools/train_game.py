@@ -1,25 +1,140 @@
 #!/usr/bin/env python
-import argparse, json
+# tools/train_game.py
+# Train the game outcome model (tools/game_model.py) on the scores history.
+#
+#   1) point-in-time features for every game (feature store + Elo pass)
+#   2) ridge regressions for the mean margin and mean total
+#   3) residual densities + key-number weights -> margin / total CDF tables
+#   4) holdout on the last --test-seasons seasons (MAE, ML log loss, cover/over calibration
+#      where closing lines exist), then refit on everything and register as "game"
+import argparse, json, time
 from pathlib import Path
+
+import numpy as np
 import pandas as pd
 
+from tools.game_model import FEATURES, CdfTable, GameModel, game_features, key_weights, residual_density
+from tools.pathing import exports_dir
+
+MARGIN_RANGE = (-80, 80)
+TOTAL_RANGE = (0, 120)
+
+def _ridge(alpha: float):
+    from sklearn.impute import SimpleImputer
+    from sklearn.linear_model import Ridge
+    from sklearn.pipeline import make_pipeline
+    from sklearn.preprocessing import StandardScaler
+    return make_pipeline(SimpleImputer(strategy="median"), StandardScaler(), Ridge(alpha=alpha))
+
+def fit(df: pd.DataFrame, features=FEATURES, alpha: float = 1.0) -> GameModel:
+    X = df[features].to_numpy(dtype="float64", na_value=np.nan)
+    ym = df["margin"].to_numpy(dtype="float64")
+    yt = df["total"].to_numpy(dtype="float64")
+    m_est = _ridge(alpha).fit(X, ym)
+    t_est = _ridge(alpha).fit(X, yt)
+
+    xm, fm = residual_density(ym - m_est.predict(X))
+    xt, ft = residual_density(yt - t_est.predict(X))
+    wm = key_weights(ym, *MARGIN_RANGE, symmetric=True)
+    wt = key_weights(yt, *TOTAL_RANGE)
+    m_tab = CdfTable(xm, fm, wm, MARGIN_RANGE[0], -40.0, 40.0)
+    t_tab = CdfTable(xt, ft, wt, TOTAL_RANGE[0], 10.0, 90.0)
+    return GameModel(m_est, t_est, features, m_tab, t_tab)
+
+def evaluate(model: GameModel, df: pd.DataFrame) -> dict:
+    p = model.price(df)
+    ym, yt = df["margin"].to_numpy(dtype="float64"), df["total"].to_numpy(dtype="float64")
+    win = (ym > 0).astype("float64")
+    pw = np.clip(p["p_home_win"] / (1.0 - p["p_tie"]), 1e-6, 1 - 1e-6).to_numpy()
+    decided = ym != 0
+    out = {
+        "n": int(len(df)),
+        "margin_mae": float(np.mean(np.abs(p["pred_margin"] - ym))),
+        "total_mae": float(np.mean(np.abs(p["pred_total"] - yt))),
+        "ml_logloss": float(-np.mean(win[decided] * np.log(pw[decided]) + (1 - win[decided]) * np.log(1 - pw[decided]))),
+    }
+    # key-number fit: predicted vs actual share of margins landing on 3 / 7
+    for k in (3, 7):
+        pk = model.margin_table.eq(p["pred_margin"], k) + model.margin_table.eq(p["pred_margin"], -k)
+        out[f"p_margin_{k}"] = float(np.mean(pk))
+        out[f"act_margin_{k}"] = float(np.mean(np.abs(ym) == k))
+    # against closing lines, when the history has them
+    has = df["home_spread"].notna().to_numpy()
+    if has.sum() >= 100:
+        cover = ym[has] + df["home_spread"].to_numpy()[has]
+        graded = cover != 0
+        pc = (p["p_home_cover"] / (1.0 - p["p_spread_push"])).to_numpy()[has][graded]
+        out["cover_brier"] = float(np.mean((pc - (cover[graded] > 0)) ** 2))
+        out["cover_n"] = int(graded.sum())
+    has = df["total_line"].notna().to_numpy()
+    if has.sum() >= 100:
+        over = yt[has] - df["total_line"].to_numpy()[has]
+        graded = over != 0
+        po = (p["p_over"] / (1.0 - p["p_total_push"])).to_numpy()[has][graded]
+        out["over_brier"] = float(np.mean((po - (over[graded] > 0)) ** 2))
+        out["over_n"] = int(graded.sum())
+    return out
+
 def main():
-    ap = argparse.ArgumentParser()
-    ap.add_argument("--historical-odds", required=True)
-    ap.add_argument("--out", required=True)
+    ap = argparse.ArgumentParser(description="Train the game margin/total outcome model.")
+    ap.add_argument("--games", type=Path, default=None, help="scores history (default exports/scores_1966-2025.csv)")
+    ap.add_argument("--historical-odds", type=Path, default=None, help="(legacy) same as --games")
+    ap.add_argument("--out", type=Path, default=None, help="also write game_model.joblib + metadata.json here")
+    ap.add_argument("--min-season", type=int, default=1970, help="first season used for fitting (Elo burn-in before)")
+    ap.add_argument("--test-seasons", type=int, default=3, help="holdout seasons for the reported metrics")
+    ap.add_argument("--alpha", type=float, default=1.0, help="ridge L2 strength")
+    ap.add_argument("--name", default="game", help="registry name")
+    ap.add_argument("--no-register", action="store_true")
+    ap.add_argument("--activate", action="store_true")
     args = ap.parse_args()
 
-    out_dir = Path(args.out); out_dir.mkdir(parents=True, exist_ok=True)
-    df = pd.read_csv(args.historical_odds)
-    meta = {
-        "rows": int(len(df)),
-        "cols": list(df.columns),
-        "note": "stub trainer — replace with real model training"
-    }
-    (out_dir / "metadata.json").write_text(json.dumps(meta, indent=2))
-    (out_dir / "version.txt").write_text("game_trainer_stub_v1\n")
-    print(f"[ok] wrote stub artifacts to {out_dir} rows={len(df)}")
+    src = args.games or args.historical_odds or exports_dir() / "scores_1966-2025.csv"
+    t0 = time.perf_counter()
+    feats = game_features(pd.read_csv(src, low_memory=False))
+    df = feats[feats["margin"].notna() & (feats["season"] >= args.min_season)].reset_index(drop=True)
+    if df.empty:
+        raise SystemExit(f"[train_game] no played games in {src}")
+    t_feat = time.perf_counter() - t0
+
+    seasons = sorted(df["season"].dropna().unique())
+    test = seasons[-args.test_seasons:] if args.test_seasons and len(seasons) > args.test_seasons else []
+    metrics = {}
+    if test:
+        is_test = df["season"].isin(test)
+        m = fit(df[~is_test], alpha=args.alpha)
+        metrics = evaluate(m, df[is_test])
+        print(f"[train_game] holdout seasons {test[0]}-{test[-1]}: " + " ".join(
+            f"{k}={v:.4f}" if isinstance(v, float) else f"{k}={v}" for k, v in metrics.items()))
+
+    model = fit(df, alpha=args.alpha)
+    fit_metrics = evaluate(model, df)
+    dt = time.perf_counter() - t0
+    print(f"[train_game] fit on {len(df):,} games ({int(seasons[0])}-{int(seasons[-1])}) in {dt:.1f}s "
+          f"(features {t_feat:.1f}s); in-sample margin_mae={fit_metrics['margin_mae']:.2f} total_mae={fit_metrics['total_mae']:.2f}")
+
+    t = time.perf_counter()
+    slate = df.tail(16)
+    model.price(slate)
+    print(f"[train_game] 16-game slate priced in {(time.perf_counter() - t) * 1000:.2f} ms")
+
+    meta = {"features": FEATURES, "train_rows": int(len(df)), "seasons": [int(seasons[0]), int(seasons[-1])],
+            "holdout_seasons": [int(s) for s in test], "holdout": metrics, "in_sample": fit_metrics,
+            "alpha": args.alpha, "source": str(src), "version": "game_model_v1"}
+    if not args.no_register:
+        from tools.model_registry import register
+        mid = register(model, args.name, FEATURES, data=df[FEATURES + ["margin", "total"]],
+                       metrics={**{f"holdout_{k}": v for k, v in metrics.items()}, "train_rows": int(len(df))},
+                       params={"alpha": args.alpha, "min_season": args.min_season}, extra_meta=meta,
+                       activate=args.activate)
+        meta["model_id"] = mid
+        print(f"[train_game] Registered model id: {mid}")
+    if args.out:
+        from joblib import dump
+        args.out.mkdir(parents=True, exist_ok=True)
+        dump(model, args.out / "game_model.joblib")
+        (args.out / "metadata.json").write_text(json.dumps(meta, indent=2))
+        (args.out / "version.txt").write_text("game_model_v1\n")
+        print(f"[train_game] wrote {args.out / 'game_model.joblib'}")
 
 if __name__ == "__main__":
     main()
-
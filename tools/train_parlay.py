@@ -99,10 +99,89 @@ def prepare_dataframe(df: pd.DataFrame, min_season: int) -> pd.DataFrame:
 
     df_out = df_features.copy()
     df_out["result_bin"] = df.get("result_bin").values
+    if "season" in df.columns and "season" not in num_present:
+        df_out["season"] = pd.to_numeric(df["season"], errors="coerce").values
     return df_out, num_present
 
 
-def train(df: pd.DataFrame, out_dir: Path, feature_cols):
+# -------------------- walk-forward CV --------------------
+
+def walk_forward_folds(seasons: np.ndarray, min_train_seasons: int = 2) -> list[tuple[list[int], int]]:
+    """Season-blocked expanding window: train on every season before the test season."""
+    uniq = sorted(int(s) for s in pd.unique(seasons[~pd.isna(seasons)]))
+    return [(uniq[:i], uniq[i]) for i in range(min_train_seasons, len(uniq))]
+
+def _calibrated(base, method: str):
+    """Wrap an already fitted estimator for calibration on held-out rows (sklearn old and new)."""
+    from sklearn.calibration import CalibratedClassifierCV
+    try:
+        from sklearn.frozen import FrozenEstimator
+        return CalibratedClassifierCV(FrozenEstimator(base), method=method)
+    except ImportError:
+        return CalibratedClassifierCV(base, method=method, cv="prefit")
+
+def fit_model(X: np.ndarray, y: np.ndarray, season: np.ndarray | None, calibration: str = "none", C: float = 1.0):
+    """
+    LogisticRegression, optionally calibrated out of time: the base model is fit on all but the
+    latest season in the window and the isotonic / sigmoid (Platt) map on that latest season.
+    A single-season window falls back to its last 20% of rows.
+    """
+    if calibration == "none":
+        return LogisticRegression(max_iter=2000, C=C).fit(X, y)
+    if season is not None and len(pd.unique(season[~pd.isna(season)])) >= 2:
+        cal = season == np.nanmax(season)
+    else:
+        cal = np.zeros(len(y), dtype=bool); cal[int(len(y) * 0.8):] = True
+    if len(np.unique(y[~cal])) < 2 or len(np.unique(y[cal])) < 2:
+        return LogisticRegression(max_iter=2000, C=C).fit(X, y)
+    base = LogisticRegression(max_iter=2000, C=C).fit(X[~cal], y[~cal])
+    return _calibrated(base, calibration).fit(X[cal], y[cal])
+
+def score_metrics(y: np.ndarray, p: np.ndarray) -> dict:
+    from sklearn.metrics import brier_score_loss, roc_auc_score
+    p = np.clip(p, 1e-6, 1 - 1e-6)
+    out = {"n": int(len(y)), "logloss": float(log_loss(y, p, labels=[0, 1])),
+           "brier": float(brier_score_loss(y, p)), "accuracy": float(accuracy_score(y, (p >= 0.5).astype(int))),
+           "base_rate": float(np.mean(y)), "mean_p": float(np.mean(p))}
+    out["auc"] = float(roc_auc_score(y, p)) if len(np.unique(y)) == 2 else None
+    return out
+
+def _run_fold(X, y, season, train_seasons, test_season, calibration, C):
+    tr = np.isin(season, train_seasons); te = season == test_season
+    if len(np.unique(y[tr])) < 2 or te.sum() == 0:
+        return None
+    model = fit_model(X[tr], y[tr], season[tr], calibration, C)
+    return {"test_season": int(test_season), "train_seasons": f"{min(train_seasons)}-{max(train_seasons)}",
+            **score_metrics(y[te], model.predict_proba(X[te])[:, 1])}
+
+def cross_validate(df: pd.DataFrame, feature_cols, calibration: str = "none", C: float = 1.0,
+                   min_train_seasons: int = 2, n_jobs: int = 1) -> pd.DataFrame:
+    """Walk-forward CV, one fold per test season; folds run in parallel with joblib."""
+    from joblib import Parallel, delayed
+    if "season" not in df.columns:
+        return pd.DataFrame()
+    X = df[feature_cols].to_numpy(dtype="float64"); y = df["result_bin"].to_numpy(dtype="int64")
+    season = df["season"].to_numpy(dtype="float64")
+    folds = walk_forward_folds(season, min_train_seasons)
+    res = Parallel(n_jobs=n_jobs)(delayed(_run_fold)(X, y, season, tr, te, calibration, C) for tr, te in folds)
+    return pd.DataFrame([r for r in res if r is not None])
+
+def summarize_cv(folds: pd.DataFrame) -> dict:
+    """Row-weighted means over folds (what the registry shows as the model's metrics)."""
+    if folds.empty:
+        return {}
+    w = folds["n"].to_numpy(dtype="float64")
+    out = {"cv_folds": int(len(folds)), "cv_rows": int(w.sum())}
+    for m in ("logloss", "brier", "accuracy", "auc"):
+        v = pd.to_numeric(folds[m], errors="coerce").to_numpy(dtype="float64"); ok = ~np.isnan(v)
+        out[f"cv_{m}"] = float(np.average(v[ok], weights=w[ok])) if ok.any() else None
+    return out
+
+# -------------------- train + register --------------------
+
+def train(df: pd.DataFrame, out_dir: Path, feature_cols, calibration: str = "none", C: float = 1.0,
+          cv: bool = True, min_train_seasons: int = 2, n_jobs: int = 1, name: str = "parlay",
+          register: bool = True, activate: bool = False):
     X = df[feature_cols].values
     y = df["result_bin"].values
 
@@ -111,9 +190,19 @@ def train(df: pd.DataFrame, out_dir: Path, feature_cols):
     if len(uniq) < 2:
         print("[train_parlay] Not enough class variety to train (need wins & losses). Exiting gracefully.")
         return None
+    y = y.astype("int64")
+    season = df["season"].to_numpy(dtype="float64") if "season" in df.columns else None
+
+    folds = pd.DataFrame()
+    if cv and season is not None:
+        folds = cross_validate(df, feature_cols, calibration, C, min_train_seasons, n_jobs)
+        if not folds.empty:
+            with pd.option_context("display.width", 160):
+                print(folds[["test_season", "train_seasons", "n", "logloss", "brier", "auc", "accuracy"]]
+                      .round(4).to_string(index=False))
+    cv_summary = summarize_cv(folds)
 
-    model = LogisticRegression(max_iter=2000, n_jobs=None)  # n_jobs in newer sklearn; if error, it will be ignored
-    model.fit(X, y)
+    model = fit_model(X, y, season, calibration, C)
 
     # Simple fit metrics
     try:
@@ -125,21 +214,36 @@ def train(df: pd.DataFrame, out_dir: Path, feature_cols):
         acc = None
         ll = None
 
-    out_dir.mkdir(parents=True, exist_ok=True)
-    model_path = out_dir / "parlay_model.joblib"
-    dump(model, model_path)
-
     meta = {
         "feature_cols": feature_cols,
         "train_size": int(len(df)),
         "accuracy_in_sample": None if acc is None else float(acc),
         "logloss_in_sample": None if ll is None else float(ll),
         "columns_available": list(df.columns),
-        "version": "1.0.0",
+        "calibration": calibration,
+        "cv": cv_summary,
+        "cv_folds": folds.to_dict(orient="records"),
+        "version": "1.1.0",
     }
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    model_path = out_dir / "parlay_model.joblib"
+    if register:
+        from tools.model_registry import register as reg_model
+        mid = reg_model(model, name, list(feature_cols), data=df[list(feature_cols) + ["result_bin"]],
+                        metrics={**cv_summary, "logloss_in_sample": meta["logloss_in_sample"]},
+                        params={"C": C, "calibration": calibration, "min_train_seasons": min_train_seasons},
+                        extra_meta=meta, activate=activate)
+        meta["model_id"] = mid
+        print(f"[train_parlay] Registered model id: {mid}")
+    dump(model, model_path)
     (out_dir / "parlay_model.meta.json").write_text(json.dumps(meta, indent=2))
     print(f"[train_parlay] Saved model to: {model_path}")
     print(f"[train_parlay] Meta: {out_dir / 'parlay_model.meta.json'}")
+    if cv_summary:
+        print(f"[train_parlay] Walk-forward CV ({cv_summary['cv_folds']} seasons): "
+              f"logloss={cv_summary['cv_logloss']:.4f} brier={cv_summary['cv_brier']:.4f} "
+              f"auc={(cv_summary['cv_auc'] or float('nan')):.3f}")
     if acc is not None:
         print(f"[train_parlay] In-sample acc={acc:.3f} logloss={ll:.4f}")
     return str(model_path)
@@ -150,6 +254,17 @@ def main():
     ap.add_argument("--edges", required=True, help="Path to edges_graded.csv")
     ap.add_argument("--out", required=True, help="Output directory for models")
     ap.add_argument("--min-season", type=int, default=2017)
+    ap.add_argument("--calibration", choices=["none", "isotonic", "sigmoid"], default="none",
+                    help="out-of-time probability calibration (sigmoid = Platt)")
+    ap.add_argument("--C", type=float, default=1.0, help="inverse L2 strength")
+    ap.add_argument("--no-cv", action="store_true", help="skip season walk-forward CV")
+    ap.add_argument("--min-train-seasons", type=int, default=2)
+    ap.add_argument("--n-jobs", type=int, default=1, help="CV folds in parallel (-1 = all cores)")
+    ap.add_argument("--name", default="parlay", help="registry name")
+    ap.add_argument("--no-register", action="store_true", help="only write the files in --out")
+    ap.add_argument("--activate", action="store_true", help="make this the active registry model")
+    ap.add_argument("--incremental", metavar="CKPT", default=None,
+                    help="train only the weeks after checkpoint CKPT with SGD (tools/incremental_train.py)")
     args = ap.parse_args()
 
     edges_path = Path(args.edges)
@@ -159,6 +274,12 @@ def main():
         print(f"[train_parlay] ERROR: edges file not found: {edges_path}", file=sys.stderr)
         sys.exit(2)
 
+    if args.incremental:
+        from tools.incremental_train import publish, run
+        state = run("parlay", edges_path, Path(args.incremental), min_season=args.min_season)
+        publish(state, "parlay", out_dir, register=not args.no_register, name=args.name, activate=args.activate)
+        return
+
     df = pd.read_csv(edges_path)
     if df.empty:
         print(f"[train_parlay] ERROR: edges file is empty: {edges_path}", file=sys.stderr)
@@ -172,7 +293,9 @@ def main():
         print("[train_parlay] No labeled (win/loss) rows after filtering; nothing to train.")
         sys.exit(0)
 
-    model_path = train(df_prepped, out_dir, feats)
+    model_path = train(df_prepped, out_dir, feats, calibration=args.calibration, C=args.C,
+                       cv=not args.no_cv, min_train_seasons=args.min_train_seasons, n_jobs=args.n_jobs,
+                       name=args.name, register=not args.no_register, activate=args.activate)
     if model_path is None:
         sys.exit(0)
 
@@ -1,28 +1,25 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 """
-train_props.py — minimal, dependency-light trainer for player props.
-
-Inputs (CSV):
-- Required-ish columns (the script is forgiving):
-  season (int)
-  market (str)         e.g., pass_yds, rush_yds, rec_yds, pass_tds, etc.
-  selection (str)      "over" or "under" (case-insensitive)
-  line (float)         closing/opening/mixed — whatever you choose
-  result (W/L/1/0)     optional; if missing, we try to compute from actual+line+selection
-  actual (float)       optional; if present, lets us compute wins and line_bias
-  player_id (str/int)  optional
-
-Artifacts:
-- models/props/hitrate.csv     (market, selection, line_bin, n, wins, hit_rate)
-- models/props/line_bias.csv   (market, n, mean_bias, std_bias)  # when 'actual' exists
-- models/props/metadata.json
-- models/props/version.txt
+train_props.py — player prop distribution model (tools/props_model.py).
+
+Fits per-player, per-stat distributions from exports/player_game_stats.parquet (negative binomial
+for counts, zero-mass + gamma mixture for yardage) shrunk toward role/usage-tier priors, scores a
+holdout season, and registers the model as "props" so any line or alt ladder can be priced.
+
+Legacy summaries are still produced when --features (graded prop records) is given:
+- <out>/hitrate.csv     (market, selection, line_bin, n, wins, hit_rate)
+- <out>/line_bias.csv   (market, n, mean_bias, std_bias)  # when 'actual' exists
+
+Artifacts (--out):
+- props_params.parquet, props_priors.csv, metadata.json, version.txt
+- props_hit_model.joblib + props_hit_model.meta.json   # --incremental only
 """
 import argparse
 import json
 import math
 import re
+import time
 from pathlib import Path
 
 import numpy as np
@@ -131,52 +128,121 @@ def summarize_line_bias(df: pd.DataFrame) -> pd.DataFrame:
     return out.sort_values(["market"]).reset_index(drop=True)
 
 
-def main():
-    ap = argparse.ArgumentParser()
-    ap.add_argument("--features", required=True,
-                    help="CSV of props records. Must include at least: season, market, selection, line "
-                         "and either result or (actual+line+selection).")
-    ap.add_argument("--out", required=True, help="Output directory (e.g., models\\props)")
-    ap.add_argument("--props-stats-since", type=int, default=2017,
-                    help="Earliest season to include for training (stats/outcomes only is fine)")
-    args = ap.parse_args()
-
-    features_path = Path(args.features)
-    out_dir = Path(args.out)
-    out_dir.mkdir(parents=True, exist_ok=True)
-
-    df = pd.read_csv(features_path)
-    df = normalize_columns(df)
-
-    # season filter
-    if "season" in df.columns:
-        df = df[pd.to_numeric(df["season"], errors="coerce").fillna(0).astype(int) >= int(args.props_stats_since)]
+def evaluate(model, test: pd.DataFrame) -> pd.DataFrame:
+    """
+    Per stat on held-out games: log score of the realised value, and over calibration at the line
+    nearest each player's mean (floor(mean) + 0.5, so no pushes).
+    """
+    from tools.props_model import STATS
+    rows = []
+    for stat, (_, role, _) in STATS.items():
+        if stat not in test.columns:
+            continue
+        t = test[(test["role"] == role) & test[stat].notna() & test["player_id"].notna()]
+        if t.empty:
+            continue
+        q = pd.DataFrame({"player_id": t["player_id"].to_numpy(), "stat": stat})
+        y = t[stat].to_numpy(dtype="float64")
+        mean = model.resolve(q)["mean"].to_numpy(dtype="float64")
+        q["line"] = np.floor(mean) + 0.5
+        p = model.price(q)
+        exact = model.price(q.assign(line=np.round(y)))["p_push"].to_numpy()
+        over = (y > q["line"].to_numpy()).astype("float64")
+        seen = (p["n_games"].to_numpy(dtype="float64", na_value=0) > 0)
+        rows.append({"stat": stat, "n": len(t), "seen_share": float(seen.mean()),
+                     "mae": float(np.nanmean(np.abs(mean - y))),
+                     "log_score": float(np.nanmean(np.log(np.clip(exact, 1e-6, 1)))) if stat not in ("pass_yards", "rec_yards", "rush_yards") else np.nan,
+                     "p_over_mean": float(np.nanmean(p["p_over"])), "over_rate": float(over.mean()),
+                     "brier_over": float(np.nanmean((p["p_over"].to_numpy() - over) ** 2))})
+    return pd.DataFrame(rows)
 
-    # ensure 'win'
-    df = ensure_result(df)
 
-    # Summaries
-    hitrate = summarize_hitrate(df)
-    line_bias = summarize_line_bias(df)
+def main():
+    ap = argparse.ArgumentParser(description="Fit player prop distributions from player_game_stats.")
+    ap.add_argument("--stats", default="", help="player_game_stats parquet (default: exports/player_game_stats.parquet)")
+    ap.add_argument("--out", default="", help="also write params / priors / metadata here (e.g., models\\props)")
+    ap.add_argument("--props-stats-since", type=int, default=2017, help="earliest season used")
+    ap.add_argument("--half-life", type=float, default=16.0, help="recency half-life in games")
+    ap.add_argument("--tiers", type=int, default=3, help="usage tiers per role for the priors")
+    ap.add_argument("--test-season", type=int, default=None, help="holdout season (default: latest; 0 = none)")
+    ap.add_argument("--features", default="", help="(legacy) graded props CSV for hit-rate / line-bias summaries")
+    ap.add_argument("--name", default="props", help="registry name")
+    ap.add_argument("--no-register", action="store_true")
+    ap.add_argument("--activate", action="store_true")
+    ap.add_argument("--incremental", metavar="CKPT", default="",
+                    help="instead: update the graded-props hit classifier from --features after checkpoint CKPT")
+    args = ap.parse_args()
 
-    # Save
-    hitrate.to_csv(out_dir / "hitrate.csv", index=False)
-    line_bias.to_csv(out_dir / "line_bias.csv", index=False)
+    if args.incremental:
+        if not args.features:
+            raise SystemExit("[train_props] --incremental needs --features (graded prop records)")
+        from tools.incremental_train import publish, run
+        state = run("props", Path(args.features), Path(args.incremental), min_season=args.props_stats_since)
+        publish(state, "props", Path(args.out) if args.out else None, register=not args.no_register,
+                name=None if args.name == "props" else args.name, activate=args.activate)
+        return
+
+    from tools.pathing import exports_dir
+    from tools.props_model import fit
+    out_dir = Path(args.out) if args.out else None
+    if out_dir:
+        out_dir.mkdir(parents=True, exist_ok=True)
+
+    stats_path = Path(args.stats) if args.stats else exports_dir() / "player_game_stats.parquet"
+    stats = pd.read_parquet(stats_path)
+    stats.columns = [str(c).lower() for c in stats.columns]
+    stats["season"] = pd.to_numeric(stats["season"], errors="coerce")
+    stats["week"] = pd.to_numeric(stats["week"], errors="coerce")
+    stats = stats[stats["season"] >= args.props_stats_since]
+    seasons = sorted(stats["season"].dropna().unique().astype(int))
+    if not seasons:
+        raise SystemExit(f"[train_props] no player games since {args.props_stats_since} in {stats_path}")
+
+    test_season = seasons[-1] if args.test_season is None else args.test_season
+    report = pd.DataFrame()
+    if test_season and len(seasons) > 1 and test_season in seasons:
+        m = fit(stats[stats["season"] < test_season], args.half_life, args.tiers)
+        report = evaluate(m, stats[stats["season"] == test_season])
+        with pd.option_context("display.width", 160):
+            print(f"[train_props] holdout season {test_season}:")
+            print(report.round(4).to_string(index=False))
+
+    t = time.perf_counter()
+    model = fit(stats, args.half_life, args.tiers)
+    print(f"[train_props] fit {len(model.params):,} player-stat distributions over {len(stats):,} rows "
+          f"({seasons[0]}-{seasons[-1]}) in {time.perf_counter() - t:.2f}s")
 
     meta = {
-        "records": int(len(df)),
-        "hitrate_rows": int(len(hitrate)),
-        "line_bias_rows": int(len(line_bias)),
-        "required_cols_present": sorted(list(set(["season", "market", "selection", "line"]) & set(df.columns))),
-        "win_filled_rate": float(df["win"].notna().mean()) if "win" in df.columns else 0.0,
+        "source": str(stats_path), "rows": int(len(stats)), "seasons": [seasons[0], seasons[-1]],
+        "half_life": args.half_life, "tiers": args.tiers, "test_season": test_season,
+        "holdout": report.to_dict(orient="records"), "version": "props_dist_v1",
     }
-    (out_dir / "metadata.json").write_text(json.dumps(meta, indent=2))
-    (out_dir / "version.txt").write_text("props_trainer_v1\n")
-
-    print(f"[ok] props model artifacts at {out_dir} "
-          f"| records={len(df)} hitrate={len(hitrate)} line_bias={len(line_bias)}")
+    if not args.no_register:
+        from tools.model_registry import register
+        metrics = {}
+        if not report.empty:
+            metrics = {"holdout_brier_over": float(np.average(report["brier_over"], weights=report["n"])),
+                       "holdout_n": int(report["n"].sum())}
+        mid = register(model, args.name, sorted(model.params["stat"].unique()), data=stats,
+                       metrics=metrics, params={"half_life": args.half_life, "tiers": args.tiers},
+                       extra_meta=meta, activate=args.activate)
+        meta["model_id"] = mid
+        print(f"[train_props] Registered model id: {mid}")
+
+    if out_dir:
+        model.params.to_parquet(out_dir / "props_params.parquet", index=False)
+        model.priors.to_csv(out_dir / "props_priors.csv", index=False)
+        if args.features:
+            df = ensure_result(normalize_columns(pd.read_csv(args.features)))
+            if "season" in df.columns:
+                df = df[pd.to_numeric(df["season"], errors="coerce").fillna(0).astype(int) >= int(args.props_stats_since)]
+            summarize_hitrate(df).to_csv(out_dir / "hitrate.csv", index=False)
+            summarize_line_bias(df).to_csv(out_dir / "line_bias.csv", index=False)
+            meta["records"] = int(len(df))
+        (out_dir / "metadata.json").write_text(json.dumps(meta, indent=2, default=str))
+        (out_dir / "version.txt").write_text("props_dist_v1\n")
+        print(f"[ok] props model artifacts at {out_dir}")
 
 
 if __name__ == "__main__":
     main()
-